@@ -12,6 +12,8 @@ from pathlib import Path
 import re
 from typing import Dict, List, Optional
 
+from index_statistics import add_entry
+
 # Cores para terminal
 class Colors:
     HEADER = '\033[95m'
@@ -476,25 +478,8 @@ def update_index(metadata: Dict, file_path: str):
         "status": metadata["status"]
     }
     
-    index["exercises"].append(exercise_entry)
-    index["total_exercises"] = len(index["exercises"])
-    index["last_updated"] = datetime.now().isoformat()
-    
-    # Estatísticas
-    disc = metadata["classification"]["discipline"]
-    index["statistics"]["by_discipline"][disc] = index["statistics"]["by_discipline"].get(disc, 0) + 1
-    
-    mod = metadata["classification"]["module"]
-    index["statistics"]["by_module"][mod] = index["statistics"]["by_module"].get(mod, 0) + 1
-    
-    conc = metadata["classification"]["concept_name"]
-    index["statistics"]["by_concept"][conc] = index["statistics"]["by_concept"].get(conc, 0) + 1
-    
-    diff = metadata["classification"]["difficulty_label"]
-    index["statistics"]["by_difficulty"][diff] = index["statistics"]["by_difficulty"].get(diff, 0) + 1
-    
-    ex_type = metadata["exercise_type"]
-    index["statistics"]["by_type"][ex_type] = index["statistics"]["by_type"].get(ex_type, 0) + 1
+    # Adicionar e atualizar estatísticas (deltas em todas as facetas)
+    add_entry(index, exercise_entry)
     
     with open(index_file, 'w', encoding='utf-8') as f:
         json.dump(index, f, indent=2, ensure_ascii=False)
@@ -690,25 +690,9 @@ Determine a função inversa de $f(x) = 2x + 3$.
         return f"{disc_abbr}_{module_clean}_{concept_abbr}_{tipo_abbr}_{next_num:03d}"
     
     def update_global_index(self, exercise_id: str, data: Dict, tex_file: Path):
-        """Atualiza index.json global."""
+        """Atualiza index.json global (ou o catálogo SQLite, se inicializado)."""
         index_file = self.base_path / "index.json"
         
-        if index_file.exists():
-            with open(index_file, 'r', encoding='utf-8') as f:
-                index = json.load(f)
-        else:
-            index = {
-                "database_version": "3.0",
-                "last_updated": "",
-                "total_exercises": 0,
-                "statistics": {
-                    "by_module": {},
-                    "by_difficulty": {},
-                    "by_type": {}
-                },
-                "exercises": []
-            }
-        
         # Adicionar exercício
         module_name = self.config.get(data['disciplina'], {}).get(data['módulo'], {}).get('name', data['módulo'])
         
@@ -735,20 +719,37 @@ Determine a função inversa de $f(x) = 2x + 3$.
             "points": 0
         }
         
-        index["exercises"].append(exercise_entry)
-        index["total_exercises"] = len(index["exercises"])
-        index["last_updated"] = datetime.now().isoformat()
+        from exercise_catalog import open_catalog
+        catalog = open_catalog(self.base_path)
+        if catalog is not None:
+            with catalog:
+                catalog.add_exercise(exercise_entry)
+                total = catalog.count()
+            print(f"{Colors.GREEN}✓ Catálogo atualizado: {total} exercícios{Colors.END}")
+            return
+        
+        from index_journal import open_journal
+        journal = open_journal(self.base_path)
+        if journal is not None:
+            journal.append('add', entry=exercise_entry)
+            print(f"{Colors.GREEN}✓ Índice atualizado (journal): {exercise_id}{Colors.END}")
+            return
         
-        # Atualizar estatísticas
-        mod_name = module_name
-        index["statistics"]["by_module"][mod_name] = index["statistics"]["by_module"].get(mod_name, 0) + 1
-        
-        diff_labels = {1: "Muito Fácil", 2: "Fácil", 3: "Médio", 4: "Difícil", 5: "Muito Difícil"}
-        diff_label = diff_labels.get(data['dificuldade'], "Fácil")
-        index["statistics"]["by_difficulty"][diff_label] = index["statistics"]["by_difficulty"].get(diff_label, 0) + 1
+        if index_file.exists():
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        else:
+            index = {
+                "database_version": "3.0",
+                "last_updated": "",
+                "total_exercises": 0,
+                "statistics": {},
+                "exercises": []
+            }
         
-        tipo_nome = data.get('tipo_nome', data['tipo'].replace('_', ' ').title())
-        index["statistics"]["by_type"][tipo_nome] = index["statistics"]["by_type"].get(tipo_nome, 0) + 1
+        # Adicionar e atualizar estatísticas (deltas em todas as facetas)
+        from index_statistics import add_entry
+        add_entry(index, exercise_entry)
         
         with open(index_file, 'w', encoding='utf-8') as f:
             json.dump(index, f, indent=2, ensure_ascii=False)
@@ -19,6 +19,7 @@ from typing import Dict, List, Optional
 
 # Importar sistema de preview
 from preview_system import PreviewManager, create_exercise_preview, create_project_preview
+from exercise_utils import update_index as write_index_entry
 import sys
 import json
 class Colors:
@@ -799,73 +800,9 @@ def create_research_project(payload: dict = None, auto_approve: bool = False):
 
 
 def update_index(metadata: Dict, file_path: str):
-    """Atualiza índice central (agora com tipo)"""
-    index_file = BASE_DIR / "index.json"
-    
-    if index_file.exists():
-        with open(index_file, 'r', encoding='utf-8') as f:
-            index = json.load(f)
-    else:
-        index = {
-            "database_version": "3.0",
-            "last_updated": "",
-            "total_exercises": 0,
-            "statistics": {
-                "by_discipline": {},
-                "by_module": {},
-                "by_concept": {},
-                "by_type": {},
-                "by_difficulty": {},
-                "by_format": {}
-            },
-            "exercises": []
-        }
-    
-    # Adicionar exercício
-    exercise_entry = {
-        "id": metadata["id"],
-        "path": file_path.replace("\\", "/"),
-        "discipline": metadata["classification"]["discipline"],
-        "module": metadata["classification"]["module"],
-        "module_name": metadata["classification"]["module_name"],
-        "concept": metadata["classification"]["concept"],
-        "concept_name": metadata["classification"]["concept_name"],
-        "tipo": metadata["classification"]["tipo"],
-        "tipo_nome": metadata["classification"]["tipo_nome"],
-        "difficulty": metadata["classification"]["difficulty"],
-        "format": metadata["exercise_type"],
-        "tags": metadata["classification"]["tags"],
-        "points": metadata.get("evaluation", {}).get("points", 0),
-        "status": metadata["status"]
-    }
-    
-    index["exercises"].append(exercise_entry)
-    index["total_exercises"] = len(index["exercises"])
-    index["last_updated"] = datetime.now().isoformat()
-    
-    # Estatísticas
-    disc = metadata["classification"]["discipline"]
-    index["statistics"]["by_discipline"][disc] = index["statistics"]["by_discipline"].get(disc, 0) + 1
-    
-    mod = metadata["classification"]["module"]
-    index["statistics"]["by_module"][mod] = index["statistics"]["by_module"].get(mod, 0) + 1
-    
-    conc = metadata["classification"]["concept_name"]
-    index["statistics"]["by_concept"][conc] = index["statistics"]["by_concept"].get(conc, 0) + 1
-    
-    tipo = metadata["classification"]["tipo_nome"]
-    index["statistics"]["by_type"][tipo] = index["statistics"]["by_type"].get(tipo, 0) + 1
-    
-    diff = metadata["classification"]["difficulty_label"]
-    index["statistics"]["by_difficulty"][diff] = index["statistics"]["by_difficulty"].get(diff, 0) + 1
-    
-    ex_format = metadata["exercise_type"]
-    index["statistics"]["by_format"][ex_format] = index["statistics"]["by_format"].get(ex_format, 0) + 1
-    
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
-    
-    print_success(f"Índice atualizado: {index['total_exercises']} exercícios no total")
+    """Atualiza índice central (catálogo, journal ou index.json, via exercise_utils)"""
+    target = write_index_entry(BASE_DIR, metadata, file_path)
+    print_success(f"Índice atualizado: {metadata['id']} -> {Path(target).name}")
 
 def main():
     """Função principal"""
@@ -11,14 +11,21 @@ What it does:
  - Appends new exercise entries from P1_index_additions.json to the "exercises" array
    if they do not already exist (by id).
  - Writes the updated index.json.
+ - If the index change journal is enabled (ExerciseDatabase/index.journal), appends
+   the new entries to the journal instead and skips the backup copy.
 
 Note: run this in the repository root. A Python 3.8+ environment is expected.
 """
 import json
 import shutil
 import datetime
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from index_journal import open_journal, read_index
+from index_statistics import add_entry
+
 ROOT = Path(__file__).resolve().parents[3]
 INDEX = ROOT / "ExerciseDatabase" / "index.json"
 PATCH = ROOT / "ExerciseDatabase" / "_tools" / "agent_index_updates" / "P1_index_additions.json"
@@ -29,8 +36,18 @@ def main():
         return
     with open(PATCH, "r", encoding="utf-8") as f:
         patch = json.load(f)
-    with open(INDEX, "r", encoding="utf-8") as f:
-        index = json.load(f)
+    index = read_index(INDEX)
+
+    journal = open_journal(INDEX.parent)
+    if journal is not None:
+        existing = {e.get("id") for e in index.get("exercises", []) if isinstance(e, dict)}
+        new_count = 0
+        for e in patch.get("exercises", []):
+            if e.get("id") not in existing:
+                journal.append("add", entry=e)
+                new_count += 1
+        print(f"Applied patch: {new_count} new exercises appended to {journal.path}")
+        return
 
     # Backup
     ts = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
@@ -43,7 +60,7 @@ def main():
     new_count = 0
     for e in additions:
         if e.get("id") not in existing:
-            index.setdefault("exercises", []).append(e)
+            add_entry(index, e)
             new_count += 1
     with open(INDEX, "w", encoding="utf-8") as f:
         json.dump(index, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,112 @@
+"""Make-style build manifests for generated documents.
+
+Each output keeps a small JSON file next to it (``.build_<stem>.json``) with
+the inputs it was built from and the build parameters. An input is fingerprinted
+by ``(mtime_ns, size, sha256)``; when mtime and size match the previous build
+the stored hash is reused, so checking an up-to-date output costs one ``stat``
+per input::
+
+    manifest = BuildManifest(output_dir, 'sebenta_conceito')
+    reasons = manifest.check(inputs, params={'tipo': None}, output=pdf)
+    if reasons:
+        build()
+        manifest.save()
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+MANIFEST_VERSION = 1
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _rel(path: Path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def snapshot(paths: Iterable[Path], previous: Optional[Dict[str, List]] = None) -> Dict[str, List]:
+    """``{relpath: [mtime_ns, size, sha256]}``, reusing hashes of unchanged files."""
+    previous = previous or {}
+    result: Dict[str, List] = {}
+    for path in paths:
+        rel = _rel(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        old = previous.get(rel)
+        if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+            result[rel] = old
+        else:
+            result[rel] = [st.st_mtime_ns, st.st_size, _sha256(Path(path))]
+    return result
+
+
+class BuildManifest:
+    def __init__(self, output_dir: Path, stem: str):
+        self.path = Path(output_dir) / f'.build_{stem}.json'
+        self._pending: Optional[Dict] = None
+
+    def load(self) -> Optional[Dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return data if data.get('version') == MANIFEST_VERSION else None
+
+    def check(self, inputs: Iterable[Path], params: Optional[Dict] = None,
+              output: Optional[Path] = None) -> List[str]:
+        """Reasons to rebuild (empty when up to date). Call :meth:`save` after a successful build."""
+        params = params or {}
+        previous = self.load()
+        old_inputs = (previous or {}).get('inputs', {})
+        current = snapshot(inputs, old_inputs)
+        self._pending = {
+            'version': MANIFEST_VERSION,
+            'inputs': current,
+            'params': params,
+            'output': _rel(output) if output else None,
+        }
+        if previous is None:
+            return ['sem manifesto anterior']
+
+        reasons = []
+        if output is not None and not Path(output).exists():
+            reasons.append(f'saída em falta: {_rel(output)}')
+        changed_params = sorted(k for k in set(params) | set(previous.get('params', {}))
+                                if params.get(k) != previous.get('params', {}).get(k))
+        if changed_params:
+            reasons.append(f"parâmetros alterados: {', '.join(changed_params)}")
+        for rel in sorted(current):
+            if rel not in old_inputs:
+                reasons.append(f'novo: {rel}')
+            elif current[rel][2] != old_inputs[rel][2]:
+                reasons.append(f'alterado: {rel}')
+        reasons.extend(f'removido: {rel}' for rel in sorted(set(old_inputs) - set(current)))
+        if not reasons and current != old_inputs:
+            self.save()  # only mtimes moved: remember them so the next check skips hashing
+        return reasons
+
+    def save(self):
+        if self._pending is None:
+            raise RuntimeError('check() must run before save()')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(self._pending, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
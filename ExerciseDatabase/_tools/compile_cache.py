@@ -0,0 +1,255 @@
+"""Content-addressed cache for LaTeX compilations.
+
+The key of a compilation is a SHA-256 over the final ``.tex``, every file it
+pulls in (``\\input``, ``\\include``, ``\\IncludeExercise``, ``\\includegraphics``,
+... followed recursively), the local ``.sty``/``.cls`` files next to it, the
+engine version and the compile options. When the key was seen before, the
+stored PDF is hard-linked (or copied) next to the ``.tex`` and the engine is
+not run at all::
+
+    ok = compile_with_cache(tex_file, run_pdflatex, options=('-interaction=nonstopmode', 2))
+
+The cache lives in ``SebentasDatabase/.compile_cache`` (override with
+``COMPILE_CACHE_PATH``; ``COMPILE_CACHE=0`` disables it)::
+
+    python compile_cache.py stats
+    python compile_cache.py clear
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = REPO_ROOT / 'SebentasDatabase' / '.compile_cache'
+
+_DEPENDENCY_RE = re.compile(
+    r'\\(input|include|subfile|IncludeExercise|InputIfFileExists|includegraphics|includepdf|lstinputlisting)'
+    r'\*?\s*(?:\[[^\]]*\])?\s*\{([^}]+)\}')
+_COMMENT_RE = re.compile(r'(?<!\\)%.*')
+GRAPHIC_EXTENSIONS = ('', '.pdf', '.png', '.jpg', '.jpeg', '.eps')
+TEX_EXTENSIONS = ('.tex', '')
+LOCAL_PACKAGE_SUFFIXES = ('.sty', '.cls', '.bst', '.bib')
+
+# (path, mtime_ns, size) -> sha256, shared by every key computed in this process
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+_OFF_VALUES = ('0', 'false', 'no', 'nao', 'não')
+
+
+def env_enabled(name: str) -> bool:
+    """On/off switch read from the environment: on unless `name` is 0/false/no/não."""
+    return os.environ.get(name, '1').strip().lower() not in _OFF_VALUES
+
+
+def cache_enabled() -> bool:
+    return env_enabled('COMPILE_CACHE')
+
+
+def _hash_file(path: Path) -> str:
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                h.update(block)
+        digest = _file_hashes[key] = h.hexdigest()
+    return digest
+
+
+@lru_cache(maxsize=None)
+def engine_version(engine: str = 'pdflatex') -> str:
+    """First line of ``<engine> --version`` (``unknown`` when not installed)."""
+    exe = shutil.which(engine)
+    if not exe:
+        return 'unknown'
+    try:
+        out = subprocess.run([exe, '--version'], capture_output=True, text=True, timeout=30,
+                             encoding='utf-8', errors='replace').stdout
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    return (out.splitlines() or ['unknown'])[0].strip()
+
+
+def _resolve(ref: str, command: str, search_dirs: List[Path]) -> Optional[Path]:
+    extensions = GRAPHIC_EXTENSIONS if command in ('includegraphics', 'includepdf') else TEX_EXTENSIONS
+    for directory in search_dirs:
+        for ext in extensions:
+            candidate = directory / (ref + ext)
+            if candidate.is_file():
+                return candidate.resolve()
+    return None
+
+
+def dependencies(tex_file: Path) -> Tuple[List[Path], List[str], bool]:
+    """Files reachable from `tex_file`: (resolved files, unresolved references, uses ``\\today``)."""
+    tex_file = Path(tex_file).resolve()
+    root = tex_file.parent
+    seen: Set[Path] = {tex_file}
+    files: List[Path] = []
+    unresolved: List[str] = []
+    uses_today = False
+    pending = [tex_file]
+    while pending:
+        current = pending.pop()
+        try:
+            source = current.read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            continue
+        source = _COMMENT_RE.sub('', source)
+        uses_today = uses_today or '\\today' in source
+        for command, refs in _DEPENDENCY_RE.findall(source):
+            for ref in refs.split(','):
+                ref = ref.strip()
+                if not ref:
+                    continue
+                # TeX resolves relative to the main file; also try the including file's folder
+                path = _resolve(ref, command, [root, current.parent])
+                if path is None:
+                    unresolved.append(f'{command}:{ref}')
+                elif path not in seen:
+                    seen.add(path)
+                    files.append(path)
+                    if path.suffix in ('.tex', ''):
+                        pending.append(path)
+    for local in sorted(root.iterdir()):
+        if local.suffix in LOCAL_PACKAGE_SUFFIXES and local.resolve() not in seen:
+            files.append(local.resolve())
+    return files, unresolved, uses_today
+
+
+class CompileCache:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or os.environ.get('COMPILE_CACHE_PATH') or DEFAULT_CACHE_DIR)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tex_file: Path, engine: str = 'pdflatex', options: Iterable = ()) -> str:
+        tex_file = Path(tex_file).resolve()
+        files, unresolved, uses_today = dependencies(tex_file)
+        h = hashlib.sha256()
+        h.update(f'engine={engine}|{engine_version(engine)}|options={list(options)!r}\n'.encode())
+        h.update(b'main=' + _hash_file(tex_file).encode() + b'\n')
+        for path in sorted(files):
+            # relative names keep keys stable across timestamped output folders
+            for base in (tex_file.parent, REPO_ROOT):
+                try:
+                    rel = path.relative_to(base).as_posix()
+                    break
+                except ValueError:
+                    rel = path.as_posix()
+            h.update(f'{rel}={_hash_file(path)}\n'.encode())
+        for ref in sorted(unresolved):
+            h.update(f'missing={ref}\n'.encode())
+        if uses_today:
+            h.update(f'today={date.today().isoformat()}\n'.encode())
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / f'{key}.pdf'
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        """Place the cached PDF for `key` at `dest`; False on a miss."""
+        entry = self._entry(key)
+        if not entry.is_file():
+            self.misses += 1
+            return False
+        dest = Path(dest)
+        if dest.exists():
+            dest.unlink()
+        try:
+            os.link(entry, dest)
+        except OSError:
+            shutil.copy2(entry, dest)
+        self.hits += 1
+        return True
+
+    def store(self, key: str, pdf: Path) -> Path:
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # unique temp name: compiles in threads of one process share the pid
+        fd, tmp = tempfile.mkstemp(dir=str(entry.parent), prefix=f'{entry.name}.', suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copy2(pdf, tmp)
+            os.replace(tmp, entry)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return entry
+
+    def entries(self) -> List[Path]:
+        return sorted(self.root.glob('*/*.pdf')) if self.root.exists() else []
+
+    def clear(self) -> int:
+        entries = self.entries()
+        for entry in entries:
+            entry.unlink()
+        return len(entries)
+
+
+_shared_cache: Optional[CompileCache] = None
+
+
+def get_cache() -> CompileCache:
+    """Compile cache shared by every generator in this process (``COMPILE_CACHE_PATH`` or the default root)."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = CompileCache()
+    return _shared_cache
+
+
+def compile_with_cache(tex_file: Path, run: Callable[[], bool], engine: str = 'pdflatex',
+                       options: Iterable = (), cache: Optional[CompileCache] = None) -> Tuple[bool, bool]:
+    """Produce ``tex_file.with_suffix('.pdf')`` from the cache or by calling `run`.
+
+    `run` compiles in place and returns whether the build succeeded; successful
+    PDFs are stored. Returns ``(success, cache_hit)``.
+    """
+    tex_file = Path(tex_file)
+    pdf = tex_file.with_suffix('.pdf')
+    if not cache_enabled():
+        return run(), False
+    cache = cache or get_cache()
+    key = cache.key(tex_file, engine, options)
+    if cache.fetch(key, pdf):
+        return True, True
+    ok = run()
+    if ok and pdf.exists():
+        try:
+            cache.store(key, pdf)
+        except OSError:
+            pass  # a full or read-only cache never fails a build
+    return ok, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cache de compilações LaTeX (por conteúdo)')
+    parser.add_argument('command', choices=['stats', 'clear'])
+    args = parser.parse_args()
+    cache = CompileCache()
+    if args.command == 'clear':
+        print(f"🧹 {cache.clear()} PDFs removidos de {cache.root}")
+        return
+    entries = cache.entries()
+    size = sum(e.stat().st_size for e in entries)
+    print(f"📦 {cache.root}: {len(entries)} PDFs, {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Find the exercise(s) that break a generated LaTeX document.
+
+Generators mark every embedded exercise with a ``% source: <path>`` line.
+:func:`diagnose` splits the document at those markers and bisects the list of
+fragments: the document is rebuilt with half of the fragments, both halves
+are compiled in parallel, and the search continues in the halves that fail.
+Finding one broken exercise costs O(log n) compiles, so a concept sebenta with
+dozens of exercises needs only a few compiles. Fragment compiles run next to
+the original ``.tex``, so relative paths resolve the same way, and they start
+from the shared precompiled preamble (see :mod:`latex_format`).
+
+Errors of each culprit are mapped back from the document line to the source
+``.tex`` and line, and everything is written as JSON::
+
+    python compile_diagnosis.py SebentasDatabase/.../sebenta_x.tex --jobs 4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+try:
+    from .latex_runner import run_latex
+except ImportError:
+    from latex_runner import run_latex
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+SOURCE_MARKER = '% source: '
+_FILE_LINE_RE = re.compile(r'^(.*?\.tex):(\d+): (.*)$')
+_BANG_RE = re.compile(r'^! (.*)$')
+_LINE_RE = re.compile(r'^l\.(\d+)\b')
+TEMP_SUFFIXES = ('.tex', '.aux', '.log', '.pdf', '.out', '.toc', '.fls', '.body.tex')
+
+
+def source_marker(path: Path) -> str:
+    """Marker line generators put before each embedded exercise."""
+    path = Path(path)
+    try:
+        path = path.resolve().relative_to(REPO_ROOT)
+    except ValueError:
+        pass
+    return f'{SOURCE_MARKER}{path.as_posix()}'
+
+
+class Document:
+    """A generated ``.tex`` split into prefix, marked fragments and suffix."""
+
+    def __init__(self, text: str):
+        lines = text.splitlines()
+        markers = [i for i, line in enumerate(lines) if line.startswith(SOURCE_MARKER)]
+        end = next((i for i in range(len(lines) - 1, -1, -1) if lines[i].strip().startswith('\\end{document}')),
+                   len(lines))
+        self.prefix = lines[:markers[0]] if markers else lines[:end]
+        self.suffix = lines[end:]
+        self.fragments: List[List[str]] = []
+        self.sources: List[str] = []
+        for n, start in enumerate(markers):
+            stop = markers[n + 1] if n + 1 < len(markers) else end
+            self.fragments.append(lines[start:stop])
+            self.sources.append(lines[start][len(SOURCE_MARKER):].strip())
+
+    def build(self, indices: Sequence[int]) -> Tuple[str, Dict[int, Tuple[int, int]]]:
+        """Document text with only `indices`, plus ``{line number: (fragment, line in fragment)}``."""
+        lines = list(self.prefix)
+        origin: Dict[int, Tuple[int, int]] = {}
+        for idx in indices:
+            for offset, line in enumerate(self.fragments[idx]):
+                lines.append(line)
+                origin[len(lines)] = (idx, offset)
+        lines.extend(self.suffix)
+        return '\n'.join(lines) + '\n', origin
+
+
+def parse_errors(log_text: str, jobname: Optional[str] = None) -> List[Tuple[Optional[int], str]]:
+    """``(document line, message)`` for each error of a pdflatex log.
+
+    With `jobname`, ``file:line:`` errors raised in other files (styles, inputs)
+    keep their location in the message and get no document line.
+    """
+    errors = []
+    pending = None
+    for line in log_text.splitlines():
+        m = _FILE_LINE_RE.match(line)
+        if m:
+            if jobname and Path(m.group(1)).name.split('.')[0] != jobname:
+                errors.append((None, line.strip()))
+            else:
+                errors.append((int(m.group(2)), m.group(3).strip()))
+            continue
+        m = _BANG_RE.match(line)
+        if m:
+            if pending:
+                errors.append((None, pending))
+            pending = m.group(1).strip()
+            continue
+        m = _LINE_RE.match(line)
+        if m and pending:
+            errors.append((int(m.group(1)), pending))
+            pending = None
+    if pending:
+        errors.append((None, pending))
+    return errors
+
+
+def _source_line(source: str, text: str, fallback: int) -> int:
+    """1-based line of `text` in `source` (fragment-relative `fallback` when not found)."""
+    path = Path(source)
+    if not path.is_absolute():
+        path = REPO_ROOT / path
+    needle = text.strip()
+    try:
+        if needle:
+            for number, line in enumerate(path.read_text(encoding='utf-8', errors='replace').splitlines(), 1):
+                if line.strip() == needle:
+                    return number
+    except OSError:
+        pass
+    return fallback
+
+
+class Bisector:
+    """Compiles subsets of a :class:`Document` (memoized) and bisects failures."""
+
+    def __init__(self, document: Document, compile_subset: Callable[[Sequence[int]], Tuple[bool, str, str]],
+                 jobs: int = 2):
+        self.document = document
+        self.compile_subset = compile_subset
+        self.jobs = max(1, jobs)
+        self.compiles = 0
+        self._results: Dict[FrozenSet[int], Tuple[bool, str, str]] = {}
+
+    def test(self, indices: Sequence[int]) -> Tuple[bool, str, str]:
+        """``(compiled, log text, jobname)`` for the document with only `indices`."""
+        key = frozenset(indices)
+        if key not in self._results:
+            self.compiles += 1
+            self._results[key] = self.compile_subset(list(indices))
+        return self._results[key]
+
+    def fails(self, indices: Sequence[int]) -> bool:
+        return not self.test(indices)[0]
+
+    def run(self) -> Tuple[List[int], List[List[int]]]:
+        """(single culprits, groups that only fail together)."""
+        culprits: List[int] = []
+        interactions: List[List[int]] = []
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            pending = [list(range(len(self.document.fragments)))]
+            while pending:
+                group = pending.pop(0)
+                if len(group) == 1:
+                    culprits.append(group[0])
+                    continue
+                mid = len(group) // 2
+                halves = [group[:mid], group[mid:]]
+                failing = [h for h, bad in zip(halves, pool.map(self.fails, halves)) if bad]
+                if not failing:
+                    interactions.append(group)
+                pending.extend(failing)
+        return sorted(culprits), interactions
+
+
+def latex_subset_compiler(tex_file: Path, engine: str = 'pdflatex', timeout: int = 60):
+    """Compile function for :class:`Bisector`: one pass next to `tex_file`, halting on the first error.
+
+    Returns the parsed :class:`Document` and ``compile_subset(indices) -> (ok, log text, jobname)``.
+    """
+    tex_file = Path(tex_file)
+    document = Document(tex_file.read_text(encoding='utf-8', errors='replace'))
+    engine_path = shutil.which(engine) or engine
+    counter = iter(range(1 << 30))
+
+    def compile_subset(indices: Sequence[int]) -> Tuple[bool, str, str]:
+        jobname = f'{tex_file.stem}__bisect_{next(counter)}'
+        text, _ = document.build(indices)
+        work = tex_file.with_name(f'{jobname}.tex')
+        work.write_text(text, encoding='utf-8')
+        try:
+            result, _ = run_latex([engine_path, '-interaction=nonstopmode', '-halt-on-error', '-file-line-error',
+                                   work.name], tex_file.parent, max_passes=1, timeout=timeout)
+            log = tex_file.with_name(f'{jobname}.log')
+            log_text = log.read_text(encoding='utf-8', errors='replace') if log.exists() else ''
+            ok = result is not None and result.returncode == 0 and tex_file.with_name(f'{jobname}.pdf').exists()
+            return ok, log_text, jobname
+        finally:
+            for suffix in TEMP_SUFFIXES:
+                tex_file.with_name(f'{jobname}{suffix}').unlink(missing_ok=True)
+
+    return document, compile_subset
+
+
+def diagnose(document: Document, compile_subset: Callable[[Sequence[int]], Tuple[bool, str, str]],
+             jobs: int = 2) -> Dict:
+    """Machine-readable diagnosis of a failing document."""
+    bisector = Bisector(document, compile_subset, jobs)
+    everything = list(range(len(document.fragments)))
+    report: Dict = {'fragments': len(everything), 'culprits': [], 'interactions': []}
+    if not bisector.fails([]):
+        if not everything or not bisector.fails(everything):
+            report['status'] = 'ok'
+        else:
+            culprits, interactions = bisector.run()
+            report['status'] = 'culprits'
+            for idx in culprits:
+                _, log_text, jobname = bisector.test([idx])
+                _, origin = document.build([idx])
+                errors = []
+                for line, message in parse_errors(log_text, jobname):
+                    entry = {'message': message, 'document_line': line}
+                    if line in origin:
+                        _, offset = origin[line]
+                        entry['source_line'] = _source_line(document.sources[idx], document.fragments[idx][offset],
+                                                            offset)
+                        entry['text'] = document.fragments[idx][offset].strip()
+                    errors.append(entry)
+                report['culprits'].append({'index': idx, 'source': document.sources[idx], 'errors': errors})
+            report['interactions'] = [[document.sources[i] for i in group] for group in interactions]
+    else:
+        # nothing to bisect: the template/preamble itself does not compile
+        report['status'] = 'preamble'
+        _, log_text, jobname = bisector.test([])
+        report['errors'] = [{'message': m, 'document_line': l} for l, m in parse_errors(log_text, jobname)]
+    report['compiles'] = bisector.compiles
+    return report
+
+
+def diagnose_file(tex_file: Path, report_file: Optional[Path] = None, jobs: int = 2,
+                  engine: str = 'pdflatex') -> Dict:
+    """Diagnose `tex_file` and write ``<stem>_diagnosis.json`` (or `report_file`)."""
+    tex_file = Path(tex_file)
+    document, compile_subset = latex_subset_compiler(tex_file, engine)
+    report = {'document': str(tex_file), **diagnose(document, compile_subset, jobs)}
+    report_file = Path(report_file or tex_file.with_name(f'{tex_file.stem}_diagnosis.json'))
+    report_file.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    report['report_file'] = str(report_file)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encontra o(s) exercício(s) que impedem a compilação de um .tex')
+    parser.add_argument('tex', help='Documento gerado (sebenta ou teste) com marcadores "% source:"')
+    parser.add_argument('--jobs', type=int, default=2, help='Compilações em paralelo')
+    parser.add_argument('--report', help='Ficheiro JSON de saída (padrão: <nome>_diagnosis.json)')
+    parser.add_argument('--engine', default='pdflatex')
+    args = parser.parse_args()
+    report = diagnose_file(Path(args.tex), Path(args.report) if args.report else None, args.jobs, args.engine)
+    print(f"🔎 {report['status']}: {report['compiles']} compilações, {report['fragments']} exercícios")
+    for culprit in report['culprits']:
+        first = culprit['errors'][0] if culprit['errors'] else {}
+        where = f":{first['source_line']}" if 'source_line' in first else ''
+        print(f"   ❌ {culprit['source']}{where} {first.get('message', '')}")
+    for group in report['interactions']:
+        print(f"   ⚠️ só falham em conjunto: {', '.join(group)}")
+    print(f"📄 {report['report_file']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Streaming assembly of generated documents.
+
+Instead of joining every exercise into one string and running ``str.replace``
+for each ``%%PLACEHOLDER%%`` over the result, the template is split once at
+``%%CONTENT%%``. The header is written first, then each content chunk
+(usually one exercise) is sanitized on its own and written straight to the
+file, then the footer::
+
+    write_document(tex_file, template, {'TITLE': '', 'HEADER_LEFT': name}, chunks,
+                   sanitize=sanitize_document)
+
+Chunks are joined with ``'\\n'``, exactly as ``'\\n'.join(lines)`` would join
+them. Peak memory is therefore bounded by the largest chunk rather than by
+the whole document. The file is written under a temporary name and renamed
+at the end, so a failure never leaves half a document behind.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, TextIO, Tuple
+
+CONTENT_PLACEHOLDER = '%%CONTENT%%'
+
+
+def split_template(template: str, values: Dict[str, str]) -> Tuple[str, str]:
+    """(header, footer) around ``%%CONTENT%%`` with the other ``%%NAME%%`` placeholders filled in."""
+    for name, value in values.items():
+        template = template.replace(f'%%{name}%%', value)
+    header, marker, footer = template.partition(CONTENT_PLACEHOLDER)
+    if not marker:
+        # no content slot: put the content before \end{document}
+        header, marker, footer = template.rpartition('\\end{document}')
+        footer = marker + footer
+    return header, footer
+
+
+def stream_document(out: TextIO, template: str, values: Dict[str, str], chunks: Iterable[str],
+                    sanitize: Optional[Callable[[str], str]] = None) -> int:
+    """Write header, `chunks` and footer to `out`; returns the number of chunks."""
+    sanitize = sanitize or (lambda text: text)
+    header, footer = split_template(template, values)
+    out.write(sanitize(header))
+    count = 0
+    for chunk in chunks:
+        if count:
+            out.write('\n')
+        out.write(sanitize(chunk))
+        count += 1
+    out.write(sanitize(footer))
+    return count
+
+
+def write_document(path: Path, template: str, values: Dict[str, str], chunks: Iterable[str],
+                   sanitize: Optional[Callable[[str], str]] = None) -> Path:
+    """Stream the document into `path` (atomically replaced)."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f'.{path.stem}-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            stream_document(out, template, values, chunks, sanitize)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return path
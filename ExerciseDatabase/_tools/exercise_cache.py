@@ -0,0 +1,149 @@
+"""Cache of sanitized exercise bodies shared by the generators.
+
+The same exercises are read and sanitized again in every concept sebenta,
+module sebenta, test version and template render. :class:`ExerciseCache`
+keeps the sanitized (and, for ``main.tex``, subvariant-expanded) body of each
+exercise in an in-process LRU and on disk under
+``SebentasDatabase/.compile_cache/exercises``::
+
+    body = get_exercise_cache().body(tex_file)
+
+The key hashes the exercise source, the subvariants it includes and
+``SANITIZER_VERSION``. Editing an exercise or changing the sanitizer therefore
+produces a new entry, and stale entries are never read. Within one process,
+the key of an unchanged file is remembered by path, modification time and
+size, so a hit skips reading and hashing. ``EXERCISE_CACHE=0`` disables the
+cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .compile_cache import DEFAULT_CACHE_DIR, env_enabled
+    from .latex_sanitize import SANITIZER_VERSION, sanitize_exercise
+except ImportError:
+    from compile_cache import DEFAULT_CACHE_DIR, env_enabled
+    from latex_sanitize import SANITIZER_VERSION, sanitize_exercise
+
+SUBVARIANT_INPUT_RE = re.compile(r'\\input\{(subvariant_\d+)\}')
+
+
+def exercise_cache_enabled() -> bool:
+    return env_enabled('EXERCISE_CACHE')
+
+
+def expand_subvariants(content: str, exercise_dir: Path) -> str:
+    """Replace ``\\input{subvariant_N}`` by the (stripped) content of ``subvariant_N.tex``."""
+    def replace_input(match: re.Match) -> str:
+        name = match.group(1)
+        try:
+            return (Path(exercise_dir) / f'{name}.tex').read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            return f'% AVISO: Subvariant {name} não encontrado'
+        except (OSError, UnicodeDecodeError):
+            return f'% ERRO: Não foi possível carregar {name}'
+    return SUBVARIANT_INPUT_RE.sub(replace_input, content)
+
+
+def build_body(source: str, tex_file: Path, expand: bool = True) -> str:
+    """Sanitized body of an exercise; a ``main.tex`` also gets its subvariants inlined."""
+    content = source.strip()
+    if expand and Path(tex_file).name == 'main.tex':
+        content = expand_subvariants(content, Path(tex_file).parent)
+    return sanitize_exercise(content)
+
+
+class ExerciseCache:
+    def __init__(self, root: Optional[Path] = None, max_entries: int = 1024):
+        base = root or os.environ.get('COMPILE_CACHE_PATH') or DEFAULT_CACHE_DIR
+        self.root = Path(base) / 'exercises'
+        self.max_entries = max_entries
+        self._bodies: 'OrderedDict[str, str]' = OrderedDict()
+        self._keys: Dict[Tuple, str] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _stamp(self, tex_file: Path, expand: bool) -> Tuple:
+        files = [tex_file]
+        if expand and tex_file.name == 'main.tex':
+            files += sorted(tex_file.parent.glob('subvariant_*.tex'))
+        stamp: List = [expand]
+        for path in files:
+            st = path.stat()
+            stamp.append((str(path), st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def key(self, source: str, tex_file: Path, expand: bool = True) -> str:
+        h = hashlib.sha256(f'sanitizer={SANITIZER_VERSION}|expand={expand}\n'.encode())
+        h.update(source.encode('utf-8'))
+        if expand and tex_file.name == 'main.tex':
+            for name in sorted(set(SUBVARIANT_INPUT_RE.findall(source))):
+                path = tex_file.parent / f'{name}.tex'
+                h.update(f'\n{name}='.encode())
+                h.update(path.read_bytes() if path.exists() else b'<missing>')
+        return h.hexdigest()
+
+    def body(self, tex_file: Path, expand: bool = True) -> str:
+        """Sanitized body of `tex_file` (see :func:`build_body`), from the cache when possible."""
+        tex_file = Path(tex_file)
+        if not exercise_cache_enabled():
+            self.misses += 1
+            return build_body(tex_file.read_text(encoding='utf-8'), tex_file, expand)
+        stamp = self._stamp(tex_file, expand)
+        key = self._keys.get(stamp)
+        if key in self._bodies:
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return self._bodies[key]
+        source = tex_file.read_text(encoding='utf-8')
+        key = self.key(source, tex_file, expand)
+        self._keys[stamp] = key
+        if key in self._bodies:
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return self._bodies[key]
+        target = self.root / key[:2] / f'{key}.tex'
+        try:
+            body = target.read_text(encoding='utf-8')
+            self.disk_hits += 1
+        except (OSError, UnicodeDecodeError):
+            body = build_body(source, tex_file, expand)
+            self.misses += 1
+            self._write(target, body)
+        self._remember(key, body)
+        return body
+
+    def _remember(self, key: str, body: str):
+        self._bodies[key] = body
+        while len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+
+    def _write(self, target: Path, body: str):
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(target.parent), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(body)
+            os.replace(tmp, target)
+        except OSError:
+            pass  # the cache is an optimization; a read-only tree still works
+
+
+_shared_cache: Optional[ExerciseCache] = None
+
+
+def get_exercise_cache() -> ExerciseCache:
+    """Sanitized-body cache for this process; its in-memory LRU is what lets a
+    module sebenta reuse the bodies its concept sebentas just sanitized."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ExerciseCache()
+    return _shared_cache
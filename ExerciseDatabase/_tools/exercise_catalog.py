@@ -0,0 +1,341 @@
+"""SQLite-backed exercise catalog.
+
+Optional replacement for rewriting the whole ``index.json`` on every insert.
+The catalog lives next to ``index.json`` as ``index.sqlite`` (override with the
+environment variable ``EXERCISE_CATALOG_PATH``) and is only used once it has
+been initialised::
+
+    python exercise_catalog.py init      # import index.json into index.sqlite
+    python exercise_catalog.py export    # write index.json from the catalog
+
+Writers call :func:`open_catalog` and, when it returns a catalog, insert a
+single row instead of dumping the full JSON document. Readers get the same
+``index.json``-shaped dict from :meth:`ExerciseCatalog.to_index`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .index_statistics import EXERCISE_FACETS, PROJECT_FACETS, compute_statistics, facet_keys
+except ImportError:
+    from index_statistics import EXERCISE_FACETS, PROJECT_FACETS, compute_statistics, facet_keys
+
+BASE_DIR = Path(__file__).parent.parent
+INDEX_FILE = BASE_DIR / 'index.json'
+CATALOG_FILENAME = 'index.sqlite'
+
+# Columns promoted out of the JSON blob so they can be indexed and filtered in SQL
+INDEXED_FIELDS = ('id', 'path', 'discipline', 'module', 'concept', 'tipo', 'difficulty', 'points', 'status')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exercises (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    path TEXT,
+    discipline TEXT,
+    module TEXT,
+    concept TEXT,
+    tipo TEXT,
+    difficulty INTEGER,
+    points REAL,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_exercises_id ON exercises(id);
+CREATE INDEX IF NOT EXISTS idx_exercises_discipline ON exercises(discipline);
+CREATE INDEX IF NOT EXISTS idx_exercises_module ON exercises(module);
+CREATE INDEX IF NOT EXISTS idx_exercises_concept ON exercises(concept);
+CREATE INDEX IF NOT EXISTS idx_exercises_tipo ON exercises(tipo);
+CREATE INDEX IF NOT EXISTS idx_exercises_difficulty ON exercises(difficulty);
+CREATE TABLE IF NOT EXISTS exercise_tags (
+    seq INTEGER NOT NULL REFERENCES exercises(seq) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_exercise_tags_tag ON exercise_tags(tag);
+CREATE INDEX IF NOT EXISTS idx_exercise_tags_seq ON exercise_tags(seq);
+CREATE TABLE IF NOT EXISTS facet_counts (
+    facet TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, key)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def catalog_path(base_dir: Optional[Path] = None) -> Path:
+    """Return the catalog location for `base_dir` (env override wins)."""
+    env = os.environ.get('EXERCISE_CATALOG_PATH')
+    if env:
+        return Path(env)
+    return Path(base_dir or BASE_DIR) / CATALOG_FILENAME
+
+
+def open_catalog(base_dir: Optional[Path] = None) -> Optional['ExerciseCatalog']:
+    """Return the catalog for `base_dir` if one has been initialised, else None."""
+    path = catalog_path(base_dir)
+    if not path.exists():
+        return None
+    return ExerciseCatalog(path)
+
+
+class ExerciseCatalog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # autocommit mode; writes are grouped with explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'facet_counts'").fetchone() is None:
+                # catalogs created before statistics were materialized
+                self.rebuild_statistics()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- writes -------------------------------------------------------------
+
+    def _write(self, fn):
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+            self._set_meta(conn, 'last_updated', datetime.now().isoformat())
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _row_values(entry: Dict) -> tuple:
+        entry = dict(entry)
+        if entry.get('path'):
+            entry['path'] = str(entry['path']).replace('\\', '/')
+        values = [entry.get(k) for k in INDEXED_FIELDS]
+        return tuple(values) + (json.dumps(entry, ensure_ascii=False),)
+
+    def _insert(self, conn: sqlite3.Connection, entry: Dict) -> int:
+        cur = conn.execute(
+            f"INSERT INTO exercises ({', '.join(INDEXED_FIELDS)}, data) "
+            f"VALUES ({', '.join('?' * (len(INDEXED_FIELDS) + 1))})",
+            self._row_values(entry),
+        )
+        seq = cur.lastrowid
+        self._bump(conn, entry, 1)
+        tags = entry.get('tags') or []
+        if tags:
+            conn.executemany('INSERT INTO exercise_tags (seq, tag) VALUES (?, ?)', [(seq, t) for t in tags])
+        return seq
+
+    def add_exercise(self, entry: Dict) -> int:
+        """Append one index entry; returns its row sequence number."""
+        return self._write(lambda conn: self._insert(conn, entry))
+
+    def add_exercises(self, entries: Iterable[Dict]) -> int:
+        """Append several entries in a single transaction."""
+        entries = list(entries)
+        self._write(lambda conn: [self._insert(conn, e) for e in entries])
+        return len(entries)
+
+    def upsert_exercise(self, entry: Dict) -> int:
+        """Merge `entry` into the first row with the same id, or append it; returns the row sequence."""
+        def _upsert(conn):
+            row = conn.execute('SELECT seq, data FROM exercises WHERE id = ? ORDER BY seq LIMIT 1',
+                               (entry.get('id'),)).fetchone()
+            if row is None:
+                return self._insert(conn, entry)
+            old = json.loads(row['data'])
+            merged = {**old, **entry}
+            self._bump(conn, old, -1)
+            conn.execute(f"UPDATE exercises SET {', '.join(f'{k} = ?' for k in INDEXED_FIELDS)}, data = ? "
+                         "WHERE seq = ?", self._row_values(merged) + (row['seq'],))
+            conn.execute('DELETE FROM exercise_tags WHERE seq = ?', (row['seq'],))
+            conn.executemany('INSERT INTO exercise_tags (seq, tag) VALUES (?, ?)',
+                             [(row['seq'], t) for t in merged.get('tags') or []])
+            self._bump(conn, merged, 1)
+            return row['seq']
+        return self._write(_upsert)
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, entry: Dict, sign: int):
+        for facet, key in facet_keys(entry).items():
+            conn.execute('INSERT INTO facet_counts (facet, key, count) VALUES (?, ?, ?) '
+                         'ON CONFLICT(facet, key) DO UPDATE SET count = count + excluded.count',
+                         (facet, key, sign))
+        conn.execute('DELETE FROM facet_counts WHERE count <= 0')
+
+    def remove_exercise(self, exercise_id: str) -> int:
+        """Remove every entry with `exercise_id`; returns the number removed."""
+        def _remove(conn):
+            for row in conn.execute('SELECT data FROM exercises WHERE id = ?', (exercise_id,)).fetchall():
+                self._bump(conn, json.loads(row['data']), -1)
+            return conn.execute('DELETE FROM exercises WHERE id = ?', (exercise_id,)).rowcount
+        return self._write(_remove)
+
+    def rebuild_statistics(self):
+        """Recount the materialized facet counters from the stored entries."""
+        def _rebuild(conn):
+            conn.execute('DELETE FROM facet_counts')
+            for row in conn.execute('SELECT data FROM exercises').fetchall():
+                self._bump(conn, json.loads(row['data']), 1)
+            self._set_meta(conn, 'facet_counts', 1)
+        self._write(_rebuild)
+
+    def replace_all(self, index: Dict):
+        """Replace the catalog contents with an ``index.json`` document."""
+        def _replace(conn):
+            conn.execute('DELETE FROM exercises')
+            conn.execute('DELETE FROM facet_counts')
+            for entry in index.get('exercises', []):
+                self._insert(conn, entry)
+            for key, value in index.items():
+                if key in ('exercises', 'statistics', 'total_exercises', 'last_updated'):
+                    continue
+                self._set_meta(conn, key, value)
+        self._write(_replace)
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value):
+        conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                     (key, json.dumps(value, ensure_ascii=False)))
+
+    def set_meta(self, key: str, value):
+        self._write(lambda conn: self._set_meta(conn, key, value))
+
+    # -- reads --------------------------------------------------------------
+
+    def get_meta(self, key: str, default=None):
+        row = self.connect().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def count(self) -> int:
+        return self.connect().execute('SELECT COUNT(*) FROM exercises').fetchone()[0]
+
+    def get(self, exercise_id: str) -> Optional[Dict]:
+        row = self.connect().execute(
+            'SELECT data FROM exercises WHERE id = ? ORDER BY seq LIMIT 1', (exercise_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def query(self, discipline: Optional[str] = None, module: Optional[str] = None,
+              concept: Optional[str] = None, tipo: Optional[str] = None,
+              difficulty: Optional[int] = None, tags: Optional[List[str]] = None,
+              min_points: Optional[float] = None, max_points: Optional[float] = None,
+              status: Optional[str] = None) -> List[Dict]:
+        """Filter entries using the indexed columns. `tags` matches any of the given tags."""
+        clauses = []
+        params: list = []
+        for column, value in (('discipline', discipline), ('module', module), ('concept', concept),
+                              ('tipo', tipo), ('difficulty', difficulty), ('status', status)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if min_points is not None:
+            clauses.append('COALESCE(points, 0) >= ?')
+            params.append(min_points)
+        if max_points is not None:
+            clauses.append('COALESCE(points, 0) <= ?')
+            params.append(max_points)
+        if tags:
+            clauses.append(f"seq IN (SELECT seq FROM exercise_tags WHERE tag IN ({', '.join('?' * len(tags))}))")
+            params.extend(tags)
+        sql = 'SELECT data FROM exercises'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY seq'
+        return [json.loads(r['data']) for r in self.connect().execute(sql, params)]
+
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """Materialized facet counters (no scan of the exercises)."""
+        stats: Dict[str, Dict[str, int]] = {facet: {} for facet in EXERCISE_FACETS}
+        for row in self.connect().execute('SELECT facet, key, count FROM facet_counts ORDER BY facet, key'):
+            stats.setdefault(row['facet'], {})[row['key']] = row['count']
+        return stats
+
+    def to_index(self) -> Dict:
+        """Return the catalog as an ``index.json``-shaped document."""
+        exercises = self.query()
+        index = {
+            'database_version': self.get_meta('database_version', '3.0'),
+            'last_updated': self.get_meta('last_updated', ''),
+            'total_exercises': len(exercises),
+            'statistics': self.statistics(),
+            'exercises': exercises,
+        }
+        for row in self.connect().execute('SELECT key, value FROM meta ORDER BY key'):
+            if row['key'] not in index and row['key'] != 'facet_counts':
+                index[row['key']] = json.loads(row['value'])
+        if 'projects' in index:
+            # projects live in meta; their counters are cheap to derive
+            index['statistics'].update({f: compute_statistics({'projects': index['projects']})[f]
+                                        for f in PROJECT_FACETS})
+        return index
+
+    # -- import / export ----------------------------------------------------
+
+    def import_index(self, index_file: Path = INDEX_FILE) -> int:
+        index = json.loads(Path(index_file).read_text(encoding='utf-8'))
+        self.replace_all(index)
+        return len(index.get('exercises', []))
+
+    def export_index(self, index_file: Path = INDEX_FILE) -> Path:
+        """Write ``index.json`` atomically for tools that still read the JSON file."""
+        index_file = Path(index_file)
+        tmp = index_file.with_suffix(index_file.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_index(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, index_file)
+        return index_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catálogo SQLite de exercícios (index.sqlite)')
+    parser.add_argument('command', choices=['init', 'export', 'stats'])
+    parser.add_argument('--index', default=str(INDEX_FILE), help='Caminho do index.json')
+    parser.add_argument('--catalog', help='Caminho do index.sqlite (padrão: junto ao index.json)')
+    args = parser.parse_args()
+
+    index_file = Path(args.index)
+    path = Path(args.catalog) if args.catalog else catalog_path(index_file.parent)
+    with ExerciseCatalog(path) as catalog:
+        if args.command == 'init':
+            n = catalog.import_index(index_file)
+            print(f"✅ Catálogo inicializado: {n} exercícios -> {path}")
+        elif args.command == 'export':
+            out = catalog.export_index(index_file)
+            print(f"✅ index.json exportado: {catalog.count()} exercícios -> {out}")
+        else:
+            print(json.dumps(catalog.statistics(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
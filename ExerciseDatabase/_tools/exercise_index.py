@@ -0,0 +1,175 @@
+"""In-memory secondary indexes over the exercises of ``index.json``.
+
+:class:`ExerciseIndex` builds one hash index (value -> posting list) per
+facet plus a tag index and a sorted points index, so filtered lookups
+intersect posting lists instead of scanning every exercise dict::
+
+    idx = ExerciseIndex.from_index(read_index(INDEX_FILE))
+    idx.query(module='P4_funcoes', difficulty=2, tags=['inversa'])
+
+Results always come back in index order, so callers that shuffle with a
+seeded RNG select exactly what a linear scan would have produced.
+:func:`get_shared_index` keeps one instance per ``index.json`` for the
+lifetime of the process and rebuilds it only when the file (or its change
+journal) is modified.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .index_journal import journal_path, read_index
+except ImportError:
+    from index_journal import journal_path, read_index
+
+BASE_DIR = Path(__file__).parent.parent
+INDEX_FILE = BASE_DIR / 'index.json'
+
+# Facets with a hash index; `type` is the legacy exercise type used by search_exercises
+FACETS = ('discipline', 'module', 'concept', 'tipo', 'type', 'difficulty', 'status')
+
+Getter = Callable[[Dict, str], object]
+
+
+def _default_getter(exercise: Dict, field: str):
+    return exercise.get(field)
+
+
+class ExerciseIndex:
+    def __init__(self, exercises: Iterable[Dict] = (), getter: Optional[Getter] = None):
+        self._get = getter or _default_getter
+        self.exercises: List[Dict] = []
+        self._facets: Dict[str, Dict[object, List[int]]] = {f: {} for f in FACETS}
+        self._tags: Dict[str, List[int]] = {}
+        self._ids: Dict[str, List[int]] = {}
+        self._points: List[Tuple[float, int]] = []
+        self._point_keys: Optional[List[float]] = None
+        for exercise in exercises:
+            self.add(exercise)
+
+    @classmethod
+    def from_index(cls, index: Optional[Dict], getter: Optional[Getter] = None) -> 'ExerciseIndex':
+        return cls((index or {}).get('exercises', []), getter=getter)
+
+    def __len__(self) -> int:
+        return len(self.exercises)
+
+    def add(self, exercise: Dict) -> int:
+        """Index one more exercise; returns its position."""
+        pos = len(self.exercises)
+        self.exercises.append(exercise)
+        for facet, postings in self._facets.items():
+            # missing/empty values are filed under None so `match_missing` can find them
+            postings.setdefault(self._get(exercise, facet) or None, []).append(pos)
+        for tag in exercise.get('tags') or []:
+            self._tags.setdefault(tag, []).append(pos)
+        if exercise.get('id'):
+            self._ids.setdefault(exercise['id'], []).append(pos)
+        self._points.append((float(exercise.get('points') or 0), pos))
+        self._point_keys = None
+        return pos
+
+    # -- lookups ------------------------------------------------------------
+
+    def values(self, facet: str) -> List:
+        """Distinct non-empty values of `facet`."""
+        return [v for v in self._facets[facet] if v is not None]
+
+    def count(self, facet: str, value) -> int:
+        return len(self._facets[facet].get(value, ()))
+
+    def get(self, exercise_id: str) -> Optional[Dict]:
+        """First exercise with `exercise_id` (index.json may contain duplicates)."""
+        positions = self._ids.get(exercise_id)
+        return self.exercises[positions[0]] if positions else None
+
+    def get_all(self, exercise_id: str) -> List[Dict]:
+        return [self.exercises[p] for p in self._ids.get(exercise_id, ())]
+
+    def group_by(self, facet: str, exercises: Optional[List[Dict]] = None) -> Dict[object, List[Dict]]:
+        """Group all exercises (or the given subset, keeping its order) by `facet`."""
+        if exercises is None:
+            return {v: [self.exercises[p] for p in ps] for v, ps in self._facets[facet].items()}
+        groups: Dict[object, List[Dict]] = {}
+        for ex in exercises:
+            groups.setdefault(self._get(ex, facet) or None, []).append(ex)
+        return groups
+
+    def _points_range(self, min_points: Optional[float], max_points: Optional[float]) -> List[int]:
+        if self._point_keys is None:
+            self._points.sort()
+            self._point_keys = [p for p, _ in self._points]
+        keys = self._point_keys
+        lo = bisect_left(keys, min_points) if min_points is not None else 0
+        hi = bisect_right(keys, max_points) if max_points is not None else len(keys)
+        return [pos for _, pos in self._points[lo:hi]]
+
+    def query(self, discipline=None, module=None, concept=None, tipo=None, type=None,
+              difficulty=None, status=None, tags: Optional[List[str]] = None,
+              min_points: Optional[float] = None, max_points: Optional[float] = None,
+              match_missing: bool = False) -> List[Dict]:
+        """Exercises matching every given filter (None = no filter), in index order.
+
+        `tags` matches any of the given tags. With `match_missing`, exercises that do
+        not define a filtered facet are kept, as the template generator expects.
+        """
+        postings: List[Iterable[int]] = []
+        for facet, value in (('discipline', discipline), ('module', module), ('concept', concept),
+                             ('tipo', tipo), ('type', type), ('difficulty', difficulty), ('status', status)):
+            if value is None:
+                continue
+            hits = self._facets[facet].get(value, [])
+            if match_missing and self._facets[facet].get(None):
+                hits = sorted(hits + self._facets[facet][None])
+            postings.append(hits)
+        if tags:
+            tagged: Set[int] = set()
+            for tag in tags:
+                tagged.update(self._tags.get(tag, ()))
+            postings.append(tagged)
+        if min_points is not None or max_points is not None:
+            postings.append(self._points_range(min_points, max_points))
+
+        if not postings:
+            return list(self.exercises)
+        if len(postings) == 1 and isinstance(postings[0], list) and min_points is None and max_points is None:
+            # single facet: its posting list is already in index order
+            return [self.exercises[p] for p in postings[0]]
+        # intersect starting from the most selective posting list
+        postings.sort(key=len)
+        result = set(postings[0])
+        for other in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(other)
+        return [self.exercises[p] for p in sorted(result)]
+
+
+_shared: Dict[Path, Tuple[Tuple, ExerciseIndex]] = {}
+
+
+def _stamp(index_file: Path) -> Tuple:
+    stamps = []
+    for path in (index_file, journal_path(index_file)):
+        try:
+            st = path.stat()
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def get_shared_index(index_file: Path = INDEX_FILE) -> Optional[ExerciseIndex]:
+    """Process-wide ExerciseIndex for `index_file`, rebuilt only when the file changes."""
+    index_file = Path(index_file).resolve()
+    stamp = _stamp(index_file)
+    if stamp[0] is None:
+        return None
+    cached = _shared.get(index_file)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    idx = ExerciseIndex.from_index(read_index(index_file))
+    _shared[index_file] = (stamp, idx)
+    return idx
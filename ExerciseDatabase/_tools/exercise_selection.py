@@ -0,0 +1,516 @@
+"""Constraint-based exercise selection for generated tests.
+
+A test config (``SebentasDatabase/_tests_config/*.json``) may carry a
+``constraints`` block instead of (or on top of) ``per_tipo``/``count``::
+
+    "constraints": {
+        "count": 6,
+        "target_points": 100, "points_tolerance": 5, "default_points": 10,
+        "difficulty": {"1": 2, "2": 3, "3": 1},
+        "required_tags": ["dominio", "contradominio"],
+        "max_per_concept": 2,
+        "time_budget_ms": 50
+    }
+
+``difficulty`` gives counts per level, or fractions of ``count`` (``{"1": 0.25,
+"2": 0.75}``). When the counts add up to less than ``count``, they are
+minimums and the remaining slots take any level. Every required tag must be
+covered by at least one selected exercise.
+
+:class:`ConstraintSelector` indexes the candidate pool once: posting lists per
+difficulty level and per required tag, and, when there is a target, the
+candidates of each level grouped by point value. It first checks the
+necessary conditions, which are cheap (availability per level under the
+per-concept cap, tags present, reachable points range). It then builds a
+selection greedily: rarest tags first, then each difficulty quota, steering
+points toward the remaining average. A repair pass swaps one or two exercises
+within their slots to close the points gap. Restarts with a fresh random
+order run until ``time_budget_ms`` is spent. The result is a feasible
+selection, or the reasons none was found::
+
+    result = select_with_constraints(pool, config, random.Random(seed))
+    if not result.feasible:
+        print('\\n'.join(result.reasons))
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import random
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress
+from operator import methodcaller
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TIME_BUDGET_MS = 50
+# random probes into a pool before falling back to a scan from a random offset
+_PROBES = 24
+FREE = None  # slot that accepts any difficulty
+_NO_TAGS: frozenset = frozenset()
+
+
+def _field(name: str):
+    return methodcaller('get', name)
+
+
+def _difficulty_key(value) -> Optional[str]:
+    return None if value in (None, '') else str(value)
+
+
+def normalize_constraints(config: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Constraints of a test config (``None`` without a ``constraints`` block) and config errors."""
+    raw = config.get('constraints')
+    if not raw:
+        return None, []
+    errors: List[str] = []
+    count = raw.get('count', config.get('count'))
+    quotas: Dict[Optional[str], int] = {}
+    difficulty = raw.get('difficulty') or {}
+    values = list(difficulty.values())
+    if values and all(isinstance(v, (int, float)) for v in values) and any(
+            isinstance(v, float) and not float(v).is_integer() for v in values):
+        # fractions of `count`, rounded by largest remainder
+        if not count:
+            errors.append("constraints: 'difficulty' em frações exige 'count'")
+        else:
+            total = sum(values)
+            exact = {str(k): v / total * count for k, v in difficulty.items()}
+            quotas = {k: int(v) for k, v in exact.items()}
+            leftover = count - sum(quotas.values())
+            for k in sorted(exact, key=lambda k: exact[k] - quotas[k], reverse=True)[:leftover]:
+                quotas[k] += 1
+    else:
+        for k, v in difficulty.items():
+            if not isinstance(v, int) or v < 0:
+                errors.append(f"constraints: dificuldade {k}: quantidade inválida {v!r}")
+            else:
+                quotas[str(k)] = v
+    quotas = {k: v for k, v in quotas.items() if v}
+    if count is None:
+        count = sum(quotas.values()) or None
+    if not count:
+        errors.append("constraints: indique 'count' ou as quantidades em 'difficulty'")
+    elif sum(quotas.values()) > count:
+        errors.append(f"constraints: 'difficulty' pede {sum(quotas.values())} exercícios mas 'count' é {count}")
+    elif count - sum(quotas.values()):
+        quotas[FREE] = count - sum(quotas.values())
+    max_per_concept = raw.get('max_per_concept')
+    if max_per_concept is not None and (not isinstance(max_per_concept, int) or max_per_concept < 1):
+        errors.append(f"constraints: 'max_per_concept' inválido: {max_per_concept!r}")
+    return {
+        'count': count or 0,
+        'quotas': quotas,
+        'required_tags': list(dict.fromkeys(raw.get('required_tags') or [])),
+        'max_per_concept': max_per_concept,
+        'target_points': raw.get('target_points'),
+        'points_tolerance': float(raw.get('points_tolerance') or 0),
+        'default_points': float(raw.get('default_points') or 0),
+        'time_budget_ms': float(raw.get('time_budget_ms', DEFAULT_TIME_BUDGET_MS)),
+    }, errors
+
+
+def violations(exercises: List[Dict[str, Any]], constraints: Dict[str, Any]) -> List[str]:
+    """Constraints (from :func:`normalize_constraints`) that `exercises` break; empty when it satisfies them."""
+    broken = []
+    if len(exercises) != constraints['count']:
+        broken.append(f"total: {len(exercises)} exercícios em vez de {constraints['count']}")
+    levels = Counter(_difficulty_key(ex.get('difficulty')) for ex in exercises)
+    for level, quota in constraints['quotas'].items():
+        if level is not FREE and levels[level] < quota:
+            broken.append(f"dificuldade {level}: {levels[level]} em vez de {quota}")
+    present = {tag for ex in exercises for tag in ex.get('tags') or ()}
+    for tag in constraints['required_tags']:
+        if tag not in present:
+            broken.append(f"etiqueta '{tag}' em falta")
+    cap = constraints['max_per_concept']
+    if cap:
+        for concept, n in Counter(ex.get('concept') for ex in exercises).items():
+            if n > cap:
+                broken.append(f"conceito {concept}: {n} exercícios (máximo {cap})")
+    target = constraints['target_points']
+    if target is not None:
+        default = constraints['default_points']
+        points = sum(float(ex.get('points') or default) for ex in exercises)
+        if abs(points - target) > constraints['points_tolerance']:
+            broken.append(f"pontuação: {points:g} (alvo {target:g} ± {constraints['points_tolerance']:g})")
+    return broken
+
+
+class SelectionResult:
+    def __init__(self, selected: List[Dict[str, Any]], reasons: List[str], points: float = 0.0,
+                 attempts: int = 0, elapsed_ms: float = 0.0):
+        self.selected = selected
+        self.reasons = reasons
+        self.points = points
+        self.attempts = attempts
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def feasible(self) -> bool:
+        return not self.reasons
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'feasible': self.feasible,
+            'selected': [ex.get('id') for ex in self.selected],
+            'points': self.points,
+            'reasons': self.reasons,
+            'attempts': self.attempts,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+        }
+
+
+class ConstraintSelector:
+    def __init__(self, pool: List[Dict[str, Any]], constraints: Dict[str, Any]):
+        self.pool = pool
+        self.c = constraints
+        n = len(pool)
+        # one pass per field that a constraint actually needs: 100k candidates stay in the ms range
+        if constraints['target_points'] is not None:
+            default = constraints['default_points']
+            self.points = [float(v or default) for v in map(_field('points'), pool)]
+        else:
+            self.points = [0.0] * n
+        if constraints['max_per_concept']:
+            self.concepts = list(map(_field('concept'), pool))
+        else:
+            self.concepts = [None] * n
+        self.required = frozenset(constraints['required_tags'])
+        self.tags: Dict[int, frozenset] = {}
+        self.by_tag: Dict[str, List[int]] = {}
+        if self.required:
+            all_tags = [tags or () for tags in map(_field('tags'), pool)]
+            for tag in self.required:
+                self.by_tag[tag] = list(compress(range(n), map(methodcaller('__contains__', tag), all_tags)))
+        self.buckets: Dict[Optional[str], List[int]] = {FREE: range(n)}
+        levels = [level for level in constraints['quotas'] if level is not FREE]
+        if levels:
+            raw = list(map(_field('difficulty'), pool))
+            keys = {value: _difficulty_key(value) for value in set(raw)}
+            self.difficulty = list(map(keys.__getitem__, raw))
+            for level in levels:
+                # not map(level.__eq__, ...): str.__eq__(None) is NotImplemented, which is truthy
+                self.buckets[level] = [i for i, d in enumerate(self.difficulty) if d == level]
+        else:
+            self.difficulty = [None] * n
+        # per slot: distinct point values (sorted) and the candidates holding each value
+        self._by_value: Dict[Optional[str], Tuple[List[float], Dict[float, List[int]]]] = {}
+
+    def tags_of(self, pos: int) -> frozenset:
+        """Required tags carried by candidate `pos`."""
+        if not self.required:
+            return _NO_TAGS
+        tags = self.tags.get(pos)
+        if tags is None:
+            tags = self.tags[pos] = self.required.intersection(self.pool[pos].get('tags') or ())
+        return tags
+
+    # -- feasibility ----------------------------------------------------------
+
+    def _capped(self, positions: List[int]) -> int:
+        cap = self.c['max_per_concept']
+        if not cap:
+            return len(positions)
+        return sum(min(cap, n) for n in Counter(map(self.concepts.__getitem__, positions)).values())
+
+    def check(self) -> List[str]:
+        """Necessary conditions; every reason returned makes the constraints unsatisfiable."""
+        reasons = []
+        count, quotas = self.c['count'], self.c['quotas']
+        available = self._capped(self.buckets[FREE])
+        if available < count:
+            cap = f" com no máximo {self.c['max_per_concept']} por conceito" if self.c['max_per_concept'] else ''
+            reasons.append(f"total: pedidos {count} exercícios, disponíveis {available}{cap}")
+        for level, quota in quotas.items():
+            if level is FREE:
+                continue
+            have = self._capped(self.buckets.get(level, []))
+            if have < quota:
+                reasons.append(f"dificuldade {level}: pedidos {quota}, disponíveis {have}")
+        for tag, positions in self.by_tag.items():
+            if not positions:
+                reasons.append(f"etiqueta '{tag}': nenhum exercício candidato a tem")
+        target = self.c['target_points']
+        if target is not None and not reasons:
+            lo = hi = 0.0
+            for level, quota in quotas.items():
+                values = list(map(self.points.__getitem__, self.buckets[level]))
+                lo += sum(heapq.nsmallest(quota, values))
+                hi += sum(heapq.nlargest(quota, values))
+            tol = self.c['points_tolerance']
+            if target + tol < lo or target - tol > hi:
+                reasons.append(f"pontuação: o alvo {target:g} ± {tol:g} está fora do alcance [{lo:g}, {hi:g}]")
+        return reasons
+
+    # -- search ---------------------------------------------------------------
+
+    def _by_points(self, level) -> Tuple[List[float], Dict[float, List[int]]]:
+        if level not in self._by_value:
+            groups: Dict[float, List[int]] = {}
+            points = self.points
+            for pos in self.buckets[level]:
+                groups.setdefault(points[pos], []).append(pos)
+            self._by_value[level] = (sorted(groups), groups)
+        return self._by_value[level]
+
+    def _fits(self, pos: int, used: set, per_concept: Counter, leaving: Optional[int] = None) -> bool:
+        if pos in used:
+            return False
+        cap = self.c['max_per_concept']
+        if not cap:
+            return True
+        concept = self.concepts[pos]
+        return per_concept[concept] - (leaving is not None and self.concepts[leaving] == concept) < cap
+
+    def _random_fit(self, positions: List[int], rng: random.Random, ok) -> Optional[int]:
+        if not positions:
+            return None
+        for _ in range(_PROBES):
+            pos = positions[rng.randrange(len(positions))]
+            if ok(pos):
+                return pos
+        start = rng.randrange(len(positions))
+        for i in range(len(positions)):
+            pos = positions[(start + i) % len(positions)]
+            if ok(pos):
+                return pos
+        return None
+
+    def _nearest_fit(self, level, want: float, rng: random.Random, ok) -> Optional[int]:
+        """A fitting candidate of `level` whose points are closest to `want` (random within a value)."""
+        values, groups = self._by_points(level)
+        right = bisect_left(values, want)
+        left = right - 1
+        while left >= 0 or right < len(values):
+            if right >= len(values) or (left >= 0 and want - values[left] <= values[right] - want):
+                value, left = values[left], left - 1
+            else:
+                value, right = values[right], right + 1
+            pos = self._random_fit(groups[value], rng, ok)
+            if pos is not None:
+                return pos
+        return None
+
+    def _greedy(self, rng: random.Random) -> Optional[Tuple[List[int], List]]:
+        quotas = dict(self.c['quotas'])
+        target = self.c['target_points']
+        chosen: List[int] = []
+        slots: List = []
+        used: set = set()
+        per_concept: Counter = Counter()
+
+        def take(pos: int, slot):
+            chosen.append(pos)
+            slots.append(slot)
+            used.add(pos)
+            per_concept[self.concepts[pos]] += 1
+            quotas[slot] -= 1
+
+        def slot_for(pos: int):
+            level = self.difficulty[pos]
+            if quotas.get(level, 0) > 0:
+                return level
+            return FREE if quotas.get(FREE, 0) > 0 else False
+
+        # tags first, rarest first; prefer exercises that cover several missing tags
+        missing = set(self.by_tag)
+        for tag in sorted(self.by_tag, key=lambda t: len(self.by_tag[t])):
+            if tag not in missing:
+                continue
+            ok = lambda p: self._fits(p, used, per_concept) and slot_for(p) is not False
+            options = {self._random_fit(self.by_tag[tag], rng, ok) for _ in range(4)} - {None}
+            if not options:
+                return None
+            pos = max(options, key=lambda p: (len(self.tags_of(p) & missing), -p))
+            take(pos, slot_for(pos))
+            missing -= self.tags_of(pos)
+
+        for level in [lvl for lvl in quotas if lvl is not FREE] + ([FREE] if FREE in quotas else []):
+            while quotas[level] > 0:
+                ok = lambda p: self._fits(p, used, per_concept)
+                if target is not None:
+                    remaining = sum(quotas.values())
+                    want = (target - sum(self.points[p] for p in chosen)) / remaining
+                    if remaining > 1:
+                        want *= rng.uniform(0.5, 1.5)  # variety between versions; the last slot closes the gap
+                    pos = self._nearest_fit(level, want, rng, ok)
+                else:
+                    pos = self._random_fit(self.buckets[level], rng, ok)
+                if pos is None:
+                    return None
+                take(pos, level)
+        return chosen, slots
+
+    def _repair(self, chosen: List[int], slots: List, rng: random.Random, deadline: float) -> float:
+        """Swap one or two exercises inside their slots' buckets to close the points gap; returns the gap."""
+        target, tol = self.c['target_points'], self.c['points_tolerance']
+        points = self.points
+        total = sum(points[p] for p in chosen)
+        used = set(chosen)
+        per_concept = Counter(self.concepts[p] for p in chosen)
+        cover = Counter(t for p in chosen for t in self.tags_of(p))
+
+        def swap(i: int, new: int):
+            nonlocal total
+            old = chosen[i]
+            chosen[i] = new
+            used.discard(old)
+            used.add(new)
+            per_concept[self.concepts[old]] -= 1
+            per_concept[self.concepts[new]] += 1
+            cover.subtract(self.tags_of(old))
+            cover.update(self.tags_of(new))
+            total += points[new] - points[old]
+
+        def needs(i: int) -> set:
+            # required tags that only chosen[i] covers: its replacement must carry them too
+            return {t for t in self.tags_of(chosen[i]) if cover[t] == 1}
+
+        def fits(i: int):
+            old = chosen[i]
+            return lambda p: self._fits(p, used, per_concept, leaving=old)
+
+        def anchored(i: int, want: float, tags: set) -> Optional[int]:
+            # candidates come from the rarest tag's posting list, not from the whole slot
+            rarest = min(tags, key=lambda t: len(self.by_tag[t]))
+            ok = fits(i)
+            options = [p for p in self.by_tag[rarest]
+                       if (slots[i] is FREE or self.difficulty[p] == slots[i]) and tags <= self.tags_of(p) and ok(p)]
+            return min(options, key=lambda p: (abs(points[p] - want), rng.random())) if options else None
+
+        def single() -> bool:
+            for i in rng.sample(range(len(chosen)), len(chosen)):
+                gap = target - total
+                want = points[chosen[i]] + gap
+                tags = needs(i)
+                if tags:
+                    new = anchored(i, want, tags)
+                else:
+                    new = self._nearest_fit(slots[i], want, rng, fits(i))
+                if new is not None and abs(gap - (points[new] - points[chosen[i]])) < abs(gap):
+                    swap(i, new)
+                    return True
+            return False
+
+        def pair() -> bool:
+            gap = target - total
+            free = [i for i in range(len(chosen)) if not needs(i)]  # tag anchors only move in single()
+            pairs = [(i, j) for i in free for j in free if i < j]
+            for i, j in rng.sample(pairs, len(pairs)):
+                values_i, groups_i = self._by_points(slots[i])
+                values_j, groups_j = self._by_points(slots[j])
+                old_i = chosen[i]
+                pi, pj = points[old_i], points[chosen[j]]
+                for a in values_i:
+                    if a == pi:
+                        continue
+                    want = pj + gap - (a - pi)
+                    lo, hi = bisect_left(values_j, want - tol), bisect_right(values_j, want + tol)
+                    if lo == hi:
+                        continue
+                    new_i = self._random_fit(groups_i[a], rng, fits(i))
+                    if new_i is None:
+                        continue
+                    swap(i, new_i)
+                    # chosen[j] may now be the last carrier of a tag chosen[i] shared
+                    tags_j, fits_j = needs(j), fits(j)
+                    ok_j = lambda p: fits_j(p) and tags_j <= self.tags_of(p)
+                    for b in values_j[lo:hi]:
+                        new_j = self._random_fit(groups_j[b], rng, ok_j)
+                        if new_j is not None:
+                            swap(j, new_j)
+                            return True
+                    swap(i, old_i)
+                if time.perf_counter() >= deadline:
+                    return False
+            return False
+
+        while abs(total - target) > tol and time.perf_counter() < deadline:
+            if not (single() or pair()):
+                break
+        return abs(total - target)
+
+    def solve(self, rng: random.Random) -> SelectionResult:
+        start = time.perf_counter()
+        reasons = self.check()
+        if reasons:
+            return SelectionResult([], reasons, elapsed_ms=(time.perf_counter() - start) * 1e3)
+        target, tol = self.c['target_points'], self.c['points_tolerance']
+        if target is not None:
+            for level in self.c['quotas']:
+                self._by_points(level)
+        # the budget is for the search; indexing the pool is not counted
+        deadline = time.perf_counter() + self.c['time_budget_ms'] / 1e3
+        best: Optional[List[int]] = None
+        best_gap = float('inf')
+        attempts = 0
+        while True:
+            attempts += 1
+            built = self._greedy(rng)
+            if built is not None:
+                chosen, slots = built
+                gap = 0.0 if target is None else self._repair(chosen, slots, rng, deadline)
+                if gap < best_gap:
+                    best, best_gap = list(chosen), gap
+                if gap <= tol:
+                    break
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = (time.perf_counter() - start) * 1e3
+        if best is None:
+            reasons = [f"nenhuma combinação satisfaz etiquetas, dificuldades e limite por conceito "
+                       f"em {attempts} tentativas ({elapsed:.0f} ms)"]
+            return SelectionResult([], reasons, attempts=attempts, elapsed_ms=elapsed)
+        best.sort()  # keep index order; callers shuffle if configured
+        points = sum(self.points[p] for p in best)
+        selected = [self.pool[p] for p in best]
+        if best_gap > tol:
+            reasons = [f"pontuação: a melhor seleção encontrada soma {points:g} (alvo {target:g} ± {tol:g}) "
+                       f"em {attempts} tentativas ({elapsed:.0f} ms)"]
+        return SelectionResult(selected, reasons, points, attempts, elapsed)
+
+
+def select_with_constraints(pool: List[Dict[str, Any]], config: Dict[str, Any],
+                            rng: random.Random) -> SelectionResult:
+    """Solve the ``constraints`` block of `config` over `pool`."""
+    constraints, errors = normalize_constraints(config)
+    if constraints is None:
+        raise ValueError("config sem bloco 'constraints'")
+    if errors:
+        return SelectionResult([], errors)
+    if not pool:
+        return SelectionResult([], ['nenhum exercício candidato com os filtros indicados'])
+    return ConstraintSelector(pool, constraints).solve(rng)
+
+
+def main():
+    try:
+        from .exercise_index import INDEX_FILE, get_shared_index
+    except ImportError:
+        from exercise_index import INDEX_FILE, get_shared_index
+    parser = argparse.ArgumentParser(description='Seleção de exercícios por restrições (pontos, dificuldade, etiquetas)')
+    parser.add_argument('config', help='Config de teste com bloco "constraints"')
+    parser.add_argument('--discipline')
+    parser.add_argument('--module')
+    parser.add_argument('--concept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--index', default=str(INDEX_FILE))
+    args = parser.parse_args()
+    config = json.loads(Path(args.config).read_text(encoding='utf-8'))
+    index = get_shared_index(Path(args.index))
+    if index is None:
+        print(f'Índice não encontrado: {args.index}')
+        return 1
+    pool = index.query(discipline=args.discipline, module=args.module, concept=args.concept)
+    result = select_with_constraints(pool, config, random.Random(args.seed))
+    print(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+    return 0 if result.feasible else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,10 +5,18 @@ updates so the different creation scripts can share behaviour.
 """
 import json
 import re
+import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 
+if str(Path(__file__).parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).parent))
+
+from exercise_catalog import open_catalog
+from index_journal import open_journal
+from index_statistics import add_entry
+
 
 def get_base_dir() -> Path:
     return Path(__file__).parent.parent
@@ -95,18 +103,6 @@ def update_index(base_dir: Path, metadata: Dict, file_path: str):
     index_file = base_dir / 'index.json'
     today = datetime.now().isoformat()
 
-    if index_file.exists():
-        try:
-            index = json.loads(index_file.read_text(encoding='utf-8'))
-        except Exception:
-            index = {}
-    else:
-        index = {}
-
-    index.setdefault('database_version', '3.0')
-    index.setdefault('exercises', [])
-    index.setdefault('statistics', {})
-
     entry = {
         'id': metadata.get('id'),
         'path': file_path.replace('\\', '/'),
@@ -124,16 +120,33 @@ def update_index(base_dir: Path, metadata: Dict, file_path: str):
         'status': metadata.get('status', 'active')
     }
 
-    index['exercises'].append(entry)
-    index['total_exercises'] = len(index['exercises'])
-    index['last_updated'] = today
+    # With an initialised SQLite catalog the insert is a single row, no JSON rewrite
+    catalog = open_catalog(base_dir)
+    if catalog is not None:
+        with catalog:
+            catalog.add_exercise(entry)
+        return catalog.path
+
+    # With the change journal enabled the insert is a single appended line
+    journal = open_journal(base_dir)
+    if journal is not None:
+        journal.append('add', entry=entry)
+        return journal.path
+
+    if index_file.exists():
+        try:
+            index = json.loads(index_file.read_text(encoding='utf-8'))
+        except Exception:
+            index = {}
+    else:
+        index = {}
+
+    index.setdefault('database_version', '3.0')
+    index.setdefault('exercises', [])
+    index.setdefault('statistics', {})
 
-    # update simple stats
-    stats = index.get('statistics', {})
-    stats.setdefault('by_module', {})
-    mod = entry.get('module') or 'unknown'
-    stats['by_module'][mod] = stats['by_module'].get(mod, 0) + 1
-    index['statistics'] = stats
+    # appends the entry and applies its deltas to every statistics facet
+    add_entry(index, entry, ts=today)
 
     with open(index_file, 'w', encoding='utf-8') as f:
         json.dump(index, f, indent=2, ensure_ascii=False)
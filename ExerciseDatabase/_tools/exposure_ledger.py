@@ -0,0 +1,305 @@
+"""Exposure ledger: which exercises appeared in which generated test.
+
+Every test generator records the exercises it used (exercise x test x class x
+date) in a small SQLite database next to ``index.json`` (``exposure.sqlite``,
+override with ``EXPOSURE_LEDGER_PATH``). Selection then asks for the exercises
+used within a window of days and either drops them or pushes them to the back
+of the candidate list, so one class does not get the questions another class
+saw last week::
+
+    python exposure_ledger.py recent --days 30
+    python exposure_ledger.py history MAT_P4FUNCOE_4FIN_001
+    python exposure_ledger.py record --test teste_10A --class 10A EX1 EX2
+
+:meth:`ExposureLedger.recent` runs one indexed range query over the window and
+returns a plain dict, so the per-candidate check is a dict lookup and does not
+slow down as the history grows.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+BASE_DIR = Path(__file__).parent.parent
+LEDGER_FILENAME = 'exposure.sqlite'
+
+MODES = ('exclude', 'penalize')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exposures (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    exercise_id TEXT NOT NULL,
+    test TEXT NOT NULL,
+    class_name TEXT NOT NULL DEFAULT '',
+    used_on TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    UNIQUE (exercise_id, test, class_name)
+);
+CREATE INDEX IF NOT EXISTS idx_exposures_used_on ON exposures(used_on);
+CREATE INDEX IF NOT EXISTS idx_exposures_exercise ON exposures(exercise_id);
+CREATE INDEX IF NOT EXISTS idx_exposures_test ON exposures(test);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Exposure(NamedTuple):
+    last_used: str   # ISO date of the most recent use inside the window
+    uses: int        # number of tests inside the window that used the exercise
+
+
+def ledger_path(base_dir: Optional[Path] = None) -> Path:
+    """Return the ledger location for `base_dir` (env override wins)."""
+    env = os.environ.get('EXPOSURE_LEDGER_PATH')
+    if env:
+        return Path(env)
+    return Path(base_dir or BASE_DIR) / LEDGER_FILENAME
+
+
+def exercise_key(exercise: Union[str, Path, Dict[str, Any]]) -> str:
+    """Ledger key for an index entry, an exercise id or an exercise path.
+
+    Exercise files and folders are named after their id, so a path maps to the
+    same key as the index entry (``.../MAT_..._001.tex`` -> ``MAT_..._001``,
+    ``.../MAT_..._002/main.tex`` -> ``MAT_..._002``).
+    """
+    if isinstance(exercise, dict):
+        return str(exercise.get('id') or _path_key(Path(str(exercise.get('path', '')))))
+    if isinstance(exercise, Path):
+        return _path_key(exercise)
+    return str(exercise)
+
+
+def _path_key(path: Path) -> str:
+    # exercises with subvariants are folders whose entry point is main.tex
+    return path.parent.name if path.stem == 'main' else path.stem
+
+
+def _iso(day: Union[None, str, date]) -> str:
+    if day is None:
+        return date.today().isoformat()
+    if isinstance(day, datetime):
+        return day.date().isoformat()
+    if isinstance(day, date):
+        return day.isoformat()
+    return date.fromisoformat(day).isoformat()
+
+
+class ExposureLedger:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else ledger_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # autocommit mode; writes are grouped with explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- writes -------------------------------------------------------------
+
+    def _write(self, fn):
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+                         (datetime.now().isoformat(),))
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def record(self, exercises: Iterable[Union[str, Path, Dict[str, Any]]], test: str,
+               class_name: str = '', used_on: Union[None, str, date] = None, source: str = '') -> int:
+        """Record that `exercises` were used in `test`; returns the rows written.
+
+        Recording the same test again (same name and class) only moves its
+        date forward, so regenerating a test does not count as a second use.
+        """
+        day = _iso(used_on)
+        rows = [(key, test, class_name or '', day, source)
+                for key in dict.fromkeys(exercise_key(ex) for ex in exercises) if key]
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT INTO exposures (exercise_id, test, class_name, used_on, source) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (exercise_id, test, class_name) DO UPDATE SET used_on = excluded.used_on '
+                'WHERE excluded.used_on > exposures.used_on', rows)
+            return conn.total_changes - before
+
+        return self._write(insert) if rows else 0
+
+    def forget(self, test: str, class_name: Optional[str] = None) -> int:
+        """Drop the records of a discarded test."""
+        sql, params = 'DELETE FROM exposures WHERE test = ?', [test]
+        if class_name is not None:
+            sql += ' AND class_name = ?'
+            params.append(class_name)
+        return self._write(lambda conn: conn.execute(sql, params).rowcount)
+
+    # -- reads --------------------------------------------------------------
+
+    def recent(self, window_days: int, class_name: Optional[str] = None,
+               today: Union[None, str, date] = None) -> Dict[str, Exposure]:
+        """Exercises used in the last `window_days` days (all classes unless `class_name`)."""
+        since = (date.fromisoformat(_iso(today)) - timedelta(days=int(window_days))).isoformat()
+        sql = ('SELECT exercise_id, MAX(used_on) AS last_used, COUNT(*) AS uses '
+               'FROM exposures WHERE used_on >= ?')
+        params: List[Any] = [since]
+        if class_name is not None:
+            sql += ' AND class_name = ?'
+            params.append(class_name)
+        sql += ' GROUP BY exercise_id'
+        return {row['exercise_id']: Exposure(row['last_used'], row['uses'])
+                for row in self.connect().execute(sql, params)}
+
+    def history(self, exercise_id: str) -> List[Dict[str, Any]]:
+        rows = self.connect().execute(
+            'SELECT test, class_name, used_on, source FROM exposures '
+            'WHERE exercise_id = ? ORDER BY used_on DESC, seq DESC', (exercise_id,))
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        return self.connect().execute('SELECT COUNT(*) FROM exposures').fetchone()[0]
+
+
+def record_test(exercises: Iterable[Union[str, Path, Dict[str, Any]]], test: str, class_name: str = '',
+                source: str = '', path: Optional[Path] = None) -> int:
+    """Record a generated test without letting a ledger problem fail the generator."""
+    try:
+        with ExposureLedger(path) as ledger:
+            return ledger.record(exercises, test, class_name=class_name, source=source)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️ Não foi possível registar a exposição dos exercícios: {e}")
+        return 0
+
+
+class ExposureFilter:
+    """Apply recent exposures to a candidate list.
+
+    ``exclude`` drops every exercise used inside the window; ``penalize`` keeps
+    them but, after the usual shuffle, moves them behind the unused ones
+    (least recently used first), so they are only picked when nothing fresher
+    fits.
+    """
+
+    def __init__(self, recent: Dict[str, Exposure], mode: str = 'exclude'):
+        if mode not in MODES:
+            raise ValueError(f"exposure: modo desconhecido {mode!r} (use {' ou '.join(MODES)})")
+        self.recent = recent
+        self.mode = mode
+
+    def __bool__(self) -> bool:
+        return bool(self.recent)
+
+    def _last_used(self, exercise: Dict[str, Any]) -> str:
+        # '' sorts before any date: unused exercises first, then oldest use first
+        seen = self.recent.get(exercise_key(exercise))
+        return seen.last_used if seen else ''
+
+    def fresh(self, pool: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        recent = self.recent
+        return [ex for ex in pool if exercise_key(ex) not in recent]
+
+    def admit(self, pool: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The pool selection may draw from (filtered only in ``exclude`` mode)."""
+        return self.fresh(pool) if self.mode == 'exclude' and self.recent else pool
+
+    def order(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Stable reorder putting recently used exercises last (``penalize`` mode)."""
+        if self.mode != 'penalize' or not self.recent:
+            return candidates
+        return sorted(candidates, key=self._last_used)
+
+
+def load_exposure(settings: Optional[Dict[str, Any]], class_name: Optional[str] = None,
+                  path: Optional[Path] = None, today: Union[None, str, date] = None) -> Optional[ExposureFilter]:
+    """Build an :class:`ExposureFilter` from a config ``exposure`` block.
+
+    ``{"window_days": 30, "mode": "exclude", "scope": "all"}``; ``scope`` is
+    ``"all"`` (any class) or ``"class"`` (only tests recorded for `class_name`).
+    Returns None when no window is configured or the ledger does not exist yet.
+    """
+    settings = settings or {}
+    window = settings.get('window_days')
+    if not window:
+        return None
+    path = Path(path) if path else ledger_path()
+    if not path.exists():
+        return None
+    mode = settings.get('mode', 'exclude')
+    scope = settings.get('scope', 'all')
+    own_class = class_name if class_name is not None else settings.get('class')
+    with ExposureLedger(path) as ledger:
+        recent = ledger.recent(int(window), own_class if scope == 'class' else None, today=today)
+    return ExposureFilter(recent, mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registo de exposição de exercícios (exposure.sqlite)')
+    parser.add_argument('--ledger', help='Caminho do exposure.sqlite (padrão: junto ao index.json)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_recent = sub.add_parser('recent', help='Exercícios usados nos últimos N dias')
+    p_recent.add_argument('--days', type=int, default=30)
+    p_recent.add_argument('--class', dest='class_name', help='Apenas testes desta turma')
+
+    p_history = sub.add_parser('history', help='Testes em que um exercício apareceu')
+    p_history.add_argument('exercise_id')
+
+    p_record = sub.add_parser('record', help='Registar manualmente um teste')
+    p_record.add_argument('--test', required=True)
+    p_record.add_argument('--class', dest='class_name', default='')
+    p_record.add_argument('--date', help='Data (AAAA-MM-DD, padrão: hoje)')
+    p_record.add_argument('exercises', nargs='+')
+
+    p_forget = sub.add_parser('forget', help='Apagar o registo de um teste')
+    p_forget.add_argument('--test', required=True)
+    p_forget.add_argument('--class', dest='class_name')
+
+    args = parser.parse_args()
+    with ExposureLedger(Path(args.ledger) if args.ledger else None) as ledger:
+        if args.command == 'recent':
+            recent = ledger.recent(args.days, args.class_name)
+            print(json.dumps({k: v._asdict() for k, v in sorted(recent.items())}, indent=2, ensure_ascii=False))
+        elif args.command == 'history':
+            print(json.dumps(ledger.history(args.exercise_id), indent=2, ensure_ascii=False))
+        elif args.command == 'record':
+            n = ledger.record(args.exercises, args.test, args.class_name, args.date, source='manual')
+            print(f"✅ {n} exposição(ões) registada(s) -> {ledger.path}")
+        else:
+            n = ledger.forget(args.test, args.class_name)
+            print(f"✅ {n} registo(s) apagado(s)")
+
+
+if __name__ == '__main__':
+    main()
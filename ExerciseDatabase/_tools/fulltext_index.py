@@ -0,0 +1,301 @@
+"""Full-text search over exercise LaTeX bodies.
+
+Builds an on-disk inverted index (``fulltext.sqlite`` next to ``index.json``)
+from the ``.tex`` sources. Bodies are reduced to plain words: comments, math
+and LaTeX command names are stripped and Portuguese accents are folded, so
+``funcao inversa`` finds ``função inversa``. Results are ranked with BM25.
+
+The index is refreshed incrementally: :meth:`FullTextIndex.update` only
+re-reads exercises whose files changed (mtime/size) and drops the ones that
+disappeared::
+
+    python fulltext_index.py update
+    python fulltext_index.py search "função inversa tabela"
+
+An exercise is either a standalone ``<ID>.tex`` or a directory with a
+``main.tex`` (its ``subvariant_*.tex`` files are indexed with it); preview
+and solution files are not indexed.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import sqlite3
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).parent.parent
+FULLTEXT_FILENAME = 'fulltext.sqlite'
+# Top-level folders that hold no exercises (besides the `_`-prefixed ones)
+EXCLUDED_DIRS = frozenset({'projects', 'temp'})
+
+# BM25 parameters (standard values)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Too frequent to help ranking; matched after accent folding
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e em entre isso na nas no nos o os ou para pela pelas pelo pelos
+por que se sem sua suas seu seus um uma umas uns the of and to in is
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT UNIQUE NOT NULL,
+    exercise_id TEXT,
+    signature TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL REFERENCES docs(doc_id) ON DELETE CASCADE,
+    tf INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term);
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+"""
+
+_COMMENT_RE = re.compile(r'(?<!\\)%.*')
+_MATH_ENV_RE = re.compile(
+    r'\\begin\{(equation|align|gather|multline|eqnarray|displaymath|math)\*?\}.*?\\end\{\1\*?\}', re.S)
+_DISPLAY_MATH_RE = re.compile(r'\$\$.*?\$\$|\\\[.*?\\\]', re.S)
+_INLINE_MATH_RE = re.compile(r'(?<!\\)\$.*?(?<!\\)\$|\\\(.*?\\\)', re.S)
+_ACCENT_CMD_RE = re.compile(r"\\[`'^\"~=.c]\s*\{?([A-Za-z])\}?")
+_ENV_RE = re.compile(r'\\(begin|end)\s*\{[^}]*\}')
+_COMMAND_RE = re.compile(r'\\[A-Za-z@]+\*?(\[[^\]]*\])?')
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def strip_latex(source: str) -> str:
+    """Reduce a LaTeX fragment to its running text."""
+    text = _COMMENT_RE.sub('', source)
+    text = _MATH_ENV_RE.sub(' ', text)
+    text = _DISPLAY_MATH_RE.sub(' ', text)
+    text = _INLINE_MATH_RE.sub(' ', text)
+    text = _ACCENT_CMD_RE.sub(r'\1', text)
+    text = _ENV_RE.sub(' ', text)
+    text = _COMMAND_RE.sub(' ', text)
+    return text.replace('\\', ' ')
+
+
+def fold_accents(text: str) -> str:
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded, lower-cased word tokens without stopwords."""
+    return [t for t in _TOKEN_RE.findall(fold_accents(text).lower())
+            if len(t) > 1 and t not in STOPWORDS]
+
+
+def is_exercise_tex(name: str) -> bool:
+    """True for an exercise ``.tex`` file name.
+
+    Previews, solutions and editor backups (``X.agentfix.tex``,
+    ``X.bak_agent_<ts>.tex``: any stem with a dot) are not exercises.
+    """
+    return (name.endswith('.tex') and not name.endswith(('_preview.tex', '_solution.tex'))
+            and '.' not in name[:-len('.tex')])
+
+
+def iter_exercise_sources(base_dir: Path) -> Iterator[Tuple[str, str, List[Path]]]:
+    """Yield (relative path, exercise id, source files) for every exercise under `base_dir`.
+
+    Folders starting with ``_`` (tools, staging, registry, outputs) and
+    :data:`EXCLUDED_DIRS` are skipped, and so are files rejected by
+    :func:`is_exercise_tex`.
+    """
+    base_dir = Path(base_dir)
+    for root, dirs, files in os.walk(base_dir):
+        root_path = Path(root)
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('_', '.'))
+                         and not (root_path == base_dir and d in EXCLUDED_DIRS))
+        if 'main.tex' in files and root_path != base_dir:
+            sources = [root_path / 'main.tex'] + sorted(
+                root_path / f for f in files if f.startswith('subvariant_') and is_exercise_tex(f))
+            dirs[:] = []
+            yield root_path.relative_to(base_dir).as_posix(), root_path.name, sources
+            continue
+        for name in sorted(files):
+            if is_exercise_tex(name):
+                path = root_path / name
+                yield path.relative_to(base_dir).as_posix(), path.stem, [path]
+
+
+def _signature(sources: List[Path]) -> str:
+    parts = []
+    for path in sources:
+        st = path.stat()
+        parts.append(f'{path.name}:{st.st_mtime_ns}:{st.st_size}')
+    return '|'.join(parts)
+
+
+def _read_sources(sources: List[Path]) -> str:
+    chunks = []
+    for path in sources:
+        try:
+            chunks.append(path.read_text(encoding='utf-8', errors='replace'))
+        except OSError:
+            continue
+    return '\n'.join(chunks)
+
+
+class FullTextIndex:
+    def __init__(self, base_dir: Optional[Path] = None, path: Optional[Path] = None):
+        self.base_dir = Path(base_dir or BASE_DIR)
+        self.path = Path(path) if path else self.base_dir / FULLTEXT_FILENAME
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def update(self) -> Dict[str, int]:
+        """Re-index changed exercises and drop removed ones; returns counts per action."""
+        conn = self.connect()
+        known = {row[0]: (row[1], row[2]) for row in
+                 conn.execute('SELECT path, doc_id, signature FROM docs')}
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        seen = set()
+        with conn:
+            for rel, exercise_id, sources in iter_exercise_sources(self.base_dir):
+                seen.add(rel)
+                try:
+                    signature = _signature(sources)
+                except OSError:
+                    continue
+                previous = known.get(rel)
+                if previous and previous[1] == signature:
+                    stats['unchanged'] += 1
+                    continue
+                if previous:
+                    conn.execute('DELETE FROM docs WHERE doc_id = ?', (previous[0],))
+                self._index_document(conn, rel, exercise_id, signature, _read_sources(sources))
+                stats['updated' if previous else 'added'] += 1
+            for rel, (doc_id, _) in known.items():
+                if rel not in seen:
+                    conn.execute('DELETE FROM docs WHERE doc_id = ?', (doc_id,))
+                    stats['removed'] += 1
+        return stats
+
+    @staticmethod
+    def _index_document(conn: sqlite3.Connection, rel: str, exercise_id: str, signature: str, source: str):
+        match = re.search(r'%\s*Exercise ID:\s*(\S+)', source)
+        if match:
+            exercise_id = match.group(1)
+        terms = tokenize(strip_latex(source))
+        cur = conn.execute('INSERT INTO docs (path, exercise_id, signature, length) VALUES (?, ?, ?, ?)',
+                           (rel, exercise_id, signature, len(terms)))
+        conn.executemany('INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)',
+                         [(term, cur.lastrowid, tf) for term, tf in Counter(terms).items()])
+
+    def search(self, query: str, limit: Optional[int] = 20, require_all: bool = False) -> List[Dict]:
+        """BM25-ranked matches for `query`: dicts with id, path and score.
+
+        With `require_all`, only exercises containing every query term are returned.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        conn = self.connect()
+        n_docs, avg_len = conn.execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+        if not n_docs:
+            return []
+        avg_len = avg_len or 1.0
+
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        lengths: Dict[int, int] = {}
+        for term in terms:
+            rows = conn.execute(
+                'SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id '
+                'WHERE p.term = ?', (term,)).fetchall()
+            if not rows:
+                continue
+            idf = math.log((n_docs - len(rows) + 0.5) / (len(rows) + 0.5) + 1.0)
+            for doc_id, tf, length in rows:
+                lengths[doc_id] = length
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        if require_all:
+            scores = {d: s for d, s in scores.items() if matched[d] == len(terms)}
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        if limit:
+            ranked = ranked[:limit]
+        results = []
+        for doc_id, score in ranked:
+            path, exercise_id = conn.execute(
+                'SELECT path, exercise_id FROM docs WHERE doc_id = ?', (doc_id,)).fetchone()
+            results.append({'id': exercise_id, 'path': path, 'score': round(score, 4),
+                            'matched_terms': matched[doc_id]})
+        return results
+
+
+def search_text(query: str, limit: Optional[int] = 20, require_all: bool = False,
+                base_dir: Optional[Path] = None, refresh: bool = True) -> List[Dict]:
+    """Run a BM25 query, refreshing the index first (cheap when nothing changed).
+
+    With ``refresh=False`` the index is only built when it does not exist yet;
+    keeping it current is left to the watcher and the ``update`` command.
+    """
+    index = FullTextIndex(base_dir)
+    build = refresh or not index.path.exists()
+    with index:
+        if build:
+            index.update()
+        return index.search(query, limit=limit, require_all=require_all)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pesquisa de texto integral nos exercícios (.tex)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('update', help='Atualizar o índice (apenas ficheiros alterados)')
+    sub.add_parser('rebuild', help='Reconstruir o índice do zero')
+    p_search = sub.add_parser('search', help='Pesquisar')
+    p_search.add_argument('query')
+    p_search.add_argument('--limit', type=int, default=20)
+    p_search.add_argument('--all', action='store_true', help='Exigir todos os termos')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        for suffix in ('', '-wal', '-shm'):
+            path = BASE_DIR / (FULLTEXT_FILENAME + suffix)
+            if path.exists():
+                path.unlink()
+    with FullTextIndex() as index:
+        stats = index.update()
+        if args.command in ('update', 'rebuild'):
+            print(f"✅ Índice atualizado: {stats['added']} novos, {stats['updated']} alterados, "
+                  f"{stats['removed']} removidos, {stats['unchanged']} sem alterações")
+            return
+        for i, hit in enumerate(index.search(args.query, limit=args.limit, require_all=args.all), 1):
+            print(f"{i:2d}. {hit['id']} (score {hit['score']:.2f})  {hit['path']}")
+
+
+if __name__ == '__main__':
+    main()
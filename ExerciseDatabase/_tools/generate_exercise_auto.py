@@ -25,6 +25,10 @@ import argparse
 import subprocess
 import sys
 
+sys.path.insert(0, str(Path(__file__).parent))
+from index_journal import open_journal, read_index
+from index_statistics import add_entry
+
 ROOT = Path(__file__).resolve().parents[2]
 INDEX = ROOT / "ExerciseDatabase" / "index.json"
 EXERCISE_DB = ROOT / "ExerciseDatabase"
@@ -33,8 +37,7 @@ TESTS = ROOT / "tests" / "quick_validation.py"
 
 def generate_unique_id(module_abbrev, concept_abbrev, tipo_abbrev):
     """Generate unique ID based on existing exercises."""
-    with open(INDEX, "r", encoding="utf-8") as f:
-        index = json.load(f)
+    index = read_index(INDEX)
 
     existing_ids = [e.get("id", "") for e in index.get("exercises", []) if isinstance(e, dict)]
     base_pattern = f"{module_abbrev}_{concept_abbrev}_{tipo_abbrev}"
@@ -97,6 +100,13 @@ def create_exercise_json(exercise_id, classification, title, difficulty, tags, s
 
 def update_index_json(new_exercise):
     """Update index.json with new exercise."""
+    # Journal enabled: one appended line, no full rewrite and no backup copy needed
+    journal = open_journal(EXERCISE_DB)
+    if journal is not None:
+        journal.append("add", entry=new_exercise)
+        print(f"Index journal updated: {new_exercise['id']} added")
+        return
+
     with open(INDEX, "r", encoding="utf-8") as f:
         index = json.load(f)
 
@@ -106,13 +116,8 @@ def update_index_json(new_exercise):
     shutil.copy2(INDEX, backup_path)
     print(f"Backup created: {backup_path}")
 
-    # Add exercise
-    index.setdefault("exercises", []).append(new_exercise)
-    index["total_exercises"] = len(index["exercises"])
-    index["last_updated"] = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
-
-    # Update statistics (simplified)
-    # TODO: Implement full statistics update
+    # Add exercise and apply its statistics deltas
+    add_entry(index, new_exercise, ts=datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"))
 
     with open(INDEX, "w", encoding="utf-8") as f:
         json.dump(index, f, ensure_ascii=False, indent=2)
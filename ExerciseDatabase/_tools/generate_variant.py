@@ -80,7 +80,11 @@ def extract_metadata_from_tex(tex_path: Path) -> Optional[dict]:
     if not tex_path.exists():
         return None
     
-    content = tex_path.read_text(encoding="utf-8")
+    return parse_meta_block(tex_path.read_text(encoding="utf-8"))
+
+
+def parse_meta_block(content: str) -> Optional[dict]:
+    """Parse the ``% meta:`` comment block of LaTeX source already in memory."""
     metadata = {}
     
     # Extract metadata from comments like % meta: % key: value
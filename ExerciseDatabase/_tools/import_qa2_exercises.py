@@ -6,9 +6,15 @@ For concept: funcao_inversa (A10_funcoes)
 
 import json
 import shutil
+import sys
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent))
+from exercise_catalog import open_catalog
+from index_journal import open_journal
+from index_statistics import add_entry
+
 # Paths
 ROOT = Path(__file__).parent.parent
 TEMP_CONTENT = ROOT / "../temp/QA2/content"
@@ -152,89 +158,37 @@ def create_exercise_files(ex_data: dict):
 
 def update_index(new_exercises: list):
     """Update index.json with new exercises"""
+    catalog = open_catalog(ROOT)
+    if catalog is not None:
+        # Catalog mode: one transaction with the new rows and their statistics deltas
+        with catalog:
+            catalog.add_exercises(new_exercises)
+            total = catalog.count()
+        print(f"✅ Catálogo atualizado: {total} exercícios totais")
+        return
+
+    journal = open_journal(ROOT)
+    if journal is not None:
+        for ex in new_exercises:
+            journal.append('add', entry=ex)
+        print(f"✅ Journal atualizado: {len(new_exercises)} exercícios adicionados")
+        return
+
     if not INDEX_FILE.exists():
         index = {
             "database_version": "2.0",
             "last_updated": datetime.now().isoformat(),
             "total_exercises": 0,
-            "statistics": {
-                "by_module": {},
-                "by_concept": {},
-                "by_difficulty": {},
-                "by_type": {},
-                "by_discipline": {}
-            },
+            "statistics": {},
             "exercises": []
         }
     else:
         with open(INDEX_FILE, 'r', encoding='utf-8') as f:
             index = json.load(f)
     
-    # Add new exercises
-    index["exercises"].extend(new_exercises)
-    index["total_exercises"] = len(index["exercises"])
-    index["last_updated"] = datetime.now().isoformat()
-    
-    # Update statistics
-    stats = index["statistics"]
-    
-    # By module
-    for ex in index["exercises"]:
-        mod = ex["module"]
-        stats["by_module"][mod] = stats["by_module"].get(mod, 0) + 1
-    
-    # By concept
-    stats["by_concept"] = {}
-    for ex in index["exercises"]:
-        concept = ex["concept_name"]
-        stats["by_concept"][concept] = stats["by_concept"].get(concept, 0) + 1
-    
-    # By difficulty
-    difficulty_labels = {1: "Muito Fácil", 2: "Fácil", 3: "Médio", 4: "Difícil", 5: "Muito Difícil"}
-    stats["by_difficulty"] = {}
-    for ex in index["exercises"]:
-        diff_label = difficulty_labels.get(ex["difficulty"], "Desconhecido")
-        stats["by_difficulty"][diff_label] = stats["by_difficulty"].get(diff_label, 0) + 1
-    
-    # By type
-    stats["by_type"] = {}
-    for ex in index["exercises"]:
-        typ = ex["type"]
-        stats["by_type"][typ] = stats["by_type"].get(typ, 0) + 1
-    
-    # By discipline
-    stats["by_discipline"] = {}
-    for ex in index["exercises"]:
-        disc = ex["discipline"]
-        stats["by_discipline"][disc] = stats["by_discipline"].get(disc, 0) + 1
-    
-    # Rebuild statistics properly (avoid duplicates)
-    stats["by_module"] = {}
-    stats["by_concept"] = {}
-    stats["by_difficulty"] = {}
-    stats["by_type"] = {}
-    stats["by_discipline"] = {}
-    
-    for ex in index["exercises"]:
-        # Module
-        mod = ex["module"]
-        stats["by_module"][mod] = stats["by_module"].get(mod, 0) + 1
-        
-        # Concept
-        concept = ex["concept_name"]
-        stats["by_concept"][concept] = stats["by_concept"].get(concept, 0) + 1
-        
-        # Difficulty
-        diff_label = difficulty_labels.get(ex["difficulty"], "Desconhecido")
-        stats["by_difficulty"][diff_label] = stats["by_difficulty"].get(diff_label, 0) + 1
-        
-        # Type
-        typ = ex["type"]
-        stats["by_type"][typ] = stats["by_type"].get(typ, 0) + 1
-        
-        # Discipline
-        disc = ex["discipline"]
-        stats["by_discipline"][disc] = stats["by_discipline"].get(disc, 0) + 1
+    # Add new exercises (statistics updated by delta for every facet)
+    for ex in new_exercises:
+        add_entry(index, ex)
     
     # Write updated index
     with open(INDEX_FILE, 'w', encoding='utf-8') as f:
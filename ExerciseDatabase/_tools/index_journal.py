@@ -0,0 +1,224 @@
+"""Append-only change journal for ``index.json``.
+
+When ``index.journal`` exists next to ``index.json`` (create it with
+``python index_journal.py enable``) writers append one JSON line per mutation
+instead of rewriting the whole index. Readers use :func:`read_index`, which
+replays the journal over the last compacted snapshot, and
+``python index_journal.py compact`` folds the journal back into ``index.json``.
+
+Journal format: the first line is a header ``{"op": "begin", "generation": N}``;
+every other line is a record::
+
+    {"op": "add",     "ts": ..., "entry": {...}}
+    {"op": "update",  "ts": ..., "id": "...", "changes": {...}}
+    {"op": "delete",  "ts": ..., "id": "..."}
+    {"op": "promote", "ts": ..., "id": "...", "entry": {...}}
+    {"op": "upsert",  "ts": ..., "id": "...", "entry": {...}}
+
+Records may carry ``"collection": "projects"`` to target the projects list.
+The compacted snapshot stores ``journal_generation``; a journal whose header
+matches it has already been folded, so a crash between writing the snapshot
+and resetting the journal never applies records twice.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .index_statistics import add_entry, remove_entries, update_entries, upsert_entry
+    from .ip_registry import RegistryLock
+except ImportError:
+    from index_statistics import add_entry, remove_entries, update_entries, upsert_entry
+    from ip_registry import RegistryLock
+
+BASE_DIR = Path(__file__).parent.parent
+INDEX_FILE = BASE_DIR / 'index.json'
+JOURNAL_FILENAME = 'index.journal'
+OPS = ('add', 'update', 'delete', 'promote', 'upsert')
+
+
+def journal_path(index_file: Path) -> Path:
+    return Path(index_file).with_name(JOURNAL_FILENAME)
+
+
+def open_journal(base_dir: Optional[Path] = None) -> Optional['IndexJournal']:
+    """Return the journal for the index in `base_dir` if journaling is enabled, else None."""
+    index_file = Path(base_dir or BASE_DIR) / 'index.json'
+    if not journal_path(index_file).exists():
+        return None
+    return IndexJournal(index_file)
+
+
+def _empty_index() -> Dict:
+    return {
+        'database_version': '3.0',
+        'last_updated': '',
+        'total_exercises': 0,
+        'statistics': {},
+        'exercises': [],
+    }
+
+
+def _load_snapshot(index_file: Path) -> Dict:
+    if not index_file.exists():
+        return _empty_index()
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def apply_record(index: Dict, record: Dict) -> None:
+    """Apply one journal record to an in-memory index document (statistics included)."""
+    op = record.get('op')
+    collection = record.get('collection', 'exercises')
+    ts = record.get('ts')
+    if op == 'add':
+        add_entry(index, record['entry'], collection, ts)
+    elif op == 'update':
+        update_entries(index, record['id'], record.get('changes') or {}, collection, ts)
+    elif op == 'delete':
+        remove_entries(index, record['id'], collection, ts)
+    elif op == 'promote':
+        entry = dict(record['entry'])
+        entry.setdefault('status', 'active')
+        upsert_entry(index, entry, collection, ts)
+    elif op == 'upsert':
+        upsert_entry(index, record['entry'], collection, ts)
+    else:
+        raise ValueError(f"unknown journal op: {op}")
+
+
+class IndexJournal:
+    def __init__(self, index_file: Path = INDEX_FILE):
+        self.index_file = Path(index_file)
+        self.path = journal_path(self.index_file)
+
+    def _lock(self) -> RegistryLock:
+        return RegistryLock(self.index_file)
+
+    def enable(self) -> Path:
+        """Create an empty journal (idempotent)."""
+        with self._lock():
+            if not self.path.exists():
+                generation = int(_load_snapshot(self.index_file).get('journal_generation', 0)) + 1
+                self._reset(generation)
+        return self.path
+
+    def _reset(self, generation: int):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'begin', 'generation': generation}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def append(self, op: str, entry: Optional[Dict] = None, exercise_id: Optional[str] = None,
+               changes: Optional[Dict] = None, collection: str = 'exercises') -> Dict:
+        """Append one mutation record. O(1) regardless of index size."""
+        if op not in OPS:
+            raise ValueError(f"unknown journal op: {op}")
+        record: Dict = {'op': op, 'ts': datetime.now().isoformat()}
+        if collection != 'exercises':
+            record['collection'] = collection
+        if entry is not None:
+            record['entry'] = entry
+        if exercise_id is None and entry is not None and op in ('update', 'delete', 'promote', 'upsert'):
+            exercise_id = entry.get('id')
+        if exercise_id is not None:
+            record['id'] = exercise_id
+        if changes is not None:
+            record['changes'] = changes
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock():
+            if not self.path.exists():
+                self._reset(int(_load_snapshot(self.index_file).get('journal_generation', 0)) + 1)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        return record
+
+    def records(self) -> Tuple[int, List[Dict]]:
+        """Return (generation, records). A truncated trailing line is ignored."""
+        if not self.path.exists():
+            return 0, []
+        generation = 0
+        out: List[Dict] = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if rec.get('op') == 'begin':
+                    generation = int(rec.get('generation', 0))
+                    continue
+                out.append(rec)
+        return generation, out
+
+    def read(self) -> Dict:
+        index = _load_snapshot(self.index_file)
+        generation, records = self.records()
+        if generation and generation == index.get('journal_generation'):
+            # already folded by a compaction that did not get to reset the journal
+            return index
+        for rec in records:
+            apply_record(index, rec)
+        return index
+
+    def compact(self) -> int:
+        """Fold the journal into ``index.json`` atomically; returns the number of records folded."""
+        with self._lock():
+            generation, records = self.records()
+            index = self.read()
+            folded = 0 if generation == index.get('journal_generation') else len(records)
+            index['journal_generation'] = generation
+            tmp = self.index_file.with_suffix(self.index_file.suffix + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.index_file)
+            self._reset(generation + 1)
+        return folded
+
+
+def read_index(index_file: Path = INDEX_FILE) -> Dict:
+    """Load ``index.json`` with any pending journal records applied."""
+    index_file = Path(index_file)
+    if journal_path(index_file).exists():
+        return IndexJournal(index_file).read()
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Journal de alterações do index.json')
+    parser.add_argument('command', choices=['enable', 'compact', 'status'])
+    parser.add_argument('--index', default=str(INDEX_FILE), help='Caminho do index.json')
+    args = parser.parse_args()
+
+    journal = IndexJournal(Path(args.index))
+    if args.command == 'enable':
+        print(f"✅ Journal ativo: {journal.enable()}")
+    elif args.command == 'compact':
+        if not journal.path.exists():
+            print("Journal não ativo - nada a compactar")
+            return
+        n = journal.compact()
+        print(f"✅ Compactado: {n} alterações incorporadas em {journal.index_file}")
+    else:
+        generation, records = journal.records()
+        print(f"Journal: {journal.path} ({'ativo' if journal.path.exists() else 'inativo'})")
+        print(f"Geração: {generation} | Alterações pendentes: {len(records)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Materialized statistics for ``index.json``.
+
+Every writer mutates the index through :func:`add_entry`, :func:`remove_entries`,
+:func:`update_entries` or :func:`upsert_entry`, which apply +1/-1 deltas to all
+facets of ``index["statistics"]`` instead of recounting. Readers can then trust
+the stored counters; :func:`verify` checks them cheaply (every facet must sum
+to the number of entries) or against a full recount, and :func:`rebuild`
+recomputes them once::
+
+    python index_statistics.py verify [--full]
+    python index_statistics.py rebuild
+
+Facet keys (shared with the SQLite catalog):
+
+- ``by_discipline``: ``discipline``
+- ``by_module``: module id (``module``)
+- ``by_concept``: ``concept_name``, falling back to ``concept``
+- ``by_difficulty``: difficulty label (``Fácil``, ``Médio``, ...)
+- ``by_type``: exercise type name (``tipo_nome``, falling back to ``tipo``)
+- ``by_format``: exercise format (``format``, falling back to ``type``)
+- ``by_status``: ``status``
+- ``by_project_status``: project ``status`` (projects collection)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+BASE_DIR = Path(__file__).parent.parent
+INDEX_FILE = BASE_DIR / 'index.json'
+
+DIFFICULTY_LABELS = {1: "Muito Fácil", 2: "Fácil", 3: "Médio", 4: "Difícil", 5: "Muito Difícil"}
+UNKNOWN = 'unknown'
+
+EXERCISE_FACETS: Dict[str, Callable[[Dict], str]] = {
+    'by_discipline': lambda e: e.get('discipline') or UNKNOWN,
+    'by_module': lambda e: e.get('module') or UNKNOWN,
+    'by_concept': lambda e: e.get('concept_name') or e.get('concept') or UNKNOWN,
+    'by_difficulty': lambda e: DIFFICULTY_LABELS.get(e.get('difficulty'), 'Desconhecido'),
+    'by_type': lambda e: e.get('tipo_nome') or e.get('tipo') or UNKNOWN,
+    'by_format': lambda e: e.get('format') or e.get('type') or UNKNOWN,
+    'by_status': lambda e: e.get('status') or UNKNOWN,
+}
+PROJECT_FACETS: Dict[str, Callable[[Dict], str]] = {
+    'by_project_status': lambda p: p.get('status') or 'draft',
+}
+COLLECTION_FACETS = {'exercises': EXERCISE_FACETS, 'projects': PROJECT_FACETS}
+
+
+def facet_keys(entry: Dict, collection: str = 'exercises') -> Dict[str, str]:
+    """The counter each facet of `entry` contributes to."""
+    return {facet: key_fn(entry) for facet, key_fn in COLLECTION_FACETS[collection].items()}
+
+
+def apply_delta(stats: Dict, entry: Dict, sign: int = 1, collection: str = 'exercises') -> None:
+    """Add (`sign=1`) or remove (`sign=-1`) `entry` from the counters; empty counters are dropped."""
+    for facet, key in facet_keys(entry, collection).items():
+        counts = stats.setdefault(facet, {})
+        value = counts.get(key, 0) + sign
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+
+def _touch(index: Dict, collection: str, ts: Optional[str]) -> None:
+    if collection == 'exercises':
+        index['total_exercises'] = len(index.get('exercises', []))
+    index['last_updated'] = ts or datetime.now().isoformat()
+
+
+def add_entry(index: Dict, entry: Dict, collection: str = 'exercises', ts: Optional[str] = None) -> Dict:
+    """Append `entry` to the collection and count it."""
+    index.setdefault(collection, []).append(entry)
+    apply_delta(index.setdefault('statistics', {}), entry, 1, collection)
+    _touch(index, collection, ts)
+    return entry
+
+
+def remove_entries(index: Dict, entry_id: str, collection: str = 'exercises', ts: Optional[str] = None) -> List[Dict]:
+    """Remove every entry with `entry_id`; returns the removed entries."""
+    items = index.setdefault(collection, [])
+    removed = [e for e in items if e.get('id') == entry_id]
+    if removed:
+        items[:] = [e for e in items if e.get('id') != entry_id]
+        stats = index.setdefault('statistics', {})
+        for entry in removed:
+            apply_delta(stats, entry, -1, collection)
+        _touch(index, collection, ts)
+    return removed
+
+
+def update_entries(index: Dict, entry_id: str, changes: Dict, collection: str = 'exercises',
+                   ts: Optional[str] = None) -> int:
+    """Apply `changes` to every entry with `entry_id` (status changes included); returns the count."""
+    stats = index.setdefault('statistics', {})
+    updated = 0
+    for entry in index.setdefault(collection, []):
+        if entry.get('id') != entry_id:
+            continue
+        apply_delta(stats, entry, -1, collection)
+        entry.update(changes)
+        apply_delta(stats, entry, 1, collection)
+        updated += 1
+    if updated:
+        _touch(index, collection, ts)
+    return updated
+
+
+def upsert_entry(index: Dict, entry: Dict, collection: str = 'exercises', ts: Optional[str] = None) -> Dict:
+    """Merge `entry` into the first entry with the same id, or add it."""
+    items = index.setdefault(collection, [])
+    for pos, existing in enumerate(items):
+        if existing.get('id') == entry.get('id'):
+            stats = index.setdefault('statistics', {})
+            apply_delta(stats, existing, -1, collection)
+            items[pos] = {**existing, **entry}
+            apply_delta(stats, items[pos], 1, collection)
+            _touch(index, collection, ts)
+            return items[pos]
+    return add_entry(index, entry, collection, ts)
+
+
+def compute_statistics(index: Dict) -> Dict[str, Dict[str, int]]:
+    """Full O(N) recount; used by :func:`rebuild` and :func:`verify` with ``full=True``."""
+    stats: Dict[str, Dict[str, int]] = {facet: {} for facet in EXERCISE_FACETS}
+    for entry in index.get('exercises', []):
+        apply_delta(stats, entry, 1, 'exercises')
+    if 'projects' in index:
+        stats.update({facet: {} for facet in PROJECT_FACETS})
+        for project in index['projects']:
+            apply_delta(stats, project, 1, 'projects')
+    return stats
+
+
+def verify(index: Dict, full: bool = False) -> List[str]:
+    """Return a list of problems with the stored statistics (empty when consistent).
+
+    The default check is O(number of facet keys): every facet must add up to
+    the size of its collection. `full` also compares against a recount.
+    """
+    stats = index.get('statistics', {})
+    problems = []
+    total = len(index.get('exercises', []))
+    if index.get('total_exercises') != total:
+        problems.append(f"total_exercises={index.get('total_exercises')} but {total} exercises")
+    sizes = {'exercises': total, 'projects': len(index.get('projects', []))}
+    for collection, facets in COLLECTION_FACETS.items():
+        if collection == 'projects' and 'projects' not in index:
+            continue
+        for facet in facets:
+            counted = sum(stats.get(facet, {}).values())
+            if counted != sizes[collection]:
+                problems.append(f"{facet} sums to {counted}, expected {sizes[collection]}")
+    if full and not problems:
+        expected = compute_statistics(index)
+        for facet, counts in expected.items():
+            if stats.get(facet, {}) != counts:
+                problems.append(f"{facet} differs from a full recount")
+    return problems
+
+
+def rebuild(index: Dict) -> Dict:
+    """Replace the stored statistics with a full recount."""
+    index['statistics'] = compute_statistics(index)
+    index['total_exercises'] = len(index.get('exercises', []))
+    return index
+
+
+def _write_index(index_file: Path, index: Dict) -> None:
+    tmp = index_file.with_suffix(index_file.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, index_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estatísticas materializadas do index.json')
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    parser.add_argument('--full', action='store_true', help='Comparar com uma recontagem completa')
+    parser.add_argument('--index', default=str(INDEX_FILE), help='Caminho do index.json')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(Path(__file__).parent))
+    from exercise_catalog import open_catalog
+    from index_journal import IndexJournal, journal_path, read_index
+
+    index_file = Path(args.index)
+    catalog = open_catalog(index_file.parent)
+    if catalog is not None:
+        with catalog:
+            if args.command == 'rebuild':
+                catalog.rebuild_statistics()
+                print(f"✅ Estatísticas do catálogo reconstruídas: {catalog.path}")
+                return
+            problems = verify(catalog.to_index(), full=args.full)
+    elif args.command == 'rebuild':
+        if journal_path(index_file).exists():
+            # fold pending changes first so the snapshot is complete
+            IndexJournal(index_file).compact()
+        _write_index(index_file, rebuild(read_index(index_file)))
+        print(f"✅ Estatísticas reconstruídas: {index_file}")
+        return
+    else:
+        problems = verify(read_index(index_file), full=args.full)
+
+    if problems:
+        print("❌ Estatísticas inconsistentes:")
+        for problem in problems:
+            print(f"   • {problem}")
+        print("   Execute: python index_statistics.py rebuild")
+        sys.exit(1)
+    print("✅ Estatísticas consistentes")
+
+
+if __name__ == '__main__':
+    main()
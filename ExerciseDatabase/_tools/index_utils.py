@@ -2,6 +2,13 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+try:
+    from .index_journal import IndexJournal, journal_path
+    from .index_statistics import add_entry
+except ImportError:
+    from index_journal import IndexJournal, journal_path
+    from index_statistics import add_entry
+
 BASE_DIR = Path(__file__).parent.parent
 INDEX_FILE = BASE_DIR / 'index.json'
 
@@ -15,6 +22,20 @@ def update_projects_index(project_metadata: dict, project_path: str, index_file:
     if index_file is None:
         index_file = INDEX_FILE
 
+    entry = {
+        'id': project_metadata.get('id', project_metadata.get('titulo', 'UNKNOWN')),
+        'titulo': project_metadata.get('titulo', ''),
+        'responsavel': project_metadata.get('responsavel', ''),
+        'path': project_path.replace('\\', '/'),
+        'created_at': project_metadata.get('created_at', datetime.now().isoformat()),
+        'status': project_metadata.get('status', 'draft')
+    }
+
+    # Change journal enabled: append instead of rewriting the whole index
+    if journal_path(index_file).exists():
+        IndexJournal(index_file).append('add', entry=entry, collection='projects')
+        return
+
     if index_file.exists():
         with open(index_file, 'r', encoding='utf-8') as f:
             idx = json.load(f)
@@ -28,28 +49,8 @@ def update_projects_index(project_metadata: dict, project_path: str, index_file:
             'projects': []
         }
 
-    # Ensure projects list
-    if 'projects' not in idx:
-        idx['projects'] = []
-
-    entry = {
-        'id': project_metadata.get('id', project_metadata.get('titulo', 'UNKNOWN')),
-        'titulo': project_metadata.get('titulo', ''),
-        'responsavel': project_metadata.get('responsavel', ''),
-        'path': project_path.replace('\\', '/'),
-        'created_at': project_metadata.get('created_at', datetime.now().isoformat()),
-        'status': project_metadata.get('status', 'draft')
-    }
-
-    idx['projects'].append(entry)
-
-    # Update statistics.by_project_status
-    stats = idx.setdefault('statistics', {})
-    by_status = stats.setdefault('by_project_status', {})
-    st = entry['status']
-    by_status[st] = by_status.get(st, 0) + 1
-
-    idx['last_updated'] = datetime.now().isoformat()
+    # Append to 'projects' and update statistics.by_project_status
+    add_entry(idx, entry, collection='projects')
 
     with open(index_file, 'w', encoding='utf-8') as f:
         json.dump(idx, f, indent=2, ensure_ascii=False)
@@ -1,14 +1,22 @@
 """IP registry for exercises.
 
 Provides atomic registry persistence, id allocation and lookups.
+Use `register_many` or the `transaction()` context manager to register many
+paths under one lock with a single save.
 Registry path can be overridden with environment variable `IP_REGISTRY_PATH`.
 """
 from __future__ import annotations
 import json
 import os
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .ip_trie import IPTrie
+except ImportError:
+    from ip_trie import IPTrie
 
 REPO_ROOT = Path(__file__).resolve().parent.parent.parent
 DEFAULT_REGISTRY_DIR = REPO_ROOT / 'ExerciseDatabase' / '_registry'
@@ -85,6 +93,9 @@ class IPRegistry:
         self.path = Path(path) if path is not None else REGISTRY_PATH
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._data = None
+        self._txn: Optional[Dict] = None
+        self._trie: Optional[IPTrie] = None
+        self._trie_data = None
 
     def load(self) -> Dict:
         if self._data is not None:
@@ -134,6 +145,32 @@ class IPRegistry:
         nc[key] = val + 1
         return val
 
+    @contextmanager
+    def transaction(self, backup: bool = True):
+        """Group registrations: one lock, one reload, one save.
+
+        Inside the block `register_path` only updates the in-memory registry;
+        the per-exercise ``exercise.json``/``_meta.json`` files and the registry
+        itself are written once on a clean exit. On error nothing is persisted.
+        """
+        if self._txn is not None:
+            # nested: join the outer transaction
+            yield self
+            return
+        with RegistryLock(self.path):
+            self._data = None
+            self.load()
+            self._txn = {'exercise_meta': {}, 'concept_meta': {}}
+            try:
+                yield self
+                self._flush_side_files(self._txn)
+                self.save(backup=backup)
+            except BaseException:
+                self._data = None
+                raise
+            finally:
+                self._txn = None
+
     def register_path(self, parts: List[str], exercise_relpath: str, label: Optional[str] = None) -> str:
         """Register a full path given parts = [discipline,module,concept,type,exercise]
         Returns assigned IP string.
@@ -141,142 +178,173 @@ class IPRegistry:
         """
         if len(parts) != 5:
             raise ValueError('parts must be length 5')
-        with RegistryLock(self.path):
-            data = self.load()
-            # traverse creating structure
-            disc_name, mod_name, conc_name, type_name, ex_name = parts
-            disciplines = data.setdefault('disciplines', {})
-            # discipline
-            disc = disciplines.get(disc_name)
-            if disc is None:
-                did = self._alloc_counter(f'discipline')
-                disc = {'id': did, 'label': disc_name, 'modules': {}}
-                disciplines[disc_name] = disc
-            # module
-            modules = disc.setdefault('modules', {})
-            mod = modules.get(mod_name)
-            if mod is None:
-                mid = self._alloc_counter(f'discipline.{disc["id"]}.module')
-                mod = {'id': mid, 'label': mod_name, 'concepts': {}}
-                modules[mod_name] = mod
-            # concept
-            concepts = mod.setdefault('concepts', {})
-            conc = concepts.get(conc_name)
-            if conc is None:
-                cid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept')
-                conc = {'id': cid, 'label': conc_name, 'types': {}}
-                concepts[conc_name] = conc
-            # type
-            types = conc.setdefault('types', {})
-            typ = types.get(type_name)
-            if typ is None:
-                tid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept.{conc["id"]}.type')
-                typ = {'id': tid, 'label': type_name, 'exercises': {}}
-                types[type_name] = typ
-            # exercise
-            exercises = typ.setdefault('exercises', {})
-            ex = exercises.get(ex_name)
-            if ex is None:
-                eid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept.{conc["id"]}.type.{typ["id"]}.exercise')
-                ex = {'id': eid, 'label': ex_name, 'path': exercise_relpath}
-                exercises[ex_name] = ex
-            # build IP
-            ids = [str(disc['id']), str(mod['id']), str(conc['id']), str(typ['id']), str(ex['id'])]
-            ip = '.'.join(ids)
-            data_ips = data.setdefault('ips', {})
-            # if ip exists but points to different path, add note but keep existing IP
-            existing = data_ips.get(ip)
-            if existing is None:
-                data_ips[ip] = {
-                    'path': exercise_relpath,
-                    'parts': parts,
-                    'label': label or ex_name,
-                    'assigned_at': int(time.time())
-                }
-            else:
-                # idempotent; update path/label if missing
-                if 'path' not in existing or not existing['path']:
-                    existing['path'] = exercise_relpath
-                if 'label' not in existing:
-                    existing['label'] = label or ex_name
-
-            # persist per-exercise metadata on disk for resilience
+        if self._txn is None:
+            with self.transaction():
+                return self.register_path(parts, exercise_relpath, label)
+
+        data = self.load()
+        now = int(time.time())
+        # traverse creating structure
+        disc_name, mod_name, conc_name, type_name, ex_name = parts
+        disciplines = data.setdefault('disciplines', {})
+        # discipline
+        disc = disciplines.get(disc_name)
+        if disc is None:
+            did = self._alloc_counter(f'discipline')
+            disc = {'id': did, 'label': disc_name, 'modules': {}}
+            disciplines[disc_name] = disc
+        # module
+        modules = disc.setdefault('modules', {})
+        mod = modules.get(mod_name)
+        if mod is None:
+            mid = self._alloc_counter(f'discipline.{disc["id"]}.module')
+            mod = {'id': mid, 'label': mod_name, 'concepts': {}}
+            modules[mod_name] = mod
+        # concept
+        concepts = mod.setdefault('concepts', {})
+        conc = concepts.get(conc_name)
+        if conc is None:
+            cid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept')
+            conc = {'id': cid, 'label': conc_name, 'types': {}}
+            concepts[conc_name] = conc
+        # type
+        types = conc.setdefault('types', {})
+        typ = types.get(type_name)
+        if typ is None:
+            tid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept.{conc["id"]}.type')
+            typ = {'id': tid, 'label': type_name, 'exercises': {}}
+            types[type_name] = typ
+        # exercise
+        exercises = typ.setdefault('exercises', {})
+        ex = exercises.get(ex_name)
+        if ex is None:
+            eid = self._alloc_counter(f'discipline.{disc["id"]}.module.{mod["id"]}.concept.{conc["id"]}.type.{typ["id"]}.exercise')
+            ex = {'id': eid, 'label': ex_name, 'path': exercise_relpath}
+            exercises[ex_name] = ex
+        # build IP
+        ids = [str(disc['id']), str(mod['id']), str(conc['id']), str(typ['id']), str(ex['id'])]
+        ip = '.'.join(ids)
+        data_ips = data.setdefault('ips', {})
+        # if ip exists but points to different path, add note but keep existing IP
+        existing = data_ips.get(ip)
+        if existing is None:
+            data_ips[ip] = {
+                'path': exercise_relpath,
+                'parts': parts,
+                'label': label or ex_name,
+                'assigned_at': now
+            }
+            if self._trie is not None and self._trie_data is data:
+                self._trie.add(ip, data_ips[ip])
+        else:
+            # idempotent; update path/label if missing
+            if 'path' not in existing or not existing['path']:
+                existing['path'] = exercise_relpath
+            if 'label' not in existing:
+                existing['label'] = label or ex_name
+
+        # per-exercise metadata on disk for resilience, written when the transaction ends
+        ex_rel = Path(exercise_relpath)
+        # if exercise_relpath starts with 'ExerciseDatabase' strip it
+        if ex_rel.parts and ex_rel.parts[0].lower() == 'exercisedatabase':
+            ex_rel = Path(*ex_rel.parts[1:])
+        self._txn['exercise_meta'][str(ex_rel)] = {
+            'ip': ip,
+            'ids': {
+                'discipline': disc['id'],
+                'module': mod['id'],
+                'concept': conc['id'],
+                'type': typ['id'],
+                'exercise': ex['id']
+            },
+            'label': label or ex_name,
+            'path': str(ex_rel),
+            'assigned_at': now
+        }
+        # also a per-directory _meta.json for the concept directory
+        self._txn['concept_meta'][str(ex_rel.parent)] = {'id': conc['id'], 'label': conc_name}
+        return ip
+
+    def register_many(self, items: Iterable[Tuple]) -> List[str]:
+        """Register several paths in one transaction.
+
+        `items` holds ``(parts, exercise_relpath)`` or ``(parts, exercise_relpath, label)``
+        tuples; returns the IPs in the same order.
+        """
+        with self.transaction():
+            return [self.register_path(*item) for item in items]
+
+    @staticmethod
+    def _flush_side_files(txn: Dict):
+        """Best-effort write of exercise.json / _meta.json; never fails the registration."""
+        for rel, meta in txn['exercise_meta'].items():
+            exercise_dir = REPO_ROOT / 'ExerciseDatabase' / rel
             try:
-                ex_rel = Path(exercise_relpath)
-                # if exercise_relpath starts with 'ExerciseDatabase' strip it
-                if ex_rel.parts and ex_rel.parts[0].lower() == 'exercisedatabase':
-                    ex_rel = Path(*ex_rel.parts[1:])
-                exercise_dir = REPO_ROOT / 'ExerciseDatabase' / ex_rel
                 # ensure exercise exists
-                if exercise_dir.exists():
-                    meta = {
-                        'ip': ip,
-                        'ids': {
-                            'discipline': disc['id'],
-                            'module': mod['id'],
-                            'concept': conc['id'],
-                            'type': typ['id'],
-                            'exercise': ex['id']
-                        },
-                        'label': label or ex_name,
-                        'path': str(ex_rel),
-                        'assigned_at': int(time.time())
-                    }
+                if exercise_dir.is_dir():
                     with open(exercise_dir / 'exercise.json', 'w', encoding='utf8') as mf:
                         json.dump(meta, mf, indent=2, ensure_ascii=False)
-                # also write per-directory _meta.json for concept directory
-                concept_dir = REPO_ROOT / 'ExerciseDatabase' / ex_rel.parent
-                concept_meta = {'id': conc['id'], 'label': conc_name}
-                with open(concept_dir / '_meta.json', 'w', encoding='utf8') as cm:
-                    json.dump(concept_meta, cm, indent=2, ensure_ascii=False)
             except Exception:
-                # best-effort; do not fail registration if filesystem write fails
                 pass
-
-            # save
-            self.save()
-            return ip
+        for rel, meta in txn['concept_meta'].items():
+            try:
+                with open(REPO_ROOT / 'ExerciseDatabase' / rel / '_meta.json', 'w', encoding='utf8') as cm:
+                    json.dump(meta, cm, indent=2, ensure_ascii=False)
+            except Exception:
+                pass
+        if txn['exercise_meta']:
+            try:
+                # imported here: path_lookup -> index_journal -> ip_registry
+                try:
+                    from .path_lookup import record_paths
+                except ImportError:
+                    from path_lookup import record_paths
+                record_paths(txn['exercise_meta'].keys(), REPO_ROOT / 'ExerciseDatabase')
+            except Exception:
+                pass
 
     def get_by_ip(self, ip: str) -> Optional[Dict]:
         data = self.load()
         return data.get('ips', {}).get(ip)
 
-    def resolve_ips(self, ips: List[str]) -> List[Dict]:
-        """Given list of IPs or simple prefix patterns ending with '*', resolve to matching metadata entries."""
+    def trie(self) -> IPTrie:
+        """Hierarchical index of the loaded IPs, kept in sync with `register_path`."""
         data = self.load()
-        out = []
-        for token in ips:
-            token = token.strip()
-            if token.endswith('*'):
-                prefix = token[:-1]
-                for ipk, v in data.get('ips', {}).items():
-                    if ipk.startswith(prefix):
-                        out.append({'ip': ipk, **v})
-            else:
-                v = data.get('ips', {}).get(token)
-                if v:
-                    out.append({'ip': token, **v})
-                else:
-                    # not found: continue (caller may handle)
-                    pass
-        return out
+        if self._trie is None or self._trie_data is not data:
+            self._trie = IPTrie(data.get('ips', {}))
+            self._trie_data = data
+        return self._trie
+
+    def resolve_ips(self, ips: List[str]) -> List[Dict]:
+        """Resolve IPs and patterns (``1.2.*``, ``1.2.3-5``, ``1.2.3+7``; see ip_trie) to metadata entries.
+
+        Each IP appears once; tokens that match nothing are skipped (caller may handle).
+        """
+        trie = self.trie()
+        return [{'ip': ip, **trie.get(ip)} for ip in trie.resolve(ips)]
+
+
+def iter_fs_exercises(base_dir: Path) -> Iterable[Tuple[List[str], str, str]]:
+    """Yield (parts, relpath, label) for every disc/module/concept/type/exercise folder, in a stable order."""
+    base_dir = Path(base_dir)
+
+    def subdirs(path: Path) -> List[Path]:
+        return sorted([d for d in path.iterdir() if d.is_dir() and not d.name.startswith('_')])
+
+    for disc in subdirs(base_dir):
+        for mod in subdirs(disc):
+            for conc in subdirs(mod):
+                for typ in subdirs(conc):
+                    for ex in subdirs(typ):
+                        parts = [disc.name, mod.name, conc.name, typ.name, ex.name]
+                        yield parts, str(ex.relative_to(base_dir)), ex.name
 
 
 # small helper for CLI usage
-def register_from_fs(base_dir: Path) -> Dict[str,str]:
+def register_from_fs(base_dir: Path, registry: Optional[IPRegistry] = None) -> Dict[str,str]:
     """Walk a simple filesystem under base_dir with structure disc/module/concept/type/exercise
     returns mapping ip->path (paths relative to base_dir)
     """
-    base_dir = Path(base_dir)
-    mapping = {}
-    for disc in sorted([d for d in base_dir.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-        for mod in sorted([d for d in (disc).iterdir() if d.is_dir() and not d.name.startswith('_')]):
-            for conc in sorted([d for d in (mod).iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                for typ in sorted([d for d in (conc).iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                    for ex in sorted([d for d in (typ).iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                        parts = [disc.name, mod.name, conc.name, typ.name, ex.name]
-                        rel = Path(ex.relative_to(base_dir))
-                        rel_str = str(rel)
-                        ip = IPRegistry().register_path(parts, rel_str, label=ex.name)
-                        mapping[ip] = rel_str
-    return mapping
+    items = list(iter_fs_exercises(base_dir))
+    ips = (registry or IPRegistry()).register_many(items)
+    return {ip: rel for ip, (_, rel, _) in zip(ips, items)}
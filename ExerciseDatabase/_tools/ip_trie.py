@@ -0,0 +1,149 @@
+"""Hierarchical index over exercise IPs.
+
+IPs number ``disciplina.módulo.conceito.tipo.exercício``; :class:`IPTrie`
+stores them as a tree with one level per component, so pattern queries only
+visit the matching branches instead of every key of the registry:
+
+- ``1.2.3.4.5``   exact IP
+- ``1.2.*``       everything under discipline 1, module 2
+- ``1.1*``        string prefix on the last level (``1.1.x``, ``1.10.x``, ...)
+- ``1.2.3-5``     concepts 3 to 5 of module 1.2 (and everything below them)
+- ``1.2.3+7``     concepts 3 and 7; ranges and sets combine: ``1.2.3-5+8.*``
+
+:meth:`IPTrie.resolve` takes a list of such tokens and returns the matching
+IPs once each, in token order. :class:`PathExistenceCache` answers ``exists``
+for many paths with one directory listing per parent folder.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+class _Node:
+    __slots__ = ('children', 'ip', '_ordered')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.ip: Optional[str] = None
+        self._ordered: Optional[List[str]] = None
+
+    def ordered_keys(self) -> List[str]:
+        # numeric components in numeric order, cached until the next insert
+        if self._ordered is None:
+            self._ordered = sorted(self.children, key=lambda k: (not k.isdigit(), int(k) if k.isdigit() else 0, k))
+        return self._ordered
+
+
+def _is_pattern(token: str) -> bool:
+    return any(ch in token for ch in '*-+')
+
+
+class IPTrie:
+    def __init__(self, ips: Optional[Dict[str, Dict]] = None):
+        self.root = _Node()
+        self.entries: Dict[str, Dict] = {}
+        for ip, entry in (ips or {}).items():
+            self.add(ip, entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self.entries
+
+    def add(self, ip: str, entry: Optional[Dict] = None):
+        node = self.root
+        for part in ip.split('.'):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+                node._ordered = None
+            node = child
+        node.ip = ip
+        self.entries[ip] = entry if entry is not None else {}
+
+    def get(self, ip: str) -> Optional[Dict]:
+        return self.entries.get(ip)
+
+    def _subtree(self, node: _Node) -> Iterator[str]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.ip is not None:
+                yield node.ip
+            stack.extend(node.children[k] for k in reversed(node.ordered_keys()))
+
+    @staticmethod
+    def _select(node: _Node, component: str) -> List[_Node]:
+        """Children of `node` matching one component (``N``, ``A-B``, ``*`` or ``+``-joined)."""
+        if component == '*':
+            return [node.children[k] for k in node.ordered_keys()]
+        selected: List[str] = []
+        for alt in component.split('+'):
+            if '-' in alt:
+                lo, hi = (int(x) for x in alt.split('-', 1))
+                if hi - lo + 1 <= len(node.children):
+                    selected.extend(str(n) for n in range(lo, hi + 1) if str(n) in node.children)
+                else:
+                    selected.extend(k for k in node.ordered_keys() if k.isdigit() and lo <= int(k) <= hi)
+            elif alt in node.children:
+                selected.append(alt)
+        return [node.children[k] for k in dict.fromkeys(selected)]
+
+    def query(self, token: str) -> List[str]:
+        """IPs matching one token; plain tokens are exact lookups."""
+        token = token.strip()
+        if not _is_pattern(token):
+            return [token] if token in self.entries else []
+
+        partial = None
+        if token.endswith('*'):
+            head = token[:-1]
+            if head and not head.endswith('.'):
+                # legacy string-prefix semantics on the last component
+                head, _, partial = head.rpartition('.')
+            components = [c for c in head.strip('.').split('.') if c]
+        else:
+            components = token.split('.')
+
+        nodes = [self.root]
+        try:
+            for component in components:
+                nodes = [child for node in nodes for child in self._select(node, component)]
+        except ValueError:
+            return []  # malformed range
+        if partial is not None:
+            nodes = [node.children[k] for node in nodes for k in node.ordered_keys() if k.startswith(partial)]
+        return [ip for node in nodes for ip in self._subtree(node)]
+
+    def resolve(self, tokens: Iterable[str]) -> List[str]:
+        """Union of several tokens, each IP once, in token order."""
+        out: Dict[str, None] = {}
+        for token in tokens:
+            for ip in self.query(token):
+                out.setdefault(ip)
+        return list(out)
+
+
+class PathExistenceCache:
+    """``exists()`` for many paths with one ``os.listdir`` per parent directory."""
+
+    def __init__(self):
+        self._listings: Dict[Path, Set[str]] = {}
+
+    def exists(self, path: Path) -> bool:
+        path = Path(path)
+        parent = path.parent
+        names = self._listings.get(parent)
+        if names is None:
+            try:
+                names = set(os.listdir(parent))
+            except OSError:
+                names = set()
+            self._listings[parent] = names
+        return path.name in names
+
+    def clear(self):
+        self._listings.clear()
@@ -0,0 +1,150 @@
+"""Precompiled LaTeX formats for the package block of our templates.
+
+Loading tikz, pgfplots, tcolorbox, babel, hyperref, ... takes most of the
+time of a small compile. The leading package block of a document (from
+``\\documentclass`` to the last ``\\usepackage`` before any other command) is
+dumped once into a ``.fmt`` named after its hash and the engine version;
+later compiles start from that format and only read the rest of the file.
+
+Only the package block goes into the format: the template lines after it use
+paths relative to the output folder (``style.tex``, ``fallback_style.tex``)
+and per-document placeholders, so they stay in the document. Editing the
+template's package list changes the hash, and the next compile builds a new
+format. A package block that cannot be dumped is remembered
+(``<name>.failed``) and compiled the normal way. ``LATEX_FORMAT=0`` disables
+formats.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .compile_cache import DEFAULT_CACHE_DIR, engine_version, env_enabled
+except ImportError:
+    from compile_cache import DEFAULT_CACHE_DIR, engine_version, env_enabled
+
+FORMAT_ENGINES = ('pdflatex', 'latex', 'xelatex', 'lualatex')
+# lines allowed inside the dumped package block
+_PACKAGE_LINE_RE = re.compile(
+    r'^\s*(%.*|\\documentclass\b.*|\\usepackage\b.*|\\RequirePackage\b.*|\\PassOptionsToPackage\b.*|'
+    r'\\usetikzlibrary\b.*|\\usepgfplotslibrary\b.*|\\tcbuselibrary\b.*|'
+    r'\\IfFileExists\{[^}]+\.sty\}\{\\usepackage.*)?$')
+# one build at a time per process: parallel compiles (threads share a pid) wait
+# for the first build instead of dumping the same format again
+_build_lock = threading.Lock()
+
+
+def formats_enabled() -> bool:
+    return env_enabled('LATEX_FORMAT')
+
+
+def format_dir() -> Path:
+    root = os.environ.get('COMPILE_CACHE_PATH')
+    return (Path(root) if root else DEFAULT_CACHE_DIR) / 'formats'
+
+
+def package_preamble(source: str) -> str:
+    """Leading ``\\documentclass`` + package lines of `source` ('' when there is no class line)."""
+    end = 0
+    has_class = False
+    offset = 0
+    for line in source.splitlines(keepends=True):
+        if not _PACKAGE_LINE_RE.match(line.rstrip('\r\n')):
+            break
+        offset += len(line)
+        if line.strip().startswith('\\documentclass'):
+            has_class = True
+        if line.strip() and not line.lstrip().startswith('%'):
+            end = offset
+    return source[:end] if has_class else ''
+
+
+def format_name(engine: str, preamble: str) -> str:
+    digest = hashlib.sha256(f'{engine}|{engine_version(engine)}\n{preamble}'.encode('utf-8')).hexdigest()
+    return f'preamble-{digest[:16]}'
+
+
+def ensure_format(engine_path: str, preamble: str, directory: Optional[Path] = None,
+                  timeout: int = 180) -> Optional[str]:
+    """Name of a ``.fmt`` in `directory` for `preamble`, building it if needed (None if impossible)."""
+    engine = Path(engine_path).stem
+    directory = Path(directory or format_dir())
+    name = format_name(engine, preamble)
+    if (directory / f'{name}.fmt').exists():
+        return name
+    if (directory / f'{name}.failed').exists():
+        return None
+    with _build_lock:
+        if (directory / f'{name}.fmt').exists():
+            return name
+        if (directory / f'{name}.failed').exists():
+            return None
+        return _build_format(engine_path, engine, name, preamble, directory, timeout)
+
+
+def _build_format(engine_path: str, engine: str, name: str, preamble: str, directory: Path,
+                  timeout: int) -> Optional[str]:
+    directory.mkdir(parents=True, exist_ok=True)
+    # build in a private folder (other processes may build the same format) and
+    # only move the finished .fmt into place
+    build_dir = Path(tempfile.mkdtemp(prefix=f'.{name}-', dir=str(directory)))
+    try:
+        source = build_dir / f'{name}.tex'
+        source.write_text(preamble + '\n\\dump\n', encoding='utf-8')
+        subprocess.run([engine_path, '-ini', '-interaction=nonstopmode', f'-jobname={name}',
+                        f'&{engine}', source.name], cwd=str(build_dir), capture_output=True,
+                       timeout=timeout)
+        built = build_dir / f'{name}.fmt'
+        if built.exists():
+            os.replace(built, directory / f'{name}.fmt')
+            return name
+        log = build_dir / f'{name}.log'
+        failed = build_dir / f'{name}.failed'
+        failed.write_text(log.read_text(encoding='utf-8', errors='replace') if log.exists() else '',
+                          encoding='utf-8')
+        os.replace(failed, directory / f'{name}.failed')
+        return None
+    except (OSError, subprocess.SubprocessError):
+        return None
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def format_command(cmd: List[str], cwd: Path) -> Tuple[List[str], Optional[Dict[str, str]], Optional[Path]]:
+    """Rewrite a ``[engine, *options, 'doc.tex']`` command to start from a precompiled format.
+
+    Returns ``(cmd, env, body_file)``; the original command and ``None``s when no
+    format applies. `body_file` is the document without its package block (same
+    line numbers, same jobname) and should be removed after the compile.
+    """
+    engine = Path(cmd[0]).stem
+    if engine not in FORMAT_ENGINES or not formats_enabled():
+        return cmd, None, None
+    tex_file = Path(cwd) / cmd[-1]
+    try:
+        source = tex_file.read_text(encoding='utf-8')
+    except OSError:
+        return cmd, None, None
+    preamble = package_preamble(source)
+    if not preamble:
+        return cmd, None, None
+    directory = format_dir()
+    name = ensure_format(cmd[0], preamble, directory)
+    if name is None:
+        return cmd, None, None
+
+    body_file = tex_file.with_name(f'{tex_file.stem}.body.tex')
+    # blank lines instead of the package block keep log line numbers valid for the original file
+    body_file.write_text('\n' * preamble.count('\n') + source[len(preamble):], encoding='utf-8')
+    env = dict(os.environ)
+    env['TEXFORMATS'] = f'{directory}{os.pathsep}{env.get("TEXFORMATS", "")}'
+    new_cmd = [cmd[0], f'-fmt={name}', f'-jobname={tex_file.stem}', *cmd[1:-1], body_file.name]
+    return new_cmd, env, body_file
@@ -0,0 +1,105 @@
+"""Run pdflatex only as many times as the document needs.
+
+Instead of a fixed double compilation, :func:`run_latex` runs one pass and
+decides whether another is needed, like latexmk does:
+
+- the log asks for it (``Label(s) may have changed``, ``Rerun to get
+  cross-references right``, ``Rerun to get outlines right``, ...), or
+- the content that feeds the next pass changed: ``\\newlabel``/``\\@writefile``/
+  ``\\bibcite`` lines of the ``.aux`` and the ``.toc``/``.lof``/``.lot``/``.out``
+  files. Boilerplate ``.aux`` lines (``\\relax``, hyperref/babel setup) are
+  ignored, so a document without references or contents stops after one pass.
+
+Passes are capped at ``max_passes``; a pass that produces no PDF is not
+repeated. With ``use_format`` the passes start from a precompiled format of
+the document's package block (see :mod:`latex_format`)::
+
+    result, passes = run_latex([pdflatex, '-interaction=nonstopmode', 'doc.tex'], cwd=folder)
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .latex_format import format_command
+except ImportError:
+    from latex_format import format_command
+
+MAX_PASSES = 3
+AUX_LINE_RE = re.compile(r'^\\(newlabel|@writefile|bibcite|contentsline|@input)\b')
+AUXILIARY_SUFFIXES = ('.toc', '.lof', '.lot', '.out')
+RERUN_RE = re.compile(
+    r'(Label\(s\) may have changed|Rerun to get|Please rerun|Rerun LaTeX|Table widths have changed)',
+    re.IGNORECASE)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8', errors='replace')).hexdigest()
+
+
+def auxiliary_state(folder: Path, jobname: str) -> Dict[str, str]:
+    """Digest of everything a pass writes that the next pass reads back."""
+    state = {}
+    aux = folder / f'{jobname}.aux'
+    if aux.exists():
+        lines = aux.read_text(encoding='utf-8', errors='replace').splitlines()
+        state['.aux'] = _digest('\n'.join(l for l in lines if AUX_LINE_RE.match(l)))
+    for suffix in AUXILIARY_SUFFIXES:
+        path = folder / f'{jobname}{suffix}'
+        if path.exists():
+            state[suffix] = _digest(path.read_text(encoding='utf-8', errors='replace'))
+    return state
+
+
+def rerun_reasons(log_text: str, before: Dict[str, str], after: Dict[str, str]) -> List[str]:
+    reasons = []
+    # the log wraps at 79 columns; join lines so split messages still match
+    match = RERUN_RE.search(log_text.replace('\n', ''))
+    if match:
+        reasons.append(f'log: {match.group(1)}')
+    empty = _digest('')
+    for suffix in sorted(set(before) | set(after)):
+        if before.get(suffix, empty) != after.get(suffix, empty):
+            reasons.append(f'{suffix} alterado')
+    return reasons
+
+
+def run_latex(cmd: List[str], cwd: Path, max_passes: int = MAX_PASSES, timeout: int = 60,
+              use_format: bool = True) -> Tuple[Optional[subprocess.CompletedProcess], int]:
+    """Run `cmd` (whose last element is the ``.tex`` name) until the document is stable.
+
+    Returns the last pass's ``CompletedProcess`` (text output) and the number of passes.
+    ``subprocess.TimeoutExpired`` propagates, as with a plain ``subprocess.run``.
+    """
+    cwd = Path(cwd)
+    jobname = Path(cmd[-1]).stem
+    pdf = cwd / f'{jobname}.pdf'
+    log = cwd / f'{jobname}.log'
+    result = None
+    passes = 0
+    env, body_file = None, None
+    if use_format:
+        cmd, env, body_file = format_command(cmd, cwd)
+    state = auxiliary_state(cwd, jobname)
+    try:
+        while passes < max_passes:
+            result = subprocess.run(cmd, cwd=str(cwd), capture_output=True, text=True, env=env,
+                                    timeout=timeout, encoding='utf-8', errors='replace')
+            passes += 1
+            if not pdf.exists():
+                break  # fatal error: another pass would fail the same way
+            before, state = state, auxiliary_state(cwd, jobname)
+            try:
+                log_text = log.read_text(encoding='utf-8', errors='replace')
+            except OSError:
+                log_text = result.stdout or ''
+            if not rerun_reasons(log_text, before, state):
+                break
+    finally:
+        if body_file is not None and body_file.exists():
+            body_file.unlink()
+    return result, passes
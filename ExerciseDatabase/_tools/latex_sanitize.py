@@ -0,0 +1,288 @@
+"""LaTeX sanitizer shared by the sebenta and test generators.
+
+Exercises written or edited by agents often carry artifacts: literal ``\\n``
+sequences, doubled backslashes before commands, Unicode math symbols and
+fill-in blanks made of underscores. Every pattern is compiled once when the
+module is imported, and :func:`sanitize_exercise` fixes a body in one scan of
+its math/text segments. Symbols are mapped with ``str.translate`` tables: bare
+commands inside math, and wrapped in ``$...$`` in text. :func:`sanitize_document`
+is the final pass over a whole generated sebenta; :class:`ChunkSanitizer` runs
+it chunk by chunk while keeping the stray-``$`` check document-wide.
+:func:`close_truncated` is the safety net for truncated exercises in tests.
+
+``SANITIZER_VERSION`` changes whenever the output for the same input changes,
+so caches of sanitized content can key on it. To benchmark the per-exercise
+cost over the whole database::
+
+    python ExerciseDatabase/_tools/latex_sanitize.py --benchmark
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+SANITIZER_VERSION = 1
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# literal "\n" left by agents; "\node", "\neq", "\newpage"... are commands, not newlines
+_LITERAL_NEWLINE_RE = re.compile(r'\\n(?![a-z])')
+_BACKSLASH_RUN_RE = re.compile(r'\\{2,}(?=[A-Za-z])')
+_COLLAPSE_RE = re.compile(r'\\{3,}(?=[A-Za-z])')
+_SAFE_COMMAND_RE = re.compile(r'frac|item|begin|end|label|textbf|emph|left|right|mathrm|mathbb|sqrt')
+_DOCUMENT_SAFE_COMMAND_RE = re.compile(r'frac|item|begin|end')
+_MATH_RE = re.compile(r'\$\$.*?\$\$|\$.*?\$|\\\[.*?\\\]', re.DOTALL)
+_UNDERSCORE_BLANK_RE = re.compile(r'(\\item\s+[^$]*?)(_{4,})([^$]*?)(?=\s|$)')
+
+UNICODE_COMMANDS = {
+    'ℝ': r'\mathbb{R}',
+    '∞': r'\infty',
+    '⇒': r'\Rightarrow',
+    '→': r'\to',
+    '←': r'\leftarrow',
+    '≠': r'\neq',
+    '∈': r'\in',
+    '⊂': r'\subset',
+    '…': '...',
+    '✓': r'\checkmark',
+}
+SCRIPTS = {
+    '₁': '_{1}', '₂': '_{2}', '₃': '_{3}', '₄': '_{4}',
+    '¹': '^{1}', '²': '^{2}', '³': '^{3}', '⁻': '-',
+}
+_MATH_TABLE = str.maketrans({**UNICODE_COMMANDS, **SCRIPTS})
+_TEXT_TABLE = str.maketrans({k: f'${v}$' for k, v in {**UNICODE_COMMANDS, **SCRIPTS}.items()})
+_DOCUMENT_TABLE = str.maketrans({k: UNICODE_COMMANDS[k] for k in 'ℝ∞⇒→∈≠…'})
+# translate() is slow on long Unicode strings: only run it on segments that contain a symbol
+_SYMBOL_RE = re.compile('[' + ''.join(UNICODE_COMMANDS) + ''.join(SCRIPTS) + ']')
+
+# final pass over a generated document
+_ARTIFACT_LINE_RE = re.compile(r'(?m)^[ \t]*(?:%+.*Agent added.*|\$[ \t]*\r?)\n')
+_OPEN_SUBEXERCISE_RE = re.compile(r'(?m)^(.*\\subexercicio\{[^\}]*)(\r?$)')
+_TIKZ_BLOCK_RE = re.compile(r'\\begin\{tikzpicture\}.*?\\end\{tikzpicture\}', re.DOTALL)
+_TIKZ_NODE_FIXES = [
+    (re.compile(r'(?m)\bn\s*\r?\n\s*ode'), r'\\node'),
+    (re.compile(r'(?m)\bn\\+\s*node'), r'\\node'),
+    (re.compile(r'(?m)\\\s*\r?\n\s*node'), r'\\node'),
+    (re.compile(r'(?m)\\+node'), r'\\node'),
+    (re.compile(r'(?m)\r?\n\s*node'), r'\n\\node'),
+]
+_BARE_MATH_LINE_RE = re.compile(r'(?m)^(?P<indent>\s*)(?P<expr>\\(?:frac|dfrac|tfrac|sqrt)\b.*)$')
+_SINGLE_LETTER_LINE_RE = re.compile(r'(?m)^[ \t]*[A-Za-z]{1}[ \t]*\r?\n')
+_OPEN_FIGURE_END_RE = re.compile(r'(\\end\{figure)(?!\})')
+_OPEN_FIGURE_END_BEFORE_SPACE_RE = re.compile(r'(\\end\{figure)(?=\s)')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+# first unescaped $ with no other one after it on its line
+_LAST_DOLLAR_RE = re.compile(r'(?<!\\)\$(?!.*(?<!\\)\$)')
+_NODE_POST_FIXES = [
+    (re.compile(r'\bode\['), r'\\node['),
+    (re.compile(r'(?m)^(\s*)(?=node\[)'), r'\1\\node'),
+    (re.compile(r'(?m)\r?\n(\s*)node'), r'\n\\node'),
+]
+
+
+def _exercise_run(match: re.Match) -> str:
+    # "\\\\frac" -> "\frac"; 3+ backslashes before any other command -> "\\" + command
+    if _SAFE_COMMAND_RE.match(match.string, match.end()):
+        return '\\'
+    return '\\\\' if len(match.group(0)) >= 3 else match.group(0)
+
+
+def _document_run(match: re.Match) -> str:
+    if _DOCUMENT_SAFE_COMMAND_RE.match(match.string, match.end()):
+        return '\\'
+    return '\\\\' if len(match.group(0)) >= 3 else match.group(0)
+
+
+def _text_segment(segment: str) -> str:
+    if _SYMBOL_RE.search(segment):
+        segment = segment.translate(_TEXT_TABLE)
+    if '____' in segment:
+        segment = underscore_blanks(segment)
+    return segment
+
+
+def _math_segment(segment: str) -> str:
+    if not _SYMBOL_RE.search(segment):
+        return segment
+    # a symbol right after backslashes ("\\ℝ") would leave "\\\mathbb"
+    return _COLLAPSE_RE.sub(r'\\\\', segment.translate(_MATH_TABLE))
+
+
+def underscore_blanks(content: str, on_fix: Optional[Callable[[re.Match], None]] = None) -> str:
+    """Replace ``____`` blanks in ``\\item`` text (a "Missing $" error) by ``\\rule{2cm}{0.4pt}``."""
+    def replace(match: re.Match) -> str:
+        if on_fix:
+            on_fix(match)
+        return f'{match.group(1)}\\rule{{2cm}}{{0.4pt}}{match.group(3)}'
+    return _UNDERSCORE_BLANK_RE.sub(replace, content)
+
+
+def unbalanced_dollars(content: str) -> bool:
+    return content.count('$') % 2 == 1
+
+
+def sanitize_exercise(content: str) -> str:
+    """Sanitized exercise body: one scan over its text and math segments."""
+    content = _LITERAL_NEWLINE_RE.sub('\n', content)
+    content = _BACKSLASH_RUN_RE.sub(_exercise_run, content)
+    if '____' not in content and not _SYMBOL_RE.search(content):
+        return content  # nothing segment-specific to fix
+    out = []
+    last = 0
+    for match in _MATH_RE.finditer(content):
+        if match.start() > last:
+            out.append(_text_segment(content[last:match.start()]))
+        out.append(_math_segment(match.group(0)))
+        last = match.end()
+    if last < len(content):
+        out.append(_text_segment(content[last:]))
+    return ''.join(out)
+
+
+def _fix_tikz_block(match: re.Match) -> str:
+    block = match.group(0)
+    for pattern, replacement in _TIKZ_NODE_FIXES:
+        block = pattern.sub(replacement, block)
+    return block
+
+
+def _wrap_math_line(match: re.Match) -> str:
+    expr = match.group('expr')
+    # don't double-wrap if there's already math on the line
+    if '$' in expr or '\\(' in expr or '\\[' in expr:
+        return match.group(0)
+    return f"{match.group('indent') or ''}${expr}$"
+
+
+def unescaped_dollars(content: str) -> int:
+    return content.count('$') - content.count('\\$')
+
+
+def escape_stray_dollar(content: str, log: Optional[logging.Logger] = None) -> str:
+    """Escape one ``$`` when the document has an odd number of them."""
+    if unescaped_dollars(content) % 2 == 1:
+        (log or logging.getLogger(__name__)).warning(
+            'Final sanitizer detected global odd number of $ characters - escaping the last one')
+        content = _LAST_DOLLAR_RE.sub(r'\\$', content, count=1)
+    return content
+
+
+def sanitize_document(content: str, log: Optional[logging.Logger] = None,
+                      balance_dollars: bool = True) -> str:
+    """Final pass over a whole generated document (agent artifacts, TikZ ``node`` corruption, stray ``$``).
+
+    With ``balance_dollars=False`` the stray-``$`` check is left to the caller,
+    for documents sanitized one chunk at a time (see :class:`ChunkSanitizer`).
+    """
+    content = _BACKSLASH_RUN_RE.sub(_document_run, content)
+    if _SYMBOL_RE.search(content):
+        content = content.translate(_DOCUMENT_TABLE)
+    content = _ARTIFACT_LINE_RE.sub('\n', content)
+    # "\subexercicio{Verifique que $f(f^{-1}" -> append the closing brace
+    content = _OPEN_SUBEXERCISE_RE.sub(r'\1}\2', content)
+    if '\\begin{tikzpicture}' in content:
+        content = _TIKZ_BLOCK_RE.sub(_fix_tikz_block, content)
+    content = _BARE_MATH_LINE_RE.sub(_wrap_math_line, content)
+    content = _SINGLE_LETTER_LINE_RE.sub('\n', content)
+    content = _OPEN_FIGURE_END_RE.sub(r'\1}', content)
+    content = _BLANK_LINES_RE.sub('\n\n', content)
+    if balance_dollars:
+        content = escape_stray_dollar(content, log)
+    for pattern, replacement in _NODE_POST_FIXES:
+        content = pattern.sub(replacement, content)
+    return content
+
+
+class ChunkSanitizer:
+    """:func:`sanitize_document` for a document streamed in chunks.
+
+    Each chunk is sanitized on its own, but the ``$`` parity is counted across
+    the whole document: a ``$`` left unmatched inside one chunk (``% custa $5``
+    in a comment) is not escaped as long as the document as a whole balances.
+    When it does not, :meth:`finish` applies the same escape to the assembled
+    text as the single-pass sanitizer would.
+    """
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self.log = log
+        self.dollars = 0
+
+    def __call__(self, chunk: str) -> str:
+        chunk = sanitize_document(chunk, self.log, balance_dollars=False)
+        self.dollars += unescaped_dollars(chunk)
+        return chunk
+
+    @property
+    def unbalanced(self) -> bool:
+        return self.dollars % 2 == 1
+
+    def finish(self, content: str) -> str:
+        return escape_stray_dollar(content, self.log) if self.unbalanced else content
+
+
+def close_truncated(content: str) -> str:
+    """Close what a truncated exercise leaves open so it cannot run away into the next one."""
+    if content is None:
+        return ''
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    if not content.endswith('\n'):
+        content += '\n'
+    content = _OPEN_FIGURE_END_BEFORE_SPACE_RE.sub(r'\1}', content)
+    missing = content.count('{') - content.count('}')
+    if missing > 0:
+        content += '}' * missing
+    if unbalanced_dollars(content):
+        content += '$\n'
+    return content
+
+
+def benchmark(root: Path, rounds: int = 5) -> dict:
+    """Per-exercise sanitizer cost over every ``.tex`` under `root`."""
+    bodies = [p.read_text(encoding='utf-8', errors='replace') for p in sorted(root.rglob('*.tex'))
+              if '_tools' not in p.parts]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for body in bodies:
+            sanitize_exercise(body)
+    elapsed = time.perf_counter() - start
+    document = '\n'.join(bodies)
+    quiet = logging.getLogger(f'{__name__}.benchmark')
+    quiet.disabled = True
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sanitize_document(document, quiet)
+    document_elapsed = time.perf_counter() - start
+    count = max(1, len(bodies))
+    return {
+        'exercises': len(bodies),
+        'bytes': sum(len(b) for b in bodies),
+        'exercise_us': elapsed / rounds / count * 1e6,
+        'document_ms': document_elapsed / rounds * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sanitizador LaTeX partilhado pelos geradores')
+    parser.add_argument('--benchmark', action='store_true', help='Medir o custo por exercício em toda a base de dados')
+    parser.add_argument('--root', default=str(REPO_ROOT / 'ExerciseDatabase'))
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('file', nargs='?', help='Ficheiro .tex a sanitizar (resultado no stdout)')
+    args = parser.parse_args()
+    if args.benchmark:
+        stats = benchmark(Path(args.root), args.rounds)
+        print(f"📊 {stats['exercises']} exercícios ({stats['bytes'] / 1024:.0f} KiB)")
+        print(f"   sanitize_exercise: {stats['exercise_us']:.1f} µs por exercício")
+        print(f"   sanitize_document (tudo junto): {stats['document_ms']:.1f} ms")
+    elif args.file:
+        print(sanitize_exercise(Path(args.file).read_text(encoding='utf-8')))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""Persistent exercise name -> path lookup table.
+
+Maps exercise ids, file/folder names and repository-relative paths to the
+exercise location, so tools that receive exercise names from the user resolve
+each one with dictionary hits instead of walking the tree with ``rglob``::
+
+    lookup = get_path_lookup()
+    lookup.resolve('MAT_P4FUNCOE_4FIN_GRA_002')      # exact id
+    lookup.resolve('mat_p4funcoe_4fin_gra_002.tex')  # case/accent-insensitive
+    lookup.resolve('MAT_P4FUNCOE_4FIN_GRA')          # unique prefix
+    lookup.candidates('MAT_P4FUNCOE_4FIN')           # every prefix match
+
+The table is stored next to ``index.json`` as ``path_lookup.json``. It is
+rebuilt by ``rebuild_index.py`` (from the fresh index, no extra walk), extended
+by the IP registry when it registers new exercises, and rebuilt at most once
+per process by :func:`resolve_exercise` when a name is missing or points to a
+path that no longer exists::
+
+    python path_lookup.py build
+    python path_lookup.py resolve MAT_P4FUNCOE_4FIN_GRA_002 matematica/P4_funcoes/...
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .fulltext_index import fold_accents, iter_exercise_sources
+    from .index_journal import read_index
+except ImportError:
+    from fulltext_index import fold_accents, iter_exercise_sources
+    from index_journal import read_index
+
+BASE_DIR = Path(__file__).parent.parent
+LOOKUP_FILENAME = 'path_lookup.json'
+
+
+def fold(name: str) -> str:
+    """Case- and accent-insensitive form of a lookup key."""
+    return fold_accents(name).casefold()
+
+
+def relative_path(path: str) -> str:
+    """`path` with ``/`` separators and anything up to ``ExerciseDatabase/`` dropped.
+
+    Legacy index entries only carry ``source_file`` as a repository-relative
+    path (``ExerciseDatabase/matematica/...``); this is the same location
+    relative to the database folder.
+    """
+    s = str(path).strip().replace('\\', '/').rstrip('/')
+    marker = 'ExerciseDatabase/'
+    if marker in s:
+        s = s.split(marker, 1)[1]
+    return s
+
+
+def normalize_name(name: str) -> str:
+    """Lookup form of a user-supplied id, file name or path.
+
+    Separators become ``/``, anything up to ``ExerciseDatabase/`` is dropped
+    and a trailing ``/main.tex`` or ``.tex`` is removed, so ``X.tex``,
+    ``.../X/main.tex`` and ``X`` all look up the same exercise.
+    """
+    s = relative_path(name)
+    if s.endswith('/main.tex'):
+        s = s[:-len('/main.tex')]
+    elif s.endswith('.tex'):
+        s = s[:-len('.tex')]
+    return s[2:] if s.startswith('./') else s
+
+
+def _names_for(rel: str, exercise_id: Optional[str] = None) -> List[str]:
+    """Keys under which the exercise at `rel` can be found."""
+    key = normalize_name(rel)
+    names = [key, key.rsplit('/', 1)[-1]]
+    if exercise_id:
+        names.insert(0, str(exercise_id))
+    return names
+
+
+class PathLookup:
+    def __init__(self, entries: Optional[Dict[str, str]] = None, base_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir or BASE_DIR)
+        self.entries: Dict[str, str] = {}
+        self._folded: Dict[str, str] = {}
+        self._sorted: Optional[List[str]] = None
+        # True when built from the tree in this process (a miss is then a real miss)
+        self.fresh = False
+        for key, rel in (entries or {}).items():
+            self._add_key(key, relative_path(rel))
+
+    def __len__(self) -> int:
+        return len(set(self.entries.values()))
+
+    def _wins(self, old: Optional[str], rel: str) -> bool:
+        # first location wins for duplicate names (index order, then tree order),
+        # unless it no longer exists and the new one does
+        if old is None:
+            return True
+        return old != rel and not (self.base_dir / old).exists() and (self.base_dir / rel).exists()
+
+    def _add_key(self, key: str, rel: str):
+        if key and self._wins(self.entries.get(key), rel):
+            self.entries[key] = rel
+            folded = fold(key)
+            if self._wins(self._folded.get(folded), rel):
+                self._folded[folded] = rel
+                self._sorted = None
+
+    def add(self, rel: str, exercise_id: Optional[str] = None):
+        """Register the exercise at `rel` (relative to ``base_dir``, file or folder)."""
+        rel = relative_path(rel)
+        for key in _names_for(rel, exercise_id):
+            self._add_key(key, rel)
+
+    # -- building -----------------------------------------------------------
+
+    @classmethod
+    def from_index(cls, index: Dict, base_dir: Optional[Path] = None) -> 'PathLookup':
+        lookup = cls(base_dir=base_dir)
+        for ex in index.get('exercises', []):
+            rel = ex.get('path') or ex.get('source_file')
+            if rel:
+                lookup.add(rel, ex.get('id'))
+        return lookup
+
+    @classmethod
+    def build(cls, base_dir: Optional[Path] = None, index: Optional[Dict] = None) -> 'PathLookup':
+        """Index entries first, then every exercise found on disk (one tree walk)."""
+        base_dir = Path(base_dir or BASE_DIR)
+        if index is None:
+            index_file = base_dir / 'index.json'
+            index = read_index(index_file) if index_file.exists() else {}
+        lookup = cls.from_index(index, base_dir)
+        for rel, exercise_id, _sources in iter_exercise_sources(base_dir):
+            lookup.add(rel, exercise_id)
+        lookup.fresh = True
+        return lookup
+
+    # -- persistence --------------------------------------------------------
+
+    @property
+    def path(self) -> Path:
+        return self.base_dir / LOOKUP_FILENAME
+
+    @classmethod
+    def load(cls, base_dir: Optional[Path] = None) -> Optional['PathLookup']:
+        base_dir = Path(base_dir or BASE_DIR)
+        try:
+            data = json.loads((base_dir / LOOKUP_FILENAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return cls(data.get('entries') or {}, base_dir)
+
+    def save(self) -> Path:
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'updated': datetime.now().isoformat(), 'entries': self.entries},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        return self.path
+
+    # -- lookups ------------------------------------------------------------
+
+    def _path(self, rel: Optional[str]) -> Optional[Path]:
+        return self.base_dir / rel if rel else None
+
+    def exact(self, name: str) -> Optional[Path]:
+        key = normalize_name(name)
+        return self._path(self.entries.get(key) or self.entries.get(key.rsplit('/', 1)[-1]))
+
+    def insensitive(self, name: str) -> Optional[Path]:
+        key = fold(normalize_name(name))
+        return self._path(self._folded.get(key) or self._folded.get(key.rsplit('/', 1)[-1]))
+
+    def candidates(self, prefix: str, limit: Optional[int] = 20) -> List[Path]:
+        """Distinct exercises with a key starting with `prefix` (case/accent-insensitive)."""
+        if self._sorted is None:
+            self._sorted = sorted(self._folded)
+        prefix = fold(normalize_name(prefix))
+        found: Dict[str, None] = {}
+        for i in range(bisect_left(self._sorted, prefix), len(self._sorted)):
+            key = self._sorted[i]
+            if not key.startswith(prefix) or (limit is not None and len(found) >= limit):
+                break
+            found.setdefault(self._folded[key])
+        return [self.base_dir / rel for rel in found]
+
+    def resolve(self, name: str, prefix: bool = True) -> Optional[Path]:
+        """Exact match, then case/accent-insensitive, then a prefix matching one exercise."""
+        path = self.exact(name) or self.insensitive(name)
+        if path is None and prefix:
+            matches = self.candidates(name, limit=2)
+            if len(matches) == 1:
+                path = matches[0]
+        return path
+
+
+_shared: Dict[Path, PathLookup] = {}
+
+
+def get_path_lookup(base_dir: Optional[Path] = None) -> PathLookup:
+    """Process-wide lookup for `base_dir`: the saved table, or a new one built and saved."""
+    base_dir = Path(base_dir or BASE_DIR).resolve()
+    lookup = _shared.get(base_dir)
+    if lookup is None:
+        lookup = PathLookup.load(base_dir)
+        if lookup is None:
+            lookup = refresh_path_lookup(base_dir)
+        _shared[base_dir] = lookup
+    return lookup
+
+
+def refresh_path_lookup(base_dir: Optional[Path] = None, index: Optional[Dict] = None,
+                        walk: bool = True) -> PathLookup:
+    """Rebuild the table from the index and the tree, save it and share it.
+
+    ``walk=False`` trusts `index` to cover the tree (right after a rebuild).
+    """
+    base_dir = Path(base_dir or BASE_DIR).resolve()
+    if walk:
+        lookup = PathLookup.build(base_dir, index)
+    else:
+        lookup = PathLookup.from_index(index or {}, base_dir)
+        lookup.fresh = True
+    try:
+        lookup.save()
+    except OSError:
+        pass
+    _shared[base_dir] = lookup
+    return lookup
+
+
+def resolve_exercise(name: str, base_dir: Optional[Path] = None, prefix: bool = True) -> Optional[Path]:
+    """Resolve one exercise name to an existing path.
+
+    A miss (or a stale entry) triggers one rebuild of the saved table per
+    process; later misses are answered from memory. ``prefix=False`` only
+    accepts exact or case/accent-insensitive matches.
+    """
+    lookup = get_path_lookup(base_dir)
+    path = lookup.resolve(name, prefix)
+    if (path is None or not path.exists()) and not lookup.fresh:
+        lookup = refresh_path_lookup(base_dir)
+        path = lookup.resolve(name, prefix)
+    return path if path is not None and path.exists() else None
+
+
+def record_paths(rels: Iterable[str], base_dir: Optional[Path] = None):
+    """Add newly registered exercises to an existing saved table (no-op without one)."""
+    base_dir = Path(base_dir or BASE_DIR).resolve()
+    lookup = _shared.get(base_dir) or PathLookup.load(base_dir)
+    if lookup is None:
+        return
+    before = len(lookup.entries)
+    for rel in rels:
+        if (base_dir / rel).exists():
+            lookup.add(rel)
+    if len(lookup.entries) != before:
+        lookup.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tabela nome/id -> caminho dos exercícios (path_lookup.json)')
+    parser.add_argument('command', choices=['build', 'resolve', 'prefix'])
+    parser.add_argument('names', nargs='*')
+    parser.add_argument('--base', default=str(BASE_DIR), help='Pasta ExerciseDatabase')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        lookup = refresh_path_lookup(Path(args.base))
+        print(f"✅ {len(lookup)} exercícios, {len(lookup.entries)} nomes -> {lookup.path}")
+    elif args.command == 'resolve':
+        for name in args.names:
+            print(f"{name}\t{resolve_exercise(name, Path(args.base)) or '(não encontrado)'}")
+    else:
+        lookup = get_path_lookup(Path(args.base))
+        for name in args.names:
+            for path in lookup.candidates(name, limit=None):
+                print(f"{name}\t{path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Rebuild ``index.json`` from the exercise tree.
+
+Walks ``discipline/module/concept[/tipo]`` and derives an index entry for
+every exercise from the directory layout, the concept/tipo ``metadata.json``,
+the exercise ``.json`` and the ``.tex`` header (``% meta:`` block parsed by
+:func:`generate_variant.parse_meta_block`, plus the ``% Difficulty:`` style
+header lines). Concept directories are scanned in a process pool and the
+results are merged deterministically: exercises already in the index keep
+their position and any fields that cannot be derived from disk (points,
+custom tags, ...), new exercises are appended in path order::
+
+    python rebuild_index.py --dry-run          # only report the differences
+    python rebuild_index.py --jobs 8 --report rebuild_report.json
+
+Entries whose file no longer exists are dropped; duplicate entries for the
+same path are collapsed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from exercise_catalog import open_catalog
+from fulltext_index import EXCLUDED_DIRS, is_exercise_tex, iter_exercise_sources
+from generate_variant import parse_meta_block
+from index_journal import IndexJournal, journal_path, read_index
+from index_statistics import rebuild as rebuild_statistics
+from path_lookup import refresh_path_lookup, relative_path
+
+BASE_DIR = Path(__file__).parent.parent
+INDEX_FILE = BASE_DIR / 'index.json'
+
+_HEADER_FIELD_RE = re.compile(r'^\s*([A-Za-z][A-Za-z ]*?)\s*:\s*(.+?)\s*$')
+
+
+def _load_json(path: Path) -> Dict:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _split_tags(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(t).strip() for t in value if str(t).strip()]
+    return [t.strip() for t in str(value).split(',') if t.strip()]
+
+
+def _parse_difficulty(value) -> Optional[int]:
+    match = re.match(r'\s*(\d+)', str(value))
+    return int(match.group(1)) if match else None
+
+
+def parse_tex_header(content: str) -> Dict:
+    """Index fields found in the leading comment block of an exercise ``.tex``."""
+    fields: Dict = {}
+    header: Dict[str, str] = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('%'):
+            break
+        # "% Difficulty: 2/5 (Fácil) | Format: desenvolvimento"
+        for part in line.lstrip('%').split('|'):
+            match = _HEADER_FIELD_RE.match(part)
+            if match:
+                header.setdefault(match.group(1).lower(), match.group(2))
+    meta = parse_meta_block(content) or {}
+
+    if 'exercise id' in header:
+        fields['id'] = header['exercise id']
+    difficulty = meta.get('difficulty', header.get('difficulty'))
+    if difficulty is not None and _parse_difficulty(difficulty) is not None:
+        fields['difficulty'] = _parse_difficulty(difficulty)
+    tags = meta.get('tags', header.get('tags'))
+    if tags:
+        fields['tags'] = _split_tags(tags)
+    if header.get('format'):
+        fields['type'] = header['format']
+    if header.get('status'):
+        fields['status'] = header['status']
+    return fields
+
+
+def _entry_from_json(data: Dict) -> Dict:
+    """Index fields from an exercise ``<ID>.json`` written by the add_exercise scripts."""
+    fields: Dict = {}
+    classification = data.get('classification') or {}
+    if classification.get('difficulty') is not None:
+        fields['difficulty'] = classification['difficulty']
+    if classification.get('tags'):
+        fields['tags'] = list(classification['tags'])
+    if data.get('exercise_type'):
+        fields['type'] = data['exercise_type']
+    points = (data.get('evaluation') or {}).get('points')
+    if points is not None:
+        fields['points'] = points
+    if data.get('status'):
+        fields['status'] = data['status']
+    return fields
+
+
+def _build_entry(concept_dir: Path, concept_rel: str, rel: str, exercise_id: str, main_tex: Path,
+                 concept_meta: Dict, tipo_meta: Dict[str, Dict]) -> Dict:
+    """Index entry for the exercise at `rel` (relative to its concept directory)."""
+    discipline, module, concept = concept_rel.split('/')[:3]
+    parts = rel.split('/')
+    entry: Dict = {
+        'id': exercise_id,
+        'path': f'{concept_rel}/{rel}',
+        'discipline': discipline,
+        'module': module,
+        'concept': concept,
+    }
+    if concept_meta.get('module_name'):
+        entry['module_name'] = concept_meta['module_name']
+    if concept_meta.get('name'):
+        entry['concept_name'] = concept_meta['name']
+    if len(parts) > 1:
+        tipo = parts[0]
+        if tipo not in tipo_meta:
+            tipo_meta[tipo] = _load_json(concept_dir / tipo / 'metadata.json')
+        entry['tipo'] = tipo
+        if tipo_meta[tipo].get('tipo_nome'):
+            entry['tipo_nome'] = tipo_meta[tipo]['tipo_nome']
+        # per-exercise summary kept by the tipo metadata.json
+        listed = tipo_meta[tipo].get('exercicios')
+        listed = listed.get(exercise_id) or {} if isinstance(listed, dict) else {}
+        entry.update({k: listed[k] for k in ('difficulty', 'status') if listed.get(k) is not None})
+
+    if main_tex.name != 'main.tex':
+        entry.update(_entry_from_json(_load_json(main_tex.with_suffix('.json'))))
+    try:
+        entry.update(parse_tex_header(main_tex.read_text(encoding='utf-8', errors='replace')))
+    except OSError:
+        pass
+    return entry
+
+
+def scan_concept(args: Tuple[str, str]) -> List[Dict]:
+    """Derive index entries for every exercise under one concept directory.
+
+    Runs in a worker process; takes and returns plain data so it pickles cheaply.
+    """
+    base_dir, concept_rel = Path(args[0]), args[1]
+    concept_dir = base_dir / concept_rel
+    concept_meta = _load_json(concept_dir / 'metadata.json')
+    tipo_meta: Dict[str, Dict] = {}
+    return [_build_entry(concept_dir, concept_rel, rel, exercise_id, sources[0], concept_meta, tipo_meta)
+            for rel, exercise_id, sources in iter_exercise_sources(concept_dir)]
+
+
+def derive_entry(base_dir: Path, exercise_rel: str) -> Optional[Dict]:
+    """Index entry for one exercise (``<ID>.tex`` or a ``main.tex`` folder), or None if it is gone.
+
+    `exercise_rel` is relative to `base_dir` and starts with ``discipline/module/concept``.
+    """
+    base_dir = Path(base_dir)
+    parts = exercise_rel.replace('\\', '/').strip('/').split('/')
+    if len(parts) < 4:
+        return None
+    concept_rel, rel = '/'.join(parts[:3]), '/'.join(parts[3:])
+    concept_dir = base_dir / concept_rel
+    target = concept_dir / rel
+    if target.is_dir():
+        main_tex, exercise_id = target / 'main.tex', target.name
+    elif is_exercise_tex(target.name):
+        main_tex, exercise_id = target, target.stem
+    else:
+        return None
+    if not main_tex.is_file():
+        return None
+    return _build_entry(concept_dir, concept_rel, rel, exercise_id, main_tex,
+                        _load_json(concept_dir / 'metadata.json'), {})
+
+
+def concept_dirs(base_dir: Path) -> List[str]:
+    """Relative ``discipline/module/concept`` paths, in a stable order."""
+    def subdirs(path: Path) -> List[Path]:
+        return sorted(d for d in path.iterdir() if d.is_dir() and not d.name.startswith(('_', '.')))
+
+    units = []
+    for disc in subdirs(base_dir):
+        if disc.name in EXCLUDED_DIRS:
+            continue
+        for mod in subdirs(disc):
+            for conc in subdirs(mod):
+                units.append(conc.relative_to(base_dir).as_posix())
+    return units
+
+
+def scan_tree(base_dir: Path, jobs: Optional[int] = None) -> List[Dict]:
+    """Scan every concept directory, in parallel when `jobs` > 1, in deterministic order."""
+    units = [(str(base_dir), rel) for rel in concept_dirs(base_dir)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(units) <= 1:
+        chunks = [scan_concept(u) for u in units]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # map() yields in submission order, so the merge does not depend on scheduling
+            chunks = list(pool.map(scan_concept, units, chunksize=max(1, len(units) // (jobs * 4))))
+    return [entry for chunk in chunks for entry in chunk]
+
+
+def _norm(path: str) -> str:
+    # legacy entries only have source_file, relative to the repository (ExerciseDatabase/...)
+    return relative_path(path or '').strip('/')
+
+
+def merge(index: Dict, scanned: List[Dict], base_dir: Path) -> Tuple[List[Dict], Dict]:
+    """Merge scanned entries into the current index; returns (exercises, report)."""
+    by_path = {_norm(e['path']): e for e in scanned}
+    report: Dict = {'added': [], 'removed': [], 'changed': {}, 'duplicates': [], 'unchanged': 0}
+    merged: List[Dict] = []
+    seen = set()
+
+    for old in index.get('exercises', []):
+        key = _norm(old.get('path') or old.get('source_file'))
+        if key in seen:
+            report['duplicates'].append(old.get('id'))
+            continue
+        derived = by_path.get(key)
+        if derived is None:
+            if key and (base_dir / key).exists():
+                # outside the scanned layout but still on disk: keep as is
+                seen.add(key)
+                merged.append(old)
+                report['unchanged'] += 1
+            else:
+                report['removed'].append(old.get('id'))
+            continue
+        seen.add(key)
+        new = {**old, **derived}
+        changed = sorted(k for k in new if k != 'path' and old.get(k) != new[k])
+        if changed:
+            report['changed'][new['id']] = changed
+        else:
+            report['unchanged'] += 1
+        merged.append(new)
+
+    for key in sorted(by_path):
+        if key not in seen:
+            merged.append(by_path[key])
+            report['added'].append(by_path[key]['id'])
+    return merged, report
+
+
+def rebuild_index(index_file: Path = INDEX_FILE, jobs: Optional[int] = None,
+                  dry_run: bool = False) -> Dict:
+    """Rebuild `index_file` from the tree next to it; returns the change report."""
+    index_file = Path(index_file)
+    base_dir = index_file.parent
+    if not dry_run and journal_path(index_file).exists():
+        # fold pending journal records so the rebuilt snapshot supersedes them
+        IndexJournal(index_file).compact()
+    index = read_index(index_file) if index_file.exists() else {'database_version': '3.0', 'exercises': []}
+
+    exercises, report = merge(index, scan_tree(base_dir, jobs), base_dir)
+    if dry_run:
+        return report
+
+    index['exercises'] = exercises
+    rebuild_statistics(index)
+    index['last_updated'] = datetime.now().isoformat()
+    tmp = index_file.with_suffix(index_file.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, index_file)
+
+    catalog = open_catalog(base_dir)
+    if catalog is not None:
+        with catalog:
+            catalog.replace_all(index)
+    # the scan already covered the tree: the name -> path table comes from the new index
+    refresh_path_lookup(base_dir, index, walk=False)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruir index.json a partir das pastas de exercícios')
+    parser.add_argument('--index', default=str(INDEX_FILE), help='Caminho do index.json')
+    parser.add_argument('--jobs', type=int, default=None, help='Processos em paralelo (padrão: nº de CPUs)')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas mostrar as diferenças')
+    parser.add_argument('--report', help='Guardar o relatório de alterações em JSON')
+    args = parser.parse_args()
+
+    report = rebuild_index(Path(args.index), jobs=args.jobs, dry_run=args.dry_run)
+    print(f"{'🔍 Simulação' if args.dry_run else '✅ Índice reconstruído'}: "
+          f"{len(report['added'])} novos, {len(report['changed'])} alterados, "
+          f"{len(report['removed'])} removidos, {len(report['duplicates'])} duplicados, "
+          f"{report['unchanged']} sem alterações")
+    for label, key in (('+', 'added'), ('-', 'removed'), ('=', 'duplicates')):
+        for ex_id in report[key]:
+            print(f"   {label} {ex_id}")
+    for ex_id, fields in report['changed'].items():
+        print(f"   ~ {ex_id}: {', '.join(fields)}")
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"Relatório: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,12 @@ import io
 from pathlib import Path
 from typing import List, Dict, Optional
 
+sys.path.insert(0, str(Path(__file__).parent))
+from exercise_catalog import open_catalog
+from index_journal import read_index
+from exercise_index import get_shared_index
+from fulltext_index import search_text as fulltext_search
+
 # Note: avoid rewrapping std streams at import-time (interferes with pytest). If
 # needed, apply platform-specific fixes when running as script.
 
@@ -28,14 +34,18 @@ BASE_DIR = Path(__file__).parent.parent
 CONFIG_FILE = BASE_DIR / "modules_config.yaml"
 
 def load_index() -> Optional[Dict]:
-    """Carrega índice de exercícios"""
+    """Carrega índice de exercícios (catálogo SQLite se inicializado, senão index.json + journal)"""
+    catalog = open_catalog(BASE_DIR)
+    if catalog is not None:
+        with catalog:
+            return catalog.to_index()
+
     index_file = BASE_DIR / "index.json"
     if not index_file.exists():
         print(f"{Colors.YELLOW}⚠ Índice não encontrado. Execute add_exercise.py primeiro{Colors.END}")
         return None
     
-    with open(index_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_index(index_file)
 
 def load_config() -> Dict:
     """Carrega configuração de módulos"""
@@ -52,33 +62,42 @@ def search_exercises(
     max_points: Optional[float] = None
 ) -> List[Dict]:
     """Pesquisa exercícios com filtros"""
-    index = load_index()
-    if not index:
+    catalog = open_catalog(BASE_DIR)
+    if catalog is not None:
+        # Filtros indexados no SQLite; o tipo de exercício continua a ser filtrado em Python
+        with catalog:
+            results = catalog.query(module=module, concept=concept, difficulty=difficulty or None,
+                                    tags=tags, min_points=min_points or None, max_points=max_points or None)
+        if exercise_type:
+            results = [ex for ex in results if ex.get("type") == exercise_type]
+        return results
+
+    index_file = BASE_DIR / "index.json"
+    if not index_file.exists():
+        print(f"{Colors.YELLOW}⚠ Índice não encontrado. Execute add_exercise.py primeiro{Colors.END}")
         return []
-    
+
+    # Índices em memória (reutilizados entre pesquisas enquanto o index.json não mudar)
+    return get_shared_index(index_file).query(
+        module=module or None, concept=concept or None, difficulty=difficulty or None,
+        type=exercise_type or None, tags=tags or None,
+        min_points=min_points or None, max_points=max_points or None,
+    )
+
+def search_text(query: str, limit: int = 20, require_all: bool = False) -> List[Dict]:
+    """Pesquisa no texto dos exercícios (.tex), ordenada por relevância (BM25).
+
+    Devolve as entradas do índice com os campos extra `score` e `matched_terms`.
+    """
+    hits = fulltext_search(query, limit=limit, require_all=require_all, base_dir=BASE_DIR)
+    index = get_shared_index(BASE_DIR / "index.json")
     results = []
-    
-    for exercise in index["exercises"]:
-        # Aplicar filtros (suporta estruturas antigas e novas)
-        if module and exercise.get("module") != module:
-            continue
-        if concept and exercise.get("concept") != concept:
-            continue
-        if difficulty and exercise.get("difficulty") != difficulty:
-            continue
-        if exercise_type and exercise.get("type") != exercise_type:
-            continue
-        if min_points and exercise.get("points", 0) < min_points:
-            continue
-        if max_points and exercise.get("points", 0) > max_points:
-            continue
-        if tags:
-            exercise_tags = exercise.get("tags", [])
-            if not any(tag in exercise_tags for tag in tags):
-                continue
-        
-        results.append(exercise)
-    
+    for hit in hits:
+        entry = index.get(hit["id"]) if index is not None else None
+        result = dict(entry) if entry else {"id": hit["id"], "path": hit["path"]}
+        result["score"] = hit["score"]
+        result["matched_terms"] = hit["matched_terms"]
+        results.append(result)
     return results
 
 def display_results(results: List[Dict], config: Dict):
@@ -107,7 +126,7 @@ def display_results(results: List[Dict], config: Dict):
         print()
 
 def display_statistics(index: Dict, config: Dict):
-    """Exibe estatísticas da base de dados"""
+    """Exibe estatísticas da base de dados (contadores materializados, sem recontagem)"""
     print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}")
     print(f"{Colors.BOLD}{Colors.CYAN}ESTATÍSTICAS DA BASE DE DADOS{Colors.END}")
     print(f"{Colors.BOLD}{Colors.CYAN}{'='*80}{Colors.END}\n")
@@ -118,7 +137,7 @@ def display_statistics(index: Dict, config: Dict):
     # Por módulo
     print(f"\n{Colors.BOLD}{Colors.YELLOW}📚 Por Módulo:{Colors.END}")
     for module_id, count in index["statistics"]["by_module"].items():
-        module_name = config['matematica'][module_id]['name']
+        module_name = config['matematica'].get(module_id, {}).get('name', module_id)
         print(f"   • {module_name}: {count} exercícios")
     
     # Por conceito
@@ -176,8 +195,15 @@ def interactive_search():
     print(f"  3. Listar Todos os Exercícios")
     print(f"  4. Pesquisa Rápida por Módulo")
     print(f"  5. Pesquisa Rápida por Conceito")
+    print(f"  6. Pesquisa por Texto (conteúdo dos exercícios)")
+    
+    mode = input(f"\n{Colors.CYAN}Escolha (1-6): {Colors.END}").strip()
     
-    mode = input(f"\n{Colors.CYAN}Escolha (1-5): {Colors.END}").strip()
+    if mode == "6":
+        query = input(f"\n{Colors.CYAN}Texto a pesquisar: {Colors.END}").strip()
+        if query:
+            display_results(search_text(query), config)
+        return
     
     if mode == "2":
         display_statistics(index, config)
@@ -317,6 +343,11 @@ def main():
         except Exception:
             pass
 
+    # Pesquisa de texto não interativa: python search_exercises.py --text "função inversa"
+    if len(sys.argv) > 2 and sys.argv[1] == "--text":
+        display_results(search_text(" ".join(sys.argv[2:])), load_config())
+        return
+
     try:
         interactive_search()
     except KeyboardInterrupt:
@@ -0,0 +1,186 @@
+"""Compile-once cache for TikZ pictures.
+
+Every ``tikzpicture`` of an exercise is compiled on its own (``standalone``
+class, the template's packages and the document's ``\\usetikzlibrary`` calls)
+and stored as ``figures/<key>.pdf`` in the compile cache. The key hashes the
+normalized picture source (comments and whitespace removed) and the figure
+preamble, so a figure is rendered again only when it or the packages change.
+At assembly time the picture is replaced by ``\\includegraphics`` of a
+relative ``tikz_figures/<key>.pdf``; :meth:`TikzCache.copy_figures` then links
+(or copies) those PDFs next to the generated ``.tex``, so the document does not
+depend on where the cache lives::
+
+    content = get_tikz_cache().externalize(content, package_preamble(template))
+    get_tikz_cache().copy_figures(content, tex_file.parent)
+
+Pictures that depend on the surrounding document (``remember picture``,
+``overlay``, ``baseline``, labels/references, ``\\textwidth``...) are left
+inline, as is any picture that fails to compile alone (remembered with a
+``.failed`` marker until its source changes). ``TIKZ_CACHE=0`` disables it.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    from .compile_cache import DEFAULT_CACHE_DIR, env_enabled
+    from .latex_runner import run_latex
+except ImportError:
+    from compile_cache import DEFAULT_CACHE_DIR, env_enabled
+    from latex_runner import run_latex
+
+BEGIN = '\\begin{tikzpicture}'
+FIGURES_DIRNAME = 'tikz_figures'
+END = '\\end{tikzpicture}'
+_COMMENT_RE = re.compile(r'(?<!\\)%.*')
+_CONTEXT_RE = re.compile(r'remember picture|overlay|baseline|\\label|\\ref\b|\\pageref|'
+                         r'\\textwidth|\\linewidth|\\columnwidth|\\thepage')
+_LIBRARY_RE = re.compile(r'\\(usetikzlibrary|usepgfplotslibrary)\{([^}]*)\}')
+_PAGE_PACKAGES_RE = re.compile(r'\\usepackage(\[[^\]]*\])?\{(geometry|fancyhdr|hyperref|bookmark)\}')
+_FONT_SIZE_RE = re.compile(r'\\documentclass\[[^\]]*?(\d+pt)')
+_FIGURE_REF_RE = re.compile(r'\\includegraphics\{' + FIGURES_DIRNAME + r'/([0-9a-f]{64})\.pdf\}')
+
+
+def tikz_enabled() -> bool:
+    return env_enabled('TIKZ_CACHE')
+
+
+def normalize(picture: str) -> str:
+    """Picture source without comments and with collapsed whitespace."""
+    return ' '.join(_COMMENT_RE.sub('', picture).split())
+
+
+def find_pictures(content: str) -> List[tuple]:
+    """``(start, end)`` spans of the outermost ``tikzpicture`` environments."""
+    spans = []
+    pos = 0
+    while True:
+        start = content.find(BEGIN, pos)
+        if start < 0:
+            return spans
+        depth, cursor = 0, start
+        while True:
+            next_begin = content.find(BEGIN, cursor)
+            next_end = content.find(END, cursor)
+            if next_end < 0:
+                return spans  # unbalanced: leave the rest untouched
+            if 0 <= next_begin < next_end:
+                depth += 1
+                cursor = next_begin + len(BEGIN)
+            else:
+                depth -= 1
+                cursor = next_end + len(END)
+                if depth == 0:
+                    break
+        spans.append((start, cursor))
+        pos = cursor
+
+
+def figure_preamble(package_block: str, content: str = '') -> str:
+    """``standalone`` preamble with the template's packages and the libraries used in `content`."""
+    size = _FONT_SIZE_RE.search(package_block)
+    lines = [f"\\documentclass[tikz{',' + size.group(1) if size else ''}]{{standalone}}"]
+    for line in package_block.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('%') or stripped.startswith('\\documentclass'):
+            continue
+        if _PAGE_PACKAGES_RE.search(stripped):
+            continue  # page layout packages do not apply to a cropped figure
+        lines.append(stripped)
+    for command, libraries in sorted(set(_LIBRARY_RE.findall(content))):
+        lines.append(f'\\{command}{{{libraries}}}')
+    return '\n'.join(lines) + '\n'
+
+
+class TikzCache:
+    def __init__(self, root: Optional[Path] = None, engine: str = 'pdflatex'):
+        base = root or os.environ.get('COMPILE_CACHE_PATH') or DEFAULT_CACHE_DIR
+        self.root = Path(base) / 'figures'
+        self.engine_path = shutil.which(engine)
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def key(self, picture: str, preamble: str) -> str:
+        return hashlib.sha256(f'{preamble}\n{normalize(picture)}'.encode('utf-8')).hexdigest()
+
+    def figure(self, picture: str, preamble: str) -> Optional[Path]:
+        """Cached PDF for `picture`, compiling it on a miss; None if it cannot stand alone."""
+        key = self.key(picture, preamble)
+        target = self.root / key[:2] / f'{key}.pdf'
+        if target.exists():
+            self.hits += 1
+            return target
+        failed = target.with_suffix('.failed')
+        if failed.exists() or not self.engine_path:
+            return None
+        self.misses += 1
+        target.parent.mkdir(parents=True, exist_ok=True)
+        work = Path(tempfile.mkdtemp(prefix='tikz-', dir=str(self.root)))
+        try:
+            (work / 'figure.tex').write_text(
+                f'{preamble}\\begin{{document}}\n{picture}\n\\end{{document}}\n', encoding='utf-8')
+            result, _ = run_latex([self.engine_path, '-interaction=nonstopmode', '-halt-on-error', 'figure.tex'],
+                                  work, timeout=60)
+            pdf = work / 'figure.pdf'
+            if result is not None and result.returncode == 0 and pdf.exists():
+                os.replace(pdf, target)
+                return target
+            log = work / 'figure.log'
+            failed.write_text(log.read_text(encoding='utf-8', errors='replace')[-4000:] if log.exists() else '',
+                              encoding='utf-8')
+        except OSError:
+            pass
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        self.failures += 1
+        return None
+
+    def externalize(self, content: str, package_block: str) -> str:
+        """Replace standalone-safe pictures of `content` by their cached PDFs."""
+        if not tikz_enabled() or BEGIN not in content or not self.engine_path:
+            return content
+        preamble = figure_preamble(package_block, content)
+        out = []
+        last = 0
+        for start, end in find_pictures(content):
+            picture = content[start:end]
+            pdf = None if _CONTEXT_RE.search(_COMMENT_RE.sub('', picture)) else self.figure(picture, preamble)
+            out.append(content[last:start])
+            out.append(f'\\includegraphics{{{FIGURES_DIRNAME}/{pdf.name}}}' if pdf else picture)
+            last = end
+        out.append(content[last:])
+        return ''.join(out)
+
+    def copy_figures(self, content: str, dest_dir: Path) -> int:
+        """Link (or copy) the cached figures referenced in `content` into ``dest_dir/tikz_figures``."""
+        copied = 0
+        for key in dict.fromkeys(_FIGURE_REF_RE.findall(content)):
+            src = self.root / key[:2] / f'{key}.pdf'
+            dest = Path(dest_dir) / FIGURES_DIRNAME / f'{key}.pdf'
+            if dest.exists() or not src.exists():
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(src, dest)
+            except OSError:
+                shutil.copy2(src, dest)
+            copied += 1
+        return copied
+
+
+_shared_cache: Optional[TikzCache] = None
+
+
+def get_tikz_cache() -> TikzCache:
+    """Figure cache shared by sebentas and tests, so a picture used twice in a run compiles once."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = TikzCache()
+    return _shared_cache
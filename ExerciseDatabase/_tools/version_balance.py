@@ -0,0 +1,287 @@
+"""Balanced selection of several test versions at once.
+
+Selecting version A, B, C... independently (one seed each) can give versions
+whose total points and difficulty differ a lot. :func:`select_versions`
+selects every version up front, then evens them out. A ``balance`` block in
+the test config sets the tolerances and how much versions may share::
+
+    "balance": {
+        "points_tolerance": 5,        # max - min of the versions' total points
+        "difficulty_tolerance": 1,    # max - min of the sums of difficulty levels
+        "disjoint": false,            # no exercise in two versions
+        "max_overlap": 2,             # or: at most 2 exercises shared by any two versions
+        "default_points": 10,         # points of exercises without "points"
+        "time_budget_ms": 200
+    }
+
+Each version starts from the usual selection with seed ``seed_base + i``.
+With ``disjoint``, version i is drawn from what versions 0..i-1 left unused.
+A local search then improves the versions. It exchanges exercises between
+versions, which keeps the multiset of exercises in use, or replaces an
+exercise with an unused one. Every move must keep its versions valid:
+same ``tipo`` counts under ``per_tipo``, and the ``constraints`` block (see
+``exercise_selection``) still satisfied. Moves are scored in O(1) from
+running sums (sum and sum of squares of each total), so 30 versions over a
+few thousand candidates take well under a second.
+"""
+from __future__ import annotations
+
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .exercise_selection import normalize_constraints, violations
+except ImportError:
+    from exercise_selection import normalize_constraints, violations
+
+DEFAULT_TIME_BUDGET_MS = 200
+# unused candidates scored per replacement move (a random sample on very large pools)
+_REPLACEMENT_SAMPLE = 4000
+
+Selector = Callable[[List[Dict[str, Any]], random.Random], List[Dict[str, Any]]]
+
+
+class VersionSet:
+    def __init__(self, versions: List[List[Dict[str, Any]]], reasons: List[str],
+                 points: List[float], difficulty: List[float], overlap: int, moves: int = 0):
+        self.versions = versions
+        self.reasons = reasons
+        self.points = points
+        self.difficulty = difficulty
+        self.overlap = overlap
+        self.moves = moves
+
+    @property
+    def balanced(self) -> bool:
+        return not self.reasons
+
+    def summary(self) -> str:
+        if not self.points:
+            return 'nenhuma versão'
+        return (f"pontos {min(self.points):g}–{max(self.points):g}, "
+                f"dificuldade {min(self.difficulty):g}–{max(self.difficulty):g}, "
+                f"sobreposição máxima {self.overlap}, {self.moves} trocas")
+
+
+class VersionBalancer:
+    def __init__(self, pool: List[Dict[str, Any]], config: Dict[str, Any]):
+        options = config.get('balance') or {}
+        self.pool = pool
+        self.pos = {id(ex): i for i, ex in enumerate(pool)}
+        self.points_tol = float(options.get('points_tolerance', 0))
+        self.difficulty_tol = float(options.get('difficulty_tolerance', 0))
+        self.max_overlap = 0 if options.get('disjoint') else options.get('max_overlap')
+        self.budget = float(options.get('time_budget_ms', DEFAULT_TIME_BUDGET_MS)) / 1e3
+        self.constraints, _ = normalize_constraints(config)
+        default = float(options.get('default_points') or (self.constraints or {}).get('default_points') or 0)
+        self.points = [float(ex.get('points') or default) for ex in pool]
+        self.difficulty = [float(ex.get('difficulty') or 0) for ex in pool]
+        # under per_tipo a swap must keep each version's tipo counts
+        self.kind = ([ex.get('tipo') for ex in pool] if config.get('per_tipo') and not self.constraints
+                     else [None] * len(pool))
+
+    # -- construction ---------------------------------------------------------
+
+    def initial(self, count: int, seed_base: int, select: Selector) -> Tuple[List[List[int]], List[str]]:
+        versions: List[List[int]] = []
+        used: set = set()
+        for v in range(count):
+            available = [ex for ex in self.pool if id(ex) not in used] if self.max_overlap == 0 else list(self.pool)
+            chosen = select(available, random.Random(seed_base + v))
+            # a shorter version (the pool ran out) would be unfair too
+            if not chosen or (versions and len(chosen) < len(versions[0])):
+                left = len(available)
+                return versions, [f"versão {v + 1}: nenhuma seleção possível ({left} exercícios disponíveis"
+                                  f"{' sem repetir versões anteriores' if self.max_overlap == 0 else ''})"]
+            versions.append([self.pos[id(ex)] for ex in chosen])
+            used.update(id(ex) for ex in chosen)
+        return versions, []
+
+    # -- local search ---------------------------------------------------------
+
+    def _valid(self, version: List[int]) -> bool:
+        return not self.constraints or not violations([self.pool[p] for p in version], self.constraints)
+
+    def balance(self, versions: List[List[int]], rng: random.Random) -> Tuple[int, List[str]]:
+        n = len(versions)
+        if n < 2:
+            return 0, []
+        deadline = time.perf_counter() + self.budget
+        pts, dif = self.points, self.difficulty
+        members: Dict[int, set] = {}
+        for v, version in enumerate(versions):
+            for p in version:
+                members.setdefault(p, set()).add(v)
+        overlap = [[len(set(a) & set(b)) for b in versions] for a in versions]
+        P = [sum(pts[p] for p in version) for version in versions]
+        D = [sum(dif[p] for p in version) for version in versions]
+        sp, sd = max(self.points_tol, 1.0), max(self.difficulty_tol, 1.0)
+        limit = self.max_overlap
+
+        def cost(P_sum: float, P_sq: float, D_sum: float, D_sq: float) -> float:
+            # sum of squared deviations from the mean, for points and difficulty
+            return (P_sq - P_sum * P_sum / n) / (sp * sp) + (D_sq - D_sum * D_sum / n) / (sd * sd)
+
+        def overlap_ok(v: int, out: int, inn: int, skip: int = -1) -> bool:
+            """Version v swaps `out` for `inn`: would it share too much with another version?"""
+            if limit is None:
+                return True
+            for t in members.get(inn, ()):
+                if t not in (v, skip) and overlap[v][t] + 1 - (t in members.get(out, ())) > limit:
+                    return False
+            return True
+
+        def move(v: int, i: int, inn: int):
+            out = versions[v][i]
+            for t in members[out]:
+                if t != v:
+                    overlap[v][t] -= 1
+                    overlap[t][v] -= 1
+            members[out].discard(v)
+            for t in members.setdefault(inn, set()):
+                overlap[v][t] += 1
+                overlap[t][v] += 1
+            members[inn].add(v)
+            versions[v][i] = inn
+            P[v] += pts[inn] - pts[out]
+            D[v] += dif[inn] - dif[out]
+
+        def done() -> bool:
+            return max(P) - min(P) <= self.points_tol and max(D) - min(D) <= self.difficulty_tol
+
+        def try_exchange(u: int) -> bool:
+            sum_p, sum_d = sum(P), sum(D)
+            sq_p, sq_d = sum(p * p for p in P), sum(d * d for d in D)
+            base = cost(sum_p, sq_p, sum_d, sq_d)
+            options = []
+            for w in range(n):
+                if w == u:
+                    continue
+                in_u, in_w = set(versions[u]), set(versions[w])
+                for i, x in enumerate(versions[u]):
+                    if x in in_w:
+                        continue
+                    for j, y in enumerate(versions[w]):
+                        if y in in_u or self.kind[x] != self.kind[y]:
+                            continue
+                        dp, dd = pts[y] - pts[x], dif[y] - dif[x]
+                        if not dp and not dd:
+                            continue
+                        # totals are unchanged, only the squares move
+                        new_sq_p = sq_p - P[u] ** 2 - P[w] ** 2 + (P[u] + dp) ** 2 + (P[w] - dp) ** 2
+                        new_sq_d = sq_d - D[u] ** 2 - D[w] ** 2 + (D[u] + dd) ** 2 + (D[w] - dd) ** 2
+                        delta = cost(sum_p, new_sq_p, sum_d, new_sq_d) - base
+                        if delta < -1e-9:
+                            options.append((delta, w, i, j))
+            options.sort()
+            for _, w, i, j in options[:32]:
+                x, y = versions[u][i], versions[w][j]
+                trial_u, trial_w = list(versions[u]), list(versions[w])
+                trial_u[i], trial_w[j] = y, x
+                if (overlap_ok(u, x, y, skip=w) and overlap_ok(w, y, x, skip=u)
+                        and self._valid(trial_u) and self._valid(trial_w)):
+                    move(u, i, y)
+                    move(w, j, x)
+                    return True
+            return False
+
+        def try_replace(u: int) -> bool:
+            sum_p, sum_d = sum(P), sum(D)
+            sq_p, sq_d = sum(p * p for p in P), sum(d * d for d in D)
+            base = cost(sum_p, sq_p, sum_d, sq_d)
+            unused = [p for p in range(len(self.pool)) if not members.get(p)] if limit == 0 else range(len(self.pool))
+            if len(unused) > _REPLACEMENT_SAMPLE:
+                unused = rng.sample(unused, _REPLACEMENT_SAMPLE)
+            in_u = set(versions[u])
+            options = []
+            for i, x in enumerate(versions[u]):
+                for z in unused:
+                    if z in in_u or self.kind[z] != self.kind[x]:
+                        continue
+                    dp, dd = pts[z] - pts[x], dif[z] - dif[x]
+                    if not dp and not dd:
+                        continue
+                    delta = cost(sum_p + dp, sq_p - P[u] ** 2 + (P[u] + dp) ** 2,
+                                 sum_d + dd, sq_d - D[u] ** 2 + (D[u] + dd) ** 2) - base
+                    if delta < -1e-9:
+                        options.append((delta, i, z))
+            options.sort()
+            for _, i, z in options[:32]:
+                x = versions[u][i]
+                trial = list(versions[u])
+                trial[i] = z
+                if overlap_ok(u, x, z) and self._valid(trial):
+                    move(u, i, z)
+                    return True
+            return False
+
+        moves = 0
+        while not done() and time.perf_counter() < deadline:
+            mean_p, mean_d = sum(P) / n, sum(D) / n
+            order = sorted(range(n), key=lambda v: -(((P[v] - mean_p) / sp) ** 2 + ((D[v] - mean_d) / sd) ** 2))
+            for u in order:
+                if try_exchange(u) or try_replace(u):
+                    moves += 1
+                    break
+            else:
+                break  # no improving move left
+
+        reasons = []
+        if max(P) - min(P) > self.points_tol:
+            reasons.append(f"pontos: as versões vão de {min(P):g} a {max(P):g} (tolerância {self.points_tol:g})")
+        if max(D) - min(D) > self.difficulty_tol:
+            reasons.append(f"dificuldade: as versões vão de {min(D):g} a {max(D):g} (tolerância {self.difficulty_tol:g})")
+        if limit is not None:
+            worst = max(overlap[a][b] for a in range(n) for b in range(n) if a != b)
+            if worst > limit:
+                reasons.append(f"sobreposição: duas versões partilham {worst} exercícios (máximo {limit})")
+        return moves, reasons
+
+    def overlap_repair(self, versions: List[List[int]], rng: random.Random):
+        """Bring pairwise overlap under ``max_overlap`` by replacing shared exercises with unused ones."""
+        limit = self.max_overlap
+        if not limit or len(versions) < 2:
+            return  # disjoint versions are built disjoint; None = unbounded
+        usage = Counter(p for version in versions for p in version)
+        spare = [p for p in range(len(self.pool)) if not usage[p]]
+        rng.shuffle(spare)
+        for b in range(1, len(versions)):
+            for a in range(b):
+                shared = [i for i, p in enumerate(versions[b]) if p in set(versions[a])]
+                excess = len(shared) - limit
+                for i in shared:
+                    if excess <= 0:
+                        break
+                    for k, z in enumerate(spare):
+                        if self.kind[z] != self.kind[versions[b][i]]:
+                            continue
+                        trial = list(versions[b])
+                        trial[i] = z
+                        if self._valid(trial):
+                            versions[b] = trial
+                            spare.pop(k)
+                            excess -= 1
+                            break
+
+
+def select_versions(pool: List[Dict[str, Any]], config: Dict[str, Any], count: int, seed_base: int,
+                    select: Selector) -> VersionSet:
+    """Select `count` versions from `pool` together and balance them (see module docstring).
+
+    `select(pool, rng)` picks one version, e.g. the generator's per-version selection.
+    """
+    balancer = VersionBalancer(pool, config)
+    versions, reasons = balancer.initial(count, seed_base, select)
+    rng = random.Random(seed_base)
+    if not reasons:
+        balancer.overlap_repair(versions, rng)
+        moves, reasons = balancer.balance(versions, rng)
+    else:
+        moves = 0
+    points = [sum(balancer.points[p] for p in version) for version in versions]
+    difficulty = [sum(balancer.difficulty[p] for p in version) for version in versions]
+    overlap = max((len(set(a) & set(b)) for i, a in enumerate(versions) for b in versions[i + 1:]), default=0)
+    return VersionSet([[pool[p] for p in version] for version in versions], reasons,
+                      points, difficulty, overlap, moves)
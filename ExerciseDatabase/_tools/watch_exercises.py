@@ -0,0 +1,363 @@
+"""Watch the exercise tree and keep the index, the IP registry and the sebentas in sync.
+
+Teachers edit ``.tex`` files directly under
+``ExerciseDatabase/<disciplina>/<módulo>/<conceito>/<tipo>/``. This watcher
+collects file events (inotify and friends through the optional ``watchdog``
+package, or a polling loop comparing mtime/size when it is not installed),
+waits until the tree has been quiet for ``--debounce`` seconds and then applies
+targeted updates for the exercises that changed:
+
+- upserts (or removes) their entries in the index, through the SQLite catalog,
+  the change journal or ``index.json``, whichever is in use;
+- registers exercises that have no IP yet with :meth:`IPRegistry.register_many`
+  (one save per batch);
+- refreshes the full-text index (``fulltext.sqlite``), when one has been built;
+- marks the concept sebentas as dirty in ``SebentasDatabase/.dirty_concepts.json``
+  (``generate_sebentas.py --dirty`` rebuilds exactly those).
+
+::
+
+    python watch_exercises.py                 # watchdog if available, else polling
+    python watch_exercises.py --polling --interval 2 --debounce 1.5
+
+Entries are derived with :func:`rebuild_index.derive_entry`, the same code used
+by the full rebuild. Changes to ``metadata.json`` files are not followed; run
+``rebuild_index.py`` after renaming concepts or tipos. IPs of deleted exercises
+are kept in the registry so they are never reassigned.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from exercise_catalog import open_catalog
+from fulltext_index import EXCLUDED_DIRS, FullTextIndex, iter_exercise_sources
+from index_journal import open_journal
+from index_statistics import remove_entries, upsert_entry
+from ip_registry import IPRegistry, RegistryLock
+from rebuild_index import derive_entry
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    _HAS_WATCHDOG = True
+except ImportError:
+    _HAS_WATCHDOG = False
+
+BASE_DIR = Path(__file__).parent.parent
+DIRTY_FILE = BASE_DIR.parent / 'SebentasDatabase' / '.dirty_concepts.json'
+WATCHED_SUFFIXES = ('.tex', '.json')
+# written by IPRegistry next to the exercises it registers; following them would re-trigger the watcher
+REGISTRY_SIDE_FILES = ('exercise.json', '_meta.json')
+
+
+# -- dirty sebentas ---------------------------------------------------------
+
+def load_dirty_sebentas(path: Path = DIRTY_FILE) -> Dict[str, str]:
+    """``{"disciplina/módulo/conceito": timestamp}`` of sebentas that need a rebuild."""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_dirty(path: Path, fn) -> Dict[str, str]:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with RegistryLock(path):
+        dirty = load_dirty_sebentas(path)
+        fn(dirty)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(dirty, indent=2, ensure_ascii=False, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, path)
+    return dirty
+
+
+def mark_sebentas_dirty(concepts: Iterable[str], path: Path = DIRTY_FILE) -> Dict[str, str]:
+    ts = datetime.now().isoformat()
+    return _update_dirty(path, lambda dirty: dirty.update({c: ts for c in concepts}))
+
+
+def clear_dirty_sebentas(concepts: Iterable[str], path: Path = DIRTY_FILE) -> Dict[str, str]:
+    concepts = list(concepts)
+    return _update_dirty(path, lambda dirty: [dirty.pop(c, None) for c in concepts])
+
+
+# -- mapping file events to exercises ---------------------------------------
+
+def _skipped(parts: Tuple[str, ...]) -> bool:
+    return not parts or parts[0] in EXCLUDED_DIRS or any(p.startswith(('_', '.')) for p in parts)
+
+
+def exercise_units(base_dir: Path, path: Path) -> List[str]:
+    """Exercises (paths relative to `base_dir`, as stored in the index) affected by a change to `path`."""
+    base_dir = Path(base_dir)
+    try:
+        parts = Path(path).relative_to(base_dir).parts
+    except ValueError:
+        return []
+    if _skipped(parts) or len(parts) < 4:
+        return []
+    path = base_dir.joinpath(*parts)
+
+    if path.is_dir():
+        return [f"{'/'.join(parts)}/{rel}" for rel, _, _ in iter_exercise_sources(path)]
+    name = path.name
+    if not name.endswith(WATCHED_SUFFIXES):
+        # a removed folder: only an exercise folder (inside a tipo) can be told apart
+        return ['/'.join(parts)] if len(parts) == 5 and not path.suffix else []
+    if name.startswith('sebenta_') or name.endswith('_preview.tex') or name in REGISTRY_SIDE_FILES:
+        return []
+    if name.endswith('.tex') and '.' in name[:-len('.tex')]:
+        return []  # editor backups (X.agentfix.tex, X.bak_agent_<ts>.tex)
+    folder = '/'.join(parts[:-1])
+    if (name == 'main.tex' or name.startswith('subvariant_')
+            or (path.parent / 'main.tex').exists()) and len(parts) > 4:
+        return [folder]
+    if name.endswith('_solution.tex'):
+        name = name[:-len('_solution.tex')] + '.tex'
+    elif name.endswith('.json'):
+        if not (path.parent / (path.stem + '.tex')).exists():
+            return []  # metadata.json, exercise.json, _meta.json, ...
+        name = path.stem + '.tex'
+    return [f'{folder}/{name}']
+
+
+def _exercise_id(unit: str) -> str:
+    return Path(unit).stem
+
+
+def _concept_key(unit: str) -> str:
+    return '/'.join(unit.split('/')[:3])
+
+
+# -- applying changes -------------------------------------------------------
+
+def _apply_to_index(base_dir: Path, upserts: List[Dict], removals: List[str]) -> None:
+    catalog = open_catalog(base_dir)
+    if catalog is not None:
+        with catalog:
+            for exercise_id in removals:
+                catalog.remove_exercise(exercise_id)
+            for entry in upserts:
+                catalog.upsert_exercise(entry)
+        return
+
+    journal = open_journal(base_dir)
+    if journal is not None:
+        for exercise_id in removals:
+            journal.append('delete', exercise_id=exercise_id)
+        for entry in upserts:
+            journal.append('upsert', entry=entry)
+        return
+
+    index_file = base_dir / 'index.json'
+    with RegistryLock(index_file):
+        if index_file.exists():
+            index = json.loads(index_file.read_text(encoding='utf-8'))
+        else:
+            index = {'database_version': '3.0', 'exercises': [], 'statistics': {}}
+        for exercise_id in removals:
+            remove_entries(index, exercise_id)
+        for entry in upserts:
+            upsert_entry(index, entry)
+        tmp = index_file.with_suffix(index_file.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, index_file)
+
+
+def apply_changes(base_dir: Path, paths: Iterable[Path], registry: Optional[IPRegistry] = None,
+                  dirty_file: Path = DIRTY_FILE) -> Dict:
+    """Apply the targeted updates for a batch of changed files; returns a summary."""
+    base_dir = Path(base_dir)
+    units = sorted({u for p in paths for u in exercise_units(base_dir, Path(p))})
+    summary: Dict = {'upserted': [], 'removed': [], 'registered': {}, 'dirty': []}
+    if not units:
+        return summary
+
+    upserts, removals = [], []
+    for unit in units:
+        entry = derive_entry(base_dir, unit)
+        if entry is None:
+            removals.append(_exercise_id(unit))
+        else:
+            upserts.append(entry)
+    _apply_to_index(base_dir, upserts, removals)
+    fulltext = FullTextIndex(base_dir)
+    if fulltext.path.exists():
+        with fulltext:
+            fulltext.update()
+    summary['upserted'] = [e['id'] for e in upserts]
+    summary['removed'] = removals
+
+    # only exercises without an IP: registering saves the registry and rewrites exercise.json
+    registry = registry or IPRegistry()
+    known = {meta.get('path') for meta in registry.load().get('ips', {}).values()}
+    items = []
+    for entry in upserts:
+        parts = entry['path'].split('/')
+        if len(parts) == 5 and entry['path'] not in known:
+            parts[-1] = Path(parts[-1]).stem
+            items.append((parts, entry['path'], entry['id']))
+    if items:
+        ips = registry.register_many(items)
+        summary['registered'] = {ip: item[1] for ip, item in zip(ips, items)}
+
+    summary['dirty'] = sorted({_concept_key(u) for u in units})
+    mark_sebentas_dirty(summary['dirty'], dirty_file)
+    return summary
+
+
+# -- event sources ----------------------------------------------------------
+
+class Debouncer:
+    """Collects paths and releases them once no new event arrived for `delay` seconds.
+
+    A batch is also released after `max_wait` seconds so a busy tree still syncs.
+    """
+
+    def __init__(self, delay: float = 1.0, max_wait: Optional[float] = None):
+        self.delay = delay
+        self.max_wait = max_wait if max_wait is not None else delay * 10
+        self._pending: Set[Path] = set()
+        self._first = self._last = 0.0
+
+    def add(self, paths: Iterable[Path], now: Optional[float] = None):
+        paths = set(paths)
+        if not paths:
+            return
+        now = time.monotonic() if now is None else now
+        if not self._pending:
+            self._first = now
+        self._pending |= paths
+        self._last = now
+
+    def due(self, now: Optional[float] = None) -> List[Path]:
+        now = time.monotonic() if now is None else now
+        if self._pending and (now - self._last >= self.delay or now - self._first >= self.max_wait):
+            batch, self._pending = sorted(self._pending), set()
+            return batch
+        return []
+
+
+class PollingSource:
+    """Detects created, modified and deleted files by comparing mtime/size snapshots."""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.base_dir):
+            root_path = Path(root)
+            dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))
+                       and not (root_path == self.base_dir and d in EXCLUDED_DIRS)]
+            for name in files:
+                if name.endswith(WATCHED_SUFFIXES):
+                    path = root_path / name
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self) -> Set[Path]:
+        current = self._scan()
+        changed = {p for p, sig in current.items() if self._snapshot.get(p) != sig}
+        changed |= self._snapshot.keys() - current.keys()
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class WatchdogSource:
+    """Native file events (inotify on Linux) through the ``watchdog`` package."""
+
+    def __init__(self, base_dir: Path):
+        self._events: 'queue.Queue[Path]' = queue.Queue()
+        events = self._events
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type in ('opened', 'closed_no_write'):
+                    return
+                for attr in ('src_path', 'dest_path'):
+                    path = getattr(event, attr, None)
+                    if path:
+                        events.put(Path(os.fsdecode(path)))
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), str(base_dir), recursive=True)
+        self._observer.start()
+
+    def poll(self) -> Set[Path]:
+        changed = set()
+        while True:
+            try:
+                changed.add(self._events.get_nowait())
+            except queue.Empty:
+                return changed
+
+    def close(self):
+        self._observer.stop()
+        self._observer.join()
+
+
+def watch(base_dir: Path = BASE_DIR, debounce: float = 1.0, interval: float = 1.0,
+          polling: bool = False, registry: Optional[IPRegistry] = None, dirty_file: Path = DIRTY_FILE):
+    """Run until interrupted, applying each debounced batch of changes."""
+    base_dir = Path(base_dir)
+    if polling or not _HAS_WATCHDOG:
+        source, mode = PollingSource(base_dir), f'polling a cada {interval}s'
+    else:
+        source, mode = WatchdogSource(base_dir), 'eventos do sistema de ficheiros'
+        interval = min(interval, debounce / 4)
+    debouncer = Debouncer(debounce)
+    print(f"👀 A vigiar {base_dir} ({mode}). Ctrl+C para terminar.")
+    try:
+        while True:
+            debouncer.add(source.poll())
+            batch = debouncer.due()
+            if batch:
+                try:
+                    summary = apply_changes(base_dir, batch, registry, dirty_file)
+                except Exception as e:  # keep watching after a bad file
+                    print(f"❌ Erro ao aplicar alterações: {e}")
+                else:
+                    if summary['dirty']:
+                        print(f"[{datetime.now():%H:%M:%S}] ✅ {len(summary['upserted'])} atualizados, "
+                              f"{len(summary['removed'])} removidos, {len(summary['registered'])} IPs; "
+                              f"sebentas por atualizar: {', '.join(summary['dirty'])}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Vigilância terminada")
+    finally:
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manter índice, registo de IPs e sebentas sincronizados')
+    parser.add_argument('--base-dir', default=str(BASE_DIR), help='Pasta ExerciseDatabase')
+    parser.add_argument('--debounce', type=float, default=1.0, help='Segundos sem alterações antes de aplicar')
+    parser.add_argument('--interval', type=float, default=1.0, help='Intervalo de polling (segundos)')
+    parser.add_argument('--polling', action='store_true', help='Forçar polling mesmo com watchdog instalado')
+    args = parser.parse_args()
+    watch(Path(args.base_dir), debounce=args.debounce, interval=args.interval, polling=args.polling)
+
+
+if __name__ == '__main__':
+    main()
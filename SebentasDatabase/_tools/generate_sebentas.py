@@ -28,6 +28,7 @@ Opções:
     --no-compile    Gerar .tex mas não compilar
     --no-preview    Não mostrar preview antes de compilar
     --auto-approve  Aprovar automaticamente sem pedir confirmação
+    --dirty         Gerar apenas as sebentas marcadas por watch_exercises.py
 """
 
 import sys
@@ -35,9 +36,11 @@ import json
 import shutil
 import subprocess
 import argparse
+import io
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
 
 try:
     import yaml
@@ -84,6 +87,25 @@ except ImportError:
     Colors = None
     logger.warning(" Sistema de preview não disponível - a continuar sem pré-visualização")
 
+try:
+    from compile_cache import compile_with_cache, dependencies
+except ImportError:
+    compile_with_cache = None
+    dependencies = None
+
+try:
+    from build_manifest import BuildManifest
+except ImportError:
+    BuildManifest = None
+
+from latex_runner import run_latex
+from latex_format import package_preamble
+from tikz_cache import FIGURES_DIRNAME, get_tikz_cache
+from compile_diagnosis import diagnose_file, source_marker
+from latex_sanitize import ChunkSanitizer, unbalanced_dollars
+from exercise_cache import get_exercise_cache
+from document_stream import stream_document, write_document
+
 
 # Paths principais
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -100,15 +122,29 @@ TEMP_EXTENSIONS = {
     '.ind', '.ilg', '.bak', '.backup'
 }
 
+# prefixo dos PDFs de conceito sem números de página (--module-mode merge)
+PAGES_PREFIX = 'paginas_'
+
 
 class SebentaGenerator:
     """Gerador principal de sebentas."""
     
     def __init__(self, clean_only: bool = False, no_compile: bool = False, 
                  no_module_sebenta: bool = False, no_preview: bool = False,
-                 auto_approve: bool = False, dump_tex: bool = False):
-        """Add `dump_tex` to optionally save generated .tex for debugging."""
+                 auto_approve: bool = False, dump_tex: bool = False, jobs: int = 1,
+                 incremental: bool = False, module_mode: str = 'full', diagnose: bool = False):
+        """Add `dump_tex` to optionally save generated .tex for debugging.
+        `jobs` > 1 builds concept sebentas in a process pool (0 = all CPUs).
+        `incremental` skips sebentas whose build manifest shows no changed input.
+        `module_mode` 'merge' builds module sebentas from the concept PDFs.
+        `diagnose` bisects a failed compile to find the offending exercise(s)."""
         self.clean_only = clean_only
+        self.diagnose = diagnose
+        self.module_mode = module_mode
+        self.incremental = incremental and BuildManifest is not None
+        self._template_packages: Optional[str] = None
+        self._concept_inputs: Dict[Path, List[Path]] = {}
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
         self.no_compile = no_compile
         self.no_module_sebenta = no_module_sebenta
         self.no_preview = no_preview
@@ -118,7 +154,12 @@ class SebentaGenerator:
             'compiled': 0,
             'cleaned': 0,
             'errors': 0,
-            'cancelled': 0
+            'cancelled': 0,
+            'cached': 0,
+            'up_to_date': 0,
+            'passes': 0,
+            'sanitized': 0,
+            'sanitize_cached': 0
         }
         # Carregar configuração dos módulos
         self.modules_config = self.load_modules_config()
@@ -330,10 +371,15 @@ class SebentaGenerator:
     
     def generate_content(self, concept_path: Path, metadata: Dict, 
                           output_dir: Path) -> str:
-        """Gera o conteúdo LaTeX da sebenta.
+        """Gera o conteúdo LaTeX da sebenta numa só string (ver iter_content)."""
+        return "\n".join(self.iter_content(concept_path, metadata))
+
+    def iter_content(self, concept_path: Path, metadata: Dict) -> Iterator[str]:
+        """Gera o conteúdo LaTeX da sebenta em blocos: a introdução e um por exercício.
         
         Em vez de usar \\input, lê diretamente o conteúdo dos ficheiros .tex
-        e incorpora no documento gerado.
+        e incorpora no documento gerado. Unidos com "\\n", os blocos dão o
+        conteúdo completo; write_document escreve-os um a um.
         """
         content_lines = []
         
@@ -373,99 +419,19 @@ class SebentaGenerator:
                 content_lines.append("")
             
             for idx, tex_file in enumerate(metadata['exercises'], 1):
-                content_lines.append(f"% Exercício {idx}: {tex_file.name}")
+                # entregar o bloco anterior (introdução ou exercício) antes de ler o próximo
+                yield "\n".join(content_lines)
+                content_lines = [f"% Exercício {idx}: {tex_file.name}"]
+                content_lines.append(source_marker(tex_file))
                 
                 # Ler conteúdo do ficheiro e incorporar diretamente
                 try:
-                    with open(tex_file, 'r', encoding='utf-8') as f:
-                        exercise_content = f.read().strip()
-                    
-                    # Sanitize agent/auto-generated literal "\\n" sequences into real newlines
-                    # This fixes cases where content contains literal backslash-n sequences (e.g. "\\n\\item")
-                    exercise_content = exercise_content.replace('\\n', '\n')
+                    # Corpo sanitizado (e com subvariants incluídos), da cache de exercícios
+                    exercise_content = self.exercise_body(tex_file)
+                    if unbalanced_dollars(exercise_content):
+                        logger.warning('Sanitizer detected odd number of $ in exercise content; leaving as-is and flagging for manual review')
                     
-                    # Additional, context-aware sanitization: attempt to avoid turning text into math
-                    def _sanitize_latex(s: str) -> str:
-                        import re
-                        # Fix common double-escaped LaTeX commands (but avoid changing standalone "\\" used for linebreaks)
-                        safe_cmds = ['frac', 'item', 'begin', 'end', 'label', 'textbf', 'emph', 'left', 'right', 'mathrm', 'mathbb', 'sqrt']
-                        for cmd in safe_cmds:
-                            s = re.sub(r'\\\\+' + cmd, r'\\' + cmd, s)
-
-                        # Collapse runs of backslashes before commands
-                        s = re.sub(r'\\\\+(?=\\[A-Za-z])', r'\\', s)
-
-                        # Unicode -> LaTeX name (no $ wrappers here)
-                        uni_map = {
-                            'ℝ': r'\mathbb{R}',
-                            '∞': r'\infty',
-                            '⇒': r'\Rightarrow',
-                            '→': r'\to',
-                            '←': r'\leftarrow',
-                            '≠': r'\neq',
-                            '∈': r'\in',
-                            '⊂': r'\subset',
-                            '…': '...',
-                            '✓': r'\checkmark'
-                        }
-
-                        # Sub/superscript unicode maps
-                        sub_map = {'₁': '_{1}', '₂': '_{2}', '₃': '_{3}', '₄': '_{4}'}
-                        sup_map = {'¹': '^{1}', '²': '^{2}', '³': '^{3}', '⁻¹': '^{-1}', '⁻': '-'}
-
-                        # Split into math and non-math segments (simple heuristic)
-                        math_pattern = re.compile(r'(\$\$.*?\$\$|\$.*?\$|\\\[.*?\\\])', re.DOTALL)
-                        parts = math_pattern.split(s)
-                        out_parts = []
-
-                        for part in parts:
-                            if not part:
-                                continue
-                            if math_pattern.match(part):
-                                # inside math: apply only lightweight fixes
-                                p = part
-                                # replace unicode with LaTeX commands (without adding $ wrappers)
-                                for k, v in uni_map.items():
-                                    p = p.replace(k, v)
-                                for k, v in sub_map.items():
-                                    p = p.replace(k, v)
-                                for k, v in sup_map.items():
-                                    p = p.replace(k, v)
-                                # fix double-escaped commands inside math
-                                p = re.sub(r'\\\\+(?=\\[A-Za-z])', r'\\', p)
-                                out_parts.append(p)
-                            else:
-                                # outside math: be conservative, wrap pure-symbol unicode in $...$ so they become math
-                                p = part
-                                for k, v in uni_map.items():
-                                    p = p.replace(k, f'${v}$')
-                                for k, v in sub_map.items():
-                                    p = p.replace(k, f'$_{v[1:]}$')
-                                for k, v in sup_map.items():
-                                    p = p.replace(k, f'${v}$')
-                                # fix double-escaped commands outside math
-                                p = re.sub(r'\\\\+(?=\\[A-Za-z])', r'\\', p)
-                                out_parts.append(p)
-
-                        result = ''.join(out_parts)
-
-                        # Warn if dollar signs are unbalanced (simple heuristic)
-                        try:
-                            total_single_dollars = len(re.findall(r'(?<!\)\$', result))
-                        except Exception:
-                            total_single_dollars = result.count('$')
-                        if total_single_dollars % 2 == 1:
-                            logger.warning('Sanitizer detected odd number of $ in exercise content; leaving as-is and flagging for manual review')
-
-                        return result
-
-                    exercise_content = _sanitize_latex(exercise_content)
-                    
-                    # Se é um main.tex de exercício com subvariants, processar os \input{}
-                    if tex_file.name == 'main.tex' and tex_file.parent.is_dir():
-                        exercise_content = self._process_subvariant_inputs(exercise_content, tex_file.parent)
-                    
-                    content_lines.append(exercise_content)
+                    content_lines.append(self.externalize_figures(exercise_content))
                     # Force floats (figures) to be placed before continuing
                     content_lines.append("\\FloatBarrier")
                 except Exception as e:
@@ -475,42 +441,109 @@ class SebentaGenerator:
                 
                 content_lines.append("")
 
-        
-        return "\n".join(content_lines)
+        yield "\n".join(content_lines)
     
-    def _process_subvariant_inputs(self, content: str, exercise_dir: Path) -> str:
-        """Processa \input{} de subvariants e substitui pelo conteúdo dos arquivos.
-        
-        Args:
-            content: Conteúdo do main.tex
-            exercise_dir: Diretório do exercício (que contém os subvariant_*.tex)
-        
-        Returns:
-            Conteúdo processado com subvariants incluídos
-        """
-        import re
-        
-        def replace_input(match):
-            subvariant_name = match.group(1)
-            subvariant_file = exercise_dir / f"{subvariant_name}.tex"
-            
-            if subvariant_file.exists():
-                try:
-                    with open(subvariant_file, 'r', encoding='utf-8') as f:
-                        return f.read().strip()
-                except Exception as e:
-                    logger.warning(f"Erro ao ler subvariant {subvariant_file}: {e}")
-                    return f"% ERRO: Não foi possível carregar {subvariant_name}"
+    def externalize_figures(self, content: str) -> str:
+        """Substitui as tikzpicture pelo PDF da cache de figuras (só quando se vai compilar)."""
+        if self.no_compile:
+            return content
+        if self._template_packages is None:
+            self._template_packages = package_preamble(self.load_template())
+        return get_tikz_cache().externalize(content, self._template_packages)
+
+    def exercise_body(self, tex_file: Path) -> str:
+        """Corpo sanitizado do exercício (main.tex com os subvariants incluídos)."""
+        cache = get_exercise_cache()
+        before = (cache.hits + cache.disk_hits, cache.misses)
+        body = cache.body(tex_file)
+        self.stats['sanitize_cached'] += cache.hits + cache.disk_hits - before[0]
+        self.stats['sanitized'] += cache.misses - before[1]
+        return body
+
+    def iter_module_content(self, module_name: str, module_description: str,
+                            concepts: List[Dict]) -> Iterator[str]:
+        """Conteúdo da sebenta de módulo em blocos: introdução, um por exercício e o fecho de cada conceito."""
+        content_lines = [f"\\section*{{{module_name}}}", ""]
+        if module_description:
+            content_lines += [f"\\textit{{{module_description}}}", "", "\\vspace{1em}", ""]
+        content_lines += [
+            "Este documento contém todos os exercícios do módulo, organizados por conceito.",
+            "",
+            "\\tableofcontents",
+            "\\newpage",
+            "",
+        ]
+
+        for concept_info in concepts:
+            concept_name = concept_info['name'].replace('_', ' ').replace('-', ' - ')
+            content_lines += [f"\\section{{{concept_name}}}", ""]
+
+            # Buscar exercícios do conceito
+            metadata = self.get_concept_metadata(concept_info['path'])
+
+            if metadata['exercises']:
+                for tex_file in metadata['exercises']:
+                    yield "\n".join(content_lines)
+                    content_lines = [source_marker(tex_file)]
+                    try:
+                        exercise_content = self.exercise_body(tex_file)
+                        content_lines.append(self.externalize_figures(exercise_content))
+                        # Force floats after each exercise when building module sebenta
+                        content_lines += ["\\FloatBarrier", ""]
+                    except Exception as e:
+                        content_lines.append(f"% ERRO ao ler {tex_file.name}: {e}")
             else:
-                logger.warning(f"Subvariant não encontrado: {subvariant_file}")
-                return f"% AVISO: Subvariant {subvariant_name} não encontrado"
-        
-        # Substituir \input{subvariant_N} pelo conteúdo do arquivo
-        pattern = r'\\input\{(subvariant_\d+)\}'
-        processed_content = re.sub(pattern, replace_input, content)
-        
-        return processed_content
-    
+                content_lines.append("\\textit{Nenhum exercício disponível.}")
+
+            content_lines += ["", "\\newpage", ""]
+
+        yield "\n".join(content_lines)
+
+    def _with_figures(self, chunks: Iterable[str], dest_dir: Path) -> Iterator[str]:
+        """Liga as figuras TikZ de cada bloco (caminho relativo) à pasta do .tex, à medida que passam."""
+        for chunk in chunks:
+            if not self.no_compile:
+                get_tikz_cache().copy_figures(chunk, dest_dir)
+            yield chunk
+
+    def write_sebenta(self, tex_file: Path, values: Dict[str, str], chunks: Iterable[str],
+                      confirm: Optional[Callable[[str], bool]] = None, sanitize: bool = True) -> bool:
+        """Escreve o .tex bloco a bloco (cada bloco sanitizado à parte), sem montar o documento em memória.
+
+        Com `confirm` (preview interativo) o documento é montado para a pré-visualização
+        e só é gravado se for aprovado; devolve False se o utilizador cancelar.
+        """
+        template = self.load_template()
+        clean = ChunkSanitizer(logger) if sanitize else None
+        chunks = self._with_figures(chunks, tex_file.parent)
+        if confirm:
+            buffer = io.StringIO()
+            stream_document(buffer, template, values, chunks, clean)
+            latex_content = buffer.getvalue()
+            if clean:
+                latex_content = clean.finish(latex_content)
+            if not confirm(latex_content):
+                return False
+            tex_file.write_text(latex_content, encoding='utf-8')
+        else:
+            write_document(tex_file, template, values, chunks, clean)
+            if clean and clean.unbalanced:
+                # raro: um $ sem par no documento inteiro obriga a uma segunda passagem
+                tex_file.write_text(clean.finish(tex_file.read_text(encoding='utf-8')), encoding='utf-8')
+
+        logger.info(f"   .tex gerado: {tex_file.relative_to(PROJECT_ROOT)}")
+        # Se dump_tex estiver ativo, guardar cópia em SebentasDatabase/debug/
+        try:
+            if getattr(self, 'dump_tex', False):
+                debug_dir = SEBENTAS_DB / "debug"
+                debug_dir.mkdir(parents=True, exist_ok=True)
+                debug_file = debug_dir / f"{tex_file.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tex"
+                shutil.copyfile(tex_file, debug_file)
+                logger.info(f"   Dump do .tex guardado para debug: {debug_file.relative_to(PROJECT_ROOT)}")
+        except Exception as e:
+            logger.exception(f" Falha ao gravar dump .tex: {e}")
+        return True
+
     def generate_sebenta(self, discipline: str, module: str, concept: str, 
                         concept_path: Path, tipo: Optional[List[str]] = None) -> Optional[Path]:
         """Enhanced logging around preview and optional dump of generated .tex for debugging."""
@@ -565,188 +598,61 @@ class SebentaGenerator:
             logger.warning(f"   Nenhum exercício encontrado em {concept_path}")
             return None
         
-        # Carregar template
-        template = self.load_template()
-        
-        # Gerar conteúdo
-        content = self.generate_content(concept_path, metadata, output_dir)
-        
         # Carregar informações do módulo
         module_name = self.get_module_name(discipline, module)
         
         # Preencher template (sem título, autor e data no documento)
-        title = ""  # Não usado mais no documento
-        header_left = module_name
-        header_right = metadata['concept_name']
-        
-        latex_content = template.replace("%%TITLE%%", title)
-        latex_content = latex_content.replace("%%AUTHOR%%", "")
-        latex_content = latex_content.replace("%%DATE%%", "")
-        latex_content = latex_content.replace("%%HEADER_LEFT%%", header_left)
-        latex_content = latex_content.replace("%%HEADER_RIGHT%%", header_right)
-        latex_content = latex_content.replace("%%CONTENT%%", content)
-
-        # Final post-processing sanitizer for the generated .tex to fix common agent/artifact issues
-        import re
-        def _final_sanitize(s: str) -> str:
-            # Collapse multiple backslashes before a LaTeX command into a single backslash
-            s = re.sub(r"\\\\+(?=\\[A-Za-z])", r"\\", s)
-            # Fix remaining literal double-escaped sequences (safe replacements)
-            s = s.replace('\\\\frac', '\\frac')
-            s = s.replace('\\\\item', '\\item')
-            s = s.replace('\\\\begin', '\\begin')
-            s = s.replace('\\\\end', '\\end')
-
-            # Map common Unicode math symbols to LaTeX (no $ wrappers here; rely on context-aware sanitizer earlier)
-            uni_map = {
-                'ℝ': r'\mathbb{R}',
-                '∞': r'\infty',
-                '⇒': r'\Rightarrow',
-                '→': r'\to',
-                '∈': r'\in',
-                '≠': r'\neq',
-                '…': '...'
-            }
-
-            for k, v in uni_map.items():
-                s = s.replace(k, v)
-
-
-            # Remove obvious agent helper comment lines (they often indicate previous failed auto-fixes)
-            s = re.sub(r'(?m)^[ \t]*%+.*Agent added.*\n', '\n', s)
-
-            # Remove solitary lines that contain only a single dollar sign (likely left by agents)
-            s = re.sub(r'(?m)^[ \t]*\$(?:[ \t]*)\r?\n', '\n', s)
-
-            # Close simple unclosed \subexercicio{... occurrences that are on a single line
-            # e.g. "\subexercicio{Verifique que $f(f^{-1}" -> append a closing brace
-            s = re.sub(r'(?m)^(.*\\subexercicio\{[^\}]*)(\r?$)', r'\1}\2', s)
-
-            # ROBUST TikZ node fixes: operate only inside tikzpicture blocks and normalize corruption to 'node'
-            try:
-                def _fix_tikz_block(match):
-                    block = match.group(0)
-                    # Replace common corrupted sequences producing 'n\n...ode' or stray backslashes
-                    block = re.sub(r'(?m)\bn\s*\r?\n\s*ode', r'\\node', block)
-                    block = re.sub(r'(?m)\bn\\+\s*node', r'\\node', block)
-                    block = re.sub(r'(?m)\\\s*\r?\n\s*node', r'\\node', block)
-                    # Normalize leading backslashes before 'node' to a single backslash (inside paths ' -- (x,y) node[...]')
-                    block = re.sub(r'(?m)\\+node', r'\\node', block)
-                    # Ensure lines that start with 'node' after a newline are correctly formatted with a backslash
-                    block = re.sub(r'(?m)\r?\n\s*node', '\\n\\node', block)
-                    return block
-
-                s = re.sub(r'(\\begin\{tikzpicture\}.*?\\end\{tikzpicture\})', _fix_tikz_block, s, flags=re.DOTALL)
-            except Exception:
-                pass
-
-            # Wrap standalone display-like math commands (e.g., a line containing only a \frac{...}) in $...$
-            try:
-                def _wrap_math_line(match):
-                    indent = match.group('indent') or ''
-                    expr = match.group('expr')
-                    # don't double-wrap if there's already a $ on the line
-                    if '$' in expr or '\\(' in expr or '\\[' in expr:
-                        return match.group(0)
-                    return f"{indent}${expr}$"
-
-                s = re.sub(r'(?m)^(?P<indent>\s*)(?P<expr>\\(?:frac|dfrac|tfrac|sqrt)\b.*)$', _wrap_math_line, s)
-            except Exception:
-                pass
-
-            # Remove solitary single-letter artifact lines (e.g., a line containing only 'q')
-            s = re.sub(r'(?m)^[ \t]*[A-Za-z]{1}[ \t]*\r?\n', '\n', s)
-
-            # Fix incomplete \end{figure without trailing '}' inserted by agent artifacts
-            try:
-                s = re.sub(r'(\\end\{figure)(?!\})', r'\1}', s)
-            except Exception:
-                pass
-
-            # Reduce long runs of blank lines
-            s = re.sub(r'\n{3,}', '\n\n', s)
-
-            # Final safety: if total number of unescaped $ is odd, try to escape the last one to avoid runaway math
-            try:
-                # Count $ not preceded by backslash
-                dollars = re.findall(r'(?<!\\)\$', s)
-                if len(dollars) % 2 == 1:
-                    logger.warning('Final sanitizer detected global odd number of $ characters - escaping the last one')
-                    # Escape the last unescaped $ by replacing it with \\
-                    s = re.sub(r'(?<!\\)\$(?!.*(?<!\\)\$)', r'\\$', s, count=1)
-            except Exception:
-                pass
-
-            return s
-
-
-        latex_content = _final_sanitize(latex_content)
-
-        # Conservative post-sanitize: ensure TikZ 'node' tokens have leading backslash
-        import re
-        try:
-            latex_content = re.sub(r'\bode\[', r'\\node[', latex_content)
-            latex_content = re.sub(r'(?m)^(\s*)(?=node\[)', r'\1\\node', latex_content)
-            latex_content = re.sub(r'(?m)\r?\n(\s*)node', r'\n\\node', latex_content)
-        except Exception:
-            pass
-
-
+        values = {
+            "TITLE": "",  # Não usado mais no documento
+            "AUTHOR": "",
+            "DATE": "",
+            "HEADER_LEFT": module_name,
+            "HEADER_RIGHT": metadata['concept_name'],
+        }
         
         # PREVIEW E CONFIRMAÇÃO (se habilitado)
+        confirm = None
         if self.preview_manager and not self.auto_approve:
-            try:
-                preview_metadata = {
-                    "discipline": discipline,
-                    "module": module,
-                    "module_name": module_name,
-                    "concept": concept,
-                    "concept_name": metadata['concept_name'],
-                    "total_exercises": len(metadata['exercises']),
-                    "tipos": [t['name'] for t in metadata['tipos']]
-                }
-                
-                preview_content = create_sebenta_preview(
-                    f"sebenta_{concept}",
-                    latex_content,
-                    preview_metadata
-                )
-                
-                logger.info(f" Mostrando preview (sebenta_{concept}) - total_exercises={len(metadata['exercises'])}")
-                confirmed = self.preview_manager.show_and_confirm(
-                    preview_content, 
-                    f"Sebenta: {metadata['concept_name']}"
-                )
+            def confirm(latex_content: str) -> bool:
+                try:
+                    preview_metadata = {
+                        "discipline": discipline,
+                        "module": module,
+                        "module_name": module_name,
+                        "concept": concept,
+                        "concept_name": metadata['concept_name'],
+                        "total_exercises": len(metadata['exercises']),
+                        "tipos": [t['name'] for t in metadata['tipos']]
+                    }
+                    
+                    preview_content = create_sebenta_preview(
+                        f"sebenta_{concept}",
+                        latex_content,
+                        preview_metadata
+                    )
+                    
+                    logger.info(f" Mostrando preview (sebenta_{concept}) - total_exercises={len(metadata['exercises'])}")
+                    confirmed = self.preview_manager.show_and_confirm(
+                        preview_content, 
+                        f"Sebenta: {metadata['concept_name']}"
+                    )
 
-                if not confirmed:
-                    logger.info(f"   Cancelado pelo utilizador durante preview")
-                    self.stats['cancelled'] += 1
-                    return None
-            except Exception as e:
-                logger.exception(f" Exceção durante preview - prosseguindo sem preview: {e}")
-                # Continuar sem preview
+                    if not confirmed:
+                        logger.info(f"   Cancelado pelo utilizador durante preview")
+                        self.stats['cancelled'] += 1
+                        return False
+                except Exception as e:
+                    logger.exception(f" Exceção durante preview - prosseguindo sem preview: {e}")
+                    # Continuar sem preview
+                return True
         else:
             if not self.preview_manager:
                 logger.info("ℹ Preview não configurado - pulando etapa de preview")
 
-        
         # Salvar .tex (só após confirmação)
         tex_file = output_dir / f"sebenta_{concept}.tex"
-        with open(tex_file, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
-        
-        logger.info(f"   .tex gerado: {tex_file.relative_to(PROJECT_ROOT)}")
-        # Se dump_tex estiver ativo, guardar cópia em SebentasDatabase/debug/
-        try:
-            if getattr(self, 'dump_tex', False):
-                debug_dir = SEBENTAS_DB / "debug"
-                debug_dir.mkdir(parents=True, exist_ok=True)
-                debug_file = debug_dir / f"{tex_file.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tex"
-                with open(debug_file, 'w', encoding='utf-8') as df:
-                    df.write(latex_content)
-                logger.info(f"   Dump do .tex guardado para debug: {debug_file.relative_to(PROJECT_ROOT)}")
-        except Exception as e:
-            logger.exception(f" Falha ao gravar dump .tex: {e}")
+        if not self.write_sebenta(tex_file, values, self.iter_content(concept_path, metadata), confirm):
+            return None
         
         # FINE-TUNING: Abrir ficheiro para edição antes de compilar
         if not self.no_compile and not self.auto_approve:
@@ -836,6 +742,9 @@ class SebentaGenerator:
                                concepts: List[Dict]) -> Optional[Path]:
         """Gera uma sebenta consolidada de todo o módulo."""
         
+        if self.module_mode == 'merge':
+            return self.merge_module_sebenta(discipline, module, concepts)
+
         logger.info(f"\n Gerando sebenta consolidada do módulo: {discipline}/{module}")
         
         # Criar estrutura de output
@@ -846,9 +755,6 @@ class SebentaGenerator:
         pdfs_dir = output_dir / "pdfs"
         pdfs_dir.mkdir(exist_ok=True)
         
-        # Carregar template
-        template = self.load_template()
-        
         # Obter nome completo do módulo
         module_name = self.get_module_name(discipline, module)
         module_description = ""
@@ -858,110 +764,43 @@ class SebentaGenerator:
         except:
             pass
         
-        # Gerar conteúdo consolidado
-        content_lines = []
-        content_lines.append(f"\\section*{{{module_name}}}")
-        content_lines.append("")
-        
-        if module_description:
-            content_lines.append(f"\\textit{{{module_description}}}")
-            content_lines.append("")
-            content_lines.append("\\vspace{1em}")
-            content_lines.append("")
-        
-        content_lines.append(f"Este documento contém todos os exercícios do módulo, organizados por conceito.")
-        content_lines.append("")
-        content_lines.append("\\tableofcontents")
-        content_lines.append("\\newpage")
-        content_lines.append("")
-        
-        for concept_info in concepts:
-            concept_name = concept_info['name'].replace('_', ' ').replace('-', ' - ')
-            content_lines.append(f"\\section{{{concept_name}}}")
-            content_lines.append("")
-            
-            # Ler conteúdo do PDF gerado (ou usar o .tex)
-            concept_tex = concept_info['tex']
-            concept_path = concept_info['path']
-            
-            # Buscar exercícios do conceito
-            metadata = self.get_concept_metadata(concept_path)
-            
-            if metadata['exercises']:
-                for idx, tex_file in enumerate(metadata['exercises'], 1):
-                    try:
-                        with open(tex_file, 'r', encoding='utf-8') as f:
-                            exercise_content = f.read()
-                        content_lines.append(exercise_content)
-                        # Force floats after each exercise when building module sebenta
-                        content_lines.append("\\FloatBarrier")
-                        content_lines.append("")
-                    except Exception as e:
-                        content_lines.append(f"% ERRO ao ler {tex_file.name}: {e}")
-            else:
-                content_lines.append("\\textit{Nenhum exercício disponível.}")
-            
-            content_lines.append("")
-            content_lines.append("\\newpage")
-            content_lines.append("")
-        
-        content = "\n".join(content_lines)
-        
         # Preencher template (sem título, autor e data)
-        module_name = self.get_module_name(discipline, module)
         # Usar o nome amigável do módulo no cabeçalho esquerdo
-        header_left = module_name
-        header_right = ""
-        
-        latex_content = template.replace("%%TITLE%%", "")
-        latex_content = latex_content.replace("%%AUTHOR%%", "")
-        latex_content = latex_content.replace("%%DATE%%", "")
-        latex_content = latex_content.replace("%%HEADER_LEFT%%", header_left)
-        latex_content = latex_content.replace("%%HEADER_RIGHT%%", header_right)
-        latex_content = latex_content.replace("%%CONTENT%%", content)
+        values = {"TITLE": "", "AUTHOR": "", "DATE": "", "HEADER_LEFT": module_name, "HEADER_RIGHT": ""}
         
         # PREVIEW E CONFIRMAÇÃO para sebenta de módulo (se habilitado)
+        confirm = None
         if self.preview_manager and not self.auto_approve:
-            preview_metadata = {
-                "discipline": discipline,
-                "module": module,
-                "module_name": module_name,
-                "type": "module_compilation",
-                "total_concepts": len(concepts),
-                "concepts": [c['name'] for c in concepts]
-            }
-            
-            preview_content = create_sebenta_preview(
-                f"sebenta_modulo_{module}",
-                latex_content,
-                preview_metadata
-            )
-            
-            if not self.preview_manager.show_and_confirm(
-                preview_content,
-                f"Sebenta Módulo: {module_name}"
-            ):
-                logger.info(f"   Cancelado pelo utilizador")
-                self.stats['cancelled'] += 1
-                return None
+            def confirm(latex_content: str) -> bool:
+                preview_metadata = {
+                    "discipline": discipline,
+                    "module": module,
+                    "module_name": module_name,
+                    "type": "module_compilation",
+                    "total_concepts": len(concepts),
+                    "concepts": [c['name'] for c in concepts]
+                }
+                
+                preview_content = create_sebenta_preview(
+                    f"sebenta_modulo_{module}",
+                    latex_content,
+                    preview_metadata
+                )
+                
+                if not self.preview_manager.show_and_confirm(
+                    preview_content,
+                    f"Sebenta Módulo: {module_name}"
+                ):
+                    logger.info(f"   Cancelado pelo utilizador")
+                    self.stats['cancelled'] += 1
+                    return False
+                return True
         
         # Salvar .tex (só após confirmação)
         tex_file = output_dir / f"sebenta_modulo_{module}.tex"
-        with open(tex_file, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
-        
-        logger.info(f"   .tex gerado: {tex_file.relative_to(PROJECT_ROOT)}")
-        # Se dump_tex estiver ativo, guardar cópia em SebentasDatabase/debug/
-        try:
-            if getattr(self, 'dump_tex', False):
-                debug_dir = SEBENTAS_DB / "debug"
-                debug_dir.mkdir(parents=True, exist_ok=True)
-                debug_file = debug_dir / f"{tex_file.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.tex"
-                with open(debug_file, 'w', encoding='utf-8') as df:
-                    df.write(latex_content)
-                logger.info(f"   Dump do .tex guardado para debug: {debug_file.relative_to(PROJECT_ROOT)}")
-        except Exception as e:
-            logger.exception(f" Falha ao gravar dump .tex: {e}")
+        chunks = self.iter_module_content(module_name, module_description, concepts)
+        if not self.write_sebenta(tex_file, values, chunks, confirm, sanitize=False):
+            return None
         
         # FINE-TUNING: Abrir ficheiro para edição antes de compilar
         if not self.no_compile and not self.auto_approve:
@@ -1046,13 +885,133 @@ class SebentaGenerator:
         self.stats['generated'] += 1
         
         # Compilar (PDFs vão para pdfs_dir)
-        self.compile_pdf(tex_file)
+        if not self.compile_pdf(tex_file):
+            return None
         
         return tex_file
     
+    def _numbered_pages_preamble(self) -> List[str]:
+        """Preâmbulo de um documento que junta PDFs com pdfpages e numera as páginas no rodapé."""
+        import re
+        template = self.load_template()
+        # a mesma geometria dos conceitos, para o rodapé coincidir
+        geometry = re.search(r'^\\geometry\{.*\}\s*$', template, re.MULTILINE)
+        return [
+            package_preamble(template).rstrip('\n'),
+            "\\usepackage{pdfpages}",
+            "",
+            geometry.group(0).strip() if geometry else "\\geometry{margin=2.5cm}",
+            "\\pagestyle{fancy}",
+            "\\fancyhf{}",
+            "\\renewcommand{\\headrulewidth}{0pt}",
+            "\\cfoot{\\thepage}",
+            "",
+        ]
+
+    def merge_module_sebenta(self, discipline: str, module: str,
+                             concepts: List[Dict]) -> Optional[Path]:
+        """Monta a sebenta do módulo juntando os PDFs já compilados dos conceitos.
+
+        Só a página de rosto/índice é composta; cada conceito entra com pdfpages
+        (marcador e entrada no índice) a partir da versão sem números de página
+        (pdfs/paginas_<conceito>.pdf, ver compile_pdf), e o rodapé do módulo
+        numera as páginas de forma contínua."""
+        logger.info(f"\n Montando sebenta do módulo a partir dos PDFs: {discipline}/{module}")
+
+        output_dir = SEBENTAS_DB / discipline / module
+        (output_dir / "pdfs").mkdir(parents=True, exist_ok=True)
+
+        includes = []
+        for idx, concept_info in enumerate(concepts, 1):
+            name = concept_info['name']
+            pdf = output_dir / name / "pdfs" / f"{PAGES_PREFIX}{name}.pdf"
+            if not pdf.exists():
+                logger.warning(f"   PDF do conceito (sem números) em falta, ignorado: {pdf.relative_to(PROJECT_ROOT)}")
+                continue
+            title = name.replace('_', ' ').replace('-', ' - ')
+            includes.append(
+                f"\\includepdf[pages=-,pagecommand={{\\thispagestyle{{fancy}}}},"
+                f"addtotoc={{1,section,1,{title},conceito:{idx}}}]{{{pdf.relative_to(output_dir).as_posix()}}}"
+            )
+        if not includes:
+            logger.warning("   Nenhum PDF de conceito disponível - sebenta do módulo não gerada")
+            return None
+
+        module_name = self.get_module_name(discipline, module)
+        module_description = ""
+        try:
+            module_info = self.modules_config.get(discipline, {}).get(module, {})
+            module_description = module_info.get('description', '')
+        except Exception:
+            pass
+        lines = [
+            *self._numbered_pages_preamble(),
+            "% as páginas dos conceitos vêm sem número: numeração contínua do módulo",
+            "\\begin{document}",
+            f"\\section*{{{module_name}}}",
+        ]
+        if module_description:
+            lines += [f"\\textit{{{module_description}}}", "", "\\vspace{1em}"]
+        lines += ["\\tableofcontents", "\\newpage", *includes, "\\end{document}", ""]
+
+        tex_file = output_dir / f"sebenta_modulo_{module}.tex"
+        tex_file.write_text("\n".join(lines), encoding='utf-8')
+        logger.info(f"   .tex gerado: {tex_file.relative_to(PROJECT_ROOT)} ({len(includes)} conceitos)")
+        self.stats['generated'] += 1
+
+        if not self.compile_pdf(tex_file):
+            return None
+        return tex_file
+
     def compile_pdf(self, tex_file: Path) -> bool:
-        """Compila um ficheiro .tex para PDF."""
-        
+        """Compila um ficheiro .tex para PDF.
+
+        Com --module-mode merge, a sebenta de um conceito é compilada uma só vez,
+        sem números de página (pdfs/paginas_<conceito>.pdf): é a versão que a
+        sebenta do módulo junta com a sua própria numeração. O PDF numerado do
+        conceito é feito a partir dela com pdfpages, sem voltar a compilar os
+        exercícios.
+        """
+        pages = self._pages_source(tex_file)
+        if pages is None:
+            return self._compile_tex(tex_file)
+        if not self._compile_tex(pages):
+            return False
+        numbered = self._numbered_source(tex_file, pages.parent / "pdfs" / f"{pages.stem}.pdf")
+        if not self._compile_tex(numbered):
+            return False
+        self.stats['compiled'] -= 1  # a mesma sebenta, não conta duas vezes
+        return True
+
+    def _pages_source(self, tex_file: Path) -> Optional[Path]:
+        """O .tex de um conceito com \\SebentaSemNumeros definido (só no modo merge), no lugar do original."""
+        name = tex_file.name
+        if (self.module_mode != 'merge' or self.no_compile or not tex_file.exists()
+                or not name.startswith('sebenta_') or name.startswith('sebenta_modulo_')):
+            return None
+        source = tex_file.read_text(encoding='utf-8')
+        # logo a seguir aos pacotes e na mesma linha: o formato pré-compilado continua
+        # a aplicar-se e os números de linha dos erros são os do .tex original
+        end = len(package_preamble(source))
+        pages = tex_file.with_name(PAGES_PREFIX + name[len('sebenta_'):])
+        pages.write_text(source[:end] + '\\def\\SebentaSemNumeros{}' + source[end:], encoding='utf-8')
+        tex_file.unlink()
+        return pages
+
+    def _numbered_source(self, tex_file: Path, pages_pdf: Path) -> Path:
+        """.tex que põe o rodapé com o número de página nas páginas de `pages_pdf`."""
+        lines = [
+            *self._numbered_pages_preamble(),
+            "\\begin{document}",
+            f"\\includepdf[pages=-,pagecommand={{\\thispagestyle{{fancy}}}}]"
+            f"{{{pages_pdf.relative_to(tex_file.parent).as_posix()}}}",
+            "\\end{document}",
+            "",
+        ]
+        tex_file.write_text("\n".join(lines), encoding='utf-8')
+        return tex_file
+
+    def _compile_tex(self, tex_file: Path) -> bool:
         if self.no_compile:
             logger.info("   no_compile set - pulando compilação")
             return True
@@ -1076,26 +1035,30 @@ class SebentaGenerator:
             tex_name
         ]
         
-        try:
-            # Executar 2 vezes para resolver referências
-            result = None
-            for i in range(2):
-                result = subprocess.run(
-                    cmd,
-                    cwd=str(output_dir),  # Converter para string
-                    capture_output=True,
-                    text=True,
-                    timeout=60,
-                    encoding='utf-8',
-                    errors='replace'
-                )
+        # Verificar se PDF foi gerado (independente do exit code)
+        pdf_file = output_dir / f"{tex_file.stem}.pdf"
+        result = None
+
+        def run_pdflatex() -> bool:
+            nonlocal result
+            # Repetir só enquanto referências/índice mudarem (máx. 3 passagens)
+            result, passes = run_latex(cmd, output_dir, timeout=60)
+            self.stats['passes'] += passes
+            logger.info(f"   pdflatex: {passes} passagem(ns)")
             
             # Pequeno delay para garantir que sistema de ficheiros sincronizou
             import time
             time.sleep(1.0)
-            
-            # Verificar se PDF foi gerado (independente do exit code)
-            pdf_file = output_dir / f"{tex_file.stem}.pdf"
+            return pdf_file.exists()
+
+        try:
+            if compile_with_cache:
+                _, cache_hit = compile_with_cache(tex_file, run_pdflatex, options=(*cmd[1:-1], 'reruns=auto'))
+                if cache_hit:
+                    logger.info("   PDF reutilizado da cache de compilação")
+                    self.stats['cached'] += 1
+            else:
+                run_pdflatex()
             
             if pdf_file.exists():
                 # Criar diretório pdfs se não existir
@@ -1130,6 +1093,12 @@ class SebentaGenerator:
                     except Exception:
                         pass
                 
+                # figuras TikZ ligadas a partir da cache: já estão no PDF
+                figures_dir = output_dir / FIGURES_DIRNAME
+                if figures_dir.is_dir():
+                    cleaned += sum(1 for file in figures_dir.iterdir() if file.is_file())
+                    shutil.rmtree(figures_dir, ignore_errors=True)
+                
                 if cleaned > 0:
                     logger.info(f"   Limpou {cleaned} ficheiros")
                 self.stats['cleaned'] += cleaned
@@ -1145,6 +1114,8 @@ class SebentaGenerator:
                         f.write("\n=== STDERR ===\n")
                         f.write(result.stderr or "")
                     logger.info(f"   Log salvo em: {error_log_file.relative_to(PROJECT_ROOT)}")
+                if self.diagnose:
+                    self.diagnose_failure(tex_file)
                 self.stats['errors'] += 1
                 return False
                 
@@ -1157,6 +1128,25 @@ class SebentaGenerator:
             self.stats['errors'] += 1
             return False
     
+    def diagnose_failure(self, tex_file: Path):
+        """Bisseção dos exercícios de um .tex que não compila; relatório em <nome>_diagnosis.json."""
+        logger.info("   🔎 A procurar o(s) exercício(s) que impedem a compilação...")
+        try:
+            report = diagnose_file(tex_file, jobs=max(2, self.jobs))
+        except Exception as e:
+            logger.warning(f"   Diagnóstico falhou: {e}")
+            return
+        if report['status'] == 'preamble':
+            logger.error("   O preâmbulo/template não compila sem exercícios")
+        for culprit in report['culprits']:
+            first = culprit['errors'][0] if culprit['errors'] else {}
+            where = f":{first['source_line']}" if 'source_line' in first else ''
+            logger.error(f"   ❌ {culprit['source']}{where} {first.get('message', '')}")
+        for group in report['interactions']:
+            logger.error(f"   ⚠️ Só falham em conjunto: {', '.join(group)}")
+        logger.info(f"   Diagnóstico ({report['compiles']} compilações): "
+                    f"{Path(report['report_file']).relative_to(PROJECT_ROOT)}")
+
     def scan_and_generate(self, discipline: Optional[List[str]] = None,
                          module: Optional[List[str]] = None,
                          concept: Optional[List[str]] = None,
@@ -1212,33 +1202,24 @@ class SebentaGenerator:
                     logger.exception(f" Erro ao gerar a partir do caminho {p}: {e}")
             return
 
-        # Iterar por disciplinas
-        for disc_dir in sorted(EXERCISE_DB.iterdir()):
-            if not disc_dir.is_dir() or disc_dir.name.startswith('_'):
-                continue
-            
-            if discipline and disc_dir.name not in discipline:
-                continue
-            
-            # Iterar por módulos
-            for mod_dir in sorted(disc_dir.iterdir()):
-                if not mod_dir.is_dir():
-                    continue
-                
-                if module and mod_dir.name not in module:
-                    continue
-                
+        modules = self._collect_concepts(discipline, module, concept)
+        build_modules = not concept and not self.no_module_sebenta
+
+        if self.jobs > 1:
+            self._scan_parallel(modules, tipo, build_modules)
+        else:
+            for disc_dir, mod_dir, concept_dirs in modules:
                 logger.info(f"\n Módulo: {disc_dir.name}/{mod_dir.name}")
                 module_concepts = []
                 
-                # Iterar por conceitos
-                for conc_dir in sorted(mod_dir.iterdir()):
-                    if not conc_dir.is_dir():
-                        continue
-                    
-                    if concept and conc_dir.name not in concept:
-                        continue
-                    
+                for conc_dir in concept_dirs:
+                    manifest = None
+                    if self.incremental:
+                        manifest = self._check_concept(disc_dir.name, mod_dir.name, conc_dir, tipo)
+                        if manifest is None:
+                            module_concepts.append(_concept_info(conc_dir, self._sebenta_tex(conc_dir)))
+                            continue
+
                     # Gerar sebenta
                     tex_file = self.generate_sebenta(
                         disc_dir.name,
@@ -1253,16 +1234,19 @@ class SebentaGenerator:
                     if tex_file:
                         success = self.compile_pdf(tex_file)
                         if success:
-                            module_concepts.append({
-                                'name': conc_dir.name,
-                                'path': conc_dir,
-                                'tex': tex_file,
-                                'pdf': tex_file.with_suffix('.pdf')
-                            })
+                            module_concepts.append(_concept_info(conc_dir, tex_file))
+                            if manifest:
+                                manifest.save()
                 
                 # Gerar sebenta consolidada do módulo se houver conceitos
-                if module_concepts and not concept and not self.no_module_sebenta:
-                    self.generate_module_sebenta(disc_dir.name, mod_dir.name, module_concepts)
+                if module_concepts and build_modules:
+                    manifest = None
+                    if self.incremental:
+                        manifest = self._check_module(disc_dir.name, mod_dir.name, module_concepts)
+                        if manifest is None:
+                            continue
+                    if self.generate_module_sebenta(disc_dir.name, mod_dir.name, module_concepts) and manifest:
+                        manifest.save()
         
         # Estatísticas finais
         logger.info("\n" + "="*60)
@@ -1270,6 +1254,15 @@ class SebentaGenerator:
         logger.info("="*60)
         logger.info(f"Sebentas geradas: {self.stats['generated']}")
         logger.info(f"PDFs compilados:  {self.stats['compiled']}")
+        if self.stats['passes'] > 0:
+            logger.info(f"Passagens LaTeX:  {self.stats['passes']}")
+        if self.stats['cached'] > 0:
+            logger.info(f"Da cache:         {self.stats['cached']}")
+        if self.stats['sanitize_cached'] + self.stats['sanitized'] > 0:
+            logger.info(f"Exercícios:       {self.stats['sanitize_cached']} da cache, "
+                        f"{self.stats['sanitized']} sanitizados")
+        if self.incremental:
+            logger.info(f"Já atualizadas:   {self.stats['up_to_date']}")
         logger.info(f"Ficheiros limpos: {self.stats['cleaned']}")
         if self.stats['cancelled'] > 0:
             logger.info(f"Canceladas:       {self.stats['cancelled']}")
@@ -1277,6 +1270,242 @@ class SebentaGenerator:
             logger.info(f"Erros:            {self.stats['errors']}")
         logger.info("="*60)
 
+    def _collect_concepts(self, discipline: Optional[List[str]], module: Optional[List[str]],
+                          concept: Optional[List[str]]) -> List[tuple]:
+        """Lista (disc_dir, mod_dir, [conc_dir, ...]) por módulo, aplicando os filtros."""
+        modules = []
+        # Iterar por disciplinas
+        for disc_dir in sorted(EXERCISE_DB.iterdir()):
+            if not disc_dir.is_dir() or disc_dir.name.startswith('_'):
+                continue
+            
+            if discipline and disc_dir.name not in discipline:
+                continue
+            
+            # Iterar por módulos
+            for mod_dir in sorted(disc_dir.iterdir()):
+                if not mod_dir.is_dir():
+                    continue
+                
+                if module and mod_dir.name not in module:
+                    continue
+                
+                concept_dirs = [c for c in sorted(mod_dir.iterdir())
+                                if c.is_dir() and not (concept and c.name not in concept)]
+                modules.append((disc_dir, mod_dir, concept_dirs))
+        return modules
+
+    def _merge_stats(self, stats: Dict[str, int]):
+        for key, value in stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+
+    def _scan_parallel(self, modules: List[tuple], tipo: Optional[List[str]], build_modules: bool):
+        """Gera os conceitos num pool de processos; cada sebenta de módulo é agendada
+        assim que todos os seus conceitos terminam."""
+        if not self.auto_approve and (self.preview_manager or not self.no_compile):
+            logger.warning(" --jobs: pré-visualização e confirmações desativadas (modo paralelo)")
+        options = {
+            'no_compile': self.no_compile,
+            'no_module_sebenta': self.no_module_sebenta,
+            'dump_tex': self.dump_tex,
+            'module_mode': self.module_mode,
+            'diagnose': self.diagnose,
+        }
+        total = sum(len(dirs) for _, _, dirs in modules)
+        logger.info(f" A gerar {total} conceitos com {self.jobs} processos...")
+
+        remaining: Dict[tuple, int] = {}
+        built: Dict[tuple, List[Dict]] = {}
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {}
+
+            def schedule_module(key: tuple):
+                if not built[key] or not build_modules:
+                    return
+                concepts = sorted(built[key], key=lambda c: c['name'])
+                manifest = None
+                if self.incremental:
+                    manifest = self._check_module(key[0], key[1], concepts)
+                    if manifest is None:
+                        return
+                future = pool.submit(_build_module_job, options, key[0], key[1], concepts)
+                futures[future] = ('module', key, None, manifest)
+
+            for disc_dir, mod_dir, concept_dirs in modules:
+                key = (disc_dir.name, mod_dir.name)
+                remaining[key] = 0
+                built[key] = []
+                for conc_dir in concept_dirs:
+                    manifest = None
+                    if self.incremental:
+                        manifest = self._check_concept(key[0], key[1], conc_dir, tipo)
+                        if manifest is None:
+                            built[key].append(_concept_info(conc_dir, self._sebenta_tex(conc_dir)))
+                            continue
+                    future = pool.submit(_build_concept_job, options, key[0], key[1], conc_dir.name, conc_dir, tipo)
+                    futures[future] = ('concept', key, conc_dir.name, manifest)
+                    remaining[key] += 1
+                if remaining[key] == 0:
+                    schedule_module(key)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, key, name, manifest = futures.pop(future)
+                    info = None
+                    try:
+                        # (info do conceito ou sucesso do módulo, estatísticas)
+                        info, stats = future.result()
+                    except Exception as e:
+                        logger.error(f"   Erro em {'/'.join(key)}/{name or 'módulo'}: {e}")
+                        stats = {'errors': 1}
+                    self._merge_stats(stats)
+                    if info and manifest:
+                        manifest.save()
+                    if kind != 'concept':
+                        continue
+                    if info:
+                        built[key].append(info)
+                    remaining[key] -= 1
+                    if remaining[key] == 0:
+                        schedule_module(key)
+
+    def _sebenta_tex(self, concept_path: Path) -> Path:
+        rel = concept_path.relative_to(EXERCISE_DB)
+        return SEBENTAS_DB / rel / f"sebenta_{concept_path.name}.tex"
+
+    def _expected_output(self, tex_file: Path) -> Path:
+        """PDF em pdfs/ (ou o .tex com --no-compile) que uma compilação bem sucedida deixa."""
+        if self.no_compile:
+            return tex_file
+        return tex_file.parent / "pdfs" / f"{tex_file.stem}.pdf"
+
+    def _build_params(self, discipline: str, module: str, **extra) -> Dict:
+        module_info = self.modules_config.get(discipline, {}).get(module, {}) if self.modules_config else {}
+        params = {
+            'module_config': json.dumps(module_info, sort_keys=True, default=str),
+            'compile': not self.no_compile,
+        }
+        params.update(extra)
+        return params
+
+    def concept_inputs(self, concept_path: Path) -> List[Path]:
+        """Ficheiros de que depende a sebenta de um conceito: exercícios, subvariants,
+        imagens incluídas, metadata.json, template e o próprio gerador."""
+        inputs = [TEMPLATE_PATH, Path(__file__).resolve()]
+        inputs.extend(sorted(concept_path.rglob('metadata.json')))
+        for exercise in self.get_concept_metadata(concept_path)['exercises']:
+            inputs.append(exercise)
+            if exercise.name == 'main.tex':
+                inputs.extend(sorted(exercise.parent.glob('subvariant_*.tex')))
+            if dependencies:
+                inputs.extend(dependencies(exercise)[0])
+        inputs = list(dict.fromkeys(p for p in inputs if p.exists()))
+        self._concept_inputs[concept_path] = inputs
+        return inputs
+
+    def _report(self, label: str, reasons: List[str]):
+        shown = '; '.join(reasons[:5]) + (f" (+{len(reasons) - 5})" if len(reasons) > 5 else "")
+        logger.info(f"   ↻ {label}: {shown}")
+
+    def _check_concept(self, discipline: str, module: str, concept_path: Path,
+                       tipo: Optional[List[str]]) -> Optional[BuildManifest]:
+        """Manifesto a gravar depois de refazer o conceito, ou None se já está atualizado."""
+        tex_file = self._sebenta_tex(concept_path)
+        manifest = BuildManifest(tex_file.parent, tex_file.stem)
+        params = self._build_params(discipline, module, tipo=sorted(tipo) if tipo else None)
+        reasons = manifest.check(self.concept_inputs(concept_path), params, self._expected_output(tex_file))
+        pages_pdf = tex_file.parent / "pdfs" / f"{PAGES_PREFIX}{concept_path.name}.pdf"
+        if not reasons and self.module_mode == 'merge' and not self.no_compile and not pages_pdf.exists():
+            reasons = [f"{pages_pdf.name} em falta"]
+        if not reasons:
+            logger.info(f"   ✓ {discipline}/{module}/{concept_path.name} atualizado")
+            self.stats['up_to_date'] += 1
+            return None
+        self._report(f"{discipline}/{module}/{concept_path.name}", reasons)
+        return manifest
+
+    def _check_module(self, discipline: str, module: str, concepts: List[Dict]) -> Optional[BuildManifest]:
+        tex_file = SEBENTAS_DB / discipline / module / f"sebenta_modulo_{module}.tex"
+        manifest = BuildManifest(tex_file.parent, tex_file.stem)
+        inputs = [TEMPLATE_PATH, Path(__file__).resolve()]
+        for concept_info in concepts:
+            path = concept_info['path']
+            inputs.extend(self._concept_inputs.get(path) or self.concept_inputs(path))
+        params = self._build_params(discipline, module, concepts=[c['name'] for c in concepts],
+                                    mode=self.module_mode)
+        reasons = manifest.check(dict.fromkeys(inputs), params, self._expected_output(tex_file))
+        if not reasons:
+            logger.info(f"   ✓ sebenta do módulo {discipline}/{module} atualizada")
+            self.stats['up_to_date'] += 1
+            return None
+        self._report(f"módulo {discipline}/{module}", reasons)
+        return manifest
+
+    def generate_dirty(self, tipo: Optional[List[str]] = None) -> int:
+        """Regenera apenas as sebentas marcadas por watch_exercises.py; devolve quantas ficaram limpas."""
+        from watch_exercises import clear_dirty_sebentas, load_dirty_sebentas
+
+        dirty = load_dirty_sebentas()
+        if not dirty:
+            logger.info(" Nenhuma sebenta por atualizar")
+            return 0
+        done = []
+        for key in sorted(dirty):
+            disc_name, mod_name, conc_name = key.split('/')
+            concept_path = EXERCISE_DB / key
+            if not concept_path.is_dir():
+                # conceito removido: nada a gerar
+                done.append(key)
+                continue
+            tex_file = self.generate_sebenta(disc_name, mod_name, conc_name, concept_path, tipo=tipo)
+            if tex_file and self.compile_pdf(tex_file):
+                self.stats['generated'] += 1
+                self.stats['compiled'] += 1
+                done.append(key)
+        clear_dirty_sebentas(done)
+        logger.info(f" Sebentas atualizadas: {len(done)}/{len(dirty)}")
+        return len(done)
+
+
+def _concept_info(concept_path: Path, tex_file: Path) -> Dict:
+    return {
+        'name': concept_path.name,
+        'path': concept_path,
+        'tex': tex_file,
+        'pdf': tex_file.with_suffix('.pdf')
+    }
+
+
+# Gerador reutilizado por cada processo do pool (modo --jobs)
+_worker_generator: Optional[SebentaGenerator] = None
+
+
+def _pool_generator(options: Dict) -> SebentaGenerator:
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = SebentaGenerator(no_preview=True, auto_approve=True, **options)
+    # estatísticas por tarefa; o processo principal soma-as
+    _worker_generator.stats = dict.fromkeys(_worker_generator.stats, 0)
+    return _worker_generator
+
+
+def _build_concept_job(options: Dict, discipline: str, module: str, concept: str,
+                       concept_path: Path, tipo: Optional[List[str]]):
+    """Gera e compila a sebenta de um conceito; devolve (info ou None, estatísticas)."""
+    generator = _pool_generator(options)
+    tex_file = generator.generate_sebenta(discipline, module, concept, concept_path, tipo=tipo)
+    info = None
+    if tex_file and generator.compile_pdf(tex_file):
+        info = _concept_info(concept_path, tex_file)
+    return info, generator.stats
+
+
+def _build_module_job(options: Dict, discipline: str, module: str, concepts: List[Dict]):
+    generator = _pool_generator(options)
+    tex_file = generator.generate_module_sebenta(discipline, module, concepts)
+    return tex_file is not None, generator.stats
+
 
 def staged_to_paths(staged_list: list) -> list:
     """Converte uma lista de staged IDs ou paths em caminhos de exercícios temporários.
@@ -1425,6 +1654,33 @@ def main():
         action='append',
         help='Fornecer IP(s) de exercícios (formato D.M.C.T.E) para gerar sebentas por IP'
     )
+    parser.add_argument(
+        '--dirty',
+        action='store_true',
+        help='Gerar apenas as sebentas marcadas como desatualizadas por watch_exercises.py'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Número de conceitos gerados/compilados em paralelo (0 = nº de CPUs; implica --auto-approve)'
+    )
+    parser.add_argument(
+        '--module-mode',
+        choices=['full', 'merge'],
+        default='full',
+        help='Sebenta do módulo: full = recompilar todos os exercícios; merge = juntar os PDFs dos conceitos'
+    )
+    parser.add_argument(
+        '--diagnose',
+        action='store_true',
+        help='Se a compilação falhar, isolar por bisseção o(s) exercício(s) responsáveis (relatório JSON)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Refazer apenas as sebentas cujos exercícios, metadata, template ou configuração mudaram'
+    )
     parser.add_argument(
         '--staged',
         action='append',
@@ -1504,9 +1760,17 @@ def main():
         no_module_sebenta=args.no_module_sebenta,
         no_preview=args.no_preview,
         auto_approve=args.auto_approve,
-        dump_tex=args.dump_tex
+        dump_tex=args.dump_tex,
+        jobs=args.jobs,
+        incremental=args.incremental,
+        module_mode=args.module_mode,
+        diagnose=args.diagnose
     )
     
+    if args.dirty:
+        generator.generate_dirty(tipo=args.tipo)
+        return
+
     generator.scan_and_generate(
         discipline=args.discipline,
         module=args.module,
@@ -15,6 +15,9 @@ Uso:
     
     # Usando wildcard para selecionar múltiplos
     python generate_test_from_ips.py --ips "1.2.3.4.*"
+
+    # Intervalos e conjuntos (conceitos 3 a 5 e 8 do módulo 1.2)
+    python generate_test_from_ips.py --ips "1.2.3-5+8.*"
     
     # Com metadados personalizados
     python generate_test_from_ips.py --ips 1.2.3.4.5 --title "Teste de Funções" --author "Prof. Silva"
@@ -27,6 +30,8 @@ Flags:
     --no-preview       Não mostrar preview antes de compilar
     --auto-approve     Aprovar automaticamente
     --no-compile       Apenas gerar .tex, não compilar PDF
+    --class            Turma (registada no ledger de exposição)
+    --no-ledger        Não registar os exercícios no ledger de exposição
 """
 
 import sys
@@ -59,11 +64,20 @@ if not logger.handlers:
 logger.setLevel(logging.INFO)
 logger.propagate = False
 
+sys.path.insert(0, str(EXERCISE_DB / "_tools"))
+from ip_trie import IPTrie, PathExistenceCache
+from compile_cache import compile_with_cache
+from latex_runner import run_latex
+from exposure_ledger import record_test
+from path_lookup import resolve_exercise
+
 class SimpleIPResolver:
     """Simple IP resolver that doesn't use complex module imports."""
 
     def __init__(self):
         self.registry_data = None
+        self.trie = IPTrie()
+        self.path_cache = PathExistenceCache()
         self.load_registry()
 
     def load_registry(self):
@@ -75,66 +89,24 @@ class SimpleIPResolver:
         try:
             with open(REGISTRY_PATH, 'r', encoding='utf-8') as f:
                 self.registry_data = json.load(f)
+            self.trie = IPTrie(self.registry_data.get('ips', {}))
+            self.path_cache.clear()
             logger.info("✅ Registry loaded")
         except Exception as e:
             logger.error(f"Failed to load registry: {e}")
 
     def resolve_to_paths(self, ip_list: List[str]) -> List[Path]:
-        """Resolve IPs to absolute paths."""
+        """Resolve IPs (exact, wildcard, range or set) to absolute paths of existing exercises."""
         if not self.registry_data:
             return []
 
-        ips_map = self.registry_data.get('ips', {})
         resolved = []
-
-        for ip_token in ip_list:
-            ip_token = ip_token.strip()
-
-            # Wildcard support
-            if ip_token.endswith('*'):
-                prefix = ip_token[:-1]
-                for ip_key, ip_data in ips_map.items():
-                    if ip_key.startswith(prefix):
-                        path_str = ip_data.get('path', '')
-                        if path_str:
-                            full_path = EXERCISE_DB / path_str
-                            if full_path.exists():
-                                resolved.append(full_path)
-            else:
-                # Exact match
-                ip_data = ips_map.get(ip_token)
-                if ip_data:
-                    path_str = ip_data.get('path', '')
-                    if path_str:
-                        full_path = EXERCISE_DB / path_str
-                        if full_path.exists():
-                            resolved.append(full_path)
-
-        return resolved
-        
-        for ip_token in ip_list:
-            ip_token = ip_token.strip()
-            
-            # Wildcard support
-            if ip_token.endswith('*'):
-                prefix = ip_token[:-1]
-                for ip_key, ip_data in ips_map.items():
-                    if ip_key.startswith(prefix):
-                        path_str = ip_data.get('path', '')
-                        if path_str:
-                            full_path = EXERCISE_DB / path_str
-                            if full_path.exists():
-                                resolved.append(full_path)
-            else:
-                # Exact match
-                ip_data = ips_map.get(ip_token)
-                if ip_data:
-                    path_str = ip_data.get('path', '')
-                    if path_str:
-                        full_path = EXERCISE_DB / path_str
-                        if full_path.exists():
-                            resolved.append(full_path)
-        
+        for ip in self.trie.resolve(ip_list):
+            path_str = self.trie.get(ip).get('path', '')
+            if path_str:
+                full_path = EXERCISE_DB / path_str
+                if self.path_cache.exists(full_path):
+                    resolved.append(full_path)
         return resolved
 
 try:
@@ -156,10 +128,13 @@ except ImportError:
 class IPTestGenerator:
     """Gerador de testes baseado em IPs."""
     
-    def __init__(self, no_preview: bool = False, auto_approve: bool = False, no_compile: bool = False):
+    def __init__(self, no_preview: bool = False, auto_approve: bool = False, no_compile: bool = False,
+                 class_name: str = '', record_exposure: bool = True):
         self.no_preview = no_preview
         self.auto_approve = auto_approve
         self.no_compile = no_compile
+        self.class_name = class_name
+        self.record_exposure = record_exposure
         self.preview_manager = PreviewManager(auto_open=True) if PreviewManager and not no_preview else None
         
     def resolve_ips(self, ip_list: List[str]) -> List[Path]:
@@ -375,34 +350,47 @@ class IPTestGenerator:
             if not self.preview_manager.show_and_confirm(preview_content, f"Teste: {title}"):
                 logger.warning("❌ Geração cancelada pelo utilizador")
                 return None
-        
+
         # 6. Compilar (se habilitado)
-        if not self.no_compile:
+        if self.no_compile:
+            self.record_exposure_of(exercise_paths, output_dir)
+        else:
             logger.info("🔨 Compilando PDF...")
+            pdf_path = output_dir / "test.pdf"
+            result = None
+
+            def run_pdflatex() -> bool:
+                nonlocal result
+                result, passes = run_latex(["pdflatex", "-interaction=nonstopmode", "test.tex"], output_dir, timeout=60)
+                logger.info(f"🔁 pdflatex: {passes} passagem(ns)")
+                return result.returncode == 0 and pdf_path.exists()
+
             try:
-                result = subprocess.run(
-                    ["pdflatex", "-interaction=nonstopmode", "test.tex"],
-                    cwd=str(output_dir),
-                    capture_output=True,
-                    timeout=60
-                )
+                _, cache_hit = compile_with_cache(test_tex, run_pdflatex, options=('-interaction=nonstopmode', 'reruns=auto'))
+                if cache_hit:
+                    logger.info("♻️ PDF reutilizado da cache de compilação")
                 
-                if result.returncode == 0:
-                    pdf_path = output_dir / "test.pdf"
+                if result is None or result.returncode == 0:
                     if pdf_path.exists():
                         logger.info(f"✅ PDF compilado: {pdf_path}")
                         self.cleanup_temp_files(output_dir)
+                        self.record_exposure_of(exercise_paths, output_dir)
                         return pdf_path
                     else:
                         logger.error("❌ PDF não foi gerado")
                 else:
                     logger.error(f"❌ Erro na compilação LaTeX (exit code {result.returncode})")
-                    logger.debug(result.stdout.decode('utf-8', errors='ignore'))
+                    logger.debug(result.stdout)
             except Exception as e:
                 logger.error(f"❌ Exceção durante compilação: {e}")
         
         return test_tex
     
+    def record_exposure_of(self, exercise_paths: List[Path], output_dir: Path):
+        """Regista no ledger de exposição os exercícios de um teste gerado (PDF, ou .tex com --no-compile)."""
+        if self.record_exposure:
+            record_test(exercise_paths, output_dir.name, self.class_name, source='generate_test_from_ips')
+
     def cleanup_temp_files(self, directory: Path):
         """Remove ficheiros temporários do LaTeX."""
         temp_extensions = {'.aux', '.log', '.out', '.fls', '.fdb_latexmk', '.synctex.gz'}
@@ -424,6 +412,8 @@ def main():
     parser.add_argument("--no-preview", action="store_true", help="Não mostrar preview")
     parser.add_argument("--auto-approve", action="store_true", help="Aprovar automaticamente")
     parser.add_argument("--no-compile", action="store_true", help="Não compilar PDF")
+    parser.add_argument("--class", dest="class_name", default="", help="Turma a que o teste se destina (ledger de exposição)")
+    parser.add_argument("--no-ledger", action="store_true", help="Não registar os exercícios no ledger de exposição")
     
     args = parser.parse_args()
     
@@ -445,7 +435,9 @@ def main():
     generator = IPTestGenerator(
         no_preview=args.no_preview,
         auto_approve=args.auto_approve,
-        no_compile=args.no_compile
+        no_compile=args.no_compile,
+        class_name=args.class_name,
+        record_exposure=not args.no_ledger,
     )
     
     # If exercise paths provided, convert them to absolute Paths and pass to generator
@@ -458,7 +450,7 @@ def main():
             Strategies (in order):
             - If the string contains 'ExerciseDatabase', take the substring after it and join with EXERCISE_DB.
             - Treat the string as an absolute or repo-relative path.
-            - Try to locate the exercise by name under EXERCISE_DB using rglob (first match).
+            - Look the name/id up in the exercise path table (exact, case/accent-insensitive, unique prefix).
             - As a last resort return the repo-relative candidate (may not exist).
             """
             s = p.strip()
@@ -481,13 +473,12 @@ def main():
             if cand.exists():
                 return cand
 
-            # 3) try searching by basename under ExerciseDatabase
+            # 3) look the name up in the exercise path table (no tree walk)
             try:
-                name = Path(s).name
-                matches = list(EXERCISE_DB.rglob(name))
-                logger.info(f"normalize: searching EXERCISE_DB for name='{name}' -> found {len(matches)} matches")
-                if matches:
-                    return matches[0]
+                found = resolve_exercise(s, EXERCISE_DB)
+                logger.info(f"normalize: path lookup for '{s}' -> {found}")
+                if found is not None:
+                    return found
             except Exception:
                 pass
 
@@ -643,6 +634,7 @@ def main():
         include_exercises_ref = "QA2/tex/exercises"
 
         # 4) Generate a test.tex in the output root that includes the QA2 exercises
+        test_written = False
         try:
             if TEMPLATE_PATH.exists():
                 template_content = TEMPLATE_PATH.read_text(encoding='utf-8')
@@ -689,12 +681,17 @@ def main():
 
                 test_tex = output_dir / "test.tex"
                 test_tex.write_text(tc, encoding='utf-8')
+                test_written = True
                 logger.info(f"✅ Teste gerado: {test_tex}")
             else:
                 logger.error(f"❌ Template não encontrado: {TEMPLATE_PATH}")
         except Exception as e:
             logger.error(f"❌ Erro ao gerar test.tex: {e}")
 
+        # este modo só gera o .tex: regista a exposição se foi escrito
+        if ex_paths and not args.no_ledger and test_written:
+            record_test(ex_paths, output_dir.name, args.class_name, source='generate_test_from_ips')
+
         result = output_dir
     else:
         result = generator.generate_test(
@@ -8,6 +8,8 @@ Behavior:
 - Reads env `TEST_SELECTED_EXERCISES` (comma-separated IDs).
 - Loads exercise content from ExerciseDatabase index.json and .tex files
 - Honors env flags: `TEST_NO_PREVIEW` (1=true), `TEST_NO_COMPILE` (1=true).
+- Records the exercises in the exposure ledger (`TEST_CLASS` names the class,
+  `TEST_NO_LEDGER=1` skips it).
 - Writes `SebentasDatabase/tests/<module>/<concept>/test_<module>_<concept>.tex`.
 - If compile requested and `pdflatex` is available, attempts to compile.
 """
@@ -23,6 +25,33 @@ REPO_ROOT = Path(__file__).resolve().parent.parent.parent
 SEBENTA_DIR = REPO_ROOT / "SebentasDatabase"
 EXERCISE_DB = REPO_ROOT / "ExerciseDatabase"
 
+# Shared ExerciseDatabase helpers (exercise catalog, etc.)
+sys.path.insert(0, str(EXERCISE_DB / "_tools"))
+from exercise_index import ExerciseIndex
+from compile_cache import compile_with_cache
+from latex_runner import run_latex
+from exercise_cache import get_exercise_cache
+from exposure_ledger import record_test
+from path_lookup import resolve_exercise
+
+# Legacy field names still found in older index entries
+FIELD_ALIASES = {
+    'discipline': ('discipline', 'subject'),
+    'module': ('module', 'tema'),
+    'concept': ('concept', 'subtopic'),
+}
+
+
+def _exercise_field(ex: dict, field: str):
+    """Read a classification field, preferring the nested `classification` block."""
+    classification = ex.get('classification', {}) if isinstance(ex, dict) else {}
+    if classification.get(field):
+        return classification[field]
+    for name in FIELD_ALIASES.get(field, (field,)):
+        if ex.get(name):
+            return ex[name]
+    return None
+
 
 class TestTemplate:
     def __init__(self, module: str = '', concept: str = '', exercises: list = None,
@@ -34,65 +63,87 @@ class TestTemplate:
         self.no_preview = no_preview
         self.no_compile = no_compile
         self.num_questions = num_questions
+        # exposure ledger: which class saw these exercises
+        self.class_name = kwargs.get('class_name', '')
+        self.record_exposure = kwargs.get('record_exposure', True)
         self.index_data = self.load_index()
         # optional runtime attributes used by tests
         self.temp_dir = None
         self.tex_file = None
 
     def load_index(self):
-        """Load ExerciseDatabase index.json"""
+        """Load ExerciseDatabase index (SQLite catalog if initialised, else index.json + journal)"""
+        try:
+            from exercise_catalog import open_catalog
+            catalog = open_catalog(EXERCISE_DB)
+            if catalog is not None:
+                with catalog:
+                    return catalog.to_index()
+        except Exception as e:
+            print(f"Warning: Could not load exercise catalog: {e}")
+
         index_file = EXERCISE_DB / "index.json"
         if not index_file.exists():
             return {'exercises': []}
         try:
-            with open(index_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            from index_journal import read_index
+            return read_index(index_file)
         except Exception as e:
             print(f"Warning: Could not load index.json: {e}")
             return {'exercises': []}
 
+    @property
+    def exercise_index(self) -> ExerciseIndex:
+        """Secondary indexes over `index_data`, rebuilt if `index_data` is replaced."""
+        if getattr(self, '_exercise_index_src', None) is not self.index_data:
+            self._exercise_index = ExerciseIndex.from_index(self.index_data, getter=_exercise_field)
+            self._exercise_index_src = self.index_data
+        return self._exercise_index
+
     def find_exercise_path(self, exercise_id: str) -> Path:
         """Find the .tex file path for a given exercise ID"""
-        for ex in self.index_data.get('exercises', []):
-            if ex.get('id') == exercise_id:
-                # Try 'path' field first (common in index.json)
-                ex_path = ex.get('path', '')
-                if not ex_path:
-                    # Fallback to 'source_file'
-                    ex_path = ex.get('source_file', '')
+        for ex in self.exercise_index.get_all(exercise_id):
+            # Try 'path' field first (common in index.json)
+            ex_path = ex.get('path', '')
+            if not ex_path:
+                # Fallback to 'source_file'
+                ex_path = ex.get('source_file', '')
+            
+            if ex_path:
+                # Normalize path separators for Windows
+                ex_path = ex_path.replace('\\', '/').replace('//', '/')
                 
-                if ex_path:
-                    # Normalize path separators for Windows
-                    ex_path = ex_path.replace('\\', '/').replace('//', '/')
-                    
-                    # Check if path is a directory (exercise with subvariants)
-                    full_path = EXERCISE_DB / ex_path
-                    
-                    if full_path.exists():
-                        if full_path.is_dir():
-                            # Look for main.tex inside the directory
-                            main_tex = full_path / "main.tex"
-                            if main_tex.exists():
-                                return main_tex
-                        else:
-                            # It's a direct .tex file
-                            return full_path
+                # Check if path is a directory (exercise with subvariants)
+                full_path = EXERCISE_DB / ex_path
+                
+                if full_path.exists():
+                    if full_path.is_dir():
+                        # Look for main.tex inside the directory
+                        main_tex = full_path / "main.tex"
+                        if main_tex.exists():
+                            return main_tex
+                    else:
+                        # It's a direct .tex file
+                        return full_path
+                
+                # Try adding .tex extension if not present
+                if not ex_path.endswith('.tex'):
+                    tex_file = EXERCISE_DB / f"{ex_path}.tex"
+                    if tex_file.exists():
+                        return tex_file
                     
-                    # Try adding .tex extension if not present
-                    if not ex_path.endswith('.tex'):
-                        tex_file = EXERCISE_DB / f"{ex_path}.tex"
-                        if tex_file.exists():
-                            return tex_file
-                        
-                        # Try looking for main.tex in a directory with that name
-                        dir_path = EXERCISE_DB / ex_path
-                        if dir_path.is_dir():
-                            main_tex = dir_path / "main.tex"
-                            if main_tex.exists():
-                                return main_tex
+                    # Try looking for main.tex in a directory with that name
+                    dir_path = EXERCISE_DB / ex_path
+                    if dir_path.is_dir():
+                        main_tex = dir_path / "main.tex"
+                        if main_tex.exists():
+                            return main_tex
         
-        # Fallback: search by ID pattern in filesystem
-        return None
+        # Fallback: exercise not in the index (or moved) -> path lookup table
+        found = resolve_exercise(exercise_id, EXERCISE_DB, prefix=False)
+        if found is not None and found.is_dir():
+            found = found / "main.tex"
+        return found if found is not None and found.exists() else None
 
     def load_exercise_content(self, exercise_id: str) -> str:
         """Load the actual LaTeX content of an exercise"""
@@ -102,12 +153,8 @@ class TestTemplate:
             return f"\\item \\textbf{{Exercício {exercise_id}}} (ficheiro não encontrado)"
         
         try:
-            with open(tex_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            # If it's a main.tex with subvariants, process the includes
-            if tex_path.name == 'main.tex' and tex_path.parent.is_dir():
-                content = self.process_subvariant_inputs(content, tex_path.parent)
+            # Sanitized body (main.tex with its subvariants inlined), shared with the other generators
+            content = get_exercise_cache().body(tex_path)
             
             # Remove metadata comments at the top (lines starting with % meta:)
             lines = content.split('\n')
@@ -135,24 +182,6 @@ class TestTemplate:
         except Exception as e:
             return f"\\item \\textbf{{Erro ao carregar exercício {exercise_id}: {e}}}"
 
-    def process_subvariant_inputs(self, content: str, exercise_dir: Path) -> str:
-        """Process \\input{subvariant_N} and replace with actual content"""
-        def replace_input(match):
-            subvariant_name = match.group(1)
-            subvariant_file = exercise_dir / f"{subvariant_name}.tex"
-            
-            if subvariant_file.exists():
-                try:
-                    with open(subvariant_file, 'r', encoding='utf-8') as f:
-                        return f.read().strip()
-                except Exception:
-                    return f"% Erro ao carregar {subvariant_name}"
-            else:
-                return f"% Subvariant não encontrado: {subvariant_name}"
-        
-        pattern = r'\\input\{(subvariant_\d+)\}'
-        return re.sub(pattern, replace_input, content)
-
     def generate_tex(self) -> str:
         # Use proper LaTeX template from SebentasDatabase if available
         template_path = SEBENTA_DIR / "_templates" / "test_template.tex"
@@ -226,30 +255,17 @@ class TestTemplate:
 
     def load_exercises(self, discipline: str, module: str, concept: str | None):
         """Return a list of exercise metadata dicts filtered by discipline/module/concept."""
-        results = []
-        for ex in self.index_data.get('exercises', []):
-            classification = ex.get('classification', {}) if isinstance(ex, dict) else {}
-            d = classification.get('discipline') or ex.get('discipline') or ex.get('subject')
-            m = classification.get('module') or ex.get('module') or ex.get('tema') or ex.get('module')
-            c = classification.get('concept') or ex.get('concept') or ex.get('subtopic')
-
-            if discipline and d and d != discipline:
-                continue
-            if module and m and m != module:
-                continue
-            if concept and c and c != concept:
-                continue
-            results.append(ex)
-        return results
+        # Entries without a value for a filtered field are kept (legacy behaviour)
+        return self.exercise_index.query(discipline=discipline or None, module=module or None,
+                                         concept=concept or None, match_missing=True)
 
     def load_exercises_by_ids(self, ids: list[str]):
         """Return a list of exercise metadata dicts for the given ids, preserving order."""
         out = []
-        id_map = {ex.get('id'): ex for ex in self.index_data.get('exercises', [])}
         for i in ids:
-            ex = id_map.get(i)
-            if ex:
-                out.append(ex)
+            matches = self.exercise_index.get_all(i)
+            if matches:
+                out.append(matches[-1])
         return out
 
     # Selection helper expected by tests
@@ -351,6 +367,11 @@ class TestTemplate:
         with open(tex_file, 'w', encoding='utf-8') as f:
             f.write(content)
         print(f"Generated .tex: {tex_file.relative_to(REPO_ROOT)}")
+        if self.record_exposure and self.exercises:
+            record_test(self.exercises, f"{self.module}/{self.concept}/{tex_file.stem}",
+                        self.class_name, source='generate_test_template')
+        cache = get_exercise_cache()
+        print(f"Exercises: {cache.hits + cache.disk_hits} cached, {cache.misses} sanitized")
         return tex_file
 
     def compile_pdf(self, tex_file: Path) -> bool:
@@ -363,12 +384,18 @@ class TestTemplate:
             print("pdflatex not found in PATH; cannot compile PDF")
             return False
 
-        try:
-            # Run twice to settle references
-            for _ in range(2):
-                subprocess.run([pdflatex, '-interaction=nonstopmode', tex_file.name], cwd=str(tex_file.parent), check=False)
+        pdf_file = tex_file.with_suffix('.pdf')
 
-            pdf_file = tex_file.with_suffix('.pdf')
+        def run_pdflatex() -> bool:
+            # Rerun only while references settle
+            _, passes = run_latex([pdflatex, '-interaction=nonstopmode', tex_file.name], tex_file.parent, timeout=120)
+            print(f"pdflatex: {passes} pass(es)")
+            return pdf_file.exists()
+
+        try:
+            _, cache_hit = compile_with_cache(tex_file, run_pdflatex, options=('-interaction=nonstopmode', 'reruns=auto'))
+            if cache_hit:
+                print("PDF reused from compile cache")
             if pdf_file.exists():
                 pdfs_dir = tex_file.parent / 'pdfs'
                 pdfs_dir.mkdir(exist_ok=True)
@@ -420,7 +447,9 @@ def main():
     exercises = parse_env_selected_exercises()
 
     template = TestTemplate(module=args.module or 'misc', concept=args.concept or 'general',
-                            exercises=exercises, no_preview=no_preview, no_compile=no_compile)
+                            exercises=exercises, no_preview=no_preview, no_compile=no_compile,
+                            class_name=os.environ.get('TEST_CLASS', ''),
+                            record_exposure=not env_flag('TEST_NO_LEDGER'))
 
     tex_file = template.save()
 
@@ -19,6 +19,8 @@ Opções:
   --discipline/module/concept/tipo permitem filtrar o pool de exercícios
   --no-preview  Não mostrar preview antes de compilar
   --auto-approve Aprovar automaticamente sem pedir confirmação
+  --batch       Manifesto JSON/YAML com vários conceitos (índice e templates carregados
+                uma vez, compilação num pool de --jobs workers, resumo com tempos)
 """
 
 from __future__ import annotations
@@ -39,6 +41,9 @@ import subprocess
 import random
 import os
 import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
@@ -54,6 +59,26 @@ except Exception:
     create_test_preview = None
     print("AVISO: Sistema de preview nao disponivel - a continuar sem pre-visualizacao")
 
+try:
+    from exercise_index import ExerciseIndex
+except Exception:
+    ExerciseIndex = None
+
+try:
+    from compile_cache import compile_with_cache
+except Exception:
+    compile_with_cache = None
+
+from latex_runner import run_latex
+from latex_format import package_preamble
+from tikz_cache import FIGURES_DIRNAME, get_tikz_cache
+from compile_diagnosis import diagnose_file, source_marker
+from latex_sanitize import close_truncated
+from exercise_cache import get_exercise_cache
+from exercise_selection import select_with_constraints
+from version_balance import select_versions
+from exposure_ledger import ExposureFilter, load_exposure, record_test
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 EXERCISE_INDEX = PROJECT_ROOT / "ExerciseDatabase" / "index.json"
 SEBENTAS_DB = PROJECT_ROOT / "SebentasDatabase"
@@ -102,6 +127,22 @@ def find_config(discipline: Optional[str], module: Optional[str], concept: Optio
 
 
 def load_index(path: Path) -> Dict[str, Any]:
+    # Use the SQLite catalog next to index.json when it has been initialised
+    try:
+        from exercise_catalog import open_catalog
+        catalog = open_catalog(path.parent)
+    except Exception:
+        catalog = None
+    if catalog is not None:
+        with catalog:
+            return catalog.to_index()
+    # Pending index.journal records are replayed over index.json
+    try:
+        from index_journal import read_index
+    except ImportError:
+        read_index = None
+    if read_index is not None:
+        return read_index(path)
     with path.open('r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -111,25 +152,52 @@ def load_config(path: Path) -> Dict[str, Any]:
         return json.load(f)
 
 
+def candidate_pool(exercises: Any, filters: Dict[str, Optional[str]]) -> List[Dict[str, Any]]:
+    # Apply explicit CLI filters; `exercises` may be a prebuilt ExerciseIndex
+    # so repeated selections (multiple versions) reuse the same posting lists
+    if ExerciseIndex is not None:
+        index = exercises if isinstance(exercises, ExerciseIndex) else ExerciseIndex(exercises)
+        pool = index.query(
+            discipline=filters.get('discipline') or None,
+            module=filters.get('module') or None,
+            concept=filters.get('concept') or None,
+            tipo=filters.get('tipo') or None,
+        )
+    else:
+        pool = []
+        for ex in exercises:
+            if filters.get('discipline') and ex.get('discipline') != filters['discipline']:
+                continue
+            if filters.get('module') and ex.get('module') != filters['module']:
+                continue
+            if filters.get('concept') and ex.get('concept') != filters['concept']:
+                continue
+            if filters.get('tipo') and ex.get('tipo') != filters['tipo']:
+                continue
+            pool.append(ex)
+    return pool
+
+
 def select_by_config(
-    exercises: List[Dict[str, Any]],
+    exercises: Any,
     config: Dict[str, Any],
     filters: Dict[str, Optional[str]],
     rng: random.Random,
+    exposure: Optional[ExposureFilter] = None,
 ) -> List[Dict[str, Any]]:
-    # Apply explicit CLI filters first
-    pool = []
-    for ex in exercises:
-        if filters.get('discipline') and ex.get('discipline') != filters['discipline']:
-            continue
-        if filters.get('module') and ex.get('module') != filters['module']:
-            continue
-        if filters.get('concept') and ex.get('concept') != filters['concept']:
-            continue
-        if filters.get('tipo') and ex.get('tipo') != filters['tipo']:
-            continue
-        pool.append(ex)
+    return select_from_pool(candidate_pool(exercises, filters), config, rng, exposure)
 
+
+def select_from_pool(
+    pool: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    rng: random.Random,
+    exposure: Optional[ExposureFilter] = None,
+) -> List[Dict[str, Any]]:
+    # Recently used exercises (exposure ledger) are dropped or moved to the back
+    exposure = exposure or None
+    if exposure is not None:
+        pool = exposure.admit(pool)
     if not pool:
         return []
 
@@ -138,6 +206,28 @@ def select_by_config(
     per_tipo = config.get('per_tipo') or {}
     shuffle = bool(config.get('shuffle', True))
 
+    # A "constraints" block (points, difficulty, tags, per-concept cap) replaces per_tipo/count
+    if config.get('constraints'):
+        result = None
+        if exposure is not None and exposure.mode == 'penalize':
+            # Try the unused exercises first; fall back to the full pool
+            fresh = exposure.fresh(pool)
+            if len(fresh) < len(pool):
+                result = select_with_constraints(fresh, config, rng)
+                if not result.feasible:
+                    result = None
+        if result is None:
+            result = select_with_constraints(pool, config, rng)
+        if not result.feasible:
+            print('  [RESTRIÇÕES] Nenhuma seleção satisfaz a config:')
+            for reason in result.reasons:
+                print(f'    - {reason}')
+            return []
+        selected = result.selected
+        if shuffle:
+            rng.shuffle(selected)
+        return selected
+
     # If per_tipo specified, pick from each tipo
     if per_tipo:
         # Group by tipo
@@ -152,20 +242,27 @@ def select_by_config(
                 continue
             if shuffle:
                 rng.shuffle(candidates)
+            if exposure is not None:
+                candidates = exposure.order(candidates)
             selected.extend(candidates[:count])
 
         # If config specifies total count and selection less than that, fill from remaining
         total_count = config.get('count')
         if total_count and len(selected) < total_count:
-            remaining = [e for e in pool if e not in selected]
+            chosen = {id(e) for e in selected}
+            remaining = [e for e in pool if id(e) not in chosen]
             if shuffle:
                 rng.shuffle(remaining)
+            if exposure is not None:
+                remaining = exposure.order(remaining)
             selected.extend(remaining[: (total_count - len(selected)) ])
 
     else:
         # No per_tipo: use count or include all
         if shuffle:
             rng.shuffle(pool)
+        if exposure is not None:
+            pool = exposure.order(pool)
         if config.get('count'):
             selected = pool[: config['count']]
         else:
@@ -174,40 +271,23 @@ def select_by_config(
     return selected
 
 
+# Templates read once per run; every combo/version fills the same text
+_templates: Dict[Path, str] = {}
+
+
 def load_template(path: Path) -> str:
-    if not path.exists():
-        raise FileNotFoundError(f"Template not found: {path}")
-    return path.read_text(encoding='utf-8')
-
-
-def build_test_content(selected: List[Dict[str, Any]], repo_root: Path, config: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Path]]:
-    def sanitize_tex(content: str) -> str:
-        # Heuristic sanitizer to avoid runaway LaTeX arguments from truncated exercises
-        # - normalize line endings
-        # - ensure file ends with a newline
-        # - balance braces by appending closing '}' if necessary
-        # - fix common truncated environment closings like '\end{figure}'
-        # - attempt to close unbalanced inline math '$' if present
-        if content is None:
-            return ''
-        # Normalize line endings
-        content = content.replace('\r\n', '\n')
-        content = content.replace('\r', '\n')
-        # Ensure trailing newline
-        if not content.endswith('\n'):
-            content += '\n'
-        # Fix common cases where an environment end lost the closing brace, e.g. '\end{figure\n' -> '\end{figure}\n'
-        import re
-        content = re.sub(r'(\\end\{figure)(?=\s)', r"\1}", content)
-        # Balance braces
-        open_braces = content.count('{')
-        close_braces = content.count('}')
-        if open_braces > close_braces:
-            content += '}' * (open_braces - close_braces)
-        # If there's an odd number of inline dollar signs, append a closing '$' to avoid runaway math mode
-        if content.count('$') % 2 == 1:
-            content += '$\n'
-        return content
+    if path not in _templates:
+        if not path.exists():
+            raise FileNotFoundError(f"Template not found: {path}")
+        _templates[path] = path.read_text(encoding='utf-8')
+    return _templates[path]
+
+
+def build_test_content(selected: List[Dict[str, Any]], repo_root: Path, config: Optional[Dict[str, Any]] = None,
+                       externalize_figures: bool = False) -> Tuple[str, List[Path]]:
+    """Junta os exercícios selecionados; com `externalize_figures` as tikzpicture
+    passam a \\includegraphics de PDFs da cache de figuras (compilação local apenas)."""
+    figure_packages = package_preamble(load_template(TEMPLATE_PATH)) if externalize_figures else None
 
     parts: List[str] = []
     # Collect asset paths (relative to project root) that need copying into the output directory
@@ -247,10 +327,11 @@ def build_test_content(selected: List[Dict[str, Any]], repo_root: Path, config:
                 continue
 
         parts.append(f"% Exercise ID: {ex.get('id')}")
+        parts.append(source_marker(ex_path))
         try:
-            content = ex_path.read_text(encoding='utf-8')
-            # Sanitize possible truncated or malformed TeX content
-            content = sanitize_tex(content)
+            # Same sanitized body as the sebentas (cached), then close what a truncated exercise leaves open;
+            # subvariant \input{} stay as inputs, they are copied as assets below
+            content = close_truncated(get_exercise_cache().body(ex_path, expand=False))
             # Truncate extremely long contents for safety (keep first 50k chars)
             if len(content) > 50000:
                 content = content[:50000] + '\n% [truncated]\n'
@@ -288,6 +369,8 @@ def build_test_content(selected: List[Dict[str, Any]], repo_root: Path, config:
                     return match.group(0)
 
             content = re.sub(r'\\input\{([^}]+)\}', replace_input, content)
+            if figure_packages is not None:
+                content = get_tikz_cache().externalize(content, figure_packages)
 
 
         except Exception as e:
@@ -333,10 +416,19 @@ def save_tex_and_compile(
     no_preview: bool = False,
     auto_approve: bool = False,
     assets_to_copy: Optional[List[Path]] = None,
+    diagnose: bool = False,
+    build_dir: Optional[Path] = None,
+    file_label: Optional[str] = None,
 ) -> Optional[Path]:
+    # `build_dir`: private compile directory (batch mode), so parallel versions of the
+    # same concept do not clean up each other's files; pdfs/ and logs/ stay in output_dir.
+    # `file_label`: name part of the output files when it must differ from `version_label`
     output_dir.mkdir(parents=True, exist_ok=True)
+    work_dir = build_dir or output_dir
+    work_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-    suffix = f"_{version_label}" if version_label else ""
+    file_label = file_label or version_label
+    suffix = f"_{file_label}" if file_label else ""
     tex_file_name = f"test_{ts}{suffix}"
 
     template = load_template(TEMPLATE_PATH)
@@ -378,10 +470,12 @@ def save_tex_and_compile(
 
 
     # Salvar assets (se houver)
-    copy_assets_to_output(assets_to_copy, output_dir, PROJECT_ROOT)
+    copy_assets_to_output(assets_to_copy, work_dir, PROJECT_ROOT)
+    # figuras TikZ externalizadas: referenciadas por caminho relativo, ligadas a partir da cache
+    get_tikz_cache().copy_figures(filled, work_dir)
 
     # Salvar .tex (só após confirmação)
-    tex_file = output_dir / f"{tex_file_name}.tex"
+    tex_file = work_dir / f"{tex_file_name}.tex"
     tex_file.write_text(filled, encoding='utf-8')
     print(f"  ✅ .tex gerado: {tex_file.relative_to(PROJECT_ROOT)}")
 
@@ -392,7 +486,7 @@ def save_tex_and_compile(
     try:
         fallback_src = SEBENTAS_DB / '_templates' / 'fallback_style.tex'
         if fallback_src.exists():
-            shutil.copy2(fallback_src, output_dir / 'fallback_style.tex')
+            shutil.copy2(fallback_src, work_dir / 'fallback_style.tex')
     except Exception:
         pass
 
@@ -413,26 +507,28 @@ def save_tex_and_compile(
         tex_file.name
     ]
     
-    try:
-        # Executar 2 vezes para resolver referências
-        result = None
-        for i in range(2):
-            result = subprocess.run(
-                cmd,
-                cwd=str(output_dir),
-                capture_output=True,
-                text=True,
-                timeout=60,
-                encoding='utf-8',
-                errors='replace'
-            )
+    # Verificar se PDF foi gerado (independente do exit code)
+    pdf_file = work_dir / f"{tex_file.stem}.pdf"
+    result = None
+
+    def run_pdflatex() -> bool:
+        nonlocal result
+        # Repetir só enquanto referências/índice mudarem (máx. 3 passagens)
+        result, passes = run_latex(cmd, work_dir, timeout=60)
+        print(f'  🔁 pdflatex: {passes} passagem(ns)')
         
         # Pequeno delay para garantir sincronização do sistema de ficheiros
         import time
         time.sleep(1.0)
-        
-        # Verificar se PDF foi gerado (independente do exit code)
-        pdf_file = output_dir / f"{tex_file.stem}.pdf"
+        return pdf_file.exists()
+
+    try:
+        if compile_with_cache:
+            _, cache_hit = compile_with_cache(tex_file, run_pdflatex, options=(*cmd[1:-1], 'reruns=auto'))
+            if cache_hit:
+                print('  ♻️ PDF reutilizado da cache de compilação')
+        else:
+            run_pdflatex()
         
         if pdf_file.exists():
             # Criar diretório pdfs se não existir
@@ -449,7 +545,10 @@ def save_tex_and_compile(
             
             # Limpar TODOS os ficheiros temporários incluindo .tex (mas preservar test_config.json)
             cleaned = 0
-            for file in output_dir.iterdir():
+            if build_dir is not None:
+                cleaned = sum(1 for file in build_dir.rglob('*') if file.is_file())
+                shutil.rmtree(build_dir, ignore_errors=True)
+            for file in (output_dir.iterdir() if build_dir is None else ()):
                 if file.is_file():
                     # Preservar test_config.json
                     if file.name == 'test_config.json':
@@ -460,6 +559,11 @@ def save_tex_and_compile(
                             cleaned += 1
                         except Exception:
                             pass
+                # figuras TikZ ligadas a partir da cache: já estão no PDF
+                figures_dir = output_dir / FIGURES_DIRNAME
+                if figures_dir.is_dir():
+                    cleaned += sum(1 for file in figures_dir.iterdir() if file.is_file())
+                    shutil.rmtree(figures_dir, ignore_errors=True)
             
             if cleaned > 0:
                 print(f"  🧹 Limpou {cleaned} ficheiros")
@@ -478,6 +582,17 @@ def save_tex_and_compile(
                     f.write("\n=== STDERR ===\n")
                     f.write(result.stderr or "")
                 print(f"  📄 Log salvo em: {error_log_file.relative_to(PROJECT_ROOT)}")
+            if diagnose:
+                print('  🔎 A procurar o(s) exercício(s) que impedem a compilação...')
+                logs_dir = output_dir / 'logs'
+                logs_dir.mkdir(exist_ok=True)
+                report = diagnose_file(tex_file, logs_dir / f"{tex_file.stem}_diagnosis.json")
+                for culprit in report['culprits']:
+                    first = culprit['errors'][0] if culprit['errors'] else {}
+                    where = f":{first['source_line']}" if 'source_line' in first else ''
+                    print(f"  ❌ {culprit['source']}{where} {first.get('message', '')}")
+                print(f"  📄 Diagnóstico ({report['compiles']} compilações): "
+                      f"{Path(report['report_file']).relative_to(PROJECT_ROOT)}")
             return None
     
     except subprocess.TimeoutExpired:
@@ -486,6 +601,327 @@ def save_tex_and_compile(
     except Exception as e:
         print(f"  ❌ Erro na compilação: {e}")
         return None
+    finally:
+        if build_dir is not None and build_dir.exists():
+            keep_failed_build(build_dir, output_dir / 'logs')
+
+
+def keep_failed_build(build_dir: Path, logs_dir: Path) -> None:
+    """Guarda o .tex e o .log de uma compilação falhada em `logs_dir` e remove a pasta de build."""
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    for file in build_dir.iterdir():
+        if file.is_file() and file.suffix in ('.tex', '.log') and file.name.startswith('test_'):
+            shutil.move(str(file), str(logs_dir / file.name))
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def combo_config(discipline: str, module: str, concept: str, cli_config: Optional[str] = None,
+                 create: bool = False) -> Dict[str, Any]:
+    """Config de um conceito (CLI, local ou global), criando a local se pedido."""
+    config_path = find_config(discipline, module, concept, cli_config)
+
+    # Create local config if requested
+    if create and discipline and module and concept:
+        local_config_path = SEBENTAS_DB / discipline / module / concept / "tests" / "test_config.json"
+        if not local_config_path.exists():
+            local_config_path.parent.mkdir(parents=True, exist_ok=True)
+            if DEFAULT_CONFIG.exists():
+                shutil.copy(DEFAULT_CONFIG, local_config_path)
+                print(f"  ✅ Config local criada: {local_config_path.relative_to(PROJECT_ROOT)}")
+            else:
+                default_content = {
+                    "name": f"teste_{concept}",
+                    "title_template": "Teste - {concept_name}",
+                    "shuffle": True,
+                    "count": 5
+                }
+                with open(local_config_path, 'w', encoding='utf-8') as f:
+                    json.dump(default_content, f, indent=2, ensure_ascii=False)
+                print(f"  ✅ Config local criada: {local_config_path.relative_to(PROJECT_ROOT)}")
+            config_path = local_config_path
+
+    return load_config(config_path) if config_path else {}
+
+
+def combo_output_dir(discipline: str, module: str, concept: str, config: Dict[str, Any]) -> Path:
+    return SEBENTAS_DB / discipline / module / concept / config.get('output_subdir', 'tests')
+
+
+def version_labels_for(versions: int, labels: Any, config: Dict[str, Any]) -> List[str]:
+    """Rótulos das versões: `labels` (lista ou 'A,B,C'), depois a config, depois A, B, C..."""
+    if isinstance(labels, str):
+        labels = [s.strip() for s in labels.split(',') if s.strip()]
+    version_labels = [str(label) for label in (labels or config.get('version_labels') or [])]
+    if not version_labels:
+        alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        version_labels = [alphabet[i % len(alphabet)] if versions <= len(alphabet) else str(i+1) for i in range(versions)]
+    if len(version_labels) < versions:
+        version_labels += [str(i+1) for i in range(len(version_labels), versions)]
+    return version_labels[:versions]
+
+
+def combo_exposure(
+    config: Dict[str, Any],
+    class_name: Optional[str] = None,
+    window_days: Optional[int] = None,
+    mode: Optional[str] = None,
+    enabled: bool = True,
+) -> Tuple[Optional[ExposureFilter], str]:
+    """Exercícios usados em testes recentes (ledger de exposição), lidos uma vez por conceito."""
+    exposure_settings = dict(config.get('exposure') or {})
+    if window_days is not None:
+        exposure_settings['window_days'] = window_days
+    if mode:
+        exposure_settings['mode'] = mode
+    class_name = class_name or exposure_settings.get('class') or ''
+    exposure = load_exposure(exposure_settings, class_name) if enabled else None
+    if exposure:
+        print(f"  [EXPOSIÇÃO] {len(exposure.recent)} exercício(s) usados nos últimos "
+              f"{exposure_settings['window_days']} dias ({exposure.mode})")
+    return exposure, class_name
+
+
+def plan_versions(
+    exercise_index: Any,
+    config: Dict[str, Any],
+    filters: Dict[str, Optional[str]],
+    version_labels: List[str],
+    seed_base: int,
+    exposure: Optional[ExposureFilter] = None,
+    balance: bool = False,
+    externalize_figures: bool = False,
+) -> Optional[List[Dict[str, Any]]]:
+    """Seleciona e monta todas as versões de um conceito.
+
+    Devolve None se nada puder ser selecionado; senão um dict por rótulo com
+    `selected`, título, cabeçalhos e o LaTeX montado (`selected` vazio quando
+    essa versão não pôde ser preenchida).
+    """
+    module, concept = filters.get('module'), filters.get('concept')
+    versions = len(version_labels)
+
+    # Use a peek selection to get human-friendly names
+    peek_rng = random.Random(seed_base)
+    peek_selected = select_by_config(exercise_index, config, filters, peek_rng, exposure)
+    if not peek_selected:
+        return None
+
+    module_name = peek_selected[0].get('module_name', module)
+    concept_name = peek_selected[0].get('concept_name', concept)
+
+    # Balanced batch: all versions selected together, with close points/difficulty totals
+    balanced = None
+    if versions > 1 and (balance or config.get('balance')):
+        pool = candidate_pool(exercise_index, filters)
+        balanced = select_versions(
+            exposure.admit(pool) if exposure else pool, config, versions, seed_base,
+            lambda available, rng: select_from_pool(available, config, rng, exposure))
+        print(f"  [EQUILÍBRIO] {balanced.summary()}")
+        for reason in balanced.reasons:
+            print(f"    - {reason}")
+
+    plan: List[Dict[str, Any]] = []
+    for idx, label in enumerate(version_labels):
+        if balanced is not None:
+            selected = balanced.versions[idx] if idx < len(balanced.versions) else []
+        else:
+            rng = random.Random(seed_base + idx)
+            selected = select_by_config(exercise_index, config, filters, rng, exposure)
+        if not selected:
+            plan.append({'label': label, 'selected': []})
+            continue
+
+        title_template = config.get('title_template', 'Teste gerado')
+        title = title_template.format(
+            module=module,
+            concept=concept,
+            module_name=module_name,
+            concept_name=concept_name,
+            version_label=label,
+            version_text='',
+        )
+        embed_title = bool(config.get('embed_version_in_title', False))
+        if embed_title and ('version_label' in title_template or 'version_text' in title_template):
+            pass
+        elif embed_title:
+            version_label_template = config.get('version_label_template', 'Versão {label}')
+            version_text = version_label_template.format(label=label)
+            title = f"{title} - {version_text}"
+
+        header_left = config.get('header_left', module_name or module or '')
+        embed_header = bool(config.get('embed_version_in_header', False))
+        if embed_header:
+            version_label_template = config.get('version_label_template', 'Versão {label}')
+            version_text = version_label_template.format(label=label)
+            header_right_default = f"{concept_name or concept} — {version_text}"
+        else:
+            header_right_default = f"{concept_name or concept}"
+        header_right = config.get('header_right', header_right_default)
+
+        content, assets = build_test_content(selected, PROJECT_ROOT, config,
+                                             externalize_figures=externalize_figures)
+        plan.append({
+            'label': label,
+            'selected': selected,
+            'title': title,
+            'header_left': header_left,
+            'header_right': header_right,
+            'content': content,
+            'assets': assets,
+        })
+    return plan
+
+
+def load_manifest(path: Path) -> List[Dict[str, Any]]:
+    """Lê um manifesto de lote (JSON ou YAML) e devolve as entradas com os `defaults` aplicados.
+
+    Formato: uma lista de entradas ou ``{"defaults": {...}, "tests": [...]}``; cada
+    entrada tem `discipline`/`module`/`concept` (sem `concept` = todos os conceitos
+    do módulo) e, opcionalmente, `tipo`, `config` (caminho ou dict), `versions`,
+    `labels`, `seed`, `balance`, `class`, `exposure_window`, `exposure_mode`.
+    """
+    text = path.read_text(encoding='utf-8')
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        import yaml
+        data = yaml.safe_load(text) or {}
+    else:
+        data = json.loads(text)
+    if isinstance(data, list):
+        data = {'tests': data}
+    defaults = data.get('defaults') or {}
+    entries = [{**defaults, **entry} for entry in data.get('tests') or []]
+    if not entries:
+        raise ValueError(f"manifesto sem entradas em 'tests': {path}")
+    for n, entry in enumerate(entries, 1):
+        if not (entry.get('discipline') or entry.get('module') or entry.get('concept')):
+            raise ValueError(f"manifesto: a entrada {n} não indica discipline/module/concept")
+    return entries
+
+
+def run_batch(args, exercise_index: Any, available_combos: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """Gera todos os testes de um manifesto com o índice já carregado.
+
+    Seleção e montagem correm aqui, em sequência (usam o índice e as caches em
+    memória); a compilação de todas as versões corre num pool limitado a
+    `--jobs` threads, cada uma na sua pasta de build. Devolve um resumo por versão.
+    """
+    manifest_path = Path(args.batch)
+    entries = load_manifest(manifest_path)
+    jobs = args.jobs or os.cpu_count() or 1
+    no_compile = args.no_compile
+    if not no_compile and not shutil.which('pdflatex'):
+        print('  ⚠️ pdflatex não encontrado - o lote gera só os .tex')
+        no_compile = True
+    if args.qa2_output:
+        print('  ⚠️ --batch: --qa2-output ignorado (o lote gera testes normais)')
+    if not args.auto_approve and not args.no_preview:
+        print('  ⚠️ --batch: pré-visualização e confirmações desativadas (modo lote)')
+
+    started = time.perf_counter()
+    summary: List[Dict[str, Any]] = []
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    # (conceito, rótulo) já usados: duas entradas com o mesmo par no mesmo segundo
+    # gerariam o mesmo test_<ts>_<rótulo>, por isso as repetições levam um número
+    used_names: Dict[Tuple[str, str], int] = {}
+
+    for entry in entries:
+        combos = [combo for combo in available_combos
+                  if all(not entry.get(key) or entry[key] == value
+                         for key, value in zip(('discipline', 'module', 'concept'), combo))]
+        if not combos:
+            print(f"  ⚠️ Manifesto: nenhum conceito para {entry}")
+        for discipline, module, concept in combos:
+            print(f"\n--- Batch: {discipline}/{module}/{concept} ---")
+            t0 = time.perf_counter()
+            config = entry.get('config')
+            if not isinstance(config, dict):
+                config = combo_config(discipline, module, concept, config or args.config)
+            filters = {'discipline': discipline, 'module': module, 'concept': concept,
+                       'tipo': entry.get('tipo', args.tipo)}
+            versions = entry.get('versions') or args.versions or int(config.get('versions', 1) or 1)
+            version_labels = version_labels_for(versions, entry.get('labels') or args.version_labels, config)
+            seed = entry.get('seed', args.seed)
+            seed_base = int(seed) if seed is not None else int(datetime.now().timestamp())
+            exposure, class_name = combo_exposure(
+                config, entry.get('class', args.class_name), entry.get('exposure_window', args.exposure_window),
+                entry.get('exposure_mode', args.exposure_mode), enabled=not args.no_ledger)
+            plan = plan_versions(exercise_index, config, filters, version_labels, seed_base, exposure,
+                                 balance=bool(entry.get('balance', args.balance)),
+                                 externalize_figures=not no_compile)
+            select_ms = (time.perf_counter() - t0) * 1000
+            combo_name = f"{discipline}/{module}/{concept}"
+            if plan is None:
+                print(f'Nenhum exercício selecionado para {combo_name}; skipping.')
+                summary.append({'combo': combo_name, 'label': None, 'output': None,
+                                'select_ms': round(select_ms, 1), 'compile_s': 0.0})
+                continue
+            output_dir = combo_output_dir(discipline, module, concept, config)
+            for version in plan:
+                row = {'combo': combo_name, 'label': version['label'], 'output': None,
+                       'exercises': [ex.get('id') for ex in version['selected']],
+                       'select_ms': round(select_ms / len(plan), 1), 'compile_s': 0.0}
+                summary.append(row)
+                if version['selected']:
+                    key = (combo_name, version['label'])
+                    used_names[key] = seen = used_names.get(key, 0) + 1
+                    file_label = version['label'] if seen == 1 else f"{version['label']}_{seen}"
+                    pending.append((row, {**version, 'config': config, 'output_dir': output_dir,
+                                          'class_name': class_name, 'file_label': file_label}))
+                else:
+                    print(f"Versão {version['label']}: nenhum exercício selecionado.")
+
+    def compile_version(version: Dict[str, Any]) -> Tuple[Optional[Path], float]:
+        t0 = time.perf_counter()
+        output_dir = version['output_dir']
+        build_dir = None if no_compile else output_dir / f".tmp_test_{version['file_label']}_{uuid.uuid4().hex[:8]}"
+        result = save_tex_and_compile(
+            version['content'], version['title'], version['header_left'], version['header_right'],
+            output_dir,
+            no_compile=no_compile,
+            version_label=version['label'],
+            selected_exercises=version['selected'],
+            config=version['config'],
+            no_preview=True,
+            auto_approve=True,
+            assets_to_copy=version['assets'],
+            diagnose=args.diagnose,
+            build_dir=build_dir,
+            file_label=version['file_label'],
+        )
+        return result, time.perf_counter() - t0
+
+    print(f"\n  A compilar {len(pending)} versão(ões) com {jobs} worker(s)...")
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(compile_version, version): (row, version) for row, version in pending}
+        for future in as_completed(futures):
+            row, version = futures[future]
+            try:
+                result, elapsed = future.result()
+            except Exception as e:
+                print(f"  ❌ {row['combo']} versão {row['label']}: {e}")
+                continue
+            row['compile_s'] = round(elapsed, 2)
+            if result:
+                row['output'] = str(result)
+                if not args.no_ledger:
+                    record_test(version['selected'], f"{row['combo']}/{Path(result).stem}",
+                                version['class_name'], source='generate_tests')
+
+    total_s = time.perf_counter() - started
+    print(f"\n=== Resumo do lote ({manifest_path.name}) ===")
+    for row in summary:
+        status = row['output'] or 'falha ou vazia'
+        label = f" - Versão {row['label']}" if row['label'] else ''
+        print(f"{row['combo']}{label}: {status} "
+              f"(seleção {row['select_ms']:.0f} ms, compilação {row['compile_s']:.1f} s)")
+    ok = sum(1 for row in summary if row['output'])
+    print(f"{ok}/{len(summary)} versões geradas em {total_s:.1f} s")
+    if args.summary:
+        Path(args.summary).write_text(json.dumps({
+            'manifest': str(manifest_path), 'jobs': jobs, 'total_s': round(total_s, 2), 'versions': summary,
+        }, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"📄 Resumo JSON: {args.summary}")
+    return summary
 
 
 def parse_args():
@@ -500,9 +936,18 @@ def parse_args():
     p.add_argument('--versions', type=int, help='Número de versões a gerar (default: 1)')
     p.add_argument('--version-labels', help='Rótulos separados por vírgula para as versões (ex: A,B,C)')
     p.add_argument('--seed', type=int, help='Seed base para seleção aleatória e versões')
+    p.add_argument('--balance', action='store_true', help='Selecionar todas as versões em conjunto, com pontos e dificuldade equilibrados (ver bloco "balance" da config)')
+    p.add_argument('--class', dest='class_name', help='Turma a que o teste se destina (registada no ledger de exposição)')
+    p.add_argument('--exposure-window', type=int, help='Evitar exercícios usados em testes dos últimos N dias (ver bloco "exposure" da config)')
+    p.add_argument('--exposure-mode', choices=['exclude', 'penalize'], help='exclude: nunca repetir; penalize: repetir só se não houver alternativa')
+    p.add_argument('--no-ledger', action='store_true', help='Não consultar nem atualizar o ledger de exposição')
     p.add_argument('--export-clean', action='store_true', help='Criar cópias dos PDFs finais sem sufixos/version labels em a distribution folder')
     p.add_argument('--no-preview', action='store_true', help='Não mostrar preview antes de compilar')
+    p.add_argument('--diagnose', action='store_true', help='Se a compilação falhar, isolar por bisseção o(s) exercício(s) responsáveis (relatório JSON em logs/)')
     p.add_argument('--auto-approve', action='store_true', help='Aprovar automaticamente sem pedir confirmação')
+    p.add_argument('--batch', help='Manifesto JSON/YAML com vários conceitos/versões/seeds: carrega o índice uma vez e compila tudo num pool')
+    p.add_argument('--jobs', type=int, default=0, help='Compilações em paralelo no modo --batch (0 = nº de CPUs)')
+    p.add_argument('--summary', help='Guardar o resumo do lote (saídas e tempos) em JSON neste caminho')
     p.add_argument('--qa2-output', help='Gerar uma estrutura tipo reference/QA2 em PATH (ex: --qa2-output temp/QA2_generated). Se omitido, não gera QA2.', default=None)
     return p.parse_args()
 
@@ -531,6 +976,8 @@ def main():
 
     index = load_index(EXERCISE_INDEX)
     exercises = index.get('exercises', [])
+    # Secondary indexes built once and shared by every selection below
+    exercise_index = ExerciseIndex(exercises) if ExerciseIndex is not None else exercises
 
     # Build list of available (discipline, module, concept) tuples from the index
     available_combos = []
@@ -547,6 +994,10 @@ def main():
         seen.add(key)
         available_combos.append(key)
 
+    if args.batch:
+        run_batch(args, exercise_index, available_combos)
+        return
+
     # If CLI filters specified, narrow the combos accordingly; otherwise process all
     if args.discipline or args.module or args.concept:
         filtered = []
@@ -673,32 +1124,7 @@ def main():
         for (discipline, module, concept) in combos_to_run:
             print(f"\n--- Generating test for: {discipline}/{module}/{concept} ---")
 
-            # Find config for this concept/module
-            config_path = find_config(discipline, module, concept, args.config)
-
-            # Create local config if requested
-            if args.create_config and discipline and module and concept:
-                local_config_path = SEBENTAS_DB / discipline / module / concept / "tests" / "test_config.json"
-                if not local_config_path.exists():
-                    local_config_path.parent.mkdir(parents=True, exist_ok=True)
-                    if DEFAULT_CONFIG.exists():
-                        shutil.copy(DEFAULT_CONFIG, local_config_path)
-                        print(f"  ✅ Config local criada: {local_config_path.relative_to(PROJECT_ROOT)}")
-                    else:
-                        default_content = {
-                            "name": f"teste_{concept}",
-                            "title_template": "Teste - {concept_name}",
-                            "shuffle": True,
-                            "count": 5
-                        }
-                        with open(local_config_path, 'w', encoding='utf-8') as f:
-                            json.dump(default_content, f, indent=2, ensure_ascii=False)
-                        print(f"  ✅ Config local criada: {local_config_path.relative_to(PROJECT_ROOT)}")
-                    config_path = local_config_path
-
-            config = {}
-            if config_path:
-                config = load_config(config_path)
+            config = combo_config(discipline, module, concept, args.config, args.create_config)
 
             # Force filters for this combo
             filters = {
@@ -710,71 +1136,32 @@ def main():
 
             # Prepare versions and labels as before
             versions = args.versions if args.versions is not None else int(config.get('versions', 1) or 1)
-            if args.version_labels:
-                version_labels = [s.strip() for s in args.version_labels.split(',') if s.strip()]
-            else:
-                version_labels = config.get('version_labels') or []
-            if not version_labels:
-                alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-                version_labels = [alphabet[i % len(alphabet)] if versions <= len(alphabet) else str(i+1) for i in range(versions)]
-            if len(version_labels) < versions:
-                version_labels += [str(i+1) for i in range(len(version_labels), versions)]
-            version_labels = version_labels[:versions]
+            version_labels = version_labels_for(versions, args.version_labels, config)
 
             seed_base = args.seed if args.seed is not None else int(datetime.now().timestamp())
 
-            # Use a peek selection to get human-friendly names
-            peek_rng = random.Random(seed_base)
-            peek_selected = select_by_config(exercises, config, filters, peek_rng)
-            if not peek_selected:
+            exposure, class_name = combo_exposure(config, args.class_name, args.exposure_window,
+                                                  args.exposure_mode, enabled=not args.no_ledger)
+
+            plan = plan_versions(exercise_index, config, filters, version_labels, seed_base, exposure,
+                                 balance=args.balance,
+                                 externalize_figures=not args.no_compile and not args.qa2_output)
+            if plan is None:
                 print(f'Nenhum exercício selecionado para {discipline}/{module}/{concept}; skipping.')
                 overall_results[(discipline, module, concept)] = []
                 continue
 
-            module_name = peek_selected[0].get('module_name', module)
-            concept_name = peek_selected[0].get('concept_name', concept)
-
-            output_subdir = config.get('output_subdir', 'tests')
-            output_dir = SEBENTAS_DB / discipline / module / concept / output_subdir
+            output_dir = combo_output_dir(discipline, module, concept, config)
 
             results: List[Tuple[str, Optional[Path]]] = []
-            for idx in range(versions):
-                label = version_labels[idx]
-                rng = random.Random(seed_base + idx)
-                selected = select_by_config(exercises, config, filters, rng)
+            for version in plan:
+                label, selected = version['label'], version['selected']
                 if not selected:
                     print(f'Versão {label}: nenhum exercício selecionado.')
                     results.append((label, None))
                     continue
-
-                title_template = config.get('title_template', 'Teste gerado')
-                title = title_template.format(
-                    module=module,
-                    concept=concept,
-                    module_name=module_name,
-                    concept_name=concept_name,
-                    version_label=label,
-                    version_text='',
-                )
-                embed_title = bool(config.get('embed_version_in_title', False))
-                if embed_title and ('version_label' in title_template or 'version_text' in title_template):
-                    pass
-                elif embed_title:
-                    version_label_template = config.get('version_label_template', 'Versão {label}')
-                    version_text = version_label_template.format(label=label)
-                    title = f"{title} - {version_text}"
-
-                header_left = config.get('header_left', module_name or module or '')
-                embed_header = bool(config.get('embed_version_in_header', False))
-                if embed_header:
-                    version_label_template = config.get('version_label_template', 'Versão {label}')
-                    version_text = version_label_template.format(label=label)
-                    header_right_default = f"{concept_name or concept} — {version_text}"
-                else:
-                    header_right_default = f"{concept_name or concept}"
-                header_right = config.get('header_right', header_right_default)
-
-                content, assets = build_test_content(selected, PROJECT_ROOT, config)
+                title, header_left, header_right = version['title'], version['header_left'], version['header_right']
+                content, assets = version['content'], version['assets']
 
                 # If QA2 output requested, write QA2-style folder structure
                 if args.qa2_output:
@@ -918,7 +1305,13 @@ def main():
                         no_preview=args.no_preview,
                         auto_approve=args.auto_approve,
                         assets_to_copy=assets,
+                        diagnose=args.diagnose,
                     )
+                if result and not args.no_ledger:
+                    test_name = f"{discipline}/{module}/{concept}/{Path(result).stem}"
+                    if args.qa2_output:
+                        test_name += f"_{label}"
+                    record_test(selected, test_name, class_name, source='generate_tests')
                 results.append((label, result))
 
             overall_results[(discipline, module, concept)] = results
@@ -931,3 +1324,9 @@ def main():
                     print(f"{disc}/{mod}/{conc} - Versão {label}: {path}")
                 else:
                     print(f"{disc}/{mod}/{conc} - Versão {label}: falha ou vazia")
+        cache = get_exercise_cache()
+        print(f"Exercícios: {cache.hits + cache.disk_hits} da cache, {cache.misses} sanitizados")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,10 @@ from pathlib import Path
 from collections import defaultdict, Counter
 from typing import Dict, List, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ExerciseDatabase" / "_tools"))
+from exercise_index import ExerciseIndex
+from index_statistics import compute_statistics, verify as verify_statistics
+
 class DatabaseAnalyzer:
     def __init__(self, index_path: Path):
         self.index_path = index_path
@@ -48,13 +52,14 @@ class DatabaseAnalyzer:
         
         analysis['field_distribution'] = dict(field_counts)
         
-        # Analyze module distribution
-        modules = Counter(ex.get('module', 'unknown') for ex in exercises)
-        analysis['module_distribution'] = dict(modules.most_common(10))
-        
-        # Analyze concept distribution
-        concepts = Counter(ex.get('concept', 'unknown') for ex in exercises)
-        analysis['concept_distribution'] = dict(concepts.most_common(10))
+        # Module/concept distribution from the materialized statistics; only
+        # recount when the stored counters fail the cheap consistency check
+        analysis['statistics_problems'] = verify_statistics(self.data)
+        stats = self.data.get('statistics', {})
+        if analysis['statistics_problems']:
+            stats = compute_statistics(self.data)
+        analysis['module_distribution'] = dict(Counter(stats.get('by_module', {})).most_common(10))
+        analysis['concept_distribution'] = dict(Counter(stats.get('by_concept', {})).most_common(10))
         
         return analysis
     
@@ -89,6 +94,25 @@ class DatabaseAnalyzer:
         for _ in range(100):
             _ = [ex for ex in exercises if ex.get('module') == 'P4_funcoes']
         results['100_searches_ms'] = (time.time() - start) * 1000
+
+        # Same queries through the secondary indexes used by the generators
+        start = time.time()
+        index = ExerciseIndex(exercises)
+        results['index_build_ms'] = (time.time() - start) * 1000
+
+        start = time.time()
+        for _ in range(100):
+            _ = index.query(module='P4_funcoes')
+        results['100_indexed_searches_ms'] = (time.time() - start) * 1000
+
+        start = time.time()
+        linear = [ex for ex in exercises if ex.get('module') == 'P4_funcoes' and ex.get('difficulty') == 2]
+        results['multi_filter_search_ms'] = (time.time() - start) * 1000
+
+        start = time.time()
+        indexed = index.query(module='P4_funcoes', difficulty=2)
+        results['multi_filter_indexed_ms'] = (time.time() - start) * 1000
+        results['multi_filter_count'] = len(indexed)
         
         return results
     
@@ -139,12 +163,16 @@ class DatabaseAnalyzer:
 - **Total Exercises**: {structure['total_exercises']}
 - **Load Time**: {structure['load_time_ms']:.2f} ms
 - **Database Version**: {structure['database_version']}
+- **Statistics Consistent**: {'yes' if not structure['statistics_problems'] else 'no (' + '; '.join(structure['statistics_problems']) + ')'}
 
 ## Performance Metrics
 - **Module Search**: {performance['module_search_ms']:.2f} ms (found {performance['p4_count']} exercises)
 - **Concept Search**: {performance['concept_search_ms']:.2f} ms (found {performance['inverse_count']} exercises)
 - **Difficulty Search**: {performance['difficulty_search_ms']:.2f} ms (found {performance['easy_count']} exercises)
 - **100 Repeated Searches**: {performance['100_searches_ms']:.2f} ms
+- **Index Build (ExerciseIndex)**: {performance['index_build_ms']:.2f} ms
+- **100 Repeated Indexed Searches**: {performance['100_indexed_searches_ms']:.2f} ms
+- **Multi-filter Search (module+difficulty)**: {performance['multi_filter_search_ms']:.2f} ms linear vs {performance['multi_filter_indexed_ms']:.2f} ms indexed (found {performance['multi_filter_count']} exercises)
 
 ## Access Pattern Analysis
 - **Estimated Operations/Hour**: {patterns['total_estimated_operations_per_hour']}
@@ -162,7 +190,7 @@ class DatabaseAnalyzer:
 ## Performance Bottlenecks Identified
 
 1. **Full JSON Reload on Every Operation**: {structure['load_time_ms']:.2f} ms per access
-2. **Linear Search Complexity**: O(n) for all searches
+2. **Linear Search Complexity**: O(n) for ad-hoc scans (generators now share `ExerciseIndex`)
 3. **No Caching Mechanism**: Repeated expensive operations
 4. **Concurrent Access Risk**: No file locking mechanism
 5. **Memory Inefficiency**: Loading entire database for simple queries
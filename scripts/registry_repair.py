@@ -15,41 +15,31 @@ REPO_ROOT = Path(__file__).resolve().parent.parent
 REG_PATH = REPO_ROOT / 'ExerciseDatabase' / '_registry' / 'ip_registry.json'
 EX_DB = REPO_ROOT / 'ExerciseDatabase'
 
-from ExerciseDatabase._tools.ip_registry import IPRegistry
+from ExerciseDatabase._tools.ip_registry import IPRegistry, iter_fs_exercises
 
 
 def scan_fs_and_register(base: Path, registry: IPRegistry):
-    # deterministic traversal
-    count = 0
-    for disc in sorted([d for d in base.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-        for mod in sorted([d for d in disc.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-            for conc in sorted([d for d in mod.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                for typ in sorted([d for d in conc.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                    for ex in sorted([d for d in typ.iterdir() if d.is_dir() and not d.name.startswith('_')]):
-                        parts = [disc.name, mod.name, conc.name, typ.name, ex.name]
-                        rel = str(ex.relative_to(base))
-                        registry.register_path(parts, rel, label=ex.name)
-                        count += 1
-    return count
+    # deterministic traversal, registered in a single transaction
+    return len(registry.register_many(iter_fs_exercises(base)))
 
 
 def rebuild_from_exercise_json(base: Path, registry: IPRegistry):
-    count = 0
-    for exjson in base.rglob('exercise.json'):
+    items = []
+    for exjson in sorted(base.rglob('exercise.json')):
         try:
             with open(exjson, 'r', encoding='utf8') as f:
                 meta = json.load(f)
             ip = meta.get('ip')
             path_str = meta.get('path')
             if ip and path_str:
-                parts = meta.get('path').split('\\') if '\\' in meta.get('path') else meta.get('path').split('/')
+                parts = path_str.split('\\') if '\\' in path_str else path_str.split('/')
                 # last 5 parts may be full path
                 parts = parts[-5:]
-                registry.register_path(parts, path_str, label=meta.get('label'))
-                count += 1
+                if len(parts) == 5:
+                    items.append((parts, path_str, meta.get('label')))
         except Exception:
             pass
-    return count
+    return len(registry.register_many(items))
 
 
 def main():
@@ -74,13 +64,11 @@ def main():
 
     if args.from_exercise_json:
         n = rebuild_from_exercise_json(EX_DB, registry)
-        registry.save()
         print('Rebuilt registry from exercise.json files, entries:', n)
         return 0
 
     if args.rebuild:
         n = scan_fs_and_register(EX_DB, registry)
-        registry.save()
         print('Rebuilt registry from filesystem, entries:', n)
         return 0
 
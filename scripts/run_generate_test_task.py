@@ -11,6 +11,8 @@ Environment variables used (set by tasks.json inputs):
 - TEST_NO_PREVIEW (1/true)
 - TEST_NO_COMPILE (1/true)
 - TEST_AUTO_APPROVE (1/true)
+- TEST_BATCH (manifesto JSON/YAML: gera todos os conceitos numa só execução)
+- TEST_JOBS (compilações em paralelo no modo lote)
 
 Usage (from VS Code task):
 python scripts/run_generate_test_task.py
@@ -62,6 +64,12 @@ if env_flag("TEST_NO_COMPILE"):
 if env_flag("TEST_AUTO_APPROVE"):
     cmd.append("--auto-approve")
 
+# Batch manifest: one generator run (one index load) for many combos
+for var, arg in [("TEST_BATCH", "--batch"), ("TEST_JOBS", "--jobs")]:
+    v = env.get(var, "").strip()
+    if v:
+        cmd.extend([arg, v])
+
 # Ensure deterministic encoding on Windows
 env['PYTHONIOENCODING'] = env.get('PYTHONIOENCODING', 'utf-8')
 
@@ -28,6 +28,17 @@ def stage_exercise(payload: StagePayload):
     return {"status": "staged", "meta": meta}
 
 
+@router.get("/exercises/search")
+def search_exercises(q: str, limit: int = 20, all_terms: bool = False):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="empty query")
+    try:
+        results = utils_wrappers.search_exercises_text(q, limit=limit, require_all=all_terms)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "count": len(results), "results": results}
+
+
 @router.get("/staging/{staged_id}/preview")
 def get_staging_preview(staged_id: str):
     try:
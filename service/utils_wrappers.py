@@ -2,7 +2,8 @@
 
 Functions are small adapters and intentionally thin so tests can monkeypatch them.
 """
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, List
 import json
 import os
 
@@ -51,6 +52,14 @@ def get_staging_preview(staged_id: str) -> Dict[str, str]:
         return files
 
 
+def search_exercises_text(query: str, limit: int = 20, require_all: bool = False) -> List[Dict[str, Any]]:
+    """Full-text (BM25) search over exercise bodies via the repository helper."""
+    from ExerciseDatabase._tools.fulltext_index import search_text
+    # no rescan of the tree per request: the watcher and `fulltext_index.py update` keep the index current
+    return search_text(query, limit=limit, require_all=require_all, base_dir=Path("ExerciseDatabase"),
+                       refresh=False)
+
+
 def confirm_staged(staged_id: str, action: str) -> Dict[str, Any]:
     """Confirm (promote or discard) a staged item.
 
@@ -92,6 +101,33 @@ def confirm_staged(staged_id: str, action: str) -> Dict[str, Any]:
             raise FileExistsError(dest_dir)
         shutil.move(staged_path, dest_dir)
 
+        entry = {
+            "id": staged_id,
+            "path": os.path.relpath(dest_dir).replace("\\", "/"),
+            "discipline": payload.get("discipline"),
+            "module": payload.get("module"),
+            "concept": payload.get("concept"),
+            "tipo": payload.get("tipo"),
+            "difficulty": payload.get("difficulty"),
+            "tags": payload.get("tags", []),
+            "status": "active"
+        }
+
+        # Prefer the SQLite catalog when it has been initialised
+        from ExerciseDatabase._tools.exercise_catalog import open_catalog
+        catalog = open_catalog(Path("ExerciseDatabase"))
+        if catalog is not None:
+            with catalog:
+                catalog.add_exercise(entry)
+            return {"action": "promoted", "new_path": dest_dir}
+
+        # Otherwise append to the change journal when it is enabled
+        from ExerciseDatabase._tools.index_journal import open_journal
+        journal = open_journal(Path("ExerciseDatabase"))
+        if journal is not None:
+            journal.append("promote", entry=entry)
+            return {"action": "promoted", "new_path": dest_dir}
+
         # Update or create index.json
         index_path = os.path.join("ExerciseDatabase", "index.json")
         if os.path.exists(index_path):
@@ -104,22 +140,8 @@ def confirm_staged(staged_id: str, action: str) -> Dict[str, Any]:
             index = {}
 
         index.setdefault("database_version", "1.0")
-        index["last_updated"] = datetime.utcnow().isoformat() + "Z"
-        exercises = index.setdefault("exercises", [])
-
-        entry = {
-            "id": staged_id,
-            "path": os.path.relpath(dest_dir).replace("\\", "/"),
-            "discipline": payload.get("discipline"),
-            "module": payload.get("module"),
-            "concept": payload.get("concept"),
-            "tipo": payload.get("tipo"),
-            "difficulty": payload.get("difficulty"),
-            "tags": payload.get("tags", []),
-            "status": "active"
-        }
-        exercises.append(entry)
-        index["total_exercises"] = len(exercises)
+        from ExerciseDatabase._tools.index_statistics import add_entry
+        add_entry(index, entry, ts=datetime.utcnow().isoformat() + "Z")
 
         # write atomically
         tmp_index = index_path + ".tmp"
@@ -1,16 +1,51 @@
+import importlib
+import os
+from pathlib import Path
+import shutil
+import stat
+import sys
+
 import pytest
-from fastapi.testclient import TestClient
-from service.fastapi_app import app
 
 
 @pytest.fixture
 def client():
+    # imported here so the other fixtures work without the service dependencies
+    from fastapi.testclient import TestClient
+    from service.fastapi_app import app
     return TestClient(app)
-import importlib
-from pathlib import Path
-import shutil
 
-import pytest
+
+@pytest.fixture
+def make_exercise_tree(tmp_path):
+    """Write ``{path: text}`` files under a root (default tmp_path), creating parent
+    folders; paths are relative to the root or absolute. Returns the root.
+    """
+    def make(files, root=None):
+        root = Path(root or tmp_path)
+        for rel, text in files.items():
+            path = root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+        return root
+    return make
+
+
+@pytest.fixture
+def fake_latex_engine(tmp_path, monkeypatch):
+    """Install a Python ``script`` as an executable ``tmp_path/bin/pdflatex`` stand-in,
+    first on PATH. Precompiled formats stay off unless ``formats=True``. Returns its path.
+    """
+    def make(script, formats=False):
+        if not formats:
+            monkeypatch.setenv("LATEX_FORMAT", "0")
+        engine = tmp_path / "bin" / "pdflatex"
+        engine.parent.mkdir(exist_ok=True)
+        engine.write_text(f"#!{sys.executable}\n{script}", encoding="utf-8")
+        engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setenv("PATH", str(engine.parent) + os.pathsep + os.environ.get("PATH", ""))
+        return engine
+    return make
 
 
 @pytest.fixture
@@ -13,9 +13,14 @@ Problemas Tratados:
 """
 
 import re
+import sys
+from pathlib import Path
 from typing import Dict, List, Tuple, Callable
 from dataclasses import dataclass
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ExerciseDatabase" / "_tools"))
+from latex_sanitize import underscore_blanks  # noqa: E402
+
 @dataclass
 class LaTeXIssue:
     """Representa um problema identificado no LaTeX"""
@@ -62,25 +67,18 @@ class LaTeXSanitizer:
 
         issues = []
 
-        # Padrão melhorado: underscores consecutivos (4+) em itemize/enumerate
-        # Evita capturar underscores que fazem parte de palavras
-        pattern = r'(\\item\s+[^$]*?)(_{4,})([^$]*?)(?=\s|$)'
-
-        def replace_underscores(match):
-            before = match.group(1)
-            underscores = match.group(2)
-            after = match.group(3)
+        # Mesmo padrão dos geradores (latex_sanitize): underscores consecutivos (4+) em itemize/enumerate
+        def record(match):
             issues.append(LaTeXIssue(
                 line_number=content[:match.start()].count('\n') + 1,
                 position=match.start(),
                 issue_type="underscores_in_text",
-                description=f"Underscores consecutivos ({len(underscores)}) em texto normal",
+                description=f"Underscores consecutivos ({len(match.group(2))}) em texto normal",
                 severity="error",
                 suggestion="Substituir por \\rule{2cm}{0.4pt}"
             ))
-            return f"{before}\\rule{{2cm}}{{0.4pt}}{after}"
 
-        corrected = re.sub(pattern, replace_underscores, content)
+        corrected = underscore_blanks(content, on_fix=record)
 
         return corrected, issues
 
@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from build_manifest import BuildManifest  # noqa: E402
+
+
+def test_manifest_reasons(tmp_path):
+    a = tmp_path / "a.tex"
+    b = tmp_path / "b.tex"
+    a.write_text("A", encoding="utf-8")
+    b.write_text("B", encoding="utf-8")
+    out = tmp_path / "out.pdf"
+
+    manifest = BuildManifest(tmp_path, "doc")
+    assert manifest.check([a, b], {"tipo": None}, out) == ["sem manifesto anterior"]
+    out.write_bytes(b"%PDF")
+    manifest.save()
+    assert BuildManifest(tmp_path, "doc").check([a, b], {"tipo": None}, out) == []
+
+    # same content, new mtime: still up to date
+    os.utime(a, ns=(1, 1))
+    assert BuildManifest(tmp_path, "doc").check([a, b], {"tipo": None}, out) == []
+
+    a.write_text("A2", encoding="utf-8")
+    c = tmp_path / "c.tex"
+    c.write_text("C", encoding="utf-8")
+    reasons = BuildManifest(tmp_path, "doc").check([a, c], {"tipo": ["t1"]}, out)
+    assert reasons[0] == "parâmetros alterados: tipo"
+    assert any(r.startswith("alterado:") and r.endswith("a.tex") for r in reasons)
+    assert any(r.startswith("novo:") and r.endswith("c.tex") for r in reasons)
+    assert any(r.startswith("removido:") and r.endswith("b.tex") for r in reasons)
+
+    out.unlink()
+    assert BuildManifest(tmp_path, "doc").check([a, b], {"tipo": None}, out)[0].startswith("saída em falta")
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from compile_cache import CompileCache, compile_with_cache, dependencies, env_enabled  # noqa: E402
+
+
+def _document(tmp_path: Path) -> Path:
+    (tmp_path / "ex").mkdir()
+    (tmp_path / "ex" / "a.tex").write_text("A \\includegraphics[width=2cm]{fig}", encoding="utf-8")
+    (tmp_path / "ex" / "fig.png").write_bytes(b"png")
+    (tmp_path / "local.sty").write_text("% style", encoding="utf-8")
+    tex = tmp_path / "doc.tex"
+    tex.write_text("\\input{ex/a}\n% \\input{commented}\n\\input{missing}\n", encoding="utf-8")
+    return tex
+
+
+def _fake_run(tex: Path, calls: list):
+    def run() -> bool:
+        calls.append(tex)
+        tex.with_suffix(".pdf").write_bytes(b"%PDF " + tex.read_bytes())
+        return True
+    return run
+
+
+def test_dependencies(tmp_path):
+    tex = _document(tmp_path)
+    files, unresolved, uses_today = dependencies(tex)
+    names = sorted(p.name for p in files)
+    assert names == ["a.tex", "fig.png", "local.sty"]
+    assert unresolved == ["input:missing"]
+    assert not uses_today
+
+
+def test_hit_skips_compilation(tmp_path):
+    tex = _document(tmp_path)
+    cache = CompileCache(tmp_path / "cache")
+    calls = []
+
+    assert compile_with_cache(tex, _fake_run(tex, calls), cache=cache) == (True, False)
+    tex.with_suffix(".pdf").unlink()
+    assert compile_with_cache(tex, _fake_run(tex, calls), cache=cache) == (True, True)
+    assert len(calls) == 1
+    assert tex.with_suffix(".pdf").read_bytes().startswith(b"%PDF")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_follows_dependencies(tmp_path):
+    tex = _document(tmp_path)
+    cache = CompileCache(tmp_path / "cache")
+    key = cache.key(tex)
+    assert cache.key(tex, options=("-file-line-error",)) != key
+
+    (tmp_path / "ex" / "a.tex").write_text("B \\includegraphics{fig}", encoding="utf-8")
+    changed = cache.key(tex)
+    assert changed != key
+    (tmp_path / "ex" / "fig.png").write_bytes(b"other png")
+    assert cache.key(tex) != changed
+
+
+def test_failed_builds_not_stored_and_disable(tmp_path, monkeypatch):
+    tex = _document(tmp_path)
+    cache = CompileCache(tmp_path / "cache")
+    assert compile_with_cache(tex, lambda: False, cache=cache) == (False, False)
+    assert cache.entries() == []
+
+    monkeypatch.setenv("COMPILE_CACHE", "0")
+    calls = []
+    compile_with_cache(tex, _fake_run(tex, calls), cache=cache)
+    compile_with_cache(tex, _fake_run(tex, calls), cache=cache)
+    assert len(calls) == 2
+    assert cache.entries() == []
+
+
+def test_env_enabled(monkeypatch):
+    monkeypatch.delenv("SOME_CACHE", raising=False)
+    assert env_enabled("SOME_CACHE")
+    for off in ("0", "false", "No", " não "):
+        monkeypatch.setenv("SOME_CACHE", off)
+        assert not env_enabled("SOME_CACHE")
+    monkeypatch.setenv("SOME_CACHE", "1")
+    assert env_enabled("SOME_CACHE")
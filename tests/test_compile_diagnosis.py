@@ -0,0 +1,85 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from compile_diagnosis import Document, diagnose_file, parse_errors, source_marker  # noqa: E402
+
+# "pdflatex" stand-in: fails with a file:line error on the first line containing \BROKEN
+FAKE_ENGINE = '''
+import sys
+from pathlib import Path
+source = Path(sys.argv[-1])
+jobname = source.name.split(".")[0]
+for number, line in enumerate(source.read_text().splitlines(), 1):
+    if "\\\\BROKEN" in line:
+        Path(jobname + ".log").write_text(f"./{source.name}:{number}: Undefined control sequence.\\n")
+        sys.exit(1)
+Path(jobname + ".pdf").write_text("pdf")
+'''
+
+
+def _document(tmp_path: Path, broken=()) -> Path:
+    lines = ["\\documentclass{article}", "\\begin{document}", "\\section*{Conceito}"]
+    for idx in range(8):
+        exercise = tmp_path / "ex" / f"ex{idx}.tex"
+        exercise.parent.mkdir(exist_ok=True)
+        body = ["\\exercicio{Calcule}", "\\BROKEN{x}" if idx in broken else "$x^2$", "\\FloatBarrier"]
+        exercise.write_text("% comentário\n" + "\n".join(body) + "\n", encoding="utf-8")
+        lines += [f"% Exercício {idx}", source_marker(exercise), *body]
+    lines.append("\\end{document}")
+    tex = tmp_path / "out" / "sebenta_x.tex"
+    tex.parent.mkdir()
+    tex.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return tex
+
+
+def test_document_split_and_rebuild(tmp_path):
+    text = _document(tmp_path).read_text(encoding="utf-8")
+    document = Document(text)
+    assert len(document.fragments) == 8
+    assert document.sources[0].endswith("ex0.tex")
+    assert document.build(range(8))[0] == text
+    rebuilt, origin = document.build([3])
+    assert rebuilt.count("\\exercicio") == 1 and rebuilt.rstrip().endswith("\\end{document}")
+    assert origin[6] == (3, 1)  # prefix has 4 lines, then the marker
+
+
+def test_parse_errors():
+    log = ("./doc.tex:12: Undefined control sequence.\n"
+           "./style.tex:3: Missing $ inserted.\n"
+           "! Emergency stop.\nl.40 \\end{document}\n")
+    assert parse_errors(log, "doc") == [(12, "Undefined control sequence."),
+                                         (None, "./style.tex:3: Missing $ inserted."),
+                                         (40, "Emergency stop.")]
+
+
+def test_bisection_finds_culprit(tmp_path, fake_latex_engine):
+    engine = str(fake_latex_engine(FAKE_ENGINE))
+    tex = _document(tmp_path, broken={5})
+    report = diagnose_file(tex, jobs=2, engine=engine)
+
+    assert report["status"] == "culprits"
+    [culprit] = report["culprits"]
+    assert culprit["source"].endswith("ex5.tex")
+    # error line mapped back to the exercise file (after its leading comment)
+    assert culprit["errors"][0]["source_line"] == 3
+    assert culprit["errors"][0]["text"] == "\\BROKEN{x}"
+    # empty + full document, then two halves per level: 2 + 2 * log2(8)
+    assert report["compiles"] == 8
+    saved = json.loads((tex.parent / "sebenta_x_diagnosis.json").read_text(encoding="utf-8"))
+    assert saved["culprits"][0]["index"] == 5
+    assert sorted(p.name for p in tex.parent.iterdir()) == ["sebenta_x.tex", "sebenta_x_diagnosis.json"]
+
+
+def test_bisection_multiple_and_ok(tmp_path, fake_latex_engine):
+    engine = str(fake_latex_engine(FAKE_ENGINE))
+    tex = _document(tmp_path, broken={0, 6})
+    report = diagnose_file(tex, engine=engine)
+    assert [c["index"] for c in report["culprits"]] == [0, 6]
+    assert report["interactions"] == []
+
+    tex.write_text(tex.read_text(encoding="utf-8").replace("\\BROKEN{x}", "$x$"), encoding="utf-8")
+    assert diagnose_file(tex, engine=engine)["status"] == "ok"
@@ -0,0 +1,59 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from document_stream import split_template, stream_document, write_document  # noqa: E402
+from latex_sanitize import ChunkSanitizer, sanitize_document  # noqa: E402
+
+TEMPLATE = "\\fancyhead[L]{%%HEADER_LEFT%%}\n\\begin{document}\n%%CONTENT%%\n\n\\end{document}\n"
+
+
+def test_streamed_document_matches_replace():
+    chunks = ["\\section*{Funções}\n", "% ex1\nSeja $x$.", "% ex2\nCalcule."]
+    out = io.StringIO()
+    assert stream_document(out, TEMPLATE, {"HEADER_LEFT": "P4"}, iter(chunks)) == 3
+    expected = TEMPLATE.replace("%%HEADER_LEFT%%", "P4").replace("%%CONTENT%%", "\n".join(chunks))
+    assert out.getvalue() == expected
+
+
+def test_sanitize_runs_per_chunk_and_missing_slot():
+    seen = []
+    out = io.StringIO()
+    stream_document(out, TEMPLATE, {}, ["a", "b"], sanitize=lambda t: seen.append(t) or t.upper())
+    assert seen[1:3] == ["a", "b"] and "A\nB" in out.getvalue()
+    header, footer = split_template("\\begin{document}\n\\end{document}\n", {})
+    assert header == "\\begin{document}\n" and footer == "\\end{document}\n"
+
+
+def test_write_document_is_atomic(tmp_path):
+    target = tmp_path / "sebenta.tex"
+    target.write_text("versão anterior", encoding="utf-8")
+
+    def chunks():
+        yield "primeiro"
+        raise RuntimeError("exercício ilegível")
+
+    with pytest.raises(RuntimeError):
+        write_document(target, TEMPLATE, {}, chunks())
+    assert target.read_text(encoding="utf-8") == "versão anterior"
+    assert list(tmp_path.iterdir()) == [target]
+
+    write_document(target, TEMPLATE, {"HEADER_LEFT": "Módulo"}, ["ç"])
+    assert "Módulo" in target.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("chunks", [
+    ["% custa $5\nSeja", "$x$ e $y"],        # $ sem par num bloco, equilibrado no documento
+    ["Seja $x$.", "% custa $5\nCalcule."],   # $ sem par no documento inteiro
+])
+def test_chunked_sanitize_keeps_document_dollar_parity(chunks):
+    whole = sanitize_document(TEMPLATE.replace("%%HEADER_LEFT%%", "").replace("%%CONTENT%%", "\n".join(chunks)))
+    clean = ChunkSanitizer()
+    out = io.StringIO()
+    stream_document(out, TEMPLATE, {"HEADER_LEFT": ""}, chunks, clean)
+    assert clean.finish(out.getvalue()) == whole
@@ -0,0 +1,62 @@
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from exercise_cache import ExerciseCache  # noqa: E402
+
+
+def _edit(make_exercise_tree, path: Path, text: str):
+    make_exercise_tree({path: text})
+    st = path.stat()
+    # make sure the edit is visible even on coarse mtime filesystems
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_memory_and_disk_hits(tmp_path, make_exercise_tree):
+    exercise = make_exercise_tree({"ex1.tex": "  Seja x ∈ ℝ.\n"}) / "ex1.tex"
+    cache = ExerciseCache(tmp_path / "cache")
+
+    assert cache.body(exercise) == "Seja x $\\in$ $\\mathbb{R}$."
+    assert cache.body(exercise) == "Seja x $\\in$ $\\mathbb{R}$."
+    assert (cache.misses, cache.hits, cache.disk_hits) == (1, 1, 0)
+
+    # a new process reads the sanitized body from disk
+    fresh = ExerciseCache(tmp_path / "cache")
+    assert fresh.body(exercise) == "Seja x $\\in$ $\\mathbb{R}$."
+    assert (fresh.misses, fresh.disk_hits) == (0, 1)
+
+    _edit(make_exercise_tree, exercise, "Seja y ∈ ℝ.")
+    assert fresh.body(exercise) == "Seja y $\\in$ $\\mathbb{R}$."
+    assert fresh.misses == 1
+
+
+def test_subvariants_are_expanded_and_part_of_the_key(tmp_path, make_exercise_tree):
+    folder = make_exercise_tree({"EX1/main.tex": "\\exercicio{Calcule}\n\\input{subvariant_1}\n",
+                                 "EX1/subvariant_1.tex": "$x → 1$\n"}) / "EX1"
+    main = folder / "main.tex"
+    cache = ExerciseCache(tmp_path / "cache")
+
+    assert cache.body(main) == "\\exercicio{Calcule}\n$x \\to 1$"
+    assert cache.body(main, expand=False) == "\\exercicio{Calcule}\n\\input{subvariant_1}"
+    _edit(make_exercise_tree, folder / "subvariant_1.tex", "$x → 2$\n")
+    assert cache.body(main) == "\\exercicio{Calcule}\n$x \\to 2$"
+    assert ExerciseCache(tmp_path / "cache").body(main) == "\\exercicio{Calcule}\n$x \\to 2$"
+
+
+def test_lru_and_disabled(tmp_path, monkeypatch):
+    cache = ExerciseCache(tmp_path / "cache", max_entries=2)
+    files = []
+    for n in range(3):
+        files.append(tmp_path / f"ex{n}.tex")
+        files[-1].write_text(f"exercício {n}", encoding="utf-8")
+        cache.body(files[-1])
+    cache.body(files[0])  # evicted from memory, still on disk
+    assert (cache.hits, cache.disk_hits, cache.misses) == (0, 1, 3)
+
+    monkeypatch.setenv("EXERCISE_CACHE", "0")
+    disabled = ExerciseCache(tmp_path / "other")
+    assert disabled.body(files[1]) == "exercício 1"
+    assert disabled.misses == 1 and not (tmp_path / "other").exists()
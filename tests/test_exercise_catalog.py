@@ -0,0 +1,73 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import exercise_catalog  # noqa: E402
+import exercise_utils  # noqa: E402
+
+
+def _write_index(base: Path):
+    index = {
+        'database_version': '3.0',
+        'last_updated': '',
+        'total_exercises': 2,
+        'statistics': {},
+        'exercises': [
+            {'id': 'EX_A', 'path': 'matematica/P4/c1/t1/EX_A.tex', 'discipline': 'matematica',
+             'module': 'P4', 'concept': 'c1', 'tipo': 't1', 'difficulty': 2, 'tags': ['inversa'], 'points': 5},
+            {'id': 'EX_B', 'path': 'matematica/P4/c2/t1/EX_B.tex', 'discipline': 'matematica',
+             'module': 'P4', 'concept': 'c2', 'tipo': 't1', 'difficulty': 3, 'tags': ['grafico'], 'points': 10},
+        ],
+        'projects': [{'id': 'PROJ_1'}],
+    }
+    (base / 'index.json').write_text(json.dumps(index), encoding='utf-8')
+
+
+def test_catalog_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv('EXERCISE_CATALOG_PATH', raising=False)
+    assert exercise_catalog.open_catalog(tmp_path) is None
+
+
+def test_import_query_and_export_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.delenv('EXERCISE_CATALOG_PATH', raising=False)
+    _write_index(tmp_path)
+    with exercise_catalog.ExerciseCatalog(tmp_path / 'index.sqlite') as catalog:
+        assert catalog.import_index(tmp_path / 'index.json') == 2
+        assert [e['id'] for e in catalog.query(concept='c2')] == ['EX_B']
+        assert [e['id'] for e in catalog.query(tags=['inversa'])] == ['EX_A']
+        assert [e['id'] for e in catalog.query(min_points=6)] == ['EX_B']
+
+    # update_index now goes to the catalog instead of rewriting index.json
+    before = (tmp_path / 'index.json').read_text(encoding='utf-8')
+    meta = {'id': 'EX_C', 'classification': {'discipline': 'matematica', 'module': 'P4', 'concept': 'c1',
+                                             'tipo': 't2', 'difficulty': 1, 'tags': ['inversa']}}
+    target = exercise_utils.update_index(tmp_path, meta, 'matematica\\P4\\c1\\t2\\EX_C.tex')
+    assert target == tmp_path / 'index.sqlite'
+    assert (tmp_path / 'index.json').read_text(encoding='utf-8') == before
+
+    catalog = exercise_catalog.open_catalog(tmp_path)
+    with catalog:
+        assert {e['id'] for e in catalog.query(tags=['inversa'])} == {'EX_A', 'EX_C'}
+        catalog.export_index(tmp_path / 'index.json')
+
+    exported = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert exported['total_exercises'] == 3
+    assert exported['exercises'][-1]['path'] == 'matematica/P4/c1/t2/EX_C.tex'
+    assert exported['statistics']['by_module'] == {'P4': 3}
+    assert exported['projects'] == [{'id': 'PROJ_1'}]
+
+
+def test_upsert_merges_first_row(tmp_path):
+    _write_index(tmp_path)
+    with exercise_catalog.ExerciseCatalog(tmp_path / 'index.sqlite') as catalog:
+        catalog.import_index(tmp_path / 'index.json')
+        catalog.upsert_exercise({'id': 'EX_A', 'difficulty': 4, 'tags': ['derivada']})
+        catalog.upsert_exercise({'id': 'EX_N', 'module': 'P1', 'difficulty': 1})
+        assert [e['id'] for e in catalog.query(tags=['derivada'])] == ['EX_A']
+        assert catalog.query(tags=['inversa']) == []
+        assert catalog.get('EX_A')['points'] == 5
+        assert catalog.statistics()['by_difficulty'] == {'Difícil': 1, 'Médio': 1, 'Muito Fácil': 1}
+        assert catalog.count() == 3
@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import exercise_index  # noqa: E402
+from exercise_index import ExerciseIndex  # noqa: E402
+
+
+def _exercises(n=500, seed=7):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        ex = {
+            'id': f'EX_{i}',
+            'discipline': 'matematica',
+            'module': rng.choice(['P1', 'P2', 'P4']),
+            'concept': rng.choice(['c1', 'c2', 'c3', None]),
+            'tipo': rng.choice(['t1', 't2']),
+            'difficulty': rng.randint(1, 5),
+            'tags': rng.sample(['a', 'b', 'c', 'd'], rng.randint(0, 2)),
+        }
+        if rng.random() < 0.5:
+            ex['points'] = rng.choice([5, 10, 15, 20])
+        out.append(ex)
+    return out
+
+
+def _linear(exercises, module=None, concept=None, difficulty=None, tags=None, min_points=None, max_points=None):
+    res = []
+    for ex in exercises:
+        if module and ex.get('module') != module:
+            continue
+        if concept and ex.get('concept') != concept:
+            continue
+        if difficulty and ex.get('difficulty') != difficulty:
+            continue
+        if min_points and (ex.get('points') or 0) < min_points:
+            continue
+        if max_points and (ex.get('points') or 0) > max_points:
+            continue
+        if tags and not any(t in ex.get('tags', []) for t in tags):
+            continue
+        res.append(ex)
+    return res
+
+
+def test_query_matches_linear_scan():
+    exercises = _exercises()
+    idx = ExerciseIndex(exercises)
+    cases = [
+        {},
+        {'module': 'P4'},
+        {'module': 'P2', 'concept': 'c1'},
+        {'module': 'P1', 'difficulty': 3, 'tags': ['a', 'c']},
+        {'min_points': 10},
+        {'max_points': 10, 'module': 'P4'},
+        {'min_points': 10, 'max_points': 15, 'tags': ['b']},
+        {'module': 'P9'},
+    ]
+    for filters in cases:
+        assert idx.query(**filters) == _linear(exercises, **filters), filters
+
+
+def test_match_missing_and_ids():
+    exercises = [
+        {'id': 'A', 'module': 'P4', 'concept': 'c1'},
+        {'id': 'B', 'module': 'P4'},
+        {'id': 'C', 'module': 'P1', 'concept': 'c1'},
+        {'id': 'A', 'module': 'P4', 'concept': 'c2'},
+    ]
+    idx = ExerciseIndex(exercises)
+    assert [e['id'] for e in idx.query(module='P4', concept='c1')] == ['A']
+    assert [e['id'] for e in idx.query(module='P4', concept='c1', match_missing=True)] == ['A', 'B']
+    assert idx.get('A') is exercises[0]
+    assert idx.get_all('A') == [exercises[0], exercises[3]]
+
+
+def test_shared_index_rebuilds_when_file_changes(tmp_path):
+    index_file = tmp_path / 'index.json'
+    index_file.write_text(json.dumps({'exercises': [{'id': 'A', 'module': 'P4'}]}), encoding='utf-8')
+    first = exercise_index.get_shared_index(index_file)
+    assert exercise_index.get_shared_index(index_file) is first
+
+    index_file.write_text(json.dumps({'exercises': [{'id': 'A', 'module': 'P4'}, {'id': 'B', 'module': 'P4'}]}),
+                          encoding='utf-8')
+    os.utime(index_file, ns=(0, 1))
+    second = exercise_index.get_shared_index(index_file)
+    assert second is not first
+    assert [e['id'] for e in second.query(module='P4')] == ['A', 'B']
@@ -0,0 +1,74 @@
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from exercise_selection import normalize_constraints, select_with_constraints, violations  # noqa: E402
+
+
+def _pool(n=400, seed=3):
+    rng = random.Random(seed)
+    return [{
+        "id": f"EX{i:04d}",
+        "concept": f"c{i % 12}",
+        "difficulty": rng.randint(1, 4),
+        "points": rng.choice([5, 8, 10, 12, 15, 20]),
+        "tags": rng.sample(["dominio", "zeros", "grafico", "inversa"], rng.randint(0, 1))
+                + (["contradominio"] if i in (17, 250) else []),
+    } for i in range(n)]
+
+
+def test_all_constraints_are_met():
+    config = {"constraints": {
+        "count": 8, "target_points": 97,
+        "difficulty": {"1": 2, "2": 3, "3": 2},
+        "required_tags": ["contradominio", "inversa"],
+        "max_per_concept": 1,
+    }}
+    for seed in range(5):
+        result = select_with_constraints(_pool(), config, random.Random(seed))
+        assert result.feasible, result.reasons
+        chosen = result.selected
+        assert len(chosen) == 8 and len({e["id"] for e in chosen}) == 8
+        assert sum(e["points"] for e in chosen) == 97 == result.points
+        levels = Counter(e["difficulty"] for e in chosen)
+        assert levels[1] >= 2 and levels[2] >= 3 and levels[3] >= 2
+        assert {"contradominio", "inversa"} <= {t for e in chosen for t in e["tags"]}
+        assert max(Counter(e["concept"] for e in chosen).values()) == 1
+
+
+def test_infeasible_constraints_are_explained():
+    pool = _pool()
+    unreachable = {"constraints": {"count": 3, "target_points": 100}}
+    reasons = select_with_constraints(pool, unreachable, random.Random(0)).reasons
+    assert reasons == ["pontuação: o alvo 100 ± 0 está fora do alcance [15, 60]"]
+
+    capped = {"constraints": {"difficulty": {"4": 20}, "required_tags": ["nenhuma"], "max_per_concept": 1}}
+    reasons = select_with_constraints(pool, capped, random.Random(0)).reasons
+    assert "total: pedidos 20 exercícios, disponíveis 12 com no máximo 1 por conceito" in reasons
+    assert "dificuldade 4: pedidos 20, disponíveis 12" in reasons
+    assert "etiqueta 'nenhuma': nenhum exercício candidato a tem" in reasons
+
+
+def test_missing_difficulty_never_fills_a_quota():
+    pool = [{"id": "a", "difficulty": None}, {"id": "b", "difficulty": None}, {"id": "c", "difficulty": 2}]
+    constraints, _ = normalize_constraints({"constraints": {"difficulty": {"1": 2}}})
+    result = select_with_constraints(pool, {"constraints": {"difficulty": {"1": 2}}}, random.Random(0))
+    assert not result.feasible
+    assert "dificuldade 1: pedidos 2, disponíveis 0" in result.reasons
+
+    result = select_with_constraints(pool + [{"id": "d", "difficulty": 1}, {"id": "e", "difficulty": "1"}],
+                                     {"constraints": {"difficulty": {"1": 2}}}, random.Random(0))
+    assert result.feasible and violations(result.selected, constraints) == []
+    assert sorted(e["id"] for e in result.selected) == ["d", "e"]
+
+
+def test_difficulty_fractions_and_config_errors():
+    constraints, errors = normalize_constraints({"count": 6, "constraints": {"difficulty": {"1": 0.5, "2": 0.25, "3": 0.25}}})
+    assert not errors and constraints["quotas"] == {"1": 3, "2": 2, "3": 1}
+    _, errors = normalize_constraints({"constraints": {"count": 2, "difficulty": {"1": 3}}})
+    assert errors == ["constraints: 'difficulty' pede 3 exercícios mas 'count' é 2"]
+    assert normalize_constraints({"count": 4}) == (None, [])
@@ -0,0 +1,72 @@
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from exposure_ledger import ExposureLedger, load_exposure  # noqa: E402
+from exercise_selection import select_with_constraints  # noqa: E402
+
+
+def _pool(n=40):
+    return [{"id": f"EX{i:03d}", "tipo": f"t{i % 2}", "difficulty": 1 + i % 3, "points": 10} for i in range(n)]
+
+
+def test_recent_window_scope_and_rerecord(tmp_path):
+    path = tmp_path / "exposure.sqlite"
+    with ExposureLedger(path) as ledger:
+        assert ledger.record(["EX001", "EX002", "EX002"], "t1", "10A", "2026-09-01") == 2
+        assert ledger.record([{"id": "EX003"}, Path("db/EX004.tex")], "t2", "10B", "2026-09-20") == 2
+        # subvariant exercises are keyed by their folder, not by main.tex
+        assert ledger.record([Path("db/EX005/main.tex"), {"path": "db/EX006/main.tex"}], "t3", "10B",
+                             "2026-09-20") == 2
+        assert [h["test"] for h in ledger.history("EX006")] == ["t3"]
+        assert ledger.forget("t3") == 2
+        # the same test generated again only moves its date forward
+        assert ledger.record(["EX001"], "t1", "10A", "2026-09-25") == 1
+        assert ledger.record(["EX001"], "t1", "10A", "2026-09-02") == 0
+
+        recent = ledger.recent(10, today="2026-09-30")
+        assert set(recent) == {"EX001", "EX003", "EX004"}
+        assert recent["EX001"] == ("2026-09-25", 1)
+        assert set(ledger.recent(10, "10B", today="2026-09-30")) == {"EX003", "EX004"}
+        assert set(ledger.recent(60, today="2026-09-30")) == {"EX001", "EX002", "EX003", "EX004"}
+
+        assert ledger.forget("t2") == 2 and ledger.count() == 2
+        assert [h["test"] for h in ledger.history("EX001")] == ["t1"]
+
+
+def test_exclude_and_penalize_filters(tmp_path):
+    path = tmp_path / "exposure.sqlite"
+    assert load_exposure({"window_days": 30}, path=path) is None
+    with ExposureLedger(path) as ledger:
+        ledger.record([f"EX{i:03d}" for i in range(0, 40, 2)], "old", "10A", "2026-09-01")
+        ledger.record(["EX001"], "new", "10B", "2026-09-28")
+
+    exclude = load_exposure({"window_days": 30}, path=path, today="2026-09-30")
+    pool = _pool()
+    fresh = exclude.admit(pool)
+    assert len(fresh) == 19 and all(int(ex["id"][2:]) % 2 and ex["id"] != "EX001" for ex in fresh)
+
+    penalize = load_exposure({"window_days": 30, "mode": "penalize"}, path=path, today="2026-09-30")
+    assert penalize.admit(pool) is pool
+    shuffled = pool[:]
+    random.Random(1).shuffle(shuffled)
+    ordered = penalize.order(shuffled)
+    assert [ex["id"] for ex in ordered[:19]] == [ex["id"] for ex in shuffled if ex in fresh]
+    assert ordered[-1]["id"] == "EX001"
+
+    # scope "class": only this class's tests count
+    own = load_exposure({"window_days": 30, "scope": "class", "class": "10B"}, path=path, today="2026-09-30")
+    assert set(own.recent) == {"EX001"}
+
+
+def test_constraints_run_on_fresh_pool(tmp_path):
+    path = tmp_path / "exposure.sqlite"
+    with ExposureLedger(path) as ledger:
+        ledger.record([f"EX{i:03d}" for i in range(30)], "last_week", "10A", "2026-09-25")
+    exposure = load_exposure({"window_days": 14}, path=path, today="2026-09-30")
+    config = {"constraints": {"count": 6, "difficulty": {"1": 2}}}
+    result = select_with_constraints(exposure.admit(_pool()), config, random.Random(0))
+    assert result.feasible and {ex["id"] for ex in result.selected} <= {f"EX{i:03d}" for i in range(30, 40)}
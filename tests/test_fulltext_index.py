@@ -0,0 +1,84 @@
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import fulltext_index  # noqa: E402
+
+
+DB = {
+    "matematica/P4/inversa/calc/EX_INV.tex":
+        "% Exercise ID: EX_INV\n\\exercicio{Determine a função inversa de $f(x)=2x+1$ "
+        "e complete a \\textbf{tabela}.}\n",
+    "matematica/P4/inversa/calc/EX_INV_solution.tex": "% solução com tabela\nfunção inversa",
+    "matematica/P4/graficos/leitura/EX_GRAF.tex":
+        "\\exercicio{Observe o gráfico da função e indique o contradomínio.}\n",
+    "matematica/P4/inversa/analitica/EX_SUB/main.tex": "% Exercise ID: EX_SUB\n\\exercicio{Para cada alínea:}\n",
+    "matematica/P4/inversa/analitica/EX_SUB/subvariant_1.tex":
+        "Calcule a inversa de $g(x)=x^3$ usando uma tabela de valores.",
+    "_staging/STG/STG.tex": "função inversa tabela",
+    # editor backups next to the exercise are not indexed
+    "matematica/P4/inversa/calc/EX_INV.agentfix.tex": "função inversa tabela",
+    "matematica/P4/inversa/calc/EX_INV.bak_agent_20251127T121826Z.tex": "função inversa tabela",
+    "matematica/P4/inversa/analitica/EX_SUB/subvariant_1.agentfix.tex": "contradomínio",
+}
+
+
+def test_strip_latex_and_fold_accents():
+    text = fulltext_index.strip_latex(
+        "\\exercicio{A fun\\c{c}\\~ao $f(x)=x^2$ \\textbf{é} par % comentário\n\\[ y \\]}")
+    assert fulltext_index.tokenize(text) == ["funcao", "par"]
+    assert fulltext_index.tokenize("Função INVERSA") == ["funcao", "inversa"]
+
+
+def test_search_ranks_and_updates_incrementally(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    with fulltext_index.FullTextIndex(tmp_path) as index:
+        assert index.update() == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+
+        hits = index.search("funcao inversa tabela")
+        assert [h["id"] for h in hits][:2] == ["EX_INV", "EX_SUB"]
+        assert [h["id"] for h in index.search("contradominio")] == ["EX_GRAF"]
+        assert [h["id"] for h in index.search("inversa grafico", require_all=True)] == []
+        # math content is not indexed
+        assert index.search("x^3") == []
+
+        assert index.update()["unchanged"] == 3
+
+        graf = tmp_path / "matematica/P4/graficos/leitura/EX_GRAF.tex"
+        make_exercise_tree({graf: "\\exercicio{Use a tabela para esboçar o gráfico.}\n"})
+        os.utime(graf, ns=(0, 1))
+        (tmp_path / "matematica/P4/inversa/calc/EX_INV.tex").unlink()
+        assert index.update() == {"added": 0, "updated": 1, "removed": 1, "unchanged": 1}
+        assert {h["id"] for h in index.search("tabela")} == {"EX_GRAF", "EX_SUB"}
+
+
+
+def test_search_without_refresh_builds_only_a_missing_index(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    assert [h["id"] for h in fulltext_index.search_text("contradominio", base_dir=tmp_path, refresh=False)] \
+        == ["EX_GRAF"]
+    make_exercise_tree({"matematica/P4/graficos/leitura/EX_NOVO.tex": "\\exercicio{Indique o contradomínio.}\n"})
+    assert len(fulltext_index.search_text("contradominio", base_dir=tmp_path, refresh=False)) == 1
+    assert len(fulltext_index.search_text("contradominio", base_dir=tmp_path)) == 2
+
+def test_api_search_route(client, monkeypatch):
+    def fake_search(q, limit=20, require_all=False):
+        return [{"id": "EX_INV", "path": "x.tex", "score": 1.0, "matched_terms": 2}]
+
+    monkeypatch.setattr("service.utils_wrappers.search_exercises_text", fake_search)
+    r = client.get("/api/v1/exercises/search", params={"q": "função inversa"})
+    assert r.status_code == 200
+    assert r.json()["results"][0]["id"] == "EX_INV"
+    assert client.get("/api/v1/exercises/search", params={"q": " "}).status_code == 400
+
+
+def test_api_wrapper_does_not_rescan_the_tree(monkeypatch):
+    calls = []
+    monkeypatch.setattr("ExerciseDatabase._tools.fulltext_index.search_text",
+                        lambda query, **kwargs: calls.append(kwargs) or [])
+    from service.utils_wrappers import search_exercises_text
+    assert search_exercises_text("função inversa") == []
+    assert calls[0]["refresh"] is False
@@ -33,6 +33,7 @@ def run_generator(output_dir: Path) -> int:
         exercise_rel,
         "--output",
         str(output_dir),
+        "--no-ledger",
         # Note: run with compilation enabled so we can assert the produced PDF
     ]
 
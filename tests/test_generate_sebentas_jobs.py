@@ -0,0 +1,174 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+EXERCISE_DB = REPO_ROOT / "ExerciseDatabase"
+SEBENTAS_DB = REPO_ROOT / "SebentasDatabase"
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path, monkeypatch):
+    # the generator runs (and its subprocesses, which copy os.environ) cache outside the repo
+    monkeypatch.setenv("COMPILE_CACHE_PATH", str(tmp_path / "cache"))
+
+
+def _make_concepts(disc: Path, out: Path):
+    for path in (disc, out):
+        if path.exists():
+            shutil.rmtree(path)
+    for concept in ("c1", "c2", "c3"):
+        tipo_dir = disc / "mod" / concept / "tipo"
+        tipo_dir.mkdir(parents=True)
+        (tipo_dir / f"ex_{concept}.tex").write_text(
+            f"\\begin{{exercise}}Exercicio {concept}\\end{{exercise}}", encoding="utf-8")
+
+
+def _run(discipline: str, *extra: str) -> subprocess.CompletedProcess:
+    cmd = [sys.executable, str(SEBENTAS_DB / "_tools" / "generate_sebentas.py"),
+           "--discipline", discipline,
+           "--no-compile",
+           "--no-preview",
+           "--auto-approve", *extra]
+    env = os.environ.copy()
+    env['PYTHONIOENCODING'] = 'utf-8'
+    proc = subprocess.run(cmd, cwd=str(REPO_ROOT), env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    return proc
+
+
+def test_generate_sebentas_parallel_jobs():
+    disc = EXERCISE_DB / "tmp_test_jobs"
+    out = SEBENTAS_DB / "tmp_test_jobs"
+    _make_concepts(disc, out)
+    try:
+        proc = _run("tmp_test_jobs", "--jobs", "2")
+
+        for concept in ("c1", "c2", "c3"):
+            tex = out / "mod" / concept / f"sebenta_{concept}.tex"
+            assert f"Exercicio {concept}" in tex.read_text(encoding="utf-8")
+
+        # module sebenta is built after its concepts, in concept order
+        module_tex = (out / "mod" / "sebenta_modulo_mod.tex").read_text(encoding="utf-8")
+        positions = [module_tex.index(f"Exercicio {c}") for c in ("c1", "c2", "c3")]
+        assert positions == sorted(positions)
+        # stats from the workers are summed in the parent: 3 concepts + 1 module
+        assert "Sebentas geradas: 4" in proc.stdout
+    finally:
+        for path in (disc, out):
+            if path.exists():
+                shutil.rmtree(path)
+
+
+def test_generate_sebentas_incremental():
+    disc = EXERCISE_DB / "tmp_test_incremental"
+    out = SEBENTAS_DB / "tmp_test_incremental"
+    _make_concepts(disc, out)
+    try:
+        first = _run("tmp_test_incremental", "--incremental")
+        assert "Sebentas geradas: 4" in first.stdout
+        assert "sem manifesto anterior" in first.stdout
+
+        second = _run("tmp_test_incremental", "--incremental")
+        assert "Sebentas geradas: 0" in second.stdout
+        assert "Já atualizadas:   4" in second.stdout
+
+        exercise = disc / "mod" / "c2" / "tipo" / "ex_c2.tex"
+        exercise.write_text("\\begin{exercise}Exercicio c2 editado\\end{exercise}", encoding="utf-8")
+        third = _run("tmp_test_incremental", "--incremental", "--jobs", "2")
+        # only c2 and the module sebenta are rebuilt, each with the changed file as reason
+        assert "Sebentas geradas: 2" in third.stdout
+        assert third.stdout.count("alterado: ExerciseDatabase/tmp_test_incremental/mod/c2/tipo/ex_c2.tex") == 2
+        assert "Exercicio c2 editado" in (out / "mod" / "sebenta_modulo_mod.tex").read_text(encoding="utf-8")
+    finally:
+        for path in (disc, out):
+            if path.exists():
+                shutil.rmtree(path)
+
+
+def test_module_sebenta_merge_mode():
+    disc = EXERCISE_DB / "tmp_test_merge"
+    out = SEBENTAS_DB / "tmp_test_merge"
+    _make_concepts(disc, out)
+    try:
+        # concept PDFs from an earlier build; c2 never compiled
+        for concept in ("c1", "c3"):
+            pdfs = out / "mod" / concept / "pdfs"
+            pdfs.mkdir(parents=True)
+            (pdfs / f"sebenta_{concept}.pdf").write_bytes(b"%PDF-1.5")
+            (pdfs / f"paginas_{concept}.pdf").write_bytes(b"%PDF-1.5")
+        proc = _run("tmp_test_merge", "--module-mode", "merge")
+
+        module_tex = (out / "mod" / "sebenta_modulo_mod.tex").read_text(encoding="utf-8")
+        assert "\\usepackage{pdfpages}" in module_tex and "\\tableofcontents" in module_tex
+        includes = [line for line in module_tex.splitlines() if line.startswith("\\includepdf")]
+        # the unnumbered concept pages, numbered by the module footer (nothing painted over)
+        assert [line.rsplit("{", 1)[1] for line in includes] == ["c1/pdfs/paginas_c1.pdf}", "c3/pdfs/paginas_c3.pdf}"]
+        assert "addtotoc={1,section,1,c1,conceito:1}" in includes[0]
+        assert "\\cfoot{\\thepage}" in module_tex and "colorbox" not in module_tex
+        assert "Exercicio" not in module_tex
+        assert "PDF do conceito (sem números) em falta" in proc.stdout
+    finally:
+        for path in (disc, out):
+            if path.exists():
+                shutil.rmtree(path)
+
+
+def test_merge_mode_compiles_unnumbered_concept_copy(tmp_path, monkeypatch):
+    sys.path.insert(0, str(SEBENTAS_DB / "_tools"))
+    import generate_sebentas
+
+    source = "\\documentclass{article}\n\\begin{document}x\\end{document}\n"
+    tex = tmp_path / "sebenta_c1.tex"
+    tex.write_text(source, encoding="utf-8")
+    merge = generate_sebentas.SebentaGenerator(no_preview=True, auto_approve=True, module_mode="merge")
+    pages = merge._pages_source(tex)
+    assert pages == tmp_path / "paginas_c1.tex"
+    assert not tex.exists()
+    # mesmo número de linhas: os erros apontam para as linhas do .tex original
+    assert pages.read_text(encoding="utf-8") == source.replace("\\begin", "\\def\\SebentaSemNumeros{}\\begin")
+    assert merge._pages_source(tmp_path / "sebenta_modulo_m.tex") is None
+
+    full = generate_sebentas.SebentaGenerator(no_preview=True, auto_approve=True)
+    assert full._pages_source(tex) is None
+
+    # os exercícios só são compilados uma vez; o PDF numerado vem do PDF sem números
+    compiled = []
+    monkeypatch.setattr(merge, "_compile_tex", lambda path: compiled.append(path.read_text(encoding="utf-8")) or True)
+    tex.write_text(source, encoding="utf-8")
+    assert merge.compile_pdf(tex)
+    assert len(compiled) == 2
+    assert "\\SebentaSemNumeros" in compiled[0] and "x\\end{document}" in compiled[0]
+    assert "x\\end{document}" not in compiled[1]
+    assert "\\includepdf[pages=-,pagecommand={\\thispagestyle{fancy}}]{pdfs/paginas_c1.pdf}" in compiled[1]
+    assert "\\cfoot{\\thepage}" in compiled[1]
+
+    template = generate_sebentas.TEMPLATE_PATH.read_text(encoding="utf-8")
+    assert "\\ifdefined\\SebentaSemNumeros" in template
+
+
+def test_compile_removes_linked_tikz_figures(tmp_path, monkeypatch):
+    sys.path.insert(0, str(SEBENTAS_DB / "_tools"))
+    import generate_sebentas
+
+    def fake_latex(cmd, cwd, timeout):
+        (Path(cwd) / "sebenta_c1.pdf").write_bytes(b"%PDF-1.5")
+        return subprocess.CompletedProcess(cmd, 0, "", ""), 1
+
+    monkeypatch.setattr(generate_sebentas, "run_latex", fake_latex)
+    monkeypatch.setattr(generate_sebentas, "compile_with_cache", None)
+    monkeypatch.setattr(generate_sebentas.shutil, "which", lambda name: name)
+    monkeypatch.setattr(generate_sebentas, "PROJECT_ROOT", tmp_path)
+    tex = tmp_path / "sebenta_c1.tex"
+    tex.write_text("\\includegraphics{tikz_figures/ab.pdf}", encoding="utf-8")
+    (tmp_path / "tikz_figures").mkdir()
+    (tmp_path / "tikz_figures" / "ab.pdf").write_bytes(b"%PDF-1.5")
+
+    gen = generate_sebentas.SebentaGenerator(no_preview=True, auto_approve=True)
+    assert gen._compile_tex(tex)
+    assert (tmp_path / "pdfs" / "sebenta_c1.pdf").exists()
+    assert not (tmp_path / "tikz_figures").exists()
@@ -0,0 +1,91 @@
+import json
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "SebentasDatabase" / "_tools"))
+
+import generate_tests  # noqa: E402
+
+
+def _args(manifest, **overrides):
+    values = dict(batch=str(manifest), jobs=2, no_compile=True, no_preview=True, auto_approve=True,
+                  qa2_output=None, config=None, tipo=None, versions=None, version_labels=None, seed=None,
+                  balance=False, class_name=None, exposure_window=None, exposure_mode=None, no_ledger=True,
+                  diagnose=False, summary=None)
+    values.update(overrides)
+    return Namespace(**values)
+
+
+def test_manifest_defaults_and_validation(tmp_path):
+    manifest = tmp_path / "lote.json"
+    manifest.write_text(json.dumps({"defaults": {"versions": 2, "seed": 1},
+                                    "tests": [{"module": "M1"}, {"module": "M2", "versions": 4}]}))
+    entries = generate_tests.load_manifest(manifest)
+    assert [(e["module"], e["versions"], e["seed"]) for e in entries] == [("M1", 2, 1), ("M2", 4, 1)]
+
+    manifest.write_text(json.dumps([{"versions": 2}]))
+    with pytest.raises(ValueError, match="entrada 1"):
+        generate_tests.load_manifest(manifest)
+    assert generate_tests.version_labels_for(3, "X, Y", {}) == ["X", "Y", "3"]
+
+
+def test_batch_generates_every_combo_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_tests, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(generate_tests, "SEBENTAS_DB", tmp_path / "out")
+    exercises = [{"id": f"E{c}{i}", "discipline": "d", "module": "m", "concept": c, "path": f"d/m/{c}/E{i}.tex"}
+                 for c in ("c1", "c2") for i in range(6)]
+    combos = [("d", "m", "c1"), ("d", "m", "c2")]
+    manifest = tmp_path / "lote.json"
+    manifest.write_text(json.dumps({"defaults": {"config": {"count": 3}, "seed": 5},
+                                    "tests": [{"module": "m", "versions": 2}]}))
+    summary_file = tmp_path / "resumo.json"
+
+    rows = generate_tests.run_batch(_args(manifest, summary=str(summary_file)), exercises, combos)
+
+    assert [(r["combo"], r["label"]) for r in rows] == [
+        ("d/m/c1", "A"), ("d/m/c1", "B"), ("d/m/c2", "A"), ("d/m/c2", "B")]
+    assert all(r["output"] and Path(r["output"]).exists() for r in rows)
+    assert all(len(r["exercises"]) == 3 and r["exercises"][0].startswith("E" + r["combo"][-2:]) for r in rows)
+    assert len(list((tmp_path / "out" / "d" / "m" / "c2" / "tests").glob("test_*.tex"))) == 2
+    assert json.loads(summary_file.read_text())["jobs"] == 2
+
+
+def _fixture(tmp_path, monkeypatch, tests):
+    monkeypatch.setattr(generate_tests, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(generate_tests, "SEBENTAS_DB", tmp_path / "out")
+    exercises = [{"id": f"E{i}", "discipline": "d", "module": "m", "concept": "c1", "path": f"d/m/c1/E{i}.tex"}
+                 for i in range(6)]
+    manifest = tmp_path / "lote.json"
+    manifest.write_text(json.dumps({"defaults": {"config": {"count": 3}, "seed": 5}, "tests": tests}))
+    return manifest, exercises, [("d", "m", "c1")]
+
+
+def test_repeated_concept_and_label_get_distinct_files(tmp_path, monkeypatch):
+    manifest, exercises, combos = _fixture(tmp_path, monkeypatch, [
+        {"concept": "c1", "class": "10A"}, {"concept": "c1", "class": "10B", "seed": 6}])
+
+    rows = generate_tests.run_batch(_args(manifest), exercises, combos)
+
+    outputs = [Path(r["output"]) for r in rows]
+    assert [r["label"] for r in rows] == ["A", "A"] and outputs[0] != outputs[1]
+    assert outputs[1].stem.endswith("_A_2")
+    assert len(list((tmp_path / "out" / "d" / "m" / "c1" / "tests").glob("test_*.tex"))) == 2
+
+
+def test_failed_compile_leaves_no_build_dir(tmp_path, monkeypatch):
+    manifest, exercises, combos = _fixture(tmp_path, monkeypatch, [{"concept": "c1", "versions": 2}])
+    monkeypatch.setattr(generate_tests.shutil, "which", lambda name: "/usr/bin/pdflatex")
+    monkeypatch.setattr(generate_tests, "compile_with_cache", None)
+    monkeypatch.setattr(generate_tests, "run_latex", lambda cmd, cwd, timeout: (None, 1))
+    monkeypatch.setattr(generate_tests.time, "sleep", lambda seconds: None)
+
+    rows = generate_tests.run_batch(_args(manifest, no_compile=False), exercises, combos)
+
+    assert [r["output"] for r in rows] == [None, None]
+    out = tmp_path / "out" / "d" / "m" / "c1" / "tests"
+    assert not list(out.glob(".tmp_test_*"))
+    assert sorted(p.name[-5:] for p in (out / "logs").glob("test_*.tex")) == ["A.tex", "B.tex"]
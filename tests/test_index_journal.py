@@ -0,0 +1,77 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import exercise_utils  # noqa: E402
+import index_journal  # noqa: E402
+
+
+def _write_index(base: Path):
+    index = {
+        'database_version': '3.0',
+        'last_updated': '',
+        'total_exercises': 1,
+        'statistics': {'by_module': {'P4': 1}},
+        'exercises': [
+            {'id': 'EX_A', 'path': 'matematica/P4/c1/t1/EX_A.tex', 'module': 'P4', 'concept': 'c1'},
+        ],
+    }
+    (base / 'index.json').write_text(json.dumps(index), encoding='utf-8')
+
+
+def test_update_index_appends_to_journal(tmp_path, monkeypatch):
+    monkeypatch.delenv('EXERCISE_CATALOG_PATH', raising=False)
+    _write_index(tmp_path)
+    journal = index_journal.IndexJournal(tmp_path / 'index.json')
+    journal.enable()
+    before = (tmp_path / 'index.json').read_text(encoding='utf-8')
+
+    meta = {'id': 'EX_B', 'classification': {'discipline': 'matematica', 'module': 'P4',
+                                             'concept': 'c2', 'tipo': 't1', 'difficulty': 2}}
+    target = exercise_utils.update_index(tmp_path, meta, 'matematica\\P4\\c2\\t1\\EX_B.tex')
+
+    assert target == journal.path
+    assert (tmp_path / 'index.json').read_text(encoding='utf-8') == before
+    assert len(journal.records()[1]) == 1
+    index = index_journal.read_index(tmp_path / 'index.json')
+    assert [e['id'] for e in index['exercises']] == ['EX_A', 'EX_B']
+    assert index['total_exercises'] == 2
+
+
+def test_replay_and_compact(tmp_path):
+    _write_index(tmp_path)
+    journal = index_journal.IndexJournal(tmp_path / 'index.json')
+    journal.enable()
+    journal.append('add', entry={'id': 'EX_B', 'module': 'P5'})
+    journal.append('update', exercise_id='EX_A', changes={'status': 'review'})
+    journal.append('promote', entry={'id': 'EX_C', 'module': 'P5'})
+    journal.append('delete', exercise_id='EX_B')
+
+    index = journal.read()
+    assert {e['id']: e.get('status') for e in index['exercises']} == {'EX_A': 'review', 'EX_C': 'active'}
+    assert index['statistics']['by_module'] == {'P4': 1, 'P5': 1}
+
+    generation = journal.records()[0]
+    assert journal.compact() == 4
+    assert journal.records() == (generation + 1, [])
+    compacted = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert compacted['journal_generation'] == generation
+    assert [e['id'] for e in compacted['exercises']] == ['EX_A', 'EX_C']
+
+
+def test_interrupted_compaction_is_not_replayed_twice(tmp_path):
+    _write_index(tmp_path)
+    journal = index_journal.IndexJournal(tmp_path / 'index.json')
+    journal.enable()
+    journal.append('add', entry={'id': 'EX_B', 'module': 'P4'})
+    pending = journal.path.read_text(encoding='utf-8')
+    journal.compact()
+
+    # simulate a crash after the snapshot was written but before the journal reset
+    journal.path.write_text(pending, encoding='utf-8')
+    assert [e['id'] for e in journal.read()['exercises']] == ['EX_A', 'EX_B']
+    assert journal.compact() == 0
+    assert [e['id'] for e in index_journal.read_index(tmp_path / 'index.json')['exercises']] == ['EX_A', 'EX_B']
@@ -0,0 +1,88 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import exercise_catalog  # noqa: E402
+import exercise_utils  # noqa: E402
+import index_statistics  # noqa: E402
+from index_utils import update_projects_index  # noqa: E402
+
+
+def _entry(ex_id, module='P4', difficulty=2, status='active', **extra):
+    return {'id': ex_id, 'discipline': 'matematica', 'module': module, 'concept': 'c1',
+            'concept_name': 'Conceito 1', 'difficulty': difficulty, 'type': 'desenvolvimento',
+            'status': status, **extra}
+
+
+def test_deltas_match_full_recount():
+    index = {'exercises': [], 'statistics': {}}
+    index_statistics.add_entry(index, _entry('A'))
+    index_statistics.add_entry(index, _entry('B', module='P5', difficulty=4))
+    index_statistics.add_entry(index, _entry('C', status='review'))
+    index_statistics.update_entries(index, 'C', {'status': 'active', 'difficulty': 3})
+    index_statistics.remove_entries(index, 'A')
+    index_statistics.upsert_entry(index, {'id': 'B', 'module': 'P4'})
+
+    assert index['total_exercises'] == 2
+    assert index['statistics']['by_module'] == {'P4': 2}
+    assert index['statistics']['by_difficulty'] == {'Difícil': 1, 'Médio': 1}
+    assert index['statistics']['by_status'] == {'active': 2}
+    assert index['statistics'] == index_statistics.compute_statistics(index)
+    assert index_statistics.verify(index, full=True) == []
+
+
+def test_verify_detects_drift_and_rebuild_fixes_it():
+    index = {'exercises': [_entry('A'), _entry('B')], 'total_exercises': 3,
+             'statistics': {'by_module': {'P4': 1}}}
+    problems = index_statistics.verify(index)
+    assert any('total_exercises' in p for p in problems)
+    assert any(p.startswith('by_module') for p in problems)
+    index_statistics.rebuild(index)
+    assert index_statistics.verify(index, full=True) == []
+
+
+def test_writers_keep_all_facets_consistent(tmp_path, monkeypatch):
+    monkeypatch.delenv('EXERCISE_CATALOG_PATH', raising=False)
+    meta = {'id': 'EX_A', 'status': 'active',
+            'classification': {'discipline': 'matematica', 'module': 'P4', 'concept': 'c1',
+                               'concept_name': 'Conceito 1', 'tipo': 't1', 'difficulty': 2}}
+    exercise_utils.update_index(tmp_path, meta, 'matematica/P4/c1/t1/EX_A.tex')
+    update_projects_index({'id': 'PROJ_1', 'status': 'active'}, 'projects/PROJ_1', tmp_path / 'index.json')
+
+    index = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert index['statistics']['by_concept'] == {'Conceito 1': 1}
+    assert index['statistics']['by_project_status'] == {'active': 1}
+    assert index_statistics.verify(index, full=True) == []
+
+
+def test_typed_creator_uses_shared_writer(tmp_path, monkeypatch):
+    import add_exercise_with_types
+
+    monkeypatch.delenv('EXERCISE_CATALOG_PATH', raising=False)
+    monkeypatch.setattr(add_exercise_with_types, 'BASE_DIR', tmp_path)
+    # an index.json written before by_format existed
+    (tmp_path / 'index.json').write_text(json.dumps({'exercises': [], 'statistics': {'by_module': {}}}))
+    meta = {'id': 'EX_T', 'status': 'active', 'exercise_type': 'desenvolvimento',
+            'classification': {'discipline': 'matematica', 'module': 'P4', 'concept': 'c1',
+                               'concept_name': 'Conceito 1', 'tipo': 't1', 'tipo_nome': 'Tipo 1',
+                               'difficulty': 3, 'difficulty_label': 'Médio', 'tags': []}}
+    add_exercise_with_types.update_index(meta, 'matematica\\P4\\c1\\t1\\EX_T.tex')
+
+    index = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert [e['path'] for e in index['exercises']] == ['matematica/P4/c1/t1/EX_T.tex']
+    assert index['statistics']['by_difficulty'] == {'Médio': 1}
+    assert index['statistics']['by_type'] == {'Tipo 1': 1}
+    assert index['statistics']['by_format'] == {'desenvolvimento': 1}
+    assert index_statistics.verify(index, full=True) == []
+
+
+def test_catalog_statistics_are_materialized(tmp_path):
+    with exercise_catalog.ExerciseCatalog(tmp_path / 'index.sqlite') as catalog:
+        catalog.add_exercises([_entry('A'), _entry('B', module='P5')])
+        catalog.remove_exercise('A')
+        assert catalog.statistics()['by_module'] == {'P5': 1}
+        index = catalog.to_index()
+        assert index_statistics.verify(index, full=True) == []
@@ -41,3 +41,35 @@ def test_resolve_prefix(tmp_path):
     res = reg.resolve_ips([ip1[:-2] + '*'])
     assert any(r['ip'] == ip1 for r in res)
     assert any(r['ip'] == ip2 for r in res)
+
+
+def test_register_many_saves_once(tmp_path, monkeypatch):
+    rp = tmp_path / 'registry' / 'ip_registry.json'
+    items = [(['d1', 'm1', f'c{i % 2}', 't1', f'e{i}'], f'd1/m1/c{i % 2}/t1/e{i}') for i in range(6)]
+    reg = IPRegistry(path=rp)
+    saves = []
+    original_save = reg.save
+    monkeypatch.setattr(reg, 'save', lambda backup=True: (saves.append(backup), original_save(backup)))
+    ips = reg.register_many(items)
+    assert len(saves) == 1
+    assert len(set(ips)) == 6
+
+    # same IPs as registering one by one on a fresh registry
+    seq = IPRegistry(path=tmp_path / 'seq' / 'ip_registry.json')
+    assert [seq.register_path(*item) for item in items] == ips
+    # idempotent and visible to a new instance
+    assert IPRegistry(path=rp).register_many(items) == ips
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    rp = tmp_path / 'registry' / 'ip_registry.json'
+    reg = IPRegistry(path=rp)
+    reg.register_path(['d', 'm', 'c', 't', 'e0'], 'd/m/c/t/e0')
+    try:
+        with reg.transaction():
+            reg.register_path(['d', 'm', 'c', 't', 'e1'], 'd/m/c/t/e1')
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert len(IPRegistry(path=rp).load()['ips']) == 1
+    assert len(reg.load()['ips']) == 1
@@ -0,0 +1,64 @@
+import random
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from ip_trie import IPTrie, PathExistenceCache  # noqa: E402
+
+
+def _ips(n=400, seed=3):
+    rng = random.Random(seed)
+    ips = {}
+    while len(ips) < n:
+        ip = '.'.join(str(rng.randint(1, k)) for k in (2, 12, 6, 3, 9))
+        ips[ip] = {'path': f'p/{ip}'}
+    return ips
+
+
+def _in(ip, level, lo, hi):
+    return lo <= int(ip.split('.')[level]) <= hi
+
+
+def test_prefix_queries_match_startswith_scan():
+    ips = _ips()
+    trie = IPTrie(ips)
+    for prefix in ['1.', '1.1', '2.10.', '1.1.', '2.3.4.', '', '9.']:
+        expected = {ip for ip in ips if ip.startswith(prefix)}
+        got = trie.query(prefix + '*')
+        assert set(got) == expected and len(got) == len(expected), prefix
+
+
+def test_exact_range_and_set_queries():
+    ips = _ips()
+    trie = IPTrie(ips)
+    some = next(iter(ips))
+    assert trie.query(some) == [some]
+    assert trie.query('9.9.9.9.9') == []
+
+    assert set(trie.query('1.2.3-5')) == {ip for ip in ips if ip.startswith('1.2.') and _in(ip, 2, 3, 5)}
+    assert set(trie.query('1-2.4+7.*')) == {ip for ip in ips if ip.split('.')[1] in ('4', '7')}
+    assert set(trie.query('2.*.1-2.3')) == {
+        ip for ip in ips if ip.startswith('2.') and _in(ip, 2, 1, 2) and ip.split('.')[3] == '3'}
+    assert trie.query('1.x-y') == []
+
+
+def test_resolve_dedupes_in_token_order_and_numeric_order():
+    trie = IPTrie({'1.10.1.1.1': {}, '1.2.1.1.1': {}, '1.2.1.1.2': {}})
+    assert trie.query('1.*') == ['1.2.1.1.1', '1.2.1.1.2', '1.10.1.1.1']
+    assert trie.resolve(['1.10.1.1.1', '1.*']) == ['1.10.1.1.1', '1.2.1.1.1', '1.2.1.1.2']
+
+
+def test_path_existence_cache(tmp_path, monkeypatch):
+    (tmp_path / 'a.tex').write_text('x')
+    (tmp_path / 'EX').mkdir()
+    cache = PathExistenceCache()
+    calls = []
+    import ip_trie
+    real = ip_trie.os.listdir
+    monkeypatch.setattr(ip_trie.os, 'listdir', lambda p: (calls.append(p), real(p))[1])
+    assert cache.exists(tmp_path / 'a.tex') and cache.exists(tmp_path / 'EX')
+    assert not cache.exists(tmp_path / 'b.tex')
+    assert not cache.exists(tmp_path / 'missing' / 'c.tex')
+    assert len(calls) == 2
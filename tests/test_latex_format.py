@@ -0,0 +1,96 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from latex_format import ensure_format, format_command, package_preamble  # noqa: E402
+from latex_runner import run_latex  # noqa: E402
+
+TEMPLATES = REPO_ROOT / "SebentasDatabase" / "_templates"
+
+# "pdflatex" stand-in: -ini dumps a .fmt (counted in ini_runs.txt next to it), otherwise writes a PDF
+FAKE_ENGINE = '''
+import sys
+from pathlib import Path
+args = sys.argv[1:]
+jobname = next(a.split("=", 1)[1] for a in args if a.startswith("-jobname="))
+if "-ini" in args:
+    counter = Path(__file__).with_name("ini_runs.txt")
+    counter.write_text(str(int(counter.read_text()) + 1) if counter.exists() else "1")
+    Path(jobname + ".fmt").write_text(Path(args[-1]).read_text())
+else:
+    Path(jobname + ".log").write_text("fmt args: " + " ".join(args))
+    Path(jobname + ".pdf").write_text(Path(args[-1]).read_text())
+'''
+
+DOC = """% header comment
+\\documentclass{article}
+\\usepackage{tikz}
+\\IfFileExists{pgfplots.sty}{\\usepackage{pgfplots}\\pgfplotsset{compat=1.17}}{}
+
+\\geometry{margin=2cm}
+\\begin{document}
+x
+\\end{document}
+"""
+
+
+def test_package_preamble_of_templates():
+    for name in ("sebenta_template.tex", "test_template.tex"):
+        source = (TEMPLATES / name).read_text(encoding="utf-8")
+        preamble = package_preamble(source)
+        assert preamble.rstrip().endswith("{\\usepackage{pgfplots}\\pgfplotsset{compat=1.17}}{}")
+        assert "\\usepackage{tikz}" in preamble
+        assert "\\geometry" not in preamble and "%%" not in preamble
+    assert package_preamble("\\begin{document}x\\end{document}") == ""
+
+
+def test_format_built_once_and_reused(tmp_path, monkeypatch, fake_latex_engine):
+    monkeypatch.setenv("COMPILE_CACHE_PATH", str(tmp_path / "cache"))
+    engine = fake_latex_engine(FAKE_ENGINE, formats=True)
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "doc.tex").write_text(DOC, encoding="utf-8")
+
+    result, passes = run_latex([str(engine), "-interaction=nonstopmode", "doc.tex"], work)
+    assert passes == 1
+    formats = tmp_path / "cache" / "formats"
+    assert len(list(formats.glob("preamble-*.fmt"))) == 1
+    log = (work / "doc.log").read_text()
+    assert "-fmt=preamble-" in log and "-jobname=doc" in log
+    # body keeps the original line numbers and drops only the package block
+    body = (work / "doc.pdf").read_text()
+    assert body.splitlines()[5] == "\\geometry{margin=2cm}"
+    assert "\\usepackage" not in body
+    assert not (work / "doc.body.tex").exists()
+
+    run_latex([str(engine), "-interaction=nonstopmode", "doc.tex"], work)
+    assert (engine.parent / "ini_runs.txt").read_text() == "1"
+
+    (work / "doc.tex").write_text(DOC.replace("{tikz}", "{tikz,xcolor}"), encoding="utf-8")
+    run_latex([str(engine), "-interaction=nonstopmode", "doc.tex"], work)
+    assert len(list(formats.glob("preamble-*.fmt"))) == 2
+
+
+def test_format_disabled(tmp_path, monkeypatch, fake_latex_engine):
+    monkeypatch.setenv("COMPILE_CACHE_PATH", str(tmp_path / "cache"))
+    engine = fake_latex_engine(FAKE_ENGINE)
+    (tmp_path / "doc.tex").write_text(DOC, encoding="utf-8")
+    cmd = [str(engine), "doc.tex"]
+    assert format_command(cmd, tmp_path) == (cmd, None, None)
+    assert not os.path.exists(tmp_path / "cache" / "formats")
+
+
+def test_parallel_cold_builds_share_one_format(tmp_path, fake_latex_engine):
+    engine = fake_latex_engine(FAKE_ENGINE, formats=True)
+    formats = tmp_path / "formats"
+    preamble = package_preamble(DOC)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        names = list(pool.map(lambda _: ensure_format(str(engine), preamble, formats), range(4)))
+    assert len(set(names)) == 1 and names[0]
+    assert (engine.parent / "ini_runs.txt").read_text() == "1"
+    # no build folders or half-written files left next to the format
+    assert [p.name for p in formats.iterdir()] == [f"{names[0]}.fmt"]
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from latex_runner import run_latex  # noqa: E402
+
+# Stand-in for pdflatex: \ref needs the label from the previous pass, "UNSTABLE"
+# changes the .toc on every pass, "FATAL" produces no PDF.
+FAKE_ENGINE = r'''
+import sys
+from pathlib import Path
+tex = Path(sys.argv[-1])
+source = tex.read_text()
+aux = tex.with_suffix(".aux")
+previous = aux.read_text() if aux.exists() else ""
+if "FATAL" in source:
+    sys.exit(1)
+lines = ["\\relax", "\\providecommand\\hyper@newdestlabel[2]{}"]
+log = "This is fakeTeX\n"
+if "\\ref" in source:
+    lines.append("\\newlabel{a}{{1}{1}}")
+    if "\\newlabel{a}" not in previous:
+        log += "LaTeX Warning: Label(s) may have changed. Rerun to get cross-refe\nrences right.\n"
+aux.write_text("\n".join(lines))
+if "UNSTABLE" in source:
+    toc = tex.with_suffix(".toc")
+    toc.write_text(str(len(toc.read_text()) if toc.exists() else 0) + "x")
+tex.with_suffix(".log").write_text(log)
+tex.with_suffix(".pdf").write_bytes(b"%PDF")
+'''
+
+
+def _run(tmp_path: Path, engine: Path, body: str):
+    (tmp_path / "doc.tex").write_text(body, encoding="utf-8")
+    return run_latex([str(engine), "doc.tex"], tmp_path)
+
+
+def test_single_pass_without_references(tmp_path, fake_latex_engine):
+    result, passes = _run(tmp_path, fake_latex_engine(FAKE_ENGINE), "plain text")
+    assert result.returncode == 0
+    assert passes == 1
+
+
+def test_rerun_until_references_settle(tmp_path, fake_latex_engine):
+    _, passes = _run(tmp_path, fake_latex_engine(FAKE_ENGINE), "see \\ref{a}")
+    assert passes == 2
+
+
+def test_passes_are_capped(tmp_path, fake_latex_engine):
+    _, passes = _run(tmp_path, fake_latex_engine(FAKE_ENGINE), "UNSTABLE")
+    assert passes == 3
+
+
+def test_failed_pass_not_repeated(tmp_path, fake_latex_engine):
+    result, passes = _run(tmp_path, fake_latex_engine(FAKE_ENGINE), "FATAL")
+    assert result.returncode == 1
+    assert passes == 1
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from latex_sanitize import close_truncated, sanitize_document, sanitize_exercise  # noqa: E402
+
+
+def test_exercise_symbols_depend_on_math_mode():
+    out = sanitize_exercise("Seja x ∈ ℝ e $f: ℝ → ℝ$, x² ≠ 0 …")
+    assert out == "Seja x $\\in$ $\\mathbb{R}$ e $f: \\mathbb{R} \\to \\mathbb{R}$, x$^{2}$ $\\neq$ 0 $...$"
+    assert sanitize_exercise("\\[ a₁ ⇒ b⁻ \\]") == "\\[ a_{1} \\Rightarrow b- \\]"
+
+
+def test_exercise_backslashes_and_literal_newlines():
+    assert sanitize_exercise("\\\\\\\\frac{1}{2}") == "\\frac{1}{2}"
+    assert sanitize_exercise("a \\\\ b") == "a \\\\ b"
+    assert sanitize_exercise("Texto\\n\\item x\\nOutra") == "Texto\n\\item x\nOutra"
+    assert sanitize_exercise("\\node at (0,0) {$\\neq$}; \\newpage") == "\\node at (0,0) {$\\neq$}; \\newpage"
+
+
+def test_exercise_underscore_blanks_only_in_text():
+    out = sanitize_exercise("\\item Duração: ____ minutos\n$x_{____}$")
+    assert out == "\\item Duração: \\rule{2cm}{0.4pt} minutos\n$x_{____}$"
+
+
+def test_document_pass():
+    doc = ("% fix (Agent added)\n$\n\\\\\\\\item a\nq\n\\frac{1}{2}\n"
+           "\\begin{tikzpicture}\\draw (0,0) n\n  ode {A};\\end{tikzpicture}\n\n\n\n\\end{figure\n")
+    out = sanitize_document(doc)
+    assert "Agent added" not in out and "\nq\n" not in out
+    assert "\\item a" in out and "$\\frac{1}{2}$" in out
+    assert "\\node {A}" in out and "\\end{figure}" in out and "\n\n\n" not in out
+    assert sanitize_document("$x$ e $y") == "$x$ e \\$y"
+
+
+def test_close_truncated():
+    assert close_truncated("\\exercicio{texto $x") == "\\exercicio{texto $x\n}$\n"
+    assert close_truncated("a\r\nb") == "a\nb\n"
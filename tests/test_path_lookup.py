@@ -0,0 +1,76 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import path_lookup  # noqa: E402
+from path_lookup import PathLookup, record_paths, resolve_exercise  # noqa: E402
+
+
+EXERCISE = "\\exercicio{...}\n"
+DB = {
+    "matematica/P4/inversa/calc/MAT_INV_CALC_001.tex": EXERCISE,
+    "matematica/P4/inversa/calc/MAT_INV_CALC_002.tex": EXERCISE,
+    "matematica/P1/estatística/Leitura_Gráfico/main.tex": EXERCISE,
+    "_tools/ignored.tex": EXERCISE,
+    "index.json": json.dumps({"exercises": [{"id": "EX_SUB", "path": "matematica/P1/estatística/Leitura_Gráfico"}]}),
+}
+
+
+def test_exact_insensitive_and_prefix(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    lookup = PathLookup.build(tmp_path)
+    calc = tmp_path / "matematica/P4/inversa/calc"
+    sub = tmp_path / "matematica/P1/estatística/Leitura_Gráfico"
+
+    assert lookup.exact("MAT_INV_CALC_001") == calc / "MAT_INV_CALC_001.tex"
+    assert lookup.exact("EX_SUB") == sub
+    assert lookup.exact("ExerciseDatabase/matematica/P4/inversa/calc/MAT_INV_CALC_002.tex") == \
+        calc / "MAT_INV_CALC_002.tex"
+    assert lookup.exact("mat_inv_calc_001") is None
+    assert lookup.resolve("mat_inv_calc_001.tex") == calc / "MAT_INV_CALC_001.tex"
+    assert lookup.resolve("leitura_grafico/main.tex") == sub
+
+    assert lookup.candidates("mat_inv_calc") == [calc / "MAT_INV_CALC_001.tex", calc / "MAT_INV_CALC_002.tex"]
+    assert lookup.resolve("MAT_INV_CALC") is None  # ambiguous prefix
+    assert lookup.resolve("MAT_INV_CALC_00", prefix=False) is None
+    assert lookup.resolve("ex_s") == sub
+    assert lookup.resolve("ignored") is None
+
+
+def test_saved_table_is_refreshed_on_miss_and_extended(tmp_path, monkeypatch, make_exercise_tree):
+    monkeypatch.setattr(path_lookup, "_shared", {})
+    make_exercise_tree(DB)
+    assert resolve_exercise("MAT_INV_CALC_001", tmp_path) is not None
+    saved = json.loads((tmp_path / "path_lookup.json").read_text(encoding="utf-8"))["entries"]
+    assert saved["EX_SUB"] == "matematica/P1/estatística/Leitura_Gráfico"
+
+    # new process: the saved table is loaded, a file added since is found by one rebuild
+    monkeypatch.setattr(path_lookup, "_shared", {})
+    make_exercise_tree({"matematica/P4/inversa/calc/MAT_INV_CALC_003.tex": EXERCISE})
+    assert resolve_exercise("MAT_INV_CALC_003", tmp_path).name == "MAT_INV_CALC_003.tex"
+    assert resolve_exercise("MISSING", tmp_path) is None
+
+    # registry additions go straight into the saved table
+    make_exercise_tree({"matematica/P4/inversa/novo/MAT_NEW/main.tex": EXERCISE})
+    record_paths(["matematica/P4/inversa/novo/MAT_NEW", "matematica/nao/existe"], tmp_path)
+    reloaded = PathLookup.load(tmp_path)
+    assert reloaded.exact("MAT_NEW") == tmp_path / "matematica/P4/inversa/novo/MAT_NEW"
+    assert reloaded.exact("existe") is None
+
+
+def test_legacy_source_file_and_stale_entries(tmp_path, make_exercise_tree):
+    calc = "matematica/P4/inversa/calc"
+    make_exercise_tree({f"{calc}/MAT_OLD_001.tex": EXERCISE, f"{calc}/MAT_MOVED_001.tex": EXERCISE})
+    index = {"exercises": [
+        {"id": "MAT_OLD_001", "source_file": f"ExerciseDatabase/{calc}/MAT_OLD_001.tex"},
+        {"id": "MAT_MOVED_001", "path": "matematica/P4/antigo/MAT_MOVED_001.tex"},
+    ]}
+    lookup = PathLookup.build(tmp_path, index)
+
+    assert lookup.entries["MAT_OLD_001"] == f"{calc}/MAT_OLD_001.tex"
+    assert lookup.resolve("MAT_OLD_001.tex") == tmp_path / calc / "MAT_OLD_001.tex"
+    # the location found on disk replaces the stale one from the index
+    assert lookup.resolve("mat_moved_001") == tmp_path / calc / "MAT_MOVED_001.tex"
@@ -0,0 +1,87 @@
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import rebuild_index  # noqa: E402
+
+
+DB = {
+    "matematica/P4/inversa/metadata.json": json.dumps({"name": "Função Inversa", "module_name": "Funções"}),
+    "matematica/P4/inversa/calc/metadata.json": json.dumps({"tipo_nome": "Cálculo"}),
+    "matematica/P4/inversa/calc/EX_INV.tex":
+        "% Exercise ID: EX_INV\n% Difficulty: 3/5 (Médio) | Format: desenvolvimento\n"
+        "% Tags: inversa, calculo\n\\exercicio{...}\n",
+    "matematica/P4/inversa/calc/EX_INV.json": json.dumps({"evaluation": {"points": 10}, "status": "active"}),
+    "matematica/P4/graficos/EX_GRAF.tex": "% meta:\n% difficulty: 2\n% tags: grafico\n\\exercicio{...}\n",
+    "matematica/P1/estat/leitura/EX_SUB/main.tex": "% Exercise ID: EX_SUB\n\\exercicio{...}\n",
+    "matematica/P1/estat/leitura/EX_SUB/subvariant_1.tex": "x",
+    "projects/P/x.tex": "% not an exercise\n",
+    # editor backups are not exercises
+    "matematica/P4/inversa/calc/EX_INV.agentfix.tex": "% Exercise ID: EX_INV\n\\exercicio{...}\n",
+    "matematica/P4/inversa/calc/EX_INV.bak_agent_20251127T121826Z.tex": "\\exercicio{...}\n",
+}
+
+
+def test_scan_is_deterministic_across_jobs(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    serial = rebuild_index.scan_tree(tmp_path, jobs=1)
+    assert serial == rebuild_index.scan_tree(tmp_path, jobs=3)
+    by_id = {e["id"]: e for e in serial}
+    assert set(by_id) == {"EX_INV", "EX_GRAF", "EX_SUB"}
+    assert by_id["EX_INV"] == {
+        "id": "EX_INV", "path": "matematica/P4/inversa/calc/EX_INV.tex", "discipline": "matematica",
+        "module": "P4", "concept": "inversa", "module_name": "Funções", "concept_name": "Função Inversa",
+        "tipo": "calc", "tipo_nome": "Cálculo", "points": 10, "status": "active", "difficulty": 3,
+        "tags": ["inversa", "calculo"], "type": "desenvolvimento",
+    }
+    assert by_id["EX_GRAF"]["difficulty"] == 2 and by_id["EX_GRAF"]["tags"] == ["grafico"]
+    assert by_id["EX_SUB"]["path"] == "matematica/P1/estat/leitura/EX_SUB"
+    assert len(serial) == 3
+    assert rebuild_index.derive_entry(tmp_path, "matematica/P4/inversa/calc/EX_INV.agentfix.tex") is None
+    assert rebuild_index.derive_entry(tmp_path, "matematica/P4/inversa/calc/EX_INV.tex")["id"] == "EX_INV"
+
+
+def test_rebuild_reports_changes_and_keeps_order(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    index_file = tmp_path / "index.json"
+    index_file.write_text(json.dumps({"exercises": [
+        {"id": "EX_GONE", "path": "matematica/P4/inversa/calc/EX_GONE.tex"},
+        {"id": "EX_INV", "path": "matematica\\P4\\inversa\\calc\\EX_INV.tex", "difficulty": 1, "author": "x"},
+        {"id": "EX_INV", "path": "matematica/P4/inversa/calc/EX_INV.tex"},
+    ]}), encoding="utf-8")
+
+    report = rebuild_index.rebuild_index(index_file, jobs=1, dry_run=True)
+    assert report["removed"] == ["EX_GONE"]
+    assert report["duplicates"] == ["EX_INV"]
+    assert report["added"] == ["EX_SUB", "EX_GRAF"]
+    assert "difficulty" in report["changed"]["EX_INV"]
+    assert len(json.loads(index_file.read_text(encoding="utf-8"))["exercises"]) == 3
+
+    rebuild_index.rebuild_index(index_file, jobs=2)
+    index = json.loads(index_file.read_text(encoding="utf-8"))
+    assert [e["id"] for e in index["exercises"]] == ["EX_INV", "EX_SUB", "EX_GRAF"]
+    assert index["exercises"][0]["author"] == "x"
+    assert index["total_exercises"] == 3
+    assert index["statistics"]["by_module"] == {"P4": 2, "P1": 1}
+
+    again = rebuild_index.rebuild_index(index_file, jobs=2, dry_run=True)
+    assert again["unchanged"] == 3 and not (again["added"] or again["removed"] or again["changed"])
+
+
+def test_legacy_source_file_entries_are_matched(tmp_path, make_exercise_tree):
+    make_exercise_tree(DB)
+    index_file = tmp_path / "index.json"
+    index_file.write_text(json.dumps({"exercises": [
+        {"id": "EX_INV", "source_file": "ExerciseDatabase/matematica/P4/inversa/calc/EX_INV.tex", "author": "x"},
+    ]}), encoding="utf-8")
+
+    report = rebuild_index.rebuild_index(index_file, jobs=1, dry_run=True)
+    assert report["removed"] == [] and "EX_INV" not in report["added"]
+
+    rebuild_index.rebuild_index(index_file, jobs=1)
+    first = json.loads(index_file.read_text(encoding="utf-8"))["exercises"][0]
+    assert first["id"] == "EX_INV" and first["author"] == "x"
+    assert first["path"] == "matematica/P4/inversa/calc/EX_INV.tex"
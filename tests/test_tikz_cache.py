@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from tikz_cache import TikzCache, figure_preamble, find_pictures, normalize  # noqa: E402
+
+PACKAGES = "\\documentclass[11pt,a4paper]{article}\n\\usepackage{geometry}\n\\usepackage{tikz}\n"
+
+# "pdflatex" stand-in: counts runs next to itself, fails on BROKEN pictures
+FAKE_ENGINE = '''
+import sys
+from pathlib import Path
+counter = Path(__file__).with_name("runs.txt")
+counter.write_text(str(int(counter.read_text()) + 1) if counter.exists() else "1")
+source = Path(sys.argv[-1]).read_text()
+if "BROKEN" in source:
+    sys.exit(1)
+Path("figure.pdf").write_text(source)
+'''
+
+
+def _cache(tmp_path: Path, fake_latex_engine) -> TikzCache:
+    return TikzCache(tmp_path / "cache", engine=str(fake_latex_engine(FAKE_ENGINE)))
+
+
+def test_find_and_normalize():
+    content = "a \\begin{tikzpicture}x\\begin{tikzpicture}y\\end{tikzpicture}\\end{tikzpicture} b " \
+              "\\begin{tikzpicture}z\\end{tikzpicture}"
+    spans = find_pictures(content)
+    assert len(spans) == 2
+    assert content[spans[0][0]:spans[0][1]].count("\\end{tikzpicture}") == 2
+    assert normalize("\\draw  (0,0)\n  -- (1,1); % diagonal\n") == "\\draw (0,0) -- (1,1);"
+
+
+def test_figure_preamble():
+    preamble = figure_preamble(PACKAGES, "\\usetikzlibrary{calc}")
+    assert preamble.startswith("\\documentclass[tikz,11pt]{standalone}")
+    assert "geometry" not in preamble
+    assert "\\usepackage{tikz}" in preamble and "\\usetikzlibrary{calc}" in preamble
+
+
+def test_externalize_compiles_each_figure_once(tmp_path, fake_latex_engine):
+    cache = _cache(tmp_path, fake_latex_engine)
+    pic = "\\begin{tikzpicture}\n  \\draw (0,0) -- (1,1);\n\\end{tikzpicture}"
+    same_pic = "\\begin{tikzpicture} \\draw (0,0) -- (1,1); % same\n\\end{tikzpicture}"
+    inline = "\\begin{tikzpicture}[remember picture]\\node{a};\\end{tikzpicture}"
+    content = f"Antes {pic} meio {same_pic} {inline} depois"
+
+    out = cache.externalize(content, PACKAGES)
+    assert out.count("\\includegraphics{tikz_figures/") == 2
+    assert str(tmp_path) not in out
+    assert inline in out and out.startswith("Antes ") and out.endswith(" depois")
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert (tmp_path / "bin" / "runs.txt").read_text() == "1"
+
+    # a changed picture compiles again; the cached one does not
+    cache.externalize(pic.replace("(1,1)", "(2,2)") + pic, PACKAGES)
+    assert (tmp_path / "bin" / "runs.txt").read_text() == "2"
+
+
+def test_broken_figure_stays_inline(tmp_path, fake_latex_engine):
+    cache = _cache(tmp_path, fake_latex_engine)
+    broken = "\\begin{tikzpicture}\\BROKEN\\end{tikzpicture}"
+    assert cache.externalize(broken, PACKAGES) == broken
+    assert cache.externalize(broken, PACKAGES) == broken
+    assert (tmp_path / "bin" / "runs.txt").read_text() == "1"
+    assert cache.failures == 1
+
+
+def test_copy_figures_next_to_output(tmp_path, fake_latex_engine):
+    cache = _cache(tmp_path, fake_latex_engine)
+    out = cache.externalize("\\begin{tikzpicture}\\draw (0,0) -- (1,1);\\end{tikzpicture}", PACKAGES)
+    dest = tmp_path / "pasta com espaços"
+    assert cache.copy_figures(out + out, dest) == 1
+    figure = out[len("\\includegraphics{"):-1]
+    assert (dest / figure).read_text() == next((tmp_path / "cache" / "figures").glob("*/*.pdf")).read_text()
+    assert cache.copy_figures(out, dest) == 0
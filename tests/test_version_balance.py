@@ -0,0 +1,74 @@
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+from exercise_selection import select_with_constraints  # noqa: E402
+from version_balance import select_versions  # noqa: E402
+
+
+def _pool(n=600, seed=2):
+    rng = random.Random(seed)
+    return [{
+        "id": f"EX{i:04d}",
+        "concept": f"c{i % 20}",
+        "tipo": f"t{i % 3}",
+        "difficulty": rng.randint(1, 5),
+        "points": rng.choice([5, 8, 10, 12, 15, 20]),
+    } for i in range(n)]
+
+
+def _take(config):
+    def select(available, rng):
+        if config.get("constraints"):
+            result = select_with_constraints(available, config, rng)
+            return result.selected if result.feasible else []
+        rng.shuffle(available)
+        return available[:config["count"]]
+    return select
+
+
+def test_versions_are_balanced_and_disjoint():
+    config = {"count": 8, "balance": {"points_tolerance": 3, "difficulty_tolerance": 2, "disjoint": True}}
+    result = select_versions(_pool(), config, 12, 100, _take(config))
+    assert result.balanced, result.reasons
+    assert max(result.points) - min(result.points) <= 3
+    assert max(result.difficulty) - min(result.difficulty) <= 2
+    ids = [ex["id"] for version in result.versions for ex in version]
+    assert len(ids) == len(set(ids)) == 96 and result.overlap == 0
+
+
+def test_constraints_hold_after_balancing():
+    config = {"constraints": {"count": 6, "difficulty": {"1": 2, "5": 1}, "max_per_concept": 1},
+              "balance": {"points_tolerance": 2, "difficulty_tolerance": 1, "max_overlap": 1}}
+    result = select_versions(_pool(), config, 8, 7, _take(config))
+    assert result.balanced, result.reasons
+    for version in result.versions:
+        levels = Counter(ex["difficulty"] for ex in version)
+        assert len(version) == 6 and levels[1] >= 2 and levels[5] >= 1
+        assert max(Counter(ex["concept"] for ex in version).values()) == 1
+    for i, a in enumerate(result.versions):
+        for b in result.versions[i + 1:]:
+            assert len({ex["id"] for ex in a} & {ex["id"] for ex in b}) <= 1
+
+
+def test_per_tipo_counts_kept_and_exhausted_pool_explained():
+    config = {"per_tipo": {"t0": 2, "t1": 1}, "balance": {"points_tolerance": 2}}
+
+    def per_tipo(available, rng):
+        by_tipo = {}
+        for ex in available:
+            by_tipo.setdefault(ex["tipo"], []).append(ex)
+        return rng.sample(by_tipo["t0"], 2) + rng.sample(by_tipo["t1"], 1)
+
+    result = select_versions(_pool(), config, 10, 1, per_tipo)
+    assert result.balanced, result.reasons
+    assert all(Counter(ex["tipo"] for ex in v) == {"t0": 2, "t1": 1} for v in result.versions)
+
+    small = {"count": 5, "balance": {"disjoint": True}}
+    result = select_versions(_pool(12), small, 3, 0, _take(small))
+    assert len(result.versions) == 2
+    assert result.reasons == ["versão 3: nenhuma seleção possível (2 exercícios disponíveis sem repetir versões anteriores)"]
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "ExerciseDatabase" / "_tools"))
+
+import fulltext_index  # noqa: E402
+import ip_registry  # noqa: E402
+import watch_exercises  # noqa: E402
+from ip_registry import IPRegistry  # noqa: E402
+from watch_exercises import Debouncer, PollingSource, apply_changes, exercise_units  # noqa: E402
+
+CONCEPT = "disc_watch/M1/conc"
+
+
+def test_exercise_units(tmp_path, make_exercise_tree):
+    make_exercise_tree({"t1/EX_A.tex": "x", "t1/EX_A.json": "{}", "t1/EX_B/main.tex": "x",
+                        "t1/EX_B/subvariant_1.tex": "x", "t1/metadata.json": "{}"}, tmp_path / CONCEPT)
+
+    def units(rel):
+        return exercise_units(tmp_path, tmp_path / rel)
+
+    assert units(f"{CONCEPT}/t1/EX_A.tex") == [f"{CONCEPT}/t1/EX_A.tex"]
+    assert units(f"{CONCEPT}/t1/EX_A.json") == [f"{CONCEPT}/t1/EX_A.tex"]
+    assert units(f"{CONCEPT}/t1/EX_A_solution.tex") == [f"{CONCEPT}/t1/EX_A.tex"]
+    assert units(f"{CONCEPT}/t1/EX_B/subvariant_1.tex") == [f"{CONCEPT}/t1/EX_B"]
+    assert units(f"{CONCEPT}/t1") == [f"{CONCEPT}/t1/EX_A.tex", f"{CONCEPT}/t1/EX_B"]
+    assert units(f"{CONCEPT}/t1/metadata.json") == []
+    assert units(f"{CONCEPT}/t1/EX_A_preview.tex") == []
+    assert units("_staging/a/b/c.tex") == []
+    # files the watcher itself causes to be written, and editor backups
+    assert units(f"{CONCEPT}/t1/EX_B/exercise.json") == []
+    assert units(f"{CONCEPT}/t1/EX_A.agentfix.tex") == []
+
+
+def test_debouncer_waits_for_quiet_period():
+    deb = Debouncer(delay=1.0, max_wait=5.0)
+    deb.add([Path("a")], now=0.0)
+    deb.add([Path("b")], now=0.5)
+    assert deb.due(now=1.2) == []
+    assert deb.due(now=1.5) == [Path("a"), Path("b")]
+    assert deb.due(now=3.0) == []
+    for t in range(0, 6):
+        deb.add([Path("c")], now=10.0 + t)
+    assert deb.due(now=15.5) == [Path("c")]
+
+
+def test_polling_changes_update_index_registry_and_dirty(tmp_path, make_exercise_tree):
+    base = tmp_path / "db"
+    index_file = base / "index.json"
+    make_exercise_tree({index_file: json.dumps({"exercises": [], "statistics": {}})})
+    registry = IPRegistry(path=tmp_path / "ip_registry.json")
+    dirty_file = tmp_path / "dirty.json"
+    source = PollingSource(base)
+
+    tex = base / CONCEPT / "t1/EX_A.tex"
+    make_exercise_tree({tex: "% Exercise ID: EX_A\n% Difficulty: 2/5\n\\exercicio{...}\n"})
+    summary = apply_changes(base, source.poll(), registry, dirty_file)
+    assert summary["upserted"] == ["EX_A"] and summary["dirty"] == [CONCEPT]
+    assert list(summary["registered"].values()) == [f"{CONCEPT}/t1/EX_A.tex"]
+    assert list(json.loads(dirty_file.read_text(encoding="utf-8"))) == [CONCEPT]
+
+    make_exercise_tree({tex: "% Exercise ID: EX_A\n% Difficulty: 4/5\n\\exercicio{...}\n"})
+    os.utime(tex, ns=(0, 1))
+    apply_changes(base, source.poll(), registry, dirty_file)
+    index = json.loads(index_file.read_text(encoding="utf-8"))
+    assert [(e["id"], e["difficulty"]) for e in index["exercises"]] == [("EX_A", 4)]
+    assert index["statistics"]["by_difficulty"] == {"Difícil": 1}
+
+    # once built, the full-text index follows the changes
+    with fulltext_index.FullTextIndex(base) as fulltext:
+        fulltext.update()
+    make_exercise_tree({tex: "% Exercise ID: EX_A\n\\exercicio{Complete a tabela.}\n"})
+    os.utime(tex, ns=(0, 2))
+    apply_changes(base, source.poll(), registry, dirty_file)
+    assert [h["id"] for h in fulltext_index.search_text("tabela", base_dir=base, refresh=False)] == ["EX_A"]
+
+    tex.unlink()
+    assert apply_changes(base, source.poll(), registry, dirty_file)["removed"] == ["EX_A"]
+    index = json.loads(index_file.read_text(encoding="utf-8"))
+    assert index["exercises"] == [] and index["total_exercises"] == 0
+
+    watch_exercises.clear_dirty_sebentas([CONCEPT], dirty_file)
+    assert watch_exercises.load_dirty_sebentas(dirty_file) == {}
+
+
+def test_own_writes_do_not_retrigger(tmp_path, monkeypatch, make_exercise_tree):
+    # registry side files (exercise.json) land inside this tree, as on the real database
+    monkeypatch.setattr(ip_registry, "REPO_ROOT", tmp_path)
+    base = tmp_path / "ExerciseDatabase"
+    make_exercise_tree({base / "index.json": json.dumps({"exercises": [], "statistics": {}})})
+    registry = IPRegistry(path=tmp_path / "registry" / "ip_registry.json")
+    dirty_file = tmp_path / "dirty.json"
+    source = PollingSource(base)
+
+    main_tex = base / CONCEPT / "t1/EX_B/main.tex"
+    make_exercise_tree({main_tex: "% Exercise ID: EX_B\n\\exercicio{...}\n"})
+    summary = apply_changes(base, source.poll(), registry, dirty_file)
+    assert summary["upserted"] == ["EX_B"] and len(summary["registered"]) == 1
+    assert (main_tex.parent / "exercise.json").exists()
+
+    # the next poll only sees what apply_changes wrote: nothing to do
+    assert apply_changes(base, source.poll(), registry, dirty_file)["upserted"] == []
+    assert source.poll() == set()
+
+    # editing a registered exercise updates the index without registering it again
+    backups = set((tmp_path / "registry").glob("*.bak*"))
+    make_exercise_tree({main_tex: "% Exercise ID: EX_B\n% Difficulty: 4/5\n\\exercicio{...}\n"})
+    os.utime(main_tex, ns=(0, 1))
+    summary = apply_changes(base, source.poll(), registry, dirty_file)
+    assert summary["upserted"] == ["EX_B"] and summary["registered"] == {}
+    assert set((tmp_path / "registry").glob("*.bak*")) == backups
+    assert apply_changes(base, source.poll(), registry, dirty_file)["upserted"] == []